@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.core.pagination import InvalidCursorError
 from app.models.ranking import Ranking, UserRankingStats
 from app.models.user import FirebaseUser
 from app.dependencies.auth import get_current_user
@@ -11,19 +12,82 @@ router = APIRouter(prefix="/ranking", tags=["ranking"])
 
 @router.get("/global", response_model=Ranking)
 async def get_global_ranking(
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Token context.next_cursor da página anterior"),
     ranking_service: RankingService = Depends(get_ranking_service)
 ):
-    """Busca ranking global"""
-    return await ranking_service.generate_global_ranking(limit)
+    """Busca ranking global (página seguinte ao cursor, ou a partir de offset)"""
+    try:
+        return await ranking_service.generate_global_ranking(limit, offset, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/weekly", response_model=Ranking)
 async def get_weekly_ranking(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Token context.next_cursor da página anterior"),
     ranking_service: RankingService = Depends(get_ranking_service)
 ):
-    """Busca ranking semanal"""
-    week_start = datetime.now() - timedelta(days=7)
-    return await ranking_service.generate_weekly_ranking(week_start)
+    """Busca ranking semanal (pontos dos últimos 7 dias)"""
+    try:
+        return await ranking_service.generate_weekly_ranking(limit, offset, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/monthly", response_model=Ranking)
+async def get_monthly_ranking(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Token context.next_cursor da página anterior"),
+    ranking_service: RankingService = Depends(get_ranking_service)
+):
+    """Busca ranking mensal (pontos dos últimos 31 dias)"""
+    try:
+        return await ranking_service.generate_monthly_ranking(limit, offset, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/level/{level}", response_model=Ranking)
+async def get_level_ranking(
+    level: int,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Token context.next_cursor da página anterior"),
+    ranking_service: RankingService = Depends(get_ranking_service)
+):
+    """Busca ranking dos usuários de um nível"""
+    try:
+        return await ranking_service.generate_level_ranking(level, limit, offset, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/learning-path/{path_id}", response_model=Ranking)
+async def get_learning_path_ranking(
+    path_id: str,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Token context.next_cursor da página anterior"),
+    ranking_service: RankingService = Depends(get_ranking_service)
+):
+    """Busca ranking de uma trilha (pontuação acumulada na trilha)"""
+    try:
+        return await ranking_service.generate_learning_path_ranking(path_id, limit, offset, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/snapshots/{board}", response_model=Ranking)
+async def get_ranking_snapshot(
+    board: str,
+    page: int = Query(0, ge=0),
+    ranking_service: RankingService = Depends(get_ranking_service)
+):
+    """Busca uma página do último snapshot materializado (global, weekly, monthly, level_N, path_ID)"""
+    ranking = await ranking_service.get_ranking_snapshot_page(board, page)
+    if ranking is None:
+        raise HTTPException(status_code=404, detail="Snapshot de ranking não encontrado")
+    return ranking
 
 @router.get("/user/{user_id}/stats", response_model=UserRankingStats)
 async def get_user_ranking_stats(
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.core.pagination import InvalidCursorError
 from app.models.reward import UserReward, UserBadge, Badge
 from app.models.user import FirebaseUser
 from app.dependencies.auth import get_current_user
 from app.services.reward_service import RewardService, get_reward_service
-from app.repositories.reward_repository import RewardRepository, get_reward_repository
+from app.repositories.reward_repository import RewardRepository, get_reward_repository, get_reward_history_repository
 from app.repositories.badge_repository import BadgeRepository, get_badge_repository
+from app.services.badge_notifications import BadgeNotificationHub, get_badge_notification_hub
+from app.services.badge_progress import BadgeProgressService, get_badge_progress_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,17 +18,26 @@ router = APIRouter(prefix="/rewards", tags=["rewards"])
 @router.get("/user/{user_id}/history", response_model=List[UserReward])
 async def get_user_rewards_history(
     user_id: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Token do header X-Next-Cursor da página anterior"),
     current_user: FirebaseUser = Depends(get_current_user),
-    reward_repo: RewardRepository = Depends(get_reward_repository)
+    reward_repo: RewardRepository = Depends(get_reward_history_repository)
 ):
-    """Busca histórico de recompensas do usuário"""
+    """Busca histórico de recompensas do usuário (próxima página no header X-Next-Cursor)"""
     try:
         if current_user.uid != user_id:
             raise HTTPException(status_code=403, detail="Acesso negado")
         
-        rewards = reward_repo.get_user_rewards(user_id)
+        rewards, next_cursor = reward_repo.get_user_rewards_page(user_id, limit, cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         logger.info(f"Histórico de recompensas recuperado para usuário {user_id}: {len(rewards)} itens")
         return rewards
+    except HTTPException:
+        raise
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao buscar histórico de recompensas: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
@@ -35,18 +48,36 @@ async def get_user_badges(
     current_user: FirebaseUser = Depends(get_current_user),
     badge_repo: BadgeRepository = Depends(get_badge_repository)
 ):
-    """Busca badges do usuário usando o novo sistema"""
+    """Busca badges do usuário a partir do resumo no documento do usuário"""
     try:
         if current_user.uid != user_id:
             raise HTTPException(status_code=403, detail="Acesso negado")
         
-        badges = badge_repo.get_user_badges(user_id)
+        badges = badge_repo.get_earned_badges(user_id)
         logger.info(f"Badges do usuário recuperados para usuário {user_id}: {len(badges)} itens")
         return badges
     except Exception as e:
         logger.error(f"Erro ao buscar badges do usuário: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@router.get("/user/{user_id}/badges/stream")
+async def stream_user_badge_awards(
+    user_id: str,
+    request: Request,
+    current_user: FirebaseUser = Depends(get_current_user),
+    hub: BadgeNotificationHub = Depends(get_badge_notification_hub)
+):
+    """Concessões de badges em tempo real (Server-Sent Events), no lugar do polling de /badges"""
+    if current_user.uid != user_id:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    logger.info(f"Stream de badges aberto para usuário {user_id}")
+    return StreamingResponse(
+        hub.stream(user_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/badges", response_model=List[Badge])
 async def get_all_badges(
     badge_repo: BadgeRepository = Depends(get_badge_repository)
@@ -120,6 +151,26 @@ async def get_user_badge_stats(
         logger.error(f"Erro ao buscar estatísticas de badges: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
+@router.get("/user/{user_id}/badge-progress")
+async def get_user_badge_progress(
+    user_id: str,
+    current_user: FirebaseUser = Depends(get_current_user),
+    progress_service: BadgeProgressService = Depends(get_badge_progress_service)
+):
+    """Progresso do usuário em todos os badges (documento incremental + catálogo em memória)"""
+    try:
+        if current_user.uid != user_id:
+            raise HTTPException(status_code=403, detail="Acesso negado")
+        
+        progress = await progress_service.get_user_badge_progress_async(user_id)
+        logger.info(f"Progresso de badges recuperado para usuário {user_id}")
+        return progress
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao buscar progresso de badges: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+
 @router.get("/badges/{badge_id}")
 async def get_badge_by_id(
     badge_id: str,
@@ -0,0 +1,33 @@
+"""
+Cursores opacos para paginação por chave (start_after).
+
+O cliente recebe um token com os valores de ordenação do último item da
+página e o devolve para buscar a próxima; o conteúdo do token não faz
+parte do contrato da API.
+"""
+import base64
+import json
+from typing import Any, Dict
+
+
+class InvalidCursorError(ValueError):
+    """Token de paginação malformado ou adulterado"""
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Codifica os valores de ordenação do último item em um token opaco"""
+    payload = json.dumps(values, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Decodifica um token gerado por encode_cursor"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise InvalidCursorError(f"Cursor de paginação inválido: {e}") from e
+
+    if not isinstance(values, dict):
+        raise InvalidCursorError("Cursor de paginação inválido")
+    return values
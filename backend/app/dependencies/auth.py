@@ -39,4 +39,19 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Não foi possível validar as credenciais",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+async def get_admin_user(
+    current_user: Annotated[FirebaseUser, Depends(get_current_user)]
+) -> FirebaseUser:
+    """
+    Dependência para endpoints de operação: exige o custom claim `admin`
+    no token do Firebase.
+    """
+    if not current_user.admin:
+        logger.warning(f"Acesso de operação negado para o usuário {current_user.uid}")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores",
+        )
+    return current_user
\ No newline at end of file
@@ -1,6 +1,7 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.api import auth
@@ -14,14 +15,25 @@ from app.api import rewards_api
 from app.api import ai_api
 from app.services.event_bus import get_event_bus
 from app.services.badge_engine import get_badge_engine
+from app.services.badge_progress import get_badge_progress_service
+from app.services.badge_notifications import get_badge_notification_hub
 from app.services.metrics_collector import get_metrics_collector
 from app.services.alert_manager import get_alert_manager
 from app.services.health_monitor import get_health_monitor
 from app.services.background_task_service import get_background_service
+from app.services.learning_path_service import register_background_task_handlers
 from app.services.fast_cache_service import get_fast_cache
+from app.services.leaderboard_service import get_leaderboard_service
+from app.services.ranking_materializer import get_ranking_materializer
+from app.services.sharded_counter import get_sharded_counters
+from app.repositories.user_repository import get_user_repository
+from app.repositories.reward_repository import RewardRepository
+from app.repositories.learning_path_repository import LearningPathRepository
+from app.core.firebase import get_firestore_db
 from app.middleware.security import SecurityHeadersMiddleware, RateLimitMiddleware
 from app.middleware.logging_middleware import RequestLoggingMiddleware, ErrorLoggingMiddleware
 from app.api import monitoring_api
+from app.dependencies.auth import get_admin_user
 import logging
 
 # Configurar logging
@@ -38,20 +50,57 @@ async def lifespan(app: FastAPI):
     
     # ⚡ Inicializar workers de processamento assíncrono
     background_service = get_background_service()
+    await register_background_task_handlers()
     await background_service.start_worker()
-    logging.info("✅ Background task worker inicializado!")
+    
+    # Reexecutar tarefas que ficaram na fila durável (deploy/restart anterior)
+    recovered = background_service.recover_persisted_tasks()
+    logging.info(f"✅ Background task worker inicializado! ({recovered} tarefas recuperadas)")
     
     # Inicializar cache service
     cache_service = get_fast_cache()
     await cache_service.start_cleanup_worker()
     logging.info("✅ Cache service inicializado!")
     
+    # Leaderboard em memória (carregado em background, sem atrasar o startup);
+    # o ledger de recompensas aquece os rankings semanal/mensal e os
+    # progressos montam os rankings por trilha
+    leaderboard_service = get_leaderboard_service()
+    await leaderboard_service.start_refresh_worker(
+        get_user_repository,
+        lambda: RewardRepository(get_firestore_db()),
+        LearningPathRepository
+    )
+    await leaderboard_service.register_event_handlers()
+    
+    # Contadores globais (usuários, missões, pontos distribuídos) por eventos
+    await get_sharded_counters().register_event_handlers()
+    try:
+        # Valor inicial dos contadores com dados anteriores (ex.: usuários já cadastrados)
+        await asyncio.to_thread(get_sharded_counters().seed_registered)
+    except Exception as e:
+        logging.error(f"Erro ao semear contadores globais (semeadura fica para a primeira leitura): {e}")
+    
+    # Progresso incremental de badges (um documento por usuário)
+    await get_badge_progress_service().register_event_handlers()
+    
+    # Snapshots de ranking materializados fora do caminho das requisições
+    ranking_materializer = None
+    if os.getenv("RANKING_SNAPSHOT_ENABLED", "true").lower() == "true":
+        ranking_materializer = get_ranking_materializer()
+        await ranking_materializer.start()
+    
     # Inicializar BadgeEngine
     badge_engine = get_badge_engine()
     
     # Registrar handlers de eventos
     await badge_engine._register_event_handlers()
     
+    # Push de concessões de badges (SSE); o listener traz as concessões de outros workers
+    badge_notification_hub = get_badge_notification_hub()
+    if os.getenv("BADGE_NOTIFICATIONS_LISTENER", "true").lower() == "true":
+        badge_notification_hub.start_listener(get_firestore_db(), badge_engine.badge_repo.get_badge_by_id)
+    
     # Inicializar sistema de monitoramento avançado
     get_metrics_collector()
     get_alert_manager()
@@ -69,6 +118,10 @@ async def lifespan(app: FastAPI):
     # Parar workers
     await background_service.stop_worker()
     await cache_service.stop_cleanup_worker()
+    await leaderboard_service.stop_refresh_worker()
+    badge_notification_hub.stop_listener()
+    if ranking_materializer is not None:
+        await ranking_materializer.stop()
     logging.info("✅ Workers finalizados com sucesso!")
 
 app = FastAPI(
@@ -182,7 +235,10 @@ async def get_event_stats():
     
     return {
         "event_bus_stats": event_bus.get_event_counts(),
-        "badge_engine_stats": badge_engine.get_engine_stats()
+        "badge_engine_stats": badge_engine.get_engine_stats(),
+        "counter_stats": get_sharded_counters().get_stats(),
+        "badge_progress_stats": get_badge_progress_service().get_stats(),
+        "badge_notification_stats": get_badge_notification_hub().get_stats()
     }
 
 @app.get("/background/stats", tags=["Background"])
@@ -192,6 +248,28 @@ async def get_background_stats():
     cache_service = get_fast_cache()
     
     return {
-        "background_tasks": background_service.get_metrics(),
+        # Métricas leem a fila durável (SQLite): fora do event loop
+        "background_tasks": await asyncio.to_thread(background_service.get_metrics),
         "cache": cache_service.get_stats()
     }
+
+
+@app.get("/background/dead-letters", tags=["Background"], dependencies=[Depends(get_admin_user)])
+async def get_background_dead_letters(task_name: str = None, limit: int = 100):
+    """Lista tarefas de background que esgotaram as tentativas"""
+    background_service = get_background_service()
+    
+    return {
+        "dead_letters": background_service.get_dead_letters(task_name=task_name, limit=limit),
+        "total": len(background_service.dead_letters)
+    }
+
+@app.post("/background/dead-letters/{task_id}/redrive", tags=["Background"], dependencies=[Depends(get_admin_user)])
+async def redrive_background_dead_letter(task_id: str):
+    """Reenvia uma tarefa da dead-letter queue para processamento"""
+    background_service = get_background_service()
+    
+    if not background_service.redrive_dead_letter(task_id):
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada na dead-letter queue")
+    
+    return {"task_id": task_id, "status": "pending"}
@@ -18,6 +18,7 @@ class EventType(str, Enum):
     LEARNING_PATH_COMPLETED = "learning_path_completed"
     QUIZ_COMPLETED = "quiz_completed"
     MODULE_COMPLETED = "module_completed"
+    LEARNING_PATH_PROGRESS = "learning_path_progress"
 
 
 class BaseEvent(BaseModel):
@@ -39,6 +40,8 @@ class MissionCompletedEvent(BaseEvent):
     mission_type: str  # 'daily', 'learning_path', etc.
     points_earned: int = 0
     xp_earned: int = 0
+    total_points: Optional[int] = None  # Totais após a missão, quando conhecidos
+    total_xp: Optional[int] = None
 
 
 class LevelUpEvent(BaseEvent):
@@ -64,6 +67,8 @@ class PointsEarnedEvent(BaseEvent):
     points_earned: int
     total_points: int
     source: str  # 'mission', 'quiz', 'bonus', etc.
+    xp_earned: int = 0
+    total_xp: Optional[int] = None
 
 
 class LearningPathCompletedEvent(BaseEvent):
@@ -92,6 +97,14 @@ class ModuleCompletedEvent(BaseEvent):
     module_name: str
 
 
+class LearningPathProgressEvent(BaseEvent):
+    """Evento disparado quando a pontuação do usuário em uma trilha muda"""
+    event_type: EventType = EventType.LEARNING_PATH_PROGRESS
+    learning_path_id: str
+    total_score: int  # Pontuação acumulada na trilha após a atualização
+    mission_id: Optional[str] = None
+
+
 # Union type para todos os eventos
 from typing import Union
 
@@ -102,5 +115,6 @@ Event = Union[
     PointsEarnedEvent,
     LearningPathCompletedEvent,
     QuizCompletedEvent,
-    ModuleCompletedEvent
+    ModuleCompletedEvent,
+    LearningPathProgressEvent
 ]
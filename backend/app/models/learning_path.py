@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from typing import Any, List, Optional, Union
 from datetime import datetime, UTC
 from enum import Enum
 
@@ -37,6 +37,9 @@ class LearningPath(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC), description="Data de criação")
     updated_at: Optional[datetime] = Field(default=None, description="Data de atualização")
 
+    # Índice compilado (app.services.learning_path_index), fora da serialização
+    _index: Optional[Any] = PrivateAttr(default=None)
+
 class UserPathProgress(BaseModel):
     """Progresso do usuário em uma trilha"""
     user_id: str = Field(..., description="ID do usuário")
@@ -48,6 +51,13 @@ class UserPathProgress(BaseModel):
     completed_missions: List[str] = Field(default_factory=list, description="Missões concluídas")
     total_score: int = Field(default=0, description="Pontuação total")
     progress_percentage: float = Field(default=0.0, description="Percentual de progresso")
+    # Bitset sobre os ordinais das missões da trilha (app.services.learning_path_index);
+    # `completed_missions` continua sendo a fonte de verdade
+    completed_mission_bits: Optional[bytes] = Field(default=None, description="Bitset das missões concluídas")
+    mission_bits_key: Optional[str] = Field(default=None, description="Chave do espaço de ordinais do bitset")
+
+    # Bytes em base64 nas respostas JSON da API
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
 
 class LearningPathResponse(BaseModel):
     """Resposta da API com detalhes da trilha e progresso"""
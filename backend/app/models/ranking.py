@@ -20,6 +20,7 @@ class RankingEntry(BaseModel):
     xp: int
     level: int
     rank: int 
+    score: int = 0
     avatar_url: Optional[str] = None
     badges: List[str] = Field(default_factory=list)
     last_activity: datetime
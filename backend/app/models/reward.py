@@ -7,6 +7,7 @@ from enum import Enum
 class RewardType(str, Enum): 
     DAILY_MISSION = "daily_mission"
     LEARNING_PATH_MODULE = "learning_path_module"
+    LEARNING_PATH_PROGRESS = "learning_path_progress"
     LEARNING_PATH_COMPLETE = "learning_path_complete"
     STREAK_7_DAYS = "streak_7_days"
     STREAK_30_DAYS = "streak_30_days"
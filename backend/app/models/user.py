@@ -21,6 +21,8 @@ class FirebaseUser(BaseModel):
     uid:str 
     email: EmailStr 
     name: Optional[str] = None 
+    # Custom claim "admin" do Firebase Auth (operacao interna)
+    admin: bool = False
 
 # Modelo para perfil do Usuario Armazenado no Firestore 
 # Representa os dados do perfil do usuario 
@@ -34,6 +36,8 @@ class UserProfile(BaseModel):
     points: int = 0
     xp: int = 0
     badges: List[str] = Field(default_factory=list)
+    # Resumo de badges mantido pelas concessoes (ver BadgeRepository.get_badge_summary)
+    badge_summary: Optional[dict] = None
     completed_missions: Dict[str, datetime] = Field(default_factory=dict)
     daily_missions: List[str] = Field(default_factory=list)
     daily_assigned_at: Optional[datetime] = None
@@ -44,6 +48,13 @@ class UserProfile(BaseModel):
     model_config = {"from_attributes": True} 
 
 
+def earned_badge_ids(badge_summary: Optional[dict], legacy_badges: Optional[List[str]] = None) -> List[str]:
+    """IDs de badges de um documento de usuario, preferindo o resumo mantido pelas concessoes"""
+    if badge_summary and badge_summary.get("badge_ids") is not None:
+        return list(badge_summary["badge_ids"])
+    return list(legacy_badges or [])
+
+
 class UserProfileUpdate(BaseModel):
     '''
         Model para os dados que podem ser atualizados no perfil do usuario
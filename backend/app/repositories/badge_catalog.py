@@ -0,0 +1,132 @@
+"""
+Catálogo de badges em memória, versionado.
+O catálogo só muda quando os scripts de população (`populate_badges.py`,
+`create_learning_path_badges.py`) rodam; eles incrementam `version` em
+`badges_meta/catalog`. Cada processo mantém um catálogo imutável e só relê a
+coleção `badges` quando a versão muda, consultando-a no máximo a cada N
+segundos.
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.models.reward import Badge
+
+logger = logging.getLogger(__name__)
+
+CATALOG_META_COLLECTION = "badges_meta"
+CATALOG_META_DOCUMENT = "catalog"
+
+
+@dataclass(frozen=True)
+class BadgeCatalog:
+    """Snapshot imutável do catálogo com índices por ID e por tipo de requirement"""
+    version: Optional[int]
+    badges: Mapping[str, Badge]
+    by_requirement_type: Mapping[str, Tuple[Badge, ...]]
+
+    @classmethod
+    def from_badges(cls, badges: Iterable[Badge], version: Optional[int] = None) -> "BadgeCatalog":
+        by_id: Dict[str, Badge] = {}
+        by_type: Dict[str, List[Badge]] = {}
+        for badge in badges:
+            if not badge.id:
+                continue
+            by_id[badge.id] = badge
+            by_type.setdefault((badge.requirements or {}).get("type"), []).append(badge)
+        return cls(
+            version=version,
+            badges=MappingProxyType(by_id),
+            by_requirement_type=MappingProxyType({key: tuple(group) for key, group in by_type.items()})
+        )
+
+    def get(self, badge_id: str) -> Optional[Badge]:
+        return self.badges.get(badge_id)
+
+    def of_type(self, requirement_type: str) -> Tuple[Badge, ...]:
+        return self.by_requirement_type.get(requirement_type, ())
+
+    def all(self) -> List[Badge]:
+        return list(self.badges.values())
+
+    def __len__(self) -> int:
+        return len(self.badges)
+
+
+class BadgeCatalogCache:
+    """
+    Mantém o catálogo atual de um cliente Firestore.
+
+    A versão é consultada no máximo a cada `check_interval` segundos; a
+    coleção só é relida quando ela muda. Falhas mantêm o catálogo anterior
+    (só a primeira carga propaga o erro).
+    """
+
+    def __init__(self, check_interval: float = 60.0):
+        self.check_interval = check_interval
+        self._catalog: Optional[BadgeCatalog] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {"version_checks": 0, "reloads": 0, "errors": 0}
+
+    def _is_fresh(self) -> bool:
+        return self._catalog is not None and time.monotonic() - self._checked_at < self.check_interval
+
+    def get(self, badge_repo) -> BadgeCatalog:
+        """Catálogo atual, relendo a coleção de `badge_repo` só se a versão mudou"""
+        if self._is_fresh():
+            return self._catalog
+
+        with self._lock:
+            if self._is_fresh():
+                return self._catalog
+
+            try:
+                version = badge_repo.get_catalog_version()
+                self.metrics["version_checks"] += 1
+                if self._catalog is None or version != self._catalog.version:
+                    self._catalog = BadgeCatalog.from_badges(badge_repo.load_badges(), version)
+                    self.metrics["reloads"] += 1
+                    logger.info(f"🏅 Catálogo de badges carregado: {len(self._catalog)} badges (versão {version})")
+            except Exception as e:
+                self.metrics["errors"] += 1
+                if self._catalog is None:
+                    raise
+                logger.warning(f"⚠️ Falha ao verificar catálogo de badges, mantendo versão {self._catalog.version}: {e}")
+
+            self._checked_at = time.monotonic()
+            return self._catalog
+
+    def invalidate(self):
+        """Força a verificação da versão na próxima leitura"""
+        self._checked_at = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "version": self._catalog.version if self._catalog else None,
+            "badges": len(self._catalog) if self._catalog else 0,
+            "check_interval": self.check_interval
+        }
+
+
+# Um cache por cliente Firestore (na aplicação, o cliente é único)
+_catalog_caches: "weakref.WeakKeyDictionary[Any, BadgeCatalogCache]" = weakref.WeakKeyDictionary()
+_catalog_caches_lock = threading.Lock()
+
+
+def get_badge_catalog_cache(db_client) -> BadgeCatalogCache:
+    """Retorna o BadgeCatalogCache do cliente Firestore"""
+    cache = _catalog_caches.get(db_client)
+    if cache is None:
+        with _catalog_caches_lock:
+            cache = _catalog_caches.get(db_client)
+            if cache is None:
+                cache = BadgeCatalogCache(float(os.getenv("BADGE_CATALOG_CHECK_SECONDS", "60")))
+                _catalog_caches[db_client] = cache
+    return cache
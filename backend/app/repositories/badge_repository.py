@@ -3,10 +3,17 @@ Repositório para gerenciar badges com validação de duplicatas.
 Implementa operações de CRUD para badges e validação de concessões.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Optional, Set
 from app.models.reward import UserBadge, Badge
 from app.core.firebase import get_firestore_db
+from app.repositories.badge_catalog import (
+    BadgeCatalog, CATALOG_META_COLLECTION, CATALOG_META_DOCUMENT, get_badge_catalog_cache
+)
 from fastapi import Depends
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.rpc import code_pb2
 import logging
 from datetime import datetime, timezone
 
@@ -25,6 +32,12 @@ class BadgeRepository:
     - Estatísticas de badges
     """
     
+    BACKFILL_COLLECTION = "badge_backfill_jobs"
+    PROGRESS_COLLECTION = "badge_progress"
+    USERS_COLLECTION = "users"
+    SUMMARY_FIELD = "badge_summary"
+    BULK_MAX_ATTEMPTS = 5
+    
     def __init__(self, db_client):
         self.db = db_client
 
@@ -58,7 +71,289 @@ class BadgeRepository:
             logger.error(f"Erro ao verificar badge {badge_id} para usuário {user_id}: {e}")
             return False
 
-    def award_badge(self, user_id: str, badge_id: str, context: Dict[str, Any]) -> bool:
+    def get_user_badge_ids(self, user_id: str) -> Set[str]:
+        """
+        IDs dos badges do usuário (lidos do resumo no documento do usuário).
+        
+        Args:
+            user_id: ID do usuário
+            
+        Returns:
+            Conjunto de IDs de badges conquistados
+        """
+        try:
+            return set(self.get_badge_summary(user_id).get("badge_ids") or [])
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar IDs de badges do usuário {user_id}: {e}")
+            raise
+
+    def get_users_badge_ids(self, user_ids: List[str]) -> Dict[str, Set[str]]:
+        """
+        IDs dos badges de vários usuários (consultas "in" de até 30 IDs).
+        
+        Args:
+            user_ids: IDs dos usuários
+            
+        Returns:
+            Conjunto de badges por usuário (usuários sem badges ficam de fora)
+        """
+        earned: Dict[str, Set[str]] = {}
+        for start in range(0, len(user_ids), 30):
+            docs = self.db.collection("user_badges")\
+                .where("user_id", "in", user_ids[start:start + 30])\
+                .select(["user_id", "badge_id"])\
+                .stream()
+            for doc in docs:
+                data = doc.to_dict() or {}
+                if data.get("badge_id"):
+                    earned.setdefault(data.get("user_id"), set()).add(data["badge_id"])
+        return earned
+
+    def create_bulk_writer(
+        self,
+        ops_per_second: int = 100,
+        on_failure: Optional[Callable[[Any], None]] = None,
+        on_duplicate: Optional[Callable[[Any], None]] = None,
+        on_written: Optional[Callable[[Any], None]] = None
+    ):
+        """
+        BulkWriter com taxa limitada para concessões em massa.
+        
+        Args:
+            ops_per_second: Escritas por segundo (inicial e máxima)
+            on_failure: Chamado com cada escrita que falhou após as retentativas
+            on_duplicate: Chamado com cada concessão que já existia (create
+                recusado); não é falha nem é retentado
+            on_written: Chamado com a referência de cada escrita confirmada
+        """
+        from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
+        
+        writer = self.db.bulk_writer(BulkWriterOptions(
+            initial_ops_per_second=ops_per_second,
+            max_ops_per_second=ops_per_second
+        ))
+        
+        def on_write_error(failure, _writer) -> bool:
+            if failure.code == code_pb2.ALREADY_EXISTS:
+                if on_duplicate:
+                    on_duplicate(failure)
+                return False
+            if failure.code == code_pb2.NOT_FOUND:
+                # Resumo de usuário sem perfil: não é criado (ver queue_earned)
+                logger.debug(f"Escrita em lote ignorada, documento inexistente: {failure.message}")
+                return False
+            if failure.attempts < self.BULK_MAX_ATTEMPTS:
+                return True
+            logger.error(f"Erro definitivo em escrita em lote: {failure.message}")
+            if on_failure:
+                on_failure(failure)
+            return False
+        
+        writer.on_write_error(on_write_error)
+        if on_written:
+            writer.on_write_result(lambda reference, _result, _writer: on_written(reference))
+        return writer
+
+    def queue_award(self, writer, user_id: str, badge_id: str, context: Dict[str, Any]) -> UserBadge:
+        """
+        Enfileira a criação de uma concessão no BulkWriter (duplicatas já
+        filtradas pelo chamador). Progresso e resumo ficam para queue_earned,
+        só para as concessões confirmadas: uma que já existia não é regravada.
+        
+        Returns:
+            A concessão enfileirada (documento em user_badge_path)
+        """
+        user_badge = UserBadge(
+            user_id=user_id,
+            badge_id=badge_id,
+            earned_at=datetime.now(timezone.utc),
+            context=context
+        )
+        writer.create(self._user_badge_ref(user_id, badge_id), user_badge.model_dump())
+        return user_badge
+
+    def queue_earned(self, writer, user_badge: UserBadge):
+        """
+        Enfileira progresso e resumo de uma concessão criada por queue_award.
+        O resumo é um update: sem perfil ele falha com NOT_FOUND e é ignorado.
+        """
+        writer.set(self._progress_ref(user_badge.user_id), self._earned_update(user_badge.badge_id), merge=True)
+        writer.update(
+            self._user_ref(user_badge.user_id),
+            self._summary_update(user_badge.badge_id, user_badge.earned_at)
+        )
+
+    def user_badge_path(self, user_id: str, badge_id: str) -> str:
+        """Caminho do documento da concessão (referências recebidas em on_written)"""
+        return self._user_badge_ref(user_id, badge_id).path
+
+    def get_backfill_checkpoint(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Checkpoint de um job de backfill de badges (None se nunca executado)"""
+        doc = self.db.collection(self.BACKFILL_COLLECTION).document(job_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def save_backfill_checkpoint(self, job_id: str, checkpoint: Dict[str, Any]):
+        """Grava o checkpoint de um job de backfill de badges"""
+        self.db.collection(self.BACKFILL_COLLECTION).document(job_id).set(checkpoint)
+
+    def _user_badge_ref(self, user_id: str, badge_id: str):
+        """
+        Documento da concessão com ID determinístico: o create falha se o
+        usuário já tem o badge, sem janela entre verificar e gravar.
+        Concessões anteriores a ele têm ID automático (ver has_badge).
+        """
+        return self.db.collection("user_badges").document(f"{user_id}_{badge_id}")
+
+    def _progress_ref(self, user_id: str):
+        return self.db.collection(self.PROGRESS_COLLECTION).document(user_id)
+
+    @staticmethod
+    def _earned_update(badge_id: str) -> Dict[str, Any]:
+        return {
+            "earned_badges": firestore.ArrayUnion([badge_id]),
+            "updated_at": datetime.now(timezone.utc)
+        }
+
+    def _user_ref(self, user_id: str):
+        return self.db.collection(self.USERS_COLLECTION).document(user_id)
+
+    def _badge_rarity(self, badge_id: str) -> str:
+        try:
+            badge = self.get_catalog().get(badge_id)
+        except Exception:
+            badge = None
+        return (badge.rarity if badge else None) or "unknown"
+
+    def _summary_update(self, badge_id: str, earned_at: datetime) -> Dict[str, Any]:
+        """
+        Atualização do resumo de badges do usuário para uma concessão.
+        
+        Só transforms e caminhos por badge: concessões concorrentes não se
+        sobrescrevem e reaplicar a mesma concessão não muda nada (contagens
+        são derivadas de `badge_ids` na leitura, ver _summary_counts). O resumo
+        só fica `complete` após a reconstrução a partir de `user_badges`
+        (usuários anteriores ao resumo).
+        
+        Caminhos de campo para `update`: um `set` com merge criaria o documento
+        do usuário só com o resumo quando ainda não há perfil.
+        """
+        return {
+            FieldPath(self.SUMMARY_FIELD, "badge_ids").to_api_repr(): firestore.ArrayUnion([badge_id]),
+            FieldPath(self.SUMMARY_FIELD, "earned_at", badge_id).to_api_repr(): earned_at,
+            FieldPath(self.SUMMARY_FIELD, "last_earned").to_api_repr(): {"badge_id": badge_id, "earned_at": earned_at}
+        }
+
+    def _summary_counts(self, summary: Dict[str, Any]) -> Dict[str, Any]:
+        """Total e contagem por raridade calculados a partir de `badge_ids`"""
+        badge_ids = set(summary.get("badge_ids") or [])
+        by_rarity: Dict[str, int] = {}
+        for badge_id in badge_ids:
+            rarity = self._badge_rarity(badge_id)
+            by_rarity[rarity] = by_rarity.get(rarity, 0) + 1
+        return {"count": len(badge_ids), "by_rarity": by_rarity}
+
+    def _build_summary(self, rows) -> Dict[str, Any]:
+        """Resumo completo a partir dos documentos de `user_badges`"""
+        earned_at: Dict[str, datetime] = {}
+        for row in rows:
+            badge_id = row.get("badge_id")
+            if not badge_id:
+                continue
+            when = self._safe_get_datetime(row, "earned_at")
+            if badge_id not in earned_at or when < earned_at[badge_id]:
+                earned_at[badge_id] = when
+        
+        last = max(earned_at.items(), key=lambda item: item[1], default=None)
+        return {
+            "badge_ids": sorted(earned_at),
+            "earned_at": earned_at,
+            "last_earned": {"badge_id": last[0], "earned_at": last[1]} if last else None,
+            "complete": True
+        }
+
+    def get_badge_summary(self, user_id: str) -> Dict[str, Any]:
+        """
+        Resumo de badges do usuário (uma leitura do documento do usuário).
+        
+        Returns:
+            badge_ids, earned_at por badge e last_earned;
+            reconstruído uma vez a partir de `user_badges` se ainda não existe.
+            Usuário sem perfil tem resumo vazio (não há onde gravar a reconstrução)
+        """
+        doc = self._user_ref(user_id).get(field_paths=[self.SUMMARY_FIELD])
+        if not doc.exists:
+            return self._build_summary([])
+        summary = (doc.to_dict() or {}).get(self.SUMMARY_FIELD)
+        if summary and summary.get("complete"):
+            return summary
+        return self.rebuild_badge_summary(user_id)
+
+    def rebuild_badge_summary(self, user_id: str) -> Dict[str, Any]:
+        """
+        Reconstrói o resumo a partir de `user_badges` em uma transação.
+        
+        A leitura do documento do usuário na transação garante que uma
+        concessão gravada em paralelo não seja perdida pela reconstrução.
+        """
+        user_ref = self._user_ref(user_id)
+        query = self.db.collection("user_badges").where("user_id", "==", user_id)
+        
+        @firestore.transactional
+        def rebuild(transaction) -> Dict[str, Any]:
+            doc = user_ref.get(field_paths=[self.SUMMARY_FIELD], transaction=transaction)
+            if not doc.exists:
+                # Sem perfil não há onde gravar: resumo vazio, sem ler user_badges
+                return self._build_summary([])
+            current = (doc.to_dict() or {}).get(self.SUMMARY_FIELD)
+            if current and current.get("complete"):
+                return current
+            summary = self._build_summary(row.to_dict() or {} for row in transaction.get(query))
+            transaction.update(user_ref, {self.SUMMARY_FIELD: summary})
+            return summary
+        
+        summary = rebuild(self.db.transaction())
+        logger.info(f"🧾 Resumo de badges reconstruído para usuário {user_id}: {len(summary['badge_ids'])} badges")
+        return summary
+
+    def _summary_badges(self, user_id: str, summary: Dict[str, Any]) -> List[UserBadge]:
+        earned_at = summary.get("earned_at") or {}
+        badges = [
+            UserBadge(user_id=user_id, badge_id=badge_id, earned_at=self._safe_get_datetime(earned_at, badge_id))
+            for badge_id in summary.get("badge_ids") or []
+        ]
+        return sorted(badges, key=lambda badge: badge.earned_at, reverse=True)
+
+    def get_earned_badges(self, user_id: str) -> List[UserBadge]:
+        """
+        Badges do usuário a partir do resumo, do mais recente ao mais antigo.
+        
+        O contexto de cada concessão fica só em `user_badges` (ver get_user_badges).
+        """
+        try:
+            return self._summary_badges(user_id, self.get_badge_summary(user_id))
+            
+        except Exception as e:
+            logger.error(f"Erro ao buscar resumo de badges do usuário {user_id}: {e}")
+            return []
+
+    def get_badge_progress(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Documento de progresso incremental de badges do usuário (uma leitura).
+        
+        Returns:
+            Contadores mantidos pelos eventos ou None se ainda não existe
+        """
+        doc = self._progress_ref(user_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def update_badge_progress(self, user_id: str, updates: Dict[str, Any]):
+        """Aplica atualizações (valores ou transforms do Firestore) ao progresso do usuário"""
+        self._progress_ref(user_id).set(
+            {**updates, "updated_at": datetime.now(timezone.utc)}, merge=True
+        )
+
+    def award_badge(self, user_id: str, badge_id: str, context: Dict[str, Any], check_duplicate: bool = True) -> bool:
         """
         Concede um badge ao usuário com validação de duplicatas.
         
@@ -66,13 +361,17 @@ class BadgeRepository:
             user_id: ID do usuário
             badge_id: ID do badge
             context: Contexto da concessão (missão, score, etc.)
+            check_duplicate: Consultar antes se o usuário já tem o badge; False
+                quando o chamador já conferiu com o conjunto de badges recém-lido.
+                A unicidade vem do create com ID determinístico, esta consulta
+                só cobre concessões antigas (ID automático)
             
         Returns:
             True se o badge foi concedido, False se já existia
         """
         try:
             # Verificar se já possui o badge
-            if self.has_badge(user_id, badge_id):
+            if check_duplicate and self.has_badge(user_id, badge_id):
                 logger.warning(f"Tentativa de duplicar badge {badge_id} para usuário {user_id}")
                 return False
             
@@ -84,17 +383,37 @@ class BadgeRepository:
                 context=context
             )
             
-            # Salvar no Firestore
-            doc_ref = self.db.collection("user_badges").document()
-            doc_ref.set(user_badge.model_dump())
+            # Salvar no Firestore (concessão + progresso incremental + resumo no mesmo batch).
+            # Se a concessão já existe o batch inteiro falha: nada é gravado duas vezes
+            try:
+                self._award_batch(user_badge).commit()
+            except NotFound:
+                # Sem perfil o update do resumo falha; concede sem criar o documento do usuário
+                self._award_batch(user_badge, with_summary=False).commit()
             
             logger.info(f"✅ Badge {badge_id} concedido para usuário {user_id}")
             return True
             
+        except AlreadyExists:
+            logger.debug(f"Usuário {user_id} já possui badge {badge_id} (concessão concorrente)")
+            return False
+            
         except Exception as e:
             logger.error(f"Erro ao conceder badge {badge_id} para usuário {user_id}: {e}")
             return False
 
+    def _award_batch(self, user_badge: UserBadge, with_summary: bool = True):
+        """Batch da concessão: create em user_badges, progresso e (opcional) resumo"""
+        batch = self.db.batch()
+        batch.create(self._user_badge_ref(user_badge.user_id, user_badge.badge_id), user_badge.model_dump())
+        batch.set(self._progress_ref(user_badge.user_id), self._earned_update(user_badge.badge_id), merge=True)
+        if with_summary:
+            batch.update(
+                self._user_ref(user_badge.user_id),
+                self._summary_update(user_badge.badge_id, user_badge.earned_at)
+            )
+        return batch
+
     def get_user_badges(self, user_id: str) -> List[UserBadge]:
         """
         Busca todos os badges do usuário.
@@ -134,6 +453,46 @@ class BadgeRepository:
             logger.error(f"Erro ao buscar badges do usuário {user_id}: {e}")
             return []
 
+    def get_catalog_version(self) -> Optional[int]:
+        """Versão do catálogo gravada pelos scripts de população (None se nunca gravada)"""
+        doc = self.db.collection(CATALOG_META_COLLECTION).document(CATALOG_META_DOCUMENT).get()
+        return (doc.to_dict() or {}).get("version") if doc.exists else None
+
+    def load_badges(self) -> List[Badge]:
+        """
+        Lê a coleção `badges` inteira (usado pelo cache do catálogo).
+        
+        Returns:
+            Lista de todos os badges; erros de leitura são propagados
+        """
+        badges = []
+        for doc in self.db.collection("badges").stream():
+            try:
+                doc_data = doc.to_dict()
+                
+                # Validação segura dos dados
+                safe_data = {
+                    'id': doc_data.get('id', doc.id),
+                    'name': doc_data.get('name', 'Badge Desconhecido'),
+                    'description': doc_data.get('description', 'Descrição não disponível'),
+                    'icon': doc_data.get('icon', '🏆'),
+                    'rarity': doc_data.get('rarity', 'common'),
+                    'color': doc_data.get('color', '#FFD700'),
+                    'requirements': doc_data.get('requirements', {})
+                }
+                
+                badges.append(Badge(**safe_data))
+            except Exception as doc_error:
+                logger.warning(f"Erro ao processar badge disponível: {doc_error}")
+                continue
+        
+        logger.info(f"Recuperados {len(badges)} badges disponíveis")
+        return badges
+
+    def get_catalog(self) -> BadgeCatalog:
+        """Catálogo em memória do processo (relido só quando a versão muda)"""
+        return get_badge_catalog_cache(self.db).get(self)
+
     def get_all_badges(self) -> List[Badge]:
         """
         Busca todos os badges disponíveis.
@@ -142,36 +501,19 @@ class BadgeRepository:
             Lista de todos os badges
         """
         try:
-            docs = self.db.collection("badges").stream()
-            badges = []
-            
-            for doc in docs:
-                try:
-                    doc_data = doc.to_dict()
-                    
-                    # Validação segura dos dados
-                    safe_data = {
-                        'id': doc_data.get('id', doc.id),
-                        'name': doc_data.get('name', 'Badge Desconhecido'),
-                        'description': doc_data.get('description', 'Descrição não disponível'),
-                        'icon': doc_data.get('icon', '🏆'),
-                        'rarity': doc_data.get('rarity', 'common'),
-                        'color': doc_data.get('color', '#FFD700'),
-                        'requirements': doc_data.get('requirements', {})
-                    }
-                    
-                    badges.append(Badge(**safe_data))
-                except Exception as doc_error:
-                    logger.warning(f"Erro ao processar badge disponível: {doc_error}")
-                    continue
-            
-            logger.info(f"Recuperados {len(badges)} badges disponíveis")
-            return badges
-            
+            return self.get_catalog().all()
         except Exception as e:
             logger.error(f"Erro ao buscar badges disponíveis: {e}")
             return []
 
+    def get_badges_by_requirement_type(self, requirement_type: str) -> List[Badge]:
+        """Badges do catálogo com o tipo de requirement informado"""
+        try:
+            return list(self.get_catalog().of_type(requirement_type))
+        except Exception as e:
+            logger.error(f"Erro ao buscar badges do tipo {requirement_type}: {e}")
+            return []
+
     def get_available_badges_for_user(self, user_id: str) -> List[Badge]:
         """
         Busca badges disponíveis para um usuário específico (que ainda não conquistou).
@@ -187,8 +529,7 @@ class BadgeRepository:
             all_badges = self.get_all_badges()
             
             # Buscar badges que o usuário já conquistou
-            user_badges = self.get_user_badges(user_id)
-            conquered_badge_ids = {badge.badge_id for badge in user_badges if badge.badge_id}
+            conquered_badge_ids = self.get_user_badge_ids(user_id)
             
             # Filtrar badges não conquistados
             available_badges = [
@@ -214,6 +555,11 @@ class BadgeRepository:
             Badge encontrado ou None
         """
         try:
+            badge = self.get_catalog().get(badge_id)
+            if badge is not None:
+                return badge
+            
+            # Badge criado sem atualizar a versão do catálogo
             doc_ref = self.db.collection("badges").document(badge_id)
             doc = doc_ref.get()
             
@@ -248,23 +594,18 @@ class BadgeRepository:
             Dicionário com estatísticas
         """
         try:
-            badges = self.get_user_badges(user_id)
+            summary = self.get_badge_summary(user_id)
+            badges = self._summary_badges(user_id, summary)
             all_badges = self.get_all_badges()
-            
-            # Contar por raridade
-            rarity_counts = {}
-            for badge in badges:
-                badge_info = next((b for b in all_badges if b.id == badge.badge_id), None)
-                if badge_info:
-                    rarity = badge_info.rarity or 'unknown'
-                    rarity_counts[rarity] = rarity_counts.get(rarity, 0) + 1
+            counts = self._summary_counts(summary)
+            total = counts["count"]
             
             return {
-                'total_badges': len(badges),
+                'total_badges': total,
                 'total_available': len(all_badges),
-                'completion_percentage': (len(badges) / len(all_badges) * 100) if all_badges else 0,
-                'rarity_counts': rarity_counts,
-                'recent_badges': sorted(badges, key=lambda x: x.earned_at, reverse=True)[:5]
+                'completion_percentage': (total / len(all_badges) * 100) if all_badges else 0,
+                'rarity_counts': counts["by_rarity"],
+                'recent_badges': badges[:5]
             }
             
         except Exception as e:
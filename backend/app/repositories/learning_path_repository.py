@@ -1,5 +1,5 @@
 import logging
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime, UTC
 from firebase_admin import firestore
 from app.models.learning_path import LearningPath, UserPathProgress
@@ -172,6 +172,27 @@ class LearningPathRepository:
         except Exception as e:
             logger.error(f"Erro ao buscar progressos do usuário {user_id}: {e}")
             return []
+
+    def get_path_scores(self) -> List[Dict[str, Any]]:
+        """Busca apenas usuário, trilha e pontuação de todos os progressos (rankings por trilha; erros são propagados)"""
+        try:
+            query = self.progress_collection.select(["user_id", "path_id", "total_score"])
+            return [doc.to_dict() or {} for doc in query.stream()]
+        except Exception as e:
+            logger.error(f"Erro ao buscar pontuações por trilha: {e}")
+            raise
+    
+    def get_progress_by_users(self, user_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Progresso (trilha, conclusão e módulos) de vários usuários, consultas "in" de 30 IDs"""
+        progress_by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for start in range(0, len(user_ids), 30):
+            query = self.progress_collection\
+                .where("user_id", "in", user_ids[start:start + 30])\
+                .select(["user_id", "path_id", "completed_at", "completed_modules"])
+            for doc in query.stream():
+                data = doc.to_dict() or {}
+                progress_by_user.setdefault(data.get("user_id"), []).append(data)
+        return progress_by_user
     
     def complete_mission(self, user_id: str, path_id: str, mission_id: str, score: int) -> UserPathProgress:
         """Marca uma missão como concluída"""
@@ -195,23 +216,16 @@ class LearningPathRepository:
             logger.error(f"Erro ao concluir missão: {e}")
             raise
     
-    def complete_module(self, user_id: str, path_id: str, module_id: str) -> UserPathProgress:
-        """Marca um módulo como concluído"""
+    def complete_module(self, user_id: str, path_id: str, module_id: str) -> None:
+        """Marca um módulo como concluído (uma escrita, sem reler o progresso)"""
         try:
-            progress = self.get_user_progress(user_id, path_id)
-            if not progress:
-                raise ValueError(f"Progresso não encontrado para usuário {user_id} na trilha {path_id}")
-            
-            # Adiciona módulo concluído se não estiver na lista
-            if module_id not in progress.completed_modules:
-                progress.completed_modules.append(module_id)
-            
-            # Atualiza progresso
-            self.update_progress(progress)
+            doc_id = f"{user_id}_{path_id}"
+            self.progress_collection.document(doc_id).update({
+                "completed_modules": firestore.ArrayUnion([module_id])
+            })
             
             logger.info(f"Módulo {module_id} concluído para usuário {user_id}")
-            return progress
             
         except Exception as e:
             logger.error(f"Erro ao concluir módulo: {e}")
-            raise
\ No newline at end of file
+            raise
\ No newline at end of file
@@ -1,7 +1,8 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
+from datetime import datetime, UTC
+from firebase_admin import firestore
 from app.models.ranking import Ranking, RankingType
-from app.core.firebase import get_firestore_db_async
-from fastapi import Depends
+from app.core.firebase import get_firestore_db
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,5 +50,108 @@ class RankingRepository:
             logger.error(f"Erro ao buscar ranking por período: {e}")
             return None
 
-def get_ranking_repository(db_client = Depends(get_firestore_db_async)) -> RankingRepository:
-    return RankingRepository(db_client)
\ No newline at end of file
+    # ========== SNAPSHOTS MATERIALIZADOS ==========
+    #
+    # ranking_snapshots/{snapshot_id}               manifesto do snapshot
+    # ranking_snapshots/{snapshot_id}/chunks/{n}    página n (entradas + metadados)
+    # ranking_current/{board}                       ponteiro para o snapshot atual
+    #
+    # Chunks e manifesto são escritos antes do ponteiro; a troca do ponteiro é
+    # uma escrita de documento único, então leitores nunca veem snapshot parcial.
+
+    BATCH_LIMIT = 500
+
+    def write_snapshot_chunks(self, snapshot_id: str, chunks: List[Dict[str, Any]]):
+        """Escreve as páginas de um snapshot em batches"""
+        chunks_ref = self.db.collection("ranking_snapshots").document(snapshot_id).collection("chunks")
+        for start in range(0, len(chunks), self.BATCH_LIMIT):
+            batch = self.db.batch()
+            for chunk in chunks[start:start + self.BATCH_LIMIT]:
+                batch.set(chunks_ref.document(self._chunk_id(chunk["page"])), chunk)
+            batch.commit()
+
+    def write_snapshot_manifest(self, manifest: Dict[str, Any]):
+        """Escreve o manifesto do snapshot (depois de todas as páginas)"""
+        self.db.collection("ranking_snapshots").document(manifest["snapshot_id"]).set(manifest)
+
+    def swap_current_snapshot(self, board: str, manifest: Dict[str, Any]) -> Optional[str]:
+        """
+        Aponta o ranking `board` para o novo snapshot.
+
+        Returns:
+            ID do snapshot que era o anterior ao atual (pode ser removido)
+        """
+        pointer_ref = self.db.collection("ranking_current").document(board)
+        previous = pointer_ref.get()
+        previous_data = previous.to_dict() if previous.exists else {}
+
+        pointer_ref.set({
+            **manifest,
+            "previous_snapshot_id": previous_data.get("snapshot_id"),
+            "swapped_at": datetime.now(UTC)
+        })
+        # O anterior continua disponível para leitores com o ponteiro em cache
+        return previous_data.get("previous_snapshot_id")
+
+    def get_current_snapshot(self, board: str) -> Optional[Dict[str, Any]]:
+        """Ponteiro (manifesto) do snapshot atual de um ranking"""
+        try:
+            doc = self.db.collection("ranking_current").document(board).get()
+            return doc.to_dict() if doc.exists else None
+        except Exception as e:
+            logger.error(f"Erro ao buscar snapshot atual de {board}: {e}")
+            return None
+
+    def get_snapshot_chunk(self, snapshot_id: str, page: int) -> Optional[Dict[str, Any]]:
+        """Uma página de um snapshot (leitura de documento único)"""
+        try:
+            doc = self.db.collection("ranking_snapshots").document(snapshot_id)\
+                .collection("chunks").document(self._chunk_id(page)).get()
+            return doc.to_dict() if doc.exists else None
+        except Exception as e:
+            logger.error(f"Erro ao buscar página {page} do snapshot {snapshot_id}: {e}")
+            return None
+
+    def delete_snapshot(self, snapshot_id: str):
+        """Remove um snapshot antigo (páginas e manifesto)"""
+        snapshot_ref = self.db.collection("ranking_snapshots").document(snapshot_id)
+        chunk_refs = [doc.reference for doc in snapshot_ref.collection("chunks").select([]).stream()]
+        for start in range(0, len(chunk_refs), self.BATCH_LIMIT):
+            batch = self.db.batch()
+            for ref in chunk_refs[start:start + self.BATCH_LIMIT]:
+                batch.delete(ref)
+            batch.commit()
+        snapshot_ref.delete()
+
+    def try_acquire_lease(self, name: str, owner_id: str, lease_seconds: float) -> bool:
+        """
+        Lease simples em transação: só um processo materializa por vez.
+
+        Returns:
+            True se `owner_id` detém o lease
+        """
+        lease_ref = self.db.collection("ranking_current").document(f"_lease_{name}")
+
+        @firestore.transactional
+        def acquire(transaction) -> bool:
+            snapshot = lease_ref.get(transaction=transaction)
+            data = snapshot.to_dict() if snapshot.exists else {}
+            now = datetime.now(UTC).timestamp()
+            if data.get("owner_id") not in (None, owner_id) and data.get("expires_at", 0) > now:
+                return False
+            transaction.set(lease_ref, {"owner_id": owner_id, "expires_at": now + lease_seconds})
+            return True
+
+        try:
+            return acquire(self.db.transaction())
+        except Exception as e:
+            logger.error(f"Erro ao adquirir lease {name}: {e}")
+            return False
+
+    @staticmethod
+    def _chunk_id(page: int) -> str:
+        return f"{page:06d}"
+
+def get_ranking_repository() -> RankingRepository:
+    """Retorna instância do RankingRepository (cliente síncrono, como os métodos)"""
+    return RankingRepository(get_firestore_db())
\ No newline at end of file
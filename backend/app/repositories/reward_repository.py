@@ -1,6 +1,7 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from app.models.reward import UserReward, UserBadge, Badge
-from app.core.firebase import get_firestore_db_async
+from app.core.firebase import get_firestore_db, get_firestore_db_async
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
 from fastapi import Depends
 import logging
 from datetime import datetime, UTC
@@ -80,6 +81,30 @@ class RewardRepository:
             logger.error(f"Erro ao salvar recompensa: {e}")
             raise
 
+    async def apply_user_reward_once(self, reward_id: str, user_reward: UserReward) -> bool:
+        """
+        Grava a recompensa no ledger com ID determinístico e incrementa
+        pontos/XP do usuário no mesmo batch. O create falha se o ID já existe,
+        então reexecuções (retry, fila durável, redrive) não creditam de novo.
+
+        Returns:
+            True se aplicou agora, False se a recompensa já tinha sido aplicada
+        """
+        from firebase_admin import firestore
+        from google.api_core.exceptions import AlreadyExists
+
+        batch = self.db.batch()
+        batch.create(self.db.collection("user_rewards").document(reward_id), user_reward.model_dump())
+        batch.update(self.db.collection("users").document(user_reward.user_id), {
+            "points": firestore.Increment(user_reward.points_earned),
+            "xp": firestore.Increment(user_reward.xp_earned)
+        })
+        try:
+            await batch.commit()
+            return True
+        except AlreadyExists:
+            return False
+
     def save_user_badge(self, user_badge: UserBadge):
         """Salva badge do usuário"""
         try:
@@ -90,11 +115,39 @@ class RewardRepository:
             raise
 
     def get_user_rewards(self, user_id: str, limit: int = 50) -> List[UserReward]:
-        """Busca recompensas do usuário"""
+        """Busca recompensas do usuário (mais recentes primeiro)"""
+        rewards, _ = self.get_user_rewards_page(user_id, limit)
+        return rewards
+
+    def get_user_rewards_page(
+        self,
+        user_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[UserReward], Optional[str]]:
+        """
+        Busca uma página do histórico de recompensas, mais recentes primeiro.
+        Paginação por cursor (start_after em earned_at + ID do documento);
+        requer o índice composto user_id ASC, earned_at DESC.
+        
+        Returns:
+            (recompensas da página, token da próxima página ou None)
+        """
         try:
-            # Remover order_by para evitar erro de índice
-            query = self.db.collection("user_rewards").where("user_id", "==", user_id).limit(limit)
-            docs = query.stream()
+            query = self.db.collection("user_rewards")\
+                .where("user_id", "==", user_id)\
+                .order_by("earned_at", direction="DESCENDING")\
+                .order_by("__name__", direction="DESCENDING")\
+                .limit(limit)
+            if cursor:
+                values = decode_cursor(cursor)
+                try:
+                    last_earned_at = datetime.fromisoformat(values["t"])
+                    last_id = str(values["id"])
+                except (KeyError, TypeError, ValueError) as e:
+                    raise InvalidCursorError(f"Cursor de recompensas inválido: {e}") from e
+                query = query.start_after({"earned_at": last_earned_at, "__name__": last_id})
+            docs = list(query.stream())
             
             rewards = []
             for doc in docs:
@@ -117,12 +170,46 @@ class RewardRepository:
                     logger.warning(f"Erro ao processar documento de recompensa: {doc_error}")
                     continue
             
-            # Ordenar localmente por data
-            rewards.sort(key=lambda x: x.earned_at, reverse=True)
-            return rewards
+            next_cursor = None
+            if len(docs) == limit:
+                # O cursor usa o valor armazenado, não o normalizado, para o start_after bater
+                last_earned_at = (docs[-1].to_dict() or {}).get("earned_at")
+                if isinstance(last_earned_at, datetime):
+                    next_cursor = encode_cursor({"t": last_earned_at.isoformat(), "id": docs[-1].id})
+            return rewards, next_cursor
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logger.error(f"Erro ao buscar recompensas: {e}")
-            return []
+            return [], None
+
+    def get_rewards_since(self, since: datetime) -> List[Dict[str, Any]]:
+        """
+        Busca o ledger de recompensas a partir de uma data (rankings por janela).
+        Projeta apenas os campos usados na soma por usuário/dia; erros são
+        propagados para o leaderboard manter os buckets atuais.
+        """
+        try:
+            query = self.db.collection("user_rewards")\
+                .where("earned_at", ">=", since)\
+                .select(["user_id", "points_earned", "xp_earned", "earned_at"])
+            
+            rewards = []
+            for doc in query.stream():
+                doc_data = doc.to_dict()
+                user_id = self._safe_get_string(doc_data, 'user_id')
+                if not user_id:
+                    continue
+                rewards.append({
+                    'user_id': user_id,
+                    'points_earned': self._safe_get_int(doc_data, 'points_earned', 0),
+                    'xp_earned': self._safe_get_int(doc_data, 'xp_earned', 0),
+                    'earned_at': self._safe_get_datetime(doc_data, 'earned_at')
+                })
+            return rewards
+        except Exception as e:
+            logger.error(f"Erro ao buscar ledger de recompensas: {e}")
+            raise
 
     def get_user_badges(self, user_id: str) -> List[UserBadge]:
         """Busca badges do usuário"""
@@ -154,33 +241,13 @@ class RewardRepository:
             return []
 
     def get_all_badges(self) -> List[Badge]:
-        """Busca todos os badges disponíveis"""
-        try:
-            docs = self.db.collection("badges").stream()
-            badges = []
-            for doc in docs:
-                try:
-                    doc_data = doc.to_dict()
-                    
-                    # Usar métodos seguros para validar dados
-                    safe_data = {
-                        'id': self._safe_get_string(doc_data, 'id', doc.id),
-                        'name': self._safe_get_string(doc_data, 'name', 'Badge Desconhecido'),
-                        'description': self._safe_get_string(doc_data, 'description', 'Descrição não disponível'),
-                        'icon': self._safe_get_string(doc_data, 'icon', '🏆'),
-                        'rarity': self._safe_get_string(doc_data, 'rarity', 'common'),
-                        'color': self._safe_get_string(doc_data, 'color', '#FFD700'),
-                        'requirements': self._safe_get_dict(doc_data, 'requirements', {})
-                    }
-                    
-                    badges.append(Badge(**safe_data))
-                except Exception as doc_error:
-                    logger.warning(f"Erro ao processar documento de badge disponível: {doc_error}")
-                    continue
-            return badges
-        except Exception as e:
-            logger.error(f"Erro ao buscar badges: {e}")
-            return []
+        """Busca todos os badges disponíveis (catálogo versionado compartilhado com o BadgeRepository)"""
+        from app.repositories.badge_repository import get_badge_repository
+        return get_badge_repository().get_all_badges()
 
 def get_reward_repository(db_client = Depends(get_firestore_db_async)) -> RewardRepository:
-    return RewardRepository(db_client)
\ No newline at end of file
+    return RewardRepository(db_client)
+
+def get_reward_history_repository() -> RewardRepository:
+    """RewardRepository com o cliente síncrono, usado pelas consultas de leitura (histórico paginado)"""
+    return RewardRepository(get_firestore_db())
\ No newline at end of file
@@ -1,9 +1,11 @@
 from app.core.firebase import get_firestore_db
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
 from app.models.user import UserProfile
 from datetime import datetime, timezone
-from typing import Optional, Union, List 
+from typing import Any, Dict, Optional, Tuple, Union, List 
 from fastapi import Depends
 from google.protobuf.timestamp_pb2 import Timestamp
+import logging
 
 class UserRepository:
     def __init__(self, dbclient):
@@ -133,12 +135,19 @@ class UserRepository:
             logging.error(f"Erro ao buscar usuários por período: {e}")
             return []
 
-    def get_users_paginated(self, limit: int = 50, offset: int = 0) -> List[UserProfile]:
-        """Busca usuários com paginação otimizada"""
+    def get_users_paginated(self, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[UserProfile], Optional[str]]:
+        """
+        Busca usuários paginados por cursor (ordem do ID do documento).
+        Diferente de offset, start_after não lê nem cobra os documentos pulados.
+        
+        Returns:
+            (usuários da página, token da próxima página ou None)
+        """
         try:
-            # Usar query com limit e offset para otimizar performance
-            query = self.collection.limit(limit).offset(offset)
-            docs = query.stream()
+            query = self.collection.order_by("__name__").limit(limit)
+            if cursor:
+                query = query.start_after({"__name__": str(decode_cursor(cursor).get("id", ""))})
+            docs = list(query.stream())
             
             users = []
             for doc in docs:
@@ -157,10 +166,13 @@ class UserRepository:
                     user_profile = UserProfile(uid=doc.id, **data)
                     users.append(user_profile)
             
-            return users
+            next_cursor = encode_cursor({"id": docs[-1].id}) if len(docs) == limit else None
+            return users, next_cursor
+        except InvalidCursorError:
+            raise
         except Exception as e:
             logging.error(f"Erro ao buscar usuários paginados: {e}")
-            return []
+            return [], None
 
     def get_users_count(self) -> int:
         """Obtém o total de usuários no sistema com query otimizada"""
@@ -173,6 +185,39 @@ class UserRepository:
             logging.error(f"Erro ao contar usuários: {e}")
             return 0
 
+    def get_users_ranking_fields(self) -> List[Dict[str, Any]]:
+        """
+        Busca apenas os campos usados nos rankings de todos os usuários.
+        Erros são propagados: uma lista vazia esvaziaria os rankings carregados.
+        """
+        try:
+            query = self.collection.select([
+                "name", "email", "points", "xp", "level", "badges", "badge_summary.badge_ids", "register_date",
+                "current_streak", "completed_learning_paths", "average_score"
+            ])
+            return [{"uid": doc.id, **(doc.to_dict() or {})} for doc in query.stream()]
+        except Exception as e:
+            logging.error(f"Erro ao buscar campos de ranking: {e}")
+            raise
+
+    def get_users_fields_page(self, fields: List[str], limit: int = 500, after_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Página de usuários em ordem de ID com apenas os campos pedidos
+        (varreduras em lote: backfill de badges, migrações).
+        
+        Args:
+            fields: Campos projetados
+            limit: Tamanho da página
+            after_id: Último ID da página anterior
+            
+        Returns:
+            Linhas com "uid" e os campos projetados
+        """
+        query = self.collection.order_by("__name__").select(fields).limit(limit)
+        if after_id:
+            query = query.start_after({"__name__": after_id})
+        return [{"uid": doc.id, **(doc.to_dict() or {})} for doc in query.stream()]
+
     def get_users_by_level(self, level: int, limit: int = 50) -> List[UserProfile]:
         """Busca usuários por nível com query otimizada"""
         try:
@@ -232,4 +277,4 @@ def get_user_repository() -> UserRepository:
     db_client = get_firestore_db()
     return UserRepository(db_client)
 
-__all__ = ['UserRepository', 'get_user_repository']
\ No newline at end of file
+__all__ = ['UserRepository', 'get_user_repository']
\ No newline at end of file
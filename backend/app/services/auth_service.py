@@ -6,6 +6,7 @@ from app.models.user import UserProfile, FirebaseUser, UserRegister
 from firebase_admin.auth import UserNotFoundError, InvalidIdTokenError, EmailAlreadyExistsError
 from firebase_admin.exceptions import FirebaseError
 from app.core.logging_config import get_cryptoquest_logger, LogCategory
+from app.services.sharded_counter import COUNTER_USERS, get_sharded_counters
 
 logger = logging.getLogger(__name__)
 cryptoquest_logger = get_cryptoquest_logger()
@@ -42,6 +43,7 @@ class AuthService:
             if not user_profile:
                 logger.warning(f"Perfil do usuário {uid} não encontrado. Criando novo perfil.")
                 user_profile = self.user_repo.create_user_profile(uid=uid, email=email, name=name)
+                await get_sharded_counters().increment_async(COUNTER_USERS)
                 logger.info(f"Perfil criado com sucesso para UID: {uid}")
                 logger.info(f"🔍 [AuthService] Novo perfil criado - has_completed_questionnaire: {user_profile.has_completed_questionnaire}")
             else:
@@ -73,6 +75,7 @@ class AuthService:
                 name=user_data.name,
                 email=user_data.email
             )
+            await get_sharded_counters().increment_async(COUNTER_USERS)
             firebase_user_info = FirebaseUser(uid=user.uid, email=user.email, name=user_data.name)
             return firebase_user_info, user_profile
 
@@ -93,7 +96,8 @@ class AuthService:
             return FirebaseUser(
                 uid=decoded_token['uid'],
                 email=decoded_token.get('email'),
-                name=decoded_token.get('name')
+                name=decoded_token.get('name'),
+                admin=decoded_token.get('admin') is True
             )
         except InvalidIdTokenError:
             raise ValueError("Token de ID inválido ou expirado!")
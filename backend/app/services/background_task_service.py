@@ -4,13 +4,20 @@ Permite processar operações pesadas sem bloquear a resposta ao usuário.
 """
 import asyncio
 import logging
-from typing import Dict, Any, Callable, Optional, List
+import os
+import random
+import time
+from typing import Dict, Any, Callable, Optional, List, Deque, Set, Tuple, Type
 from datetime import datetime, UTC
 from enum import Enum
+from collections import Counter, deque, OrderedDict
+from dataclasses import dataclass
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 import threading
 
+from app.services.task_queue_store import SQLiteTaskQueueStore, StoredTask, create_task_queue_store
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,6 +28,39 @@ class TaskPriority(str, Enum):
     LOW = "low"
 
 
+# Ordem de atendimento das prioridades (índice menor = atendida primeiro)
+PRIORITY_ORDER: List[TaskPriority] = [TaskPriority.HIGH, TaskPriority.NORMAL, TaskPriority.LOW]
+
+
+@dataclass
+class RetryPolicy:
+    """Política de retry com backoff exponencial e jitter"""
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    jitter: float = 0.5  # Fração do delay que pode ser sorteada
+    retryable_exceptions: Tuple[Type[BaseException], ...] = (Exception,)
+    non_retryable_exceptions: Tuple[Type[BaseException], ...] = (ValueError, TypeError)
+    
+    def is_retryable(self, error: BaseException) -> bool:
+        """Verifica se o erro justifica uma nova tentativa"""
+        if isinstance(error, self.non_retryable_exceptions):
+            return False
+        return isinstance(error, self.retryable_exceptions)
+    
+    def get_delay(self, attempt: int) -> float:
+        """Delay antes da próxima tentativa (attempt começa em 1)"""
+        delay = min(self.base_delay * (2 ** (attempt - 1)), self.max_delay)
+        return delay * (1 - self.jitter * random.random())
+
+
+# Sem retry: a primeira falha já vai para a dead-letter queue
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+# Status finais: tarefas nesses estados podem ser removidas do registro
+FINISHED_STATUSES = frozenset({"completed", "failed"})
+
+
 class BackgroundTask:
     """Representa uma tarefa para processamento em background"""
     
@@ -30,19 +70,131 @@ class BackgroundTask:
         task_name: str,
         task_func: Callable,
         task_args: Dict[str, Any],
-        priority: TaskPriority = TaskPriority.NORMAL
+        priority: TaskPriority = TaskPriority.NORMAL,
+        retry_policy: Optional[RetryPolicy] = None,
+        discard_result: bool = False
     ):
         self.task_id = task_id
         self.task_name = task_name
         self.task_func = task_func
         self.task_args = task_args
         self.priority = priority
+        # Retry é opt-in: só handlers seguros para reexecutar recebem uma política
+        self.retry_policy = retry_policy or NO_RETRY
+        self.attempts = 0
+        self.next_retry_at: Optional[datetime] = None
         self.created_at = datetime.now(UTC)
+        self.enqueued_at: Optional[float] = None  # time.monotonic() ao entrar na fila
         self.started_at: Optional[datetime] = None
         self.completed_at: Optional[datetime] = None
         self.status = "pending"
         self.result: Optional[Any] = None
         self.error: Optional[str] = None
+        self.persisted = False  # Gravada na fila durável
+        self.discard_result = discard_result  # Fire-and-forget: não guarda o resultado
+
+
+class PriorityTaskQueue:
+    """
+    Fila de prioridades com aging para evitar starvation.
+    
+    Mantém uma fila FIFO por prioridade. Ao retirar uma tarefa, a prioridade
+    efetiva da mais antiga de cada fila melhora um nível a cada
+    `aging_seconds` de espera, então tarefas LOW acabam sendo atendidas
+    mesmo sob fluxo contínuo de tarefas HIGH.
+    """
+    
+    def __init__(self, aging_seconds: float = 30.0):
+        self.aging_seconds = aging_seconds
+        self._queues: Dict[TaskPriority, Deque[BackgroundTask]] = {
+            priority: deque() for priority in PRIORITY_ORDER
+        }
+        self._not_empty = asyncio.Event()
+        self.aged_promotions = 0
+    
+    def put_nowait(self, task: BackgroundTask):
+        """Adiciona tarefa na fila da sua prioridade"""
+        task.enqueued_at = time.monotonic()
+        self._queues[task.priority].append(task)
+        self._not_empty.set()
+    
+    async def get(self) -> BackgroundTask:
+        """Aguarda e retorna a próxima tarefa segundo a prioridade efetiva"""
+        while True:
+            task = self.get_nowait()
+            if task is not None:
+                return task
+            self._not_empty.clear()
+            await self._not_empty.wait()
+    
+    async def wait(self):
+        """Aguarda uma nova tarefa na fila ou uma chamada a `notify()`"""
+        self._not_empty.clear()
+        await self._not_empty.wait()
+    
+    def notify(self):
+        """Acorda quem espera em `wait()` (ex.: um limite por nome foi liberado)"""
+        self._not_empty.set()
+    
+    def get_nowait(self, is_available: Optional[Callable[[str], bool]] = None) -> Optional[BackgroundTask]:
+        """
+        Retorna a próxima tarefa ou None se a fila estiver vazia.
+        
+        Com `is_available`, tarefas cujo nome não está disponível (limite de
+        concorrência atingido) ficam na fila e a próxima de cada prioridade
+        é considerada no lugar delas.
+        """
+        now = time.monotonic()
+        best_priority: Optional[TaskPriority] = None
+        best_position = 0
+        best_key = None
+        first_index: Optional[int] = None
+        
+        for index, priority in enumerate(PRIORITY_ORDER):
+            queue = self._queues[priority]
+            position, head = next(
+                (
+                    (position, task) for position, task in enumerate(queue)
+                    if is_available is None or is_available(task.task_name)
+                ),
+                (0, None)
+            )
+            if head is None:
+                continue
+            if first_index is None:
+                first_index = index
+            
+            waited = now - (head.enqueued_at or now)
+            boost = int(waited // self.aging_seconds) if self.aging_seconds > 0 else 0
+            # Chave: prioridade efetiva, depois a mais antiga
+            key = (index - boost, head.enqueued_at or now)
+            
+            if best_key is None or key < best_key:
+                best_key = key
+                best_priority = priority
+                best_position = position
+        
+        if best_priority is None:
+            return None
+        
+        queue = self._queues[best_priority]
+        if best_position == 0:
+            task = queue.popleft()
+        else:
+            task = queue[best_position]
+            del queue[best_position]
+        if PRIORITY_ORDER.index(best_priority) != first_index:
+            # Tarefa envelhecida passou na frente de uma de prioridade maior
+            self.aged_promotions += 1
+        return task
+    
+    def qsize(self) -> int:
+        """Total de tarefas aguardando"""
+        return sum(len(queue) for queue in self._queues.values())
+    
+    def qsize_by_priority(self) -> Dict[str, int]:
+        """Tarefas aguardando por prioridade"""
+        return {priority.value: len(queue) for priority, queue in self._queues.items()}
 
 
 class BackgroundTaskService:
@@ -50,57 +202,198 @@ class BackgroundTaskService:
     Serviço para processar tarefas em background sem bloquear requisições.
     
     Features:
-    - Fila de prioridades
+    - Fila de prioridades com aging (sem starvation)
+    - Pool de workers assíncronos com limite de concorrência por tarefa
     - Processamento assíncrono
-    - Retry automático em falhas
+    - Retry automático em falhas (backoff exponencial com jitter)
+    - Dead-letter queue para falhas definitivas, com re-drive
+    - Fila durável opcional (SQLite) com recuperação após restart
+    - Registro de tarefas limitado (por quantidade e idade)
     - Métricas e monitoramento
     """
     
-    def __init__(self):
-        self.tasks: Dict[str, BackgroundTask] = {}
-        self.task_queue: asyncio.Queue = asyncio.Queue()
+    def __init__(
+        self,
+        aging_seconds: float = 30.0,
+        num_workers: int = 4,
+        executor_workers: int = 4,
+        task_concurrency_limits: Optional[Dict[str, int]] = None,
+        max_dead_letters: int = 1000,
+        store: Optional[SQLiteTaskQueueStore] = None,
+        max_tasks: int = 10000,
+        task_ttl_seconds: float = 3600.0
+    ):
+        # Registro limitado: tarefas finalizadas são removidas por idade ou
+        # quando o registro passa de `max_tasks` (as mais antigas primeiro)
+        self.tasks: "OrderedDict[str, BackgroundTask]" = OrderedDict()
+        self.max_tasks = max(1, max_tasks)
+        self.task_ttl_seconds = task_ttl_seconds
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # task_id -> monotonic da finalização
+        self._status_counts: Counter = Counter()
+        self.task_queue = PriorityTaskQueue(aging_seconds=aging_seconds)
         self.processing = False
-        self._worker_task: Optional[asyncio.Task] = None
-        self._executor = ThreadPoolExecutor(max_workers=4)
+        self.num_workers = max(1, num_workers)
+        self._worker_tasks: List[asyncio.Task] = []
+        self._busy_workers = 0
+        # Pool para funções síncronas, dimensionado separadamente dos workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, executor_workers),
+            thread_name_prefix="background-task"
+        )
         self._lock = threading.Lock()
         
+        # Limites de concorrência por nome de tarefa
+        self._task_concurrency_limits: Dict[str, int] = dict(task_concurrency_limits or {})
+        self._running_by_name: Counter = Counter()
+        
+        # Throughput: instantes (monotonic) das últimas conclusões
+        self._completion_times: Deque[float] = deque(maxlen=10000)
+        
+        # Retry e dead-letter queue
+        self._retry_policies: Dict[str, RetryPolicy] = {}
+        self._retry_handles: Dict[str, asyncio.TimerHandle] = {}
+        self.dead_letters: "OrderedDict[str, BackgroundTask]" = OrderedDict()
+        self.max_dead_letters = max_dead_letters
+        
+        # Fila durável: só tarefas com handler registrado podem ser recuperadas
+        self._store = store
+        self._task_handlers: Dict[str, Callable] = {}
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._pending_saves: Set[asyncio.Task] = set()  # Gravações em thread antes de enfileirar
+        
         # Métricas
         self.metrics = {
             "total_tasks": 0,
             "completed_tasks": 0,
             "failed_tasks": 0,
+            "retried_tasks": 0,
+            "dead_lettered_tasks": 0,
+            "redriven_tasks": 0,
+            "evicted_tasks": 0,
             "avg_processing_time": 0.0
         }
         
+        # Latência de fila (submissão -> início) por prioridade
+        self._wait_samples: Dict[TaskPriority, Deque[float]] = {
+            priority: deque(maxlen=500) for priority in PRIORITY_ORDER
+        }
+        self._wait_totals: Dict[TaskPriority, Dict[str, float]] = {
+            priority: {"count": 0, "total": 0.0, "max": 0.0} for priority in PRIORITY_ORDER
+        }
+        
         logger.info("🚀 BackgroundTaskService inicializado")
     
     async def start_worker(self):
-        """Inicia o worker que processa tarefas em background"""
+        """Inicia o pool de workers que processa tarefas em background"""
         if self.processing:
             logger.warning("Worker já está em execução")
             return
         
         self.processing = True
-        self._worker_task = asyncio.create_task(self._process_tasks())
-        logger.info("✅ Worker de background iniciado")
+        self._worker_tasks = [
+            asyncio.create_task(self._process_tasks(worker_id))
+            for worker_id in range(self.num_workers)
+        ]
+        if self._store is not None:
+            self._maintenance_task = asyncio.create_task(self._maintain_leases())
+        logger.info(f"✅ Pool de background iniciado com {self.num_workers} workers")
     
     async def stop_worker(self):
-        """Para o worker de background"""
+        """Para todos os workers de background"""
         self.processing = False
-        if self._worker_task:
-            self._worker_task.cancel()
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        for worker_task in self._worker_tasks:
+            worker_task.cancel()
+        
+        # Retries agendados não sobrevivem à parada
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+        
+        for worker_task in self._worker_tasks:
             try:
-                await self._worker_task
+                await worker_task
             except asyncio.CancelledError:
                 pass
-        logger.info("🛑 Worker de background parado")
+        
+        self._worker_tasks = []
+        
+        # Tarefas pendentes ficam na fila durável para outro processo assumir
+        await self.flush_pending_saves()
+        await asyncio.to_thread(self._store_call, "release_owned")
+        logger.info("🛑 Workers de background parados")
+    
+    def set_task_concurrency(self, task_name: str, limit: int):
+        """
+        Define quantas tarefas com o mesmo nome podem rodar ao mesmo tempo.
+        
+        Args:
+            task_name: Nome da tarefa (ex: "ai_insights_generation")
+            limit: Máximo de execuções simultâneas
+        """
+        self._task_concurrency_limits[task_name] = max(1, limit)
+        # Um limite maior pode liberar tarefas que estavam esperando
+        self.task_queue.notify()
+    
+    def register_retry_policy(self, task_name: str, policy: RetryPolicy):
+        """Define a política de retry padrão para tarefas com esse nome"""
+        self._retry_policies[task_name] = policy
+    
+    def register_task_handler(self, task_name: str, handler: Callable):
+        """
+        Registra a função que executa tarefas com esse nome após um restart.
+        
+        Só tarefas com handler registrado são gravadas na fila durável, pois
+        a função original (ex: método de um serviço por requisição) não
+        sobrevive ao processo.
+        """
+        self._task_handlers[task_name] = handler
+    
+    def _store_call(self, method: str, *args):
+        """Chama a fila durável sem deixar falhas de disco derrubarem a tarefa"""
+        if self._store is None:
+            return None
+        try:
+            return getattr(self._store, method)(*args)
+        except Exception as e:
+            logger.error(f"Erro na fila durável ({method}): {e}")
+            return None
+    
+    def _has_capacity(self, task_name: str) -> bool:
+        """Tarefa com esse nome pode começar sem passar do limite configurado"""
+        limit = self._task_concurrency_limits.get(task_name)
+        return not limit or self._running_by_name[task_name] < limit
+    
+    def _take_task(self) -> Optional[BackgroundTask]:
+        """
+        Retira a próxima tarefa cujo nome tem vaga e já reserva a vaga.
+        Síncrono: nenhum outro worker roda entre a escolha e a reserva.
+        """
+        task = self.task_queue.get_nowait(self._has_capacity)
+        if task is not None:
+            self._running_by_name[task.task_name] += 1
+            self._busy_workers += 1
+        return task
+    
+    def _release_task(self, task: BackgroundTask):
+        """Libera a vaga da tarefa e acorda workers que esperavam por ela"""
+        self._running_by_name[task.task_name] -= 1
+        if self._running_by_name[task.task_name] <= 0:
+            del self._running_by_name[task.task_name]
+        self._busy_workers -= 1
+        if task.task_name in self._task_concurrency_limits:
+            self.task_queue.notify()
     
     def submit_task(
         self,
         task_name: str,
         task_func: Callable,
         task_args: Dict[str, Any],
-        priority: TaskPriority = TaskPriority.NORMAL
+        priority: TaskPriority = TaskPriority.NORMAL,
+        retry_policy: Optional[RetryPolicy] = None,
+        discard_result: bool = False
     ) -> str:
         """
         Submete uma tarefa para processamento em background.
@@ -110,6 +403,9 @@ class BackgroundTaskService:
             task_func: Função a ser executada
             task_args: Argumentos para a função
             priority: Prioridade da tarefa
+            retry_policy: Política de retry (padrão: registrada para o nome;
+                sem ela, a primeira falha vai para a dead-letter queue)
+            discard_result: Não guardar o resultado (tarefas fire-and-forget)
             
         Returns:
             task_id: ID único da tarefa
@@ -121,40 +417,121 @@ class BackgroundTaskService:
             task_name=task_name,
             task_func=task_func,
             task_args=task_args,
-            priority=priority
+            priority=priority,
+            retry_policy=retry_policy or self._retry_policies.get(task_name),
+            discard_result=discard_result
         )
         
         with self._lock:
-            self.tasks[task_id] = task
+            self._register_task(task)
             self.metrics["total_tasks"] += 1
+            self._evict_finished_tasks()
         
-        # Adicionar à fila de forma não-bloqueante
-        asyncio.create_task(self._enqueue_task(task))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
         
-        logger.info(f"📝 Tarefa submetida: {task_name} (ID: {task_id})")
+        if task_name in self._task_handlers and self._store is not None and loop is not None:
+            # SQLite fora do event loop; a tarefa só entra na fila depois de gravada
+            save = loop.create_task(self._persist_and_enqueue(task))
+            self._pending_saves.add(save)
+            save.add_done_callback(self._pending_saves.discard)
+        else:
+            if task_name in self._task_handlers:
+                task.persisted = bool(self._store_call("save", task_id, task_name, priority.value, task_args))
+            # Adicionar à fila (não-bloqueante)
+            self.task_queue.put_nowait(task)
+        
+        logger.info(f"📝 Tarefa submetida: {task_name} (ID: {task_id}, prioridade: {priority.value})")
         return task_id
     
-    async def _enqueue_task(self, task: BackgroundTask):
-        """Adiciona tarefa à fila"""
-        await self.task_queue.put(task)
+    async def _persist_and_enqueue(self, task: BackgroundTask):
+        """Grava a tarefa na fila durável em thread e então a enfileira"""
+        task.persisted = bool(await asyncio.to_thread(
+            self._store_call, "save", task.task_id, task.task_name, task.priority.value, task.task_args
+        ))
+        self.task_queue.put_nowait(task)
+    
+    async def flush_pending_saves(self):
+        """Aguarda as gravações de submissões ainda em andamento"""
+        if self._pending_saves:
+            await asyncio.gather(*list(self._pending_saves), return_exceptions=True)
     
-    async def _process_tasks(self):
+    def _register_task(self, task: BackgroundTask, status: str = "pending"):
+        """Adiciona (ou substitui) a tarefa no registro. Requer `self._lock`."""
+        previous = self.tasks.pop(task.task_id, None)
+        if previous is not None:
+            self._status_counts[previous.status] -= 1
+            self._finished.pop(task.task_id, None)
+        
+        task.status = status
+        self.tasks[task.task_id] = task
+        self._status_counts[status] += 1
+    
+    def _set_status(self, task: BackgroundTask, status: str):
+        """Atualiza o status mantendo os contadores incrementais"""
+        with self._lock:
+            if self.tasks.get(task.task_id) is task:
+                self._status_counts[task.status] -= 1
+                self._status_counts[status] += 1
+                if status in FINISHED_STATUSES:
+                    self._finished[task.task_id] = time.monotonic()
+                else:
+                    self._finished.pop(task.task_id, None)
+            task.status = status
+            
+            if status in FINISHED_STATUSES:
+                self._evict_finished_tasks()
+    
+    def _evict_finished_tasks(self, max_age_seconds: Optional[float] = None) -> int:
+        """
+        Remove tarefas finalizadas expiradas ou excedentes. Requer `self._lock`.
+        
+        `_finished` está em ordem de finalização, então basta olhar o início:
+        custo amortizado O(1) por tarefa.
+        """
+        max_age = self.task_ttl_seconds if max_age_seconds is None else max_age_seconds
+        now = time.monotonic()
+        evicted = 0
+        
+        while self._finished:
+            task_id, finished_at = next(iter(self._finished.items()))
+            if len(self.tasks) <= self.max_tasks and now - finished_at < max_age:
+                break
+            
+            self._finished.popitem(last=False)
+            task = self.tasks.pop(task_id, None)
+            if task is not None:
+                self._status_counts[task.status] -= 1
+                evicted += 1
+        
+        self.metrics["evicted_tasks"] += evicted
+        return evicted
+    
+    async def _process_tasks(self, worker_id: int = 0):
         """Worker que processa tarefas da fila"""
-        logger.info("🔄 Worker iniciou processamento de tarefas")
+        logger.info(f"🔄 Worker {worker_id} iniciou processamento de tarefas")
         
         while self.processing:
             try:
-                # Pegar tarefa da fila (com timeout para permitir parada)
-                try:
-                    task = await asyncio.wait_for(
-                        self.task_queue.get(),
-                        timeout=1.0
-                    )
-                except asyncio.TimeoutError:
+                # Tarefas no limite por nome ficam na fila e não seguram o
+                # worker: ele pega a próxima que pode rodar
+                task = self._take_task()
+                if task is None:
+                    # Espera nova tarefa ou vaga liberada (com timeout para permitir parada)
+                    try:
+                        await asyncio.wait_for(self.task_queue.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        # Fila ociosa: aproveita para expirar tarefas antigas
+                        with self._lock:
+                            self._evict_finished_tasks()
                     continue
                 
-                # Processar tarefa
-                await self._execute_task(task)
+                try:
+                    await self._execute_task(task)
+                finally:
+                    self._release_task(task)
                 
             except Exception as e:
                 logger.error(f"Erro no worker de background: {e}")
@@ -163,9 +540,17 @@ class BackgroundTaskService:
     async def _execute_task(self, task: BackgroundTask):
         """Executa uma tarefa em background"""
         task.started_at = datetime.now(UTC)
-        task.status = "processing"
+        self._set_status(task, "processing")
+        task.attempts += 1
+        task.next_retry_at = None
+        self._record_queue_wait(task)
+        if task.persisted:
+            self._store_call("mark_running", task.task_id, task.attempts)
         
-        logger.info(f"⚡ Processando tarefa: {task.task_name} (ID: {task.task_id})")
+        logger.info(
+            f"⚡ Processando tarefa: {task.task_name} (ID: {task.task_id}, "
+            f"tentativa {task.attempts}/{task.retry_policy.max_attempts})"
+        )
         
         try:
             # Executar função da tarefa
@@ -179,15 +564,19 @@ class BackgroundTaskService:
                     lambda: task.task_func(**task.task_args)
                 )
             
-            task.result = result
-            task.status = "completed"
+            task.result = None if task.discard_result else result
             task.completed_at = datetime.now(UTC)
+            # Argumentos (ex: submissão do quiz) não são mais necessários
+            task.task_args = {}
+            if task.persisted:
+                self._store_call("complete", task.task_id)
             
             # Atualizar métricas
             processing_time = (task.completed_at - task.started_at).total_seconds()
             
             with self._lock:
                 self.metrics["completed_tasks"] += 1
+                self._completion_times.append(time.monotonic())
                 
                 # Calcular média móvel de tempo de processamento
                 total_completed = self.metrics["completed_tasks"]
@@ -196,21 +585,258 @@ class BackgroundTaskService:
                     (current_avg * (total_completed - 1) + processing_time) / total_completed
                 )
             
+            self._set_status(task, "completed")
+            
             logger.info(
                 f"✅ Tarefa concluída: {task.task_name} "
                 f"(tempo: {processing_time:.2f}s)"
             )
             
         except Exception as e:
-            task.status = "failed"
             task.error = str(e)
+            
+            policy = task.retry_policy
+            if task.attempts < policy.max_attempts and policy.is_retryable(e):
+                self._schedule_retry(task)
+                return
+            
             task.completed_at = datetime.now(UTC)
             
             with self._lock:
                 self.metrics["failed_tasks"] += 1
+            self._set_status(task, "failed")
             
             logger.error(f"❌ Erro ao processar tarefa {task.task_name}: {e}")
             logger.error(traceback.format_exc())
+            if task.persisted:
+                self._store_call("mark_dead", task.task_id, task.error)
+            self._add_to_dead_letters(task)
+    
+    def _schedule_retry(self, task: BackgroundTask):
+        """Agenda nova tentativa com timer, sem ocupar o worker"""
+        delay = task.retry_policy.get_delay(task.attempts)
+        self._set_status(task, "retrying")
+        task.next_retry_at = datetime.fromtimestamp(time.time() + delay, UTC)
+        
+        with self._lock:
+            self.metrics["retried_tasks"] += 1
+        
+        if task.persisted:
+            self._store_call("reschedule", task.task_id, time.time() + delay, task.error)
+        
+        loop = asyncio.get_running_loop()
+        self._retry_handles[task.task_id] = loop.call_later(delay, self._requeue_task, task)
+        
+        logger.warning(
+            f"🔁 Tarefa {task.task_name} falhou (tentativa {task.attempts}): {task.error}. "
+            f"Nova tentativa em {delay:.1f}s"
+        )
+    
+    def _requeue_task(self, task: BackgroundTask):
+        """Devolve a tarefa à fila quando o timer de retry dispara"""
+        self._retry_handles.pop(task.task_id, None)
+        self._set_status(task, "pending")
+        self.task_queue.put_nowait(task)
+    
+    def _add_to_dead_letters(self, task: BackgroundTask, recovered: bool = False):
+        """
+        Guarda tarefa que esgotou as tentativas para inspeção e re-drive.
+        
+        `recovered`: tarefa morta de outro processo, carregada da fila durável.
+        """
+        with self._lock:
+            self.dead_letters[task.task_id] = task
+            if not recovered:
+                self.metrics["dead_lettered_tasks"] += 1
+            
+            evicted: List[BackgroundTask] = []
+            while len(self.dead_letters) > self.max_dead_letters:
+                evicted_id, evicted_task = self.dead_letters.popitem(last=False)
+                evicted.append(evicted_task)
+                logger.warning(f"Dead-letter cheia, descartando tarefa {evicted_id}")
+        
+        # Descartada da DLQ também sai do disco
+        for evicted_task in evicted:
+            if evicted_task.persisted:
+                self._store_call("discard", evicted_task.task_id)
+        
+        if not recovered:
+            logger.error(f"☠️ Tarefa {task.task_name} (ID: {task.task_id}) movida para dead-letter")
+    
+    def get_dead_letters(self, task_name: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Lista tarefas na dead-letter queue (mais recentes primeiro)"""
+        with self._lock:
+            tasks = list(self.dead_letters.values())
+        
+        if task_name:
+            tasks = [t for t in tasks if t.task_name == task_name]
+        
+        return [self._serialize_task(t) for t in reversed(tasks)][:limit]
+    
+    def redrive_dead_letter(self, task_id: str) -> bool:
+        """
+        Reenvia uma tarefa da dead-letter queue para a fila.
+        
+        Returns:
+            True se a tarefa foi reenfileirada, False se não estava na DLQ
+        """
+        with self._lock:
+            task = self.dead_letters.pop(task_id, None)
+            if task is None:
+                return False
+            
+            task.attempts = 0
+            task.error = None
+            task.completed_at = None
+            self._register_task(task, "pending")
+            self.metrics["redriven_tasks"] += 1
+        
+        if task.persisted:
+            self._store_call("save", task.task_id, task.task_name, task.priority.value, task.task_args)
+        self.task_queue.put_nowait(task)
+        logger.info(f"♻️ Tarefa {task.task_name} (ID: {task_id}) reenviada da dead-letter")
+        return True
+    
+    def redrive_all_dead_letters(self, task_name: Optional[str] = None) -> int:
+        """Reenvia todas as tarefas da DLQ (opcionalmente filtrando por nome)"""
+        with self._lock:
+            task_ids = [
+                task_id for task_id, task in self.dead_letters.items()
+                if task_name is None or task.task_name == task_name
+            ]
+        
+        return sum(1 for task_id in task_ids if self.redrive_dead_letter(task_id))
+    
+    def recover_persisted_tasks(self) -> int:
+        """
+        Reivindica tarefas da fila durável cujo dono morreu e as reenfileira.
+        
+        Chamado no startup e periodicamente pela manutenção de leases. A
+        entrega é at-least-once: uma tarefa interrompida no meio roda de novo.
+        Tarefas mortas do processo anterior voltam para a dead-letter queue.
+        
+        Returns:
+            Quantidade de tarefas recuperadas (reenfileiradas ou na DLQ)
+        """
+        claimed: List[StoredTask] = self._store_call("claim_expired") or []
+        loop = asyncio.get_running_loop()
+        recovered = 0
+        
+        for stored in claimed:
+            handler = self._task_handlers.get(stored.task_name)
+            if handler is None:
+                logger.error(f"Sem handler para tarefa recuperada {stored.task_name} (ID: {stored.task_id})")
+                if stored.status == "dead":
+                    # Já morta e sem como reenviar: não fica ocupando o disco
+                    self._store_call("discard", stored.task_id)
+                else:
+                    self._store_call("mark_dead", stored.task_id, "handler não registrado")
+                continue
+            
+            if stored.status == "dead":
+                with self._lock:
+                    if stored.task_id in self.dead_letters:
+                        continue
+                task = BackgroundTask(
+                    task_id=stored.task_id,
+                    task_name=stored.task_name,
+                    task_func=handler,
+                    task_args=stored.task_args,
+                    priority=TaskPriority(stored.priority),
+                    retry_policy=self._retry_policies.get(stored.task_name)
+                )
+                task.attempts = stored.attempts
+                task.status = "failed"
+                task.error = stored.last_error
+                task.persisted = True
+                self._add_to_dead_letters(task, recovered=True)
+                recovered += 1
+                continue
+            
+            with self._lock:
+                if stored.task_id in self.tasks and self.tasks[stored.task_id].status != "failed":
+                    continue  # Já está em memória neste processo
+            
+            task = BackgroundTask(
+                task_id=stored.task_id,
+                task_name=stored.task_name,
+                task_func=handler,
+                task_args=stored.task_args,
+                priority=TaskPriority(stored.priority),
+                retry_policy=self._retry_policies.get(stored.task_name)
+            )
+            task.attempts = stored.attempts
+            task.persisted = True
+            
+            delay = stored.available_at - time.time()
+            
+            with self._lock:
+                self._register_task(task, "retrying" if delay > 0 else "pending")
+                self.metrics["total_tasks"] += 1
+            
+            if delay > 0:
+                task.next_retry_at = datetime.fromtimestamp(stored.available_at, UTC)
+                self._retry_handles[task.task_id] = loop.call_later(delay, self._requeue_task, task)
+            else:
+                self.task_queue.put_nowait(task)
+            recovered += 1
+        
+        if recovered:
+            logger.info(f"♻️ {recovered} tarefas recuperadas e reenfileiradas")
+        return recovered
+    
+    async def _maintain_leases(self):
+        """Renova leases deste processo e assume tarefas de processos mortos"""
+        interval = max(1.0, self._store.lease_seconds / 3)
+        
+        while self.processing:
+            try:
+                await asyncio.sleep(interval)
+                self._store_call("heartbeat")
+                self.recover_persisted_tasks()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na manutenção da fila durável: {e}")
+    
+    def _record_queue_wait(self, task: BackgroundTask):
+        """Registra o tempo que a tarefa aguardou na fila"""
+        if task.enqueued_at is None:
+            return
+        
+        waited = time.monotonic() - task.enqueued_at
+        with self._lock:
+            self._wait_samples[task.priority].append(waited)
+            totals = self._wait_totals[task.priority]
+            totals["count"] += 1
+            totals["total"] += waited
+            totals["max"] = max(totals["max"], waited)
+    
+    def _get_priority_metrics(self) -> Dict[str, Any]:
+        """Métricas de latência de fila por prioridade"""
+        queued = self.task_queue.qsize_by_priority()
+        priority_metrics = {}
+        
+        for priority in PRIORITY_ORDER:
+            totals = self._wait_totals[priority]
+            samples = sorted(self._wait_samples[priority])
+            count = int(totals["count"])
+            
+            priority_metrics[priority.value] = {
+                "queued": queued.get(priority.value, 0),
+                "started": count,
+                "avg_wait_seconds": round(totals["total"] / count, 4) if count else 0.0,
+                "max_wait_seconds": round(totals["max"], 4),
+                "p95_wait_seconds": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4) if samples else 0.0
+            }
+        
+        return priority_metrics
+    
+    def _get_throughput(self, window_seconds: float = 60.0) -> float:
+        """Tarefas concluídas por segundo na janela recente"""
+        cutoff = time.monotonic() - window_seconds
+        recent = sum(1 for completed_at in self._completion_times if completed_at >= cutoff)
+        return round(recent / window_seconds, 4)
     
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Retorna status de uma tarefa"""
@@ -218,42 +844,84 @@ class BackgroundTaskService:
         if not task:
             return None
         
+        return self._serialize_task(task)
+    
+    def _serialize_task(self, task: BackgroundTask) -> Dict[str, Any]:
+        """Representação de uma tarefa para APIs e métricas"""
         return {
             "task_id": task.task_id,
             "task_name": task.task_name,
             "status": task.status,
+            "priority": task.priority.value,
+            "attempts": task.attempts,
+            "max_attempts": task.retry_policy.max_attempts,
             "created_at": task.created_at.isoformat(),
             "started_at": task.started_at.isoformat() if task.started_at else None,
             "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+            "next_retry_at": task.next_retry_at.isoformat() if task.next_retry_at else None,
             "error": task.error,
             "result": task.result
         }
     
     def get_metrics(self) -> Dict[str, Any]:
-        """Retorna métricas do serviço"""
+        """
+        Retorna métricas do serviço.
+        
+        Lê a fila durável (SQLite) fora do lock; em rotas async, chamar via
+        asyncio.to_thread.
+        """
+        durable_queue = self._store_call("get_stats") if self._store is not None else None
         with self._lock:
             return {
                 **self.metrics,
                 "queue_size": self.task_queue.qsize(),
-                "active_tasks": len([t for t in self.tasks.values() if t.status == "processing"]),
-                "pending_tasks": len([t for t in self.tasks.values() if t.status == "pending"])
+                "aged_promotions": self.task_queue.aged_promotions,
+                "priority_metrics": self._get_priority_metrics(),
+                "workers": self.num_workers,
+                "busy_workers": self._busy_workers,
+                "executor_workers": self._executor._max_workers,
+                "task_concurrency_limits": dict(self._task_concurrency_limits),
+                "running_by_name": dict(self._running_by_name),
+                "throughput_per_second": self._get_throughput(),
+                "scheduled_retries": len(self._retry_handles),
+                "dead_letter_size": len(self.dead_letters),
+                "durable_queue": durable_queue,
+                "registry_size": len(self.tasks),
+                "max_tasks": self.max_tasks,
+                "active_tasks": self._status_counts["processing"],
+                "pending_tasks": self._status_counts["pending"],
+                "retrying_tasks": self._status_counts["retrying"]
             }
     
-    def cleanup_old_tasks(self, max_age_hours: int = 24):
-        """Remove tarefas antigas da memória"""
-        cutoff_time = datetime.now(UTC).timestamp() - (max_age_hours * 3600)
+    def cleanup_old_tasks(self, max_age_hours: Optional[float] = None) -> int:
+        """
+        Remove tarefas finalizadas antigas da memória.
+        
+        A remoção já acontece a cada submissão/finalização; este método permite
+        forçar uma idade menor que o TTL configurado.
+        """
+        max_age_seconds = max_age_hours * 3600 if max_age_hours is not None else None
         
         with self._lock:
-            tasks_to_remove = [
-                task_id for task_id, task in self.tasks.items()
-                if task.completed_at and task.completed_at.timestamp() < cutoff_time
-            ]
-            
-            for task_id in tasks_to_remove:
-                del self.tasks[task_id]
+            removed = self._evict_finished_tasks(max_age_seconds)
         
-        if tasks_to_remove:
-            logger.info(f"🧹 Removidas {len(tasks_to_remove)} tarefas antigas")
+        if removed:
+            logger.info(f"🧹 Removidas {removed} tarefas antigas")
+        return removed
+
+
+def _parse_concurrency_limits(raw: str) -> Dict[str, int]:
+    """Converte "tarefa=2,outra=1" em dicionário de limites"""
+    limits = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        name, _, value = item.partition("=")
+        try:
+            limits[name.strip()] = int(value)
+        except ValueError:
+            logger.warning(f"Limite de concorrência inválido ignorado: {item}")
+    return limits
 
 
 # Instância global do serviço
@@ -268,7 +936,17 @@ def get_background_service() -> BackgroundTaskService:
     if _background_service_instance is None:
         with _service_lock:
             if _background_service_instance is None:
-                _background_service_instance = BackgroundTaskService()
+                _background_service_instance = BackgroundTaskService(
+                    aging_seconds=float(os.getenv("BACKGROUND_TASK_AGING_SECONDS", "30")),
+                    num_workers=int(os.getenv("BACKGROUND_WORKERS", "4")),
+                    executor_workers=int(os.getenv("BACKGROUND_EXECUTOR_WORKERS", "4")),
+                    task_concurrency_limits=_parse_concurrency_limits(
+                        os.getenv("BACKGROUND_TASK_CONCURRENCY", "")
+                    ),
+                    store=create_task_queue_store(),
+                    max_tasks=int(os.getenv("BACKGROUND_MAX_TASKS", "10000")),
+                    task_ttl_seconds=float(os.getenv("BACKGROUND_TASK_TTL_SECONDS", "3600"))
+                )
     
     return _background_service_instance
 
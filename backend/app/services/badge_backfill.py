@@ -0,0 +1,302 @@
+"""
+Backfill de badges em massa (force_check em lote, novos badges, migrações).
+Varre os usuários em páginas com campos projetados, avalia as regras
+compiladas de marco numérico para a página inteira com comparações NumPy e
+grava as concessões com um BulkWriter de taxa limitada. Um checkpoint por
+página permite retomar o job de onde parou.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.core.firebase import get_firestore_db
+from app.repositories.badge_repository import BadgeRepository
+from app.repositories.learning_path_repository import LearningPathRepository
+from app.repositories.user_repository import UserRepository
+from app.services.badge_rules import (
+    BadgeRule, BadgeRuleEngine, PATH_PROGRESS_FIELDS, QUIZ_FIELDS, UserSnapshot, get_badge_rule_engine
+)
+from app.services.sharded_counter import COUNTER_BADGES_AWARDED, get_sharded_counters
+
+logger = logging.getLogger(__name__)
+
+# Campos de `users` lidos pelo backfill (o resto do documento não trafega)
+BACKFILL_USER_FIELDS = [
+    "level", "points", "xp", "current_streak", "completed_missions",
+    "has_completed_questionnaire", "knowledge_profile"
+]
+
+
+def _metric_column(metric: str, rows: Sequence[Dict[str, Any]], path_data: Dict[str, Dict[str, Any]]) -> np.ndarray:
+    """Coluna de uma métrica para todas as linhas da página"""
+    count = len(rows)
+    if metric == "missions_completed":
+        values = (len(row.get("completed_missions") or {}) for row in rows)
+    elif metric == "completed_paths":
+        values = (len(path_data.get(row["uid"], {}).get("completed_paths", ())) for row in rows)
+    elif metric == "modules_completed":
+        values = (path_data.get(row["uid"], {}).get("modules_completed", 0) for row in rows)
+    elif metric == "level":
+        values = (row.get("level") or 1 for row in rows)
+    else:
+        values = (row.get(metric) or 0 for row in rows)
+    return np.fromiter(values, dtype=np.int64, count=count)
+
+
+class BadgeBackfillService:
+    """
+    Avalia o catálogo de badges para todos os usuários.
+
+    Regras de marco (nível, pontos, streak, contagens) são avaliadas em bloco
+    por página; as demais que dependem só do estado do usuário (trilha
+    específica, questionário) usam um snapshot por linha. Regras que exigem
+    o próprio evento (score perfeito, level up) ou o histórico de quizzes
+    ficam de fora e continuam sendo concedidas pelos eventos.
+    """
+
+    def __init__(
+        self,
+        user_repo,
+        badge_repo,
+        path_repo_factory: Optional[Callable[[], Any]] = None,
+        rule_engine: Optional[BadgeRuleEngine] = None,
+        page_size: int = 500,
+        ops_per_second: int = 100
+    ):
+        self.user_repo = user_repo
+        self.badge_repo = badge_repo
+        self._path_repo_factory = path_repo_factory
+        self._path_repo = None
+        self.rule_engine = rule_engine or get_badge_rule_engine()
+        self.page_size = page_size
+        self.ops_per_second = ops_per_second
+
+    def plan(self, badge_ids: Optional[Iterable[str]] = None) -> Tuple[List[BadgeRule], List[BadgeRule], List[str]]:
+        """
+        Separa as regras a avaliar.
+
+        Returns:
+            (regras vetorizadas, regras por linha, badges sem backfill)
+        """
+        self.rule_engine.ensure_loaded(self.badge_repo)
+        wanted = set(badge_ids) if badge_ids is not None else None
+
+        vector_rules: List[BadgeRule] = []
+        row_rules: List[BadgeRule] = []
+        skipped: List[str] = []
+        for rule in self.rule_engine.rules.values():
+            if wanted is not None and rule.badge_id not in wanted:
+                continue
+            if not rule.fields or rule.fields & QUIZ_FIELDS:
+                skipped.append(rule.badge_id)
+            elif rule.metric and rule.threshold is not None:
+                vector_rules.append(rule)
+            else:
+                row_rules.append(rule)
+
+        if wanted is not None:
+            skipped.extend(sorted(wanted - set(self.rule_engine.rules)))
+        return vector_rules, row_rules, skipped
+
+    @staticmethod
+    def evaluate_page(
+        rows: Sequence[Dict[str, Any]],
+        vector_rules: Sequence[BadgeRule],
+        row_rules: Sequence[BadgeRule],
+        earned: Dict[str, Set[str]],
+        path_data: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Badges a conceder por usuário em uma página.
+
+        Cada regra de marco é uma comparação sobre a coluna da métrica; só os
+        usuários selecionados pela máscara são visitados em Python.
+        """
+        path_data = path_data or {}
+        user_ids = [row["uid"] for row in rows]
+        awards: Dict[str, List[str]] = defaultdict(list)
+
+        columns: Dict[str, np.ndarray] = {}
+        for rule in vector_rules:
+            if rule.metric not in columns:
+                columns[rule.metric] = _metric_column(rule.metric, rows, path_data)
+            for index in np.flatnonzero(columns[rule.metric] >= rule.threshold):
+                user_id = user_ids[index]
+                if rule.badge_id not in earned.get(user_id, ()):
+                    awards[user_id].append(rule.badge_id)
+
+        if row_rules:
+            for row in rows:
+                snapshot = UserSnapshot.from_row(row, **path_data.get(row["uid"], {}))
+                for rule in row_rules:
+                    if rule.badge_id not in earned.get(row["uid"], ()) and rule.matches(snapshot):
+                        awards[row["uid"]].append(rule.badge_id)
+
+        return dict(awards)
+
+    def _load_path_data(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Trilhas e módulos concluídos dos usuários da página"""
+        if self._path_repo_factory is None:
+            return {}
+        if self._path_repo is None:
+            self._path_repo = self._path_repo_factory()
+
+        path_data: Dict[str, Dict[str, Any]] = {}
+        for user_id, progress_list in self._path_repo.get_progress_by_users(user_ids).items():
+            path_data[user_id] = {
+                "completed_paths": frozenset(
+                    progress.get("path_id") for progress in progress_list if progress.get("completed_at") is not None
+                ),
+                "modules_completed": sum(len(progress.get("completed_modules") or []) for progress in progress_list)
+            }
+        return path_data
+
+    def run(
+        self,
+        job_id: str,
+        badge_ids: Optional[Iterable[str]] = None,
+        resume: bool = True,
+        max_pages: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa (ou retoma) um job de backfill.
+
+        O checkpoint só avança depois que as escritas da página foram
+        confirmadas (flush); uma interrupção reprocessa no máximo uma página,
+        sem duplicar badges, pois os já conquistados são relidos.
+
+        Args:
+            job_id: Identificador do job (chave do checkpoint)
+            badge_ids: Restringe a badges específicos (ex.: um badge novo)
+            resume: Continuar do checkpoint existente
+            max_pages: Para após N páginas (status "paused", retomável)
+
+        Returns:
+            Checkpoint final do job
+        """
+        vector_rules, row_rules, skipped = self.plan(badge_ids)
+        planned = sorted(rule.badge_id for rule in vector_rules + row_rules)
+
+        checkpoint = self.badge_repo.get_backfill_checkpoint(job_id) if resume else None
+        if checkpoint and checkpoint.get("status") == "completed":
+            logger.info(f"⏭️ Backfill {job_id} já concluído")
+            return checkpoint
+        checkpoint = dict(checkpoint) if checkpoint else {
+            "job_id": job_id,
+            "last_user_id": None,
+            "users_scanned": 0,
+            "badges_awarded": 0,
+            "failed_writes": 0,
+            "started_at": datetime.now(UTC).isoformat()
+        }
+        checkpoint.update({"status": "running", "badge_ids": planned, "skipped_badges": skipped})
+
+        if not planned:
+            logger.warning(f"⚠️ Backfill {job_id}: nenhuma regra avaliável em lote")
+            checkpoint["status"] = "completed"
+            self.badge_repo.save_backfill_checkpoint(job_id, checkpoint)
+            return checkpoint
+
+        needs_paths = bool(self.rule_engine.fields_for(vector_rules + row_rules) & PATH_PROGRESS_FIELDS)
+        failures: List[Any] = []
+        written: Set[str] = set()
+        writer = self.badge_repo.create_bulk_writer(
+            self.ops_per_second, on_failure=failures.append,
+            on_written=lambda reference: written.add(reference.path)
+        )
+        context = {"source": "backfill", "job_id": job_id}
+        pages = 0
+        started = time.perf_counter()
+
+        logger.info(f"🔄 Backfill {job_id}: {len(planned)} badges, retomando após {checkpoint['last_user_id']}")
+        try:
+            while True:
+                rows = self.user_repo.get_users_fields_page(
+                    BACKFILL_USER_FIELDS, self.page_size, checkpoint["last_user_id"]
+                )
+                if not rows:
+                    checkpoint["status"] = "completed"
+                    break
+
+                user_ids = [row["uid"] for row in rows]
+                earned = self.badge_repo.get_users_badge_ids(user_ids)
+                path_data = self._load_path_data(user_ids) if needs_paths else {}
+                awards = self.evaluate_page(rows, vector_rules, row_rules, earned, path_data)
+
+                queued = {}
+                for user_id, awarded_ids in awards.items():
+                    for badge_id in awarded_ids:
+                        user_badge = self.badge_repo.queue_award(writer, user_id, badge_id, context)
+                        queued[self.badge_repo.user_badge_path(user_id, badge_id)] = user_badge
+                writer.flush()
+
+                # Só concessões criadas agora contam e recebem progresso/resumo; as que
+                # já existiam (ex.: ganhas durante o job) ou falharam ficam de fora
+                created = [user_badge for path, user_badge in queued.items() if path in written]
+                for user_badge in created:
+                    self.badge_repo.queue_earned(writer, user_badge)
+                writer.flush()
+
+                awarded = len(created)
+                checkpoint["last_user_id"] = user_ids[-1]
+                checkpoint["users_scanned"] += len(rows)
+                checkpoint["badges_awarded"] += awarded
+                checkpoint["failed_writes"] += len(failures)
+                checkpoint["updated_at"] = datetime.now(UTC).isoformat()
+                failures.clear()
+                written.clear()
+                self.badge_repo.save_backfill_checkpoint(job_id, checkpoint)
+                get_sharded_counters().increment(COUNTER_BADGES_AWARDED, awarded)
+
+                pages += 1
+                if len(rows) < self.page_size:
+                    checkpoint["status"] = "completed"
+                    break
+                if max_pages is not None and pages >= max_pages:
+                    checkpoint["status"] = "paused"
+                    break
+        finally:
+            writer.close()
+
+        checkpoint["updated_at"] = datetime.now(UTC).isoformat()
+        self.badge_repo.save_backfill_checkpoint(job_id, checkpoint)
+        logger.info(
+            f"✅ Backfill {job_id} ({checkpoint['status']}): {checkpoint['users_scanned']} usuários, "
+            f"{checkpoint['badges_awarded']} badges em {time.perf_counter() - started:.1f}s"
+        )
+        return checkpoint
+
+    async def run_async(self, job_id: str, **kwargs) -> Dict[str, Any]:
+        """Backfill fora do event loop"""
+        return await asyncio.to_thread(self.run, job_id, **kwargs)
+
+
+# Instância global do serviço
+_backfill_instance: Optional[BadgeBackfillService] = None
+_backfill_lock = threading.Lock()
+
+
+def get_badge_backfill_service() -> BadgeBackfillService:
+    """Retorna instância singleton do BadgeBackfillService"""
+    global _backfill_instance
+
+    if _backfill_instance is None:
+        with _backfill_lock:
+            if _backfill_instance is None:
+                db = get_firestore_db()
+                _backfill_instance = BadgeBackfillService(
+                    UserRepository(db),
+                    BadgeRepository(db),
+                    path_repo_factory=LearningPathRepository,
+                    page_size=int(os.getenv("BADGE_BACKFILL_PAGE_SIZE", "500")),
+                    ops_per_second=int(os.getenv("BADGE_BACKFILL_OPS_PER_SECOND", "100"))
+                )
+
+    return _backfill_instance
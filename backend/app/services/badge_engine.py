@@ -3,12 +3,19 @@ Motor centralizado de badges para o sistema de recompensas.
 Coordena a verificação e concessão de badges baseado em eventos.
 """
 
+import asyncio
+from collections import defaultdict
+from datetime import datetime, UTC
 from typing import List, Dict, Any, Optional
 from app.models.events import BaseEvent, EventType
+from app.services.badge_notifications import build_notification, get_badge_notification_hub
+from app.services.badge_progress import BadgeProgressService, get_badge_progress_service
+from app.services.badge_rules import BadgeEvaluationContext
 from app.services.event_bus import event_bus
 from app.services.validation_service import ValidationService
 from app.repositories.badge_repository import BadgeRepository
 from app.repositories.user_repository import UserRepository
+from app.services.sharded_counter import COUNTER_BADGES_AWARDED, get_sharded_counters
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,9 +32,11 @@ class BadgeEngine:
     - Coordenar validações
     """
     
-    def __init__(self, validation_service: ValidationService, badge_repo: BadgeRepository):
+    def __init__(self, validation_service: ValidationService, badge_repo: BadgeRepository,
+                 progress_service: Optional[BadgeProgressService] = None):
         self.validation_service = validation_service
         self.badge_repo = badge_repo
+        self.progress_service = progress_service
         self._awarded_badges_log: List[Dict[str, Any]] = []
         
         # Registrar handlers de eventos (será chamado quando necessário)
@@ -56,25 +65,16 @@ class BadgeEngine:
                 return False
             
             # Verificar se o usuário já tem o badge
-            user_badges = self.badge_repo.get_user_badges(user_id)
-            if any(ub.badge_id == badge_id for ub in user_badges):
+            if badge_id in self.badge_repo.get_user_badge_ids(user_id):
                 logger.info(f"✅ Usuário {user_id} já possui badge {badge_id}")
                 return True
             
             # Conceder o badge
-            from app.models.reward import UserBadge
-            from datetime import datetime, UTC
-            
-            user_badge = UserBadge(
-                user_id=user_id,
-                badge_id=badge_id,
-                awarded_at=datetime.now(UTC),
-                context=context
-            )
-            
             success = self.badge_repo.award_badge(user_id, badge_id, context)
             if success:
                 logger.info(f"✅ Badge {badge_id} concedido com sucesso para usuário {user_id}")
+                await get_sharded_counters().increment_async(COUNTER_BADGES_AWARDED)
+                self._notify_award(user_id, badge_id, context, badge)
                 return True
             else:
                 logger.error(f"❌ Erro ao salvar badge {badge_id} para usuário {user_id}")
@@ -145,35 +145,70 @@ class BadgeEngine:
                 await self._register_event_handlers()
                 self._handlers_registered = True
             
-            # Verificar badges elegíveis
-            eligible_badges = await self.validation_service.check_badge_conditions(
-                event.user_id, event
-            )
-            
-            if not eligible_badges:
-                logger.debug(f"Nenhum badge elegível para usuário {event.user_id}")
-                return
-            
-            # Conceder badges elegíveis
-            awarded_badges = []
-            for badge_id in eligible_badges:
-                success = self._award_badge_if_eligible(
-                    event.user_id, 
-                    badge_id, 
-                    event.context
-                )
-                
-                if success:
-                    awarded_badges.append(badge_id)
-            
-            if awarded_badges:
-                logger.info(f"🏆 Badges concedidos para usuário {event.user_id}: {awarded_badges}")
-                await self._log_badge_awards(event.user_id, awarded_badges, event)
+            await self.process_events([event])
             
         except Exception as e:
             logger.error(f"Erro ao processar evento para badges: {e}")
 
-    def _award_badge_if_eligible(self, user_id: str, badge_id: str, context: Dict[str, Any]) -> bool:
+    async def process_events(self, events: List[BaseEvent]) -> Dict[str, List[str]]:
+        """
+        Avalia e concede badges para um lote de eventos.
+        
+        Um contexto de avaliação por usuário (perfil + badges conquistados,
+        lidos uma vez) serve a todos os eventos dele no lote; badges
+        concedidos por um evento não são reavaliados pelos seguintes.
+        
+        Args:
+            events: Eventos a processar
+            
+        Returns:
+            Badges concedidos por usuário
+        """
+        events_by_user: Dict[str, List[BaseEvent]] = defaultdict(list)
+        for event in events:
+            events_by_user[event.user_id].append(event)
+        
+        rule_engine = self.validation_service.rule_engine
+        await asyncio.to_thread(rule_engine.ensure_loaded, self.badge_repo)
+        
+        awarded_by_user: Dict[str, List[str]] = {}
+        for user_id, user_events in events_by_user.items():
+            rules = rule_engine.rules_for_events(event.event_type for event in user_events)
+            if not rules:
+                logger.debug(f"Nenhuma regra de badge para os eventos do usuário {user_id}")
+                continue
+            
+            try:
+                context = await self.validation_service.build_context_async(user_id, rule_engine.fields_for(rules))
+            except Exception as e:
+                logger.error(f"Erro ao montar contexto de badges para usuário {user_id}: {e}")
+                continue
+            
+            for event in user_events:
+                eligible_badges = await self.validation_service.check_badge_conditions(user_id, event, context)
+                if not eligible_badges:
+                    logger.debug(f"Nenhum badge elegível para usuário {user_id}")
+                    continue
+                
+                awarded_badges = [
+                    badge_id for badge_id in eligible_badges
+                    if self._award_badge_if_eligible(user_id, badge_id, event.context, event, context)
+                ]
+                
+                if awarded_badges:
+                    logger.info(f"🏆 Badges concedidos para usuário {user_id}: {awarded_badges}")
+                    await self._log_badge_awards(user_id, awarded_badges, event)
+                    awarded_by_user.setdefault(user_id, []).extend(awarded_badges)
+        
+        # Contador global: um incremento por lote, fora do event loop
+        await get_sharded_counters().increment_async(
+            COUNTER_BADGES_AWARDED, sum(len(badges) for badges in awarded_by_user.values())
+        )
+        return awarded_by_user
+
+    def _award_badge_if_eligible(self, user_id: str, badge_id: str, context: Dict[str, Any],
+                                 event: Optional[BaseEvent] = None,
+                                 evaluation_context: Optional[BadgeEvaluationContext] = None) -> bool:
         """
         Concede um badge se o usuário for elegível.
         
@@ -181,31 +216,46 @@ class BadgeEngine:
             user_id: ID do usuário
             badge_id: ID do badge
             context: Contexto da concessão
+            event: Evento que originou a verificação, se houver
+            evaluation_context: Contexto de avaliação já montado; com ele a
+                verificação não faz leituras no Firestore
             
         Returns:
             True se o badge foi concedido, False caso contrário
         """
         try:
             # Verificar se já possui o badge
-            has_badge = self.badge_repo.has_badge(user_id, badge_id)
+            if evaluation_context is not None:
+                has_badge = evaluation_context.has_badge(badge_id)
+            else:
+                has_badge = self.badge_repo.has_badge(user_id, badge_id)
             if has_badge:
                 logger.debug(f"Usuário {user_id} já possui badge {badge_id}")
                 return False
             
             # Verificar elegibilidade
             is_eligible = self.validation_service.validate_badge_eligibility(
-                user_id, badge_id
+                user_id, badge_id, event, evaluation_context
             )
             
             if not is_eligible:
                 logger.debug(f"Usuário {user_id} não é elegível para badge {badge_id}")
                 return False
             
-            # Conceder badge
-            success = self.badge_repo.award_badge(user_id, badge_id, context)
+            # Conceder badge (duplicata já conferida com o contexto recém-lido;
+            # concessões concorrentes são barradas pelo create no repositório)
+            success = self.badge_repo.award_badge(
+                user_id, badge_id, context, check_duplicate=evaluation_context is None
+            )
             
             if success:
                 logger.info(f"✅ Badge {badge_id} concedido para usuário {user_id}")
+                if evaluation_context is not None:
+                    evaluation_context.mark_earned(badge_id)
+                    badge = evaluation_context.get_badge(badge_id)
+                else:
+                    badge = self.badge_repo.get_badge_by_id(badge_id)
+                self._notify_award(user_id, badge_id, context, badge)
             else:
                 logger.warning(f"❌ Falha ao conceder badge {badge_id} para usuário {user_id}")
             
@@ -215,6 +265,13 @@ class BadgeEngine:
             logger.error(f"Erro ao conceder badge {badge_id} para usuário {user_id}: {e}")
             return False
 
+    def _notify_award(self, user_id: str, badge_id: str, context: Dict[str, Any], badge=None):
+        """Publica a concessão para as conexões SSE do usuário (falha não afeta a concessão)"""
+        try:
+            get_badge_notification_hub().publish(build_notification(user_id, badge_id, badge, context))
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao notificar concessão do badge {badge_id} para usuário {user_id}: {e}")
+
     async def _log_badge_awards(self, user_id: str, badge_ids: List[str], event: BaseEvent):
         """
         Registra concessões de badges no log de auditoria.
@@ -253,30 +310,9 @@ class BadgeEngine:
             Dicionário com informações de progresso
         """
         try:
-            # Buscar badges do usuário
-            user_badges = await self.badge_repo.get_user_badges(user_id)
-            all_badges = await self.badge_repo.get_all_badges()
-            
-            # Calcular progresso para cada badge
-            progress_info = {}
-            for badge in all_badges:
-                if not badge.id:
-                    continue
-                    
-                progress = await self.validation_service.get_user_progress(user_id, badge.id)
-                progress_info[badge.id] = {
-                    'badge': badge,
-                    'progress': progress,
-                    'has_badge': any(ub.badge_id == badge.id for ub in user_badges)
-                }
-            
-            return {
-                'user_id': user_id,
-                'total_badges': len(all_badges),
-                'earned_badges': len(user_badges),
-                'completion_percentage': (len(user_badges) / len(all_badges) * 100) if all_badges else 0,
-                'badge_progress': progress_info
-            }
+            # Uma leitura do documento incremental + catálogo compilado em memória
+            progress_service = self.progress_service or get_badge_progress_service()
+            return await progress_service.get_user_badge_progress_async(user_id)
             
         except Exception as e:
             logger.error(f"Erro ao calcular progresso de badges para usuário {user_id}: {e}")
@@ -337,7 +373,8 @@ class BadgeEngine:
     async def force_check_badges(self, user_id: str) -> List[str]:
         """
         Força verificação de todos os badges para um usuário.
-        Útil para migração ou correção de dados.
+        Útil para correção de dados; para todos os usuários (migrações, badge
+        novo) usar o BadgeBackfillService.
         
         Args:
             user_id: ID do usuário
@@ -348,31 +385,17 @@ class BadgeEngine:
         try:
             logger.info(f"🔍 Verificação forçada de badges para usuário {user_id}")
             
-            # Buscar todos os badges disponíveis
-            all_badges = await self.badge_repo.get_all_badges()
-            awarded_badges = []
-            
-            for badge in all_badges:
-                if not badge.id:
-                    continue
-                    
-                # Verificar elegibilidade
-                is_eligible = await self.validation_service.validate_badge_eligibility(
-                    user_id, badge.id
-                )
-                
-                if is_eligible:
-                    # Conceder badge
-                    success = self.badge_repo.award_badge(
-                        user_id, 
-                        badge.id, 
-                        {'source': 'force_check', 'timestamp': 'now'}
-                    )
-                    
-                    if success:
-                        awarded_badges.append(badge.id)
+            # Um contexto com todos os campos; regras avaliadas sem evento
+            context = await self.validation_service.build_context_async(user_id)
+            grant_context = {'source': 'force_check', 'timestamp': datetime.now(UTC).isoformat()}
+            awarded_badges = [
+                badge_id for badge_id in list(context.engine.rules)
+                if context.is_eligible(badge_id)
+                and self._award_badge_if_eligible(user_id, badge_id, grant_context, None, context)
+            ]
             
             logger.info(f"🏆 Badges concedidos na verificação forçada: {awarded_badges}")
+            await get_sharded_counters().increment_async(COUNTER_BADGES_AWARDED, len(awarded_badges))
             return awarded_badges
             
         except Exception as e:
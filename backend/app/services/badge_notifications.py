@@ -0,0 +1,275 @@
+"""
+Notificações de badges concedidos em tempo real (Server-Sent Events).
+O BadgeEngine publica cada concessão no hub do processo, que entrega às
+conexões SSE abertas do usuário. Como o Gunicorn roda vários workers, cada
+worker também mantém um único listener do Firestore em `user_badges`: a
+concessão feita em outro worker chega por ele. O listener é reaberto a cada
+janela com o limite inferior de `earned_at` adiantado, para o estado do Watch
+não crescer com o histórico, e só monta notificações de usuários conectados
+ao worker. Entregas repetidas (publicação local + listener, sobreposição
+entre janelas) são descartadas por chave usuário/badge.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, UTC
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from app.models.reward import Badge
+
+logger = logging.getLogger(__name__)
+
+BADGE_AWARDED_EVENT = "badge_awarded"
+
+
+def format_sse(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """Mensagem no formato text/event-stream"""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def build_notification(
+    user_id: str,
+    badge_id: str,
+    badge: Optional[Badge] = None,
+    context: Optional[Dict[str, Any]] = None,
+    awarded_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Payload enviado ao cliente para uma concessão"""
+    return {
+        "user_id": user_id,
+        "badge_id": badge_id,
+        "name": badge.name if badge else None,
+        "description": badge.description if badge else None,
+        "icon": badge.icon if badge else None,
+        "rarity": badge.rarity if badge else None,
+        "color": badge.color if badge else None,
+        "awarded_at": (awarded_at or datetime.now(UTC)).isoformat(),
+        "context": context or {}
+    }
+
+
+class BadgeNotificationHub:
+    """
+    Fan-out das concessões de badges para as conexões SSE do processo.
+
+    Cada conexão tem uma fila limitada; se o cliente não consome, a
+    notificação mais antiga é descartada. `publish` pode ser chamado de
+    qualquer thread (handlers de evento, callback do listener do Firestore).
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 50,
+        dedupe_size: int = 5000,
+        keepalive_seconds: float = 15.0,
+        listener_window_seconds: float = 300.0,
+        listener_overlap_seconds: float = 60.0
+    ):
+        self.queue_size = queue_size
+        self.dedupe_size = dedupe_size
+        self.keepalive_seconds = keepalive_seconds
+        # A cada janela o listener é reaberto a partir de agora - sobreposição
+        # (cobre concessões gravadas com earned_at pouco antes do commit)
+        self.listener_window_seconds = listener_window_seconds
+        self.listener_overlap_seconds = listener_overlap_seconds
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener = None
+        self._listener_source = None
+        self._listener_timer: Optional[threading.Timer] = None
+        self._listener_lock = threading.Lock()
+        self.metrics = {
+            "published": 0, "delivered": 0, "duplicates": 0, "dropped": 0, "connections": 0, "listener_restarts": 0
+        }
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        """Abre uma fila de notificações para uma conexão do usuário"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        self.metrics["connections"] += 1
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(user_id, None)
+        self.metrics["connections"] -= 1
+
+    def _is_duplicate(self, notification: Dict[str, Any]) -> bool:
+        key = f"{notification['user_id']}:{notification['badge_id']}"
+        with self._lock:
+            if key in self._recent:
+                return True
+            self._recent[key] = None
+            if len(self._recent) > self.dedupe_size:
+                self._recent.popitem(last=False)
+            return False
+
+    def publish(self, notification: Dict[str, Any]) -> bool:
+        """
+        Publica uma concessão.
+
+        Returns:
+            False se a mesma concessão já tinha sido publicada
+        """
+        if self._is_duplicate(notification):
+            self.metrics["duplicates"] += 1
+            return False
+        self.metrics["published"] += 1
+
+        if notification["user_id"] not in self._subscribers or self._loop is None:
+            return True
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(notification)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, notification)
+        return True
+
+    def _deliver(self, notification: Dict[str, Any]):
+        for queue in list(self._subscribers.get(notification["user_id"], ())):
+            if queue.full():
+                queue.get_nowait()
+                self.metrics["dropped"] += 1
+            queue.put_nowait(notification)
+            self.metrics["delivered"] += 1
+
+    async def stream(self, user_id: str, is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+        """Mensagens SSE de um usuário até a conexão ser fechada (com keepalive)"""
+        queue = self.subscribe(user_id)
+        try:
+            yield format_sse("connected", {"user_id": user_id})
+            while not await is_disconnected():
+                try:
+                    notification = await asyncio.wait_for(queue.get(), timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(
+                    BADGE_AWARDED_EVENT, notification, f"{notification['user_id']}:{notification['badge_id']}"
+                )
+        finally:
+            self.unsubscribe(user_id, queue)
+
+    def start_listener(self, db, badge_lookup: Callable[[str], Optional[Badge]]):
+        """
+        Escuta concessões feitas por outros workers (uma consulta por processo).
+
+        Args:
+            db: Cliente Firestore síncrono
+            badge_lookup: Busca do badge no catálogo em memória
+        """
+        with self._listener_lock:
+            if self._listener is not None:
+                return
+            self._listener_source = (db, badge_lookup)
+            try:
+                self._listener = self._open_listener(datetime.now(UTC))
+                logger.info("✅ Listener de concessões de badges iniciado")
+            except Exception as e:
+                # Sem listener, cada worker só notifica as próprias concessões
+                logger.error(f"Erro ao iniciar listener de concessões de badges: {e}")
+                return
+            self._schedule_listener_restart()
+
+    def _open_listener(self, since: datetime):
+        """Abre o listener de `user_badges` com `earned_at >= since`"""
+        db, badge_lookup = self._listener_source
+
+        def on_snapshot(docs, changes, read_time):
+            for change in changes:
+                if change.type.name != "ADDED":
+                    continue
+                data = change.document.to_dict() or {}
+                user_id, badge_id = data.get("user_id"), data.get("badge_id")
+                # Concessões de usuários sem conexão neste worker são ignoradas
+                if not user_id or not badge_id or user_id not in self._subscribers:
+                    continue
+                self.publish(build_notification(
+                    user_id, badge_id, badge_lookup(badge_id), data.get("context"), data.get("earned_at")
+                ))
+
+        query = db.collection("user_badges").where("earned_at", ">=", since)
+        return query.on_snapshot(on_snapshot)
+
+    def _schedule_listener_restart(self):
+        """Agenda a próxima troca do listener. Requer `self._listener_lock`."""
+        if self.listener_window_seconds <= 0:
+            return
+        self._listener_timer = threading.Timer(self.listener_window_seconds, self._restart_listener)
+        self._listener_timer.daemon = True
+        self._listener_timer.start()
+
+    def _restart_listener(self):
+        """
+        Reabre o listener com o limite inferior adiantado e fecha o anterior.
+        O novo abre antes do antigo fechar: a sobreposição é descartada pela
+        deduplicação. Se a abertura falhar, o anterior continua ativo.
+        """
+        with self._listener_lock:
+            if self._listener is None:
+                return
+            try:
+                since = datetime.now(UTC) - timedelta(seconds=self.listener_overlap_seconds)
+                previous, self._listener = self._listener, self._open_listener(since)
+                previous.unsubscribe()
+                self.metrics["listener_restarts"] += 1
+            except Exception as e:
+                logger.error(f"Erro ao reabrir listener de concessões de badges: {e}")
+            self._schedule_listener_restart()
+
+    def stop_listener(self):
+        with self._listener_lock:
+            if self._listener_timer is not None:
+                self._listener_timer.cancel()
+                self._listener_timer = None
+            if self._listener is None:
+                return
+            self._listener.unsubscribe()
+            self._listener = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "users_connected": len(self._subscribers),
+            "listener_active": self._listener is not None
+        }
+
+
+# Instância global do hub
+_hub_instance: Optional[BadgeNotificationHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_badge_notification_hub() -> BadgeNotificationHub:
+    """Retorna instância singleton do BadgeNotificationHub"""
+    global _hub_instance
+
+    if _hub_instance is None:
+        with _hub_lock:
+            if _hub_instance is None:
+                _hub_instance = BadgeNotificationHub(
+                    queue_size=int(os.getenv("BADGE_NOTIFICATIONS_QUEUE_SIZE", "50")),
+                    keepalive_seconds=float(os.getenv("BADGE_NOTIFICATIONS_KEEPALIVE_SECONDS", "15")),
+                    listener_window_seconds=float(os.getenv("BADGE_NOTIFICATIONS_LISTENER_WINDOW_SECONDS", "300"))
+                )
+
+    return _hub_instance
@@ -0,0 +1,197 @@
+"""
+Progresso incremental de badges.
+Os contadores que as regras de marco usam (nível, pontos, streak, missões,
+trilhas e módulos concluídos) e os badges conquistados ficam em um único
+documento por usuário em `badge_progress`, atualizado pelos eventos com
+transforms do Firestore (sem leitura). O endpoint de progresso faz uma
+leitura desse documento e cruza com o catálogo compilado em memória.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, UTC
+from typing import Any, Dict, Optional, Set, Tuple
+
+from firebase_admin import firestore
+
+from app.models.events import (
+    BaseEvent, EventType, LearningPathCompletedEvent, LevelUpEvent, MissionCompletedEvent,
+    ModuleCompletedEvent, PointsEarnedEvent, StreakUpdatedEvent
+)
+from app.repositories.badge_repository import BadgeRepository, get_badge_repository
+from app.services.badge_rules import UserSnapshot, describe_progress
+from app.services.event_bus import get_event_bus
+from app.services.validation_service import ValidationService, get_validation_service
+
+logger = logging.getLogger(__name__)
+
+# Campos lidos das fontes originais ao semear o documento (quizzes não têm marco numérico)
+SEED_FIELDS = frozenset({"completed_paths", "modules_completed"})
+
+
+def progress_updates(event: BaseEvent) -> Dict[str, Any]:
+    """
+    Atualizações do documento de progresso para um evento.
+
+    Totais usam Maximum (eventos fora de ordem não regridem o valor) e
+    conjuntos usam ArrayUnion (reentregas do mesmo evento são idempotentes).
+    """
+    if isinstance(event, MissionCompletedEvent):
+        updates: Dict[str, Any] = {"mission_ids": firestore.ArrayUnion([event.mission_id])}
+        if event.total_points is not None:
+            updates["points"] = firestore.Maximum(event.total_points)
+        return updates
+    if isinstance(event, PointsEarnedEvent):
+        return {"points": firestore.Maximum(event.total_points)}
+    if isinstance(event, LevelUpEvent):
+        return {"level": firestore.Maximum(event.new_level)}
+    if isinstance(event, StreakUpdatedEvent):
+        return {"current_streak": event.current_streak}
+    if isinstance(event, LearningPathCompletedEvent):
+        return {"completed_paths": firestore.ArrayUnion([event.learning_path_id])}
+    if isinstance(event, ModuleCompletedEvent):
+        # Emitido uma vez, quando a conclusão do módulo é persistida
+        return {"modules_completed": firestore.Increment(1)}
+    return {}
+
+
+class BadgeProgressService:
+    """
+    Mantém e lê o progresso de badges por usuário.
+
+    Usuários sem documento semeado (anteriores ao recurso) são semeados na
+    primeira leitura a partir do perfil, dos badges e das trilhas; eventos
+    que chegarem antes só completam o documento, sem marcá-lo como semeado.
+    """
+
+    def __init__(self, badge_repo: BadgeRepository, validation_service: ValidationService):
+        self.badge_repo = badge_repo
+        self.validation_service = validation_service
+        self.rule_engine = validation_service.rule_engine
+        self._handlers_registered = False
+        self.metrics = {"updates": 0, "reads": 0, "seeds": 0, "errors": 0}
+
+    async def register_event_handlers(self):
+        """Inscreve a atualização do progresso nos eventos que movem as métricas"""
+        if self._handlers_registered:
+            return
+
+        event_bus = get_event_bus()
+        for event_type in (
+            EventType.MISSION_COMPLETED, EventType.POINTS_EARNED, EventType.LEVEL_UP,
+            EventType.STREAK_UPDATED, EventType.LEARNING_PATH_COMPLETED, EventType.MODULE_COMPLETED
+        ):
+            await event_bus.subscribe(event_type, self._handle_event)
+        self._handlers_registered = True
+
+        logger.info("🎯 Handlers de eventos registrados no BadgeProgressService")
+
+    async def _handle_event(self, event: BaseEvent):
+        updates = progress_updates(event)
+        if not updates:
+            return
+        try:
+            await asyncio.to_thread(self.badge_repo.update_badge_progress, event.user_id, updates)
+            self.metrics["updates"] += 1
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.error(f"Erro ao atualizar progresso de badges do usuário {event.user_id}: {e}")
+
+    def seed(self, user_id: str, partial: Optional[Dict[str, Any]] = None) -> Tuple[UserSnapshot, Set[str]]:
+        """
+        Semeia o documento a partir das fontes originais.
+
+        A gravação usa os mesmos transforms dos eventos, então valores que
+        eventos já gravaram (`partial`) não são sobrescritos por um total menor.
+        """
+        partial = partial or {}
+        context = self.validation_service.build_context(user_id, SEED_FIELDS)
+        snapshot = context.snapshot
+        profile = context.profile
+        mission_ids = sorted((getattr(profile, "completed_missions", None) or {}).keys())
+
+        self.badge_repo.update_badge_progress(user_id, {
+            "level": firestore.Maximum(snapshot.level),
+            "points": firestore.Maximum(snapshot.points),
+            "current_streak": snapshot.current_streak,
+            "mission_ids": firestore.ArrayUnion(mission_ids),
+            "completed_paths": firestore.ArrayUnion(sorted(snapshot.completed_paths)),
+            "modules_completed": snapshot.modules_completed,
+            "earned_badges": firestore.ArrayUnion(sorted(context.earned_badges)),
+            "seeded_at": datetime.now(UTC)
+        })
+        self.metrics["seeds"] += 1
+        logger.info(f"🌱 Progresso de badges semeado para usuário {user_id}")
+
+        # Mesmo resultado que o Firestore gravou, sem reler o documento
+        merged = UserSnapshot(
+            user_id=user_id,
+            level=max(snapshot.level, partial.get("level") or 1),
+            points=max(snapshot.points, partial.get("points") or 0),
+            current_streak=snapshot.current_streak,
+            missions_completed=len(set(mission_ids) | set(partial.get("mission_ids") or ())),
+            completed_paths=snapshot.completed_paths | frozenset(partial.get("completed_paths") or ()),
+            modules_completed=snapshot.modules_completed
+        )
+        return merged, set(context.earned_badges) | set(partial.get("earned_badges") or ())
+
+    def get_snapshot(self, user_id: str) -> Tuple[UserSnapshot, Set[str]]:
+        """Snapshot das métricas e badges conquistados (uma leitura após a semeadura)"""
+        progress = self.badge_repo.get_badge_progress(user_id)
+        self.metrics["reads"] += 1
+        if not progress or progress.get("seeded_at") is None:
+            return self.seed(user_id, progress)
+        return UserSnapshot.from_progress(user_id, progress), set(progress.get("earned_badges") or ())
+
+    def get_user_badge_progress(self, user_id: str) -> Dict[str, Any]:
+        """
+        Progresso do usuário em todo o catálogo.
+
+        Returns:
+            Totais e progresso por badge, no formato do BadgeEngine
+        """
+        self.rule_engine.ensure_loaded(self.badge_repo)
+        snapshot, earned = self.get_snapshot(user_id)
+        all_badges = list(self.rule_engine.badges.values())
+        earned_count = sum(1 for badge in all_badges if badge.id in earned)
+
+        badge_progress = {
+            badge.id: {
+                "badge": badge,
+                "progress": describe_progress(badge, self.rule_engine.get_rule(badge.id), snapshot, badge.id in earned),
+                "has_badge": badge.id in earned
+            }
+            for badge in all_badges
+        }
+
+        return {
+            "user_id": user_id,
+            "total_badges": len(all_badges),
+            "earned_badges": earned_count,
+            "completion_percentage": (earned_count / len(all_badges) * 100) if all_badges else 0,
+            "badge_progress": badge_progress
+        }
+
+    async def get_user_badge_progress_async(self, user_id: str) -> Dict[str, Any]:
+        """Progresso fora do event loop"""
+        return await asyncio.to_thread(self.get_user_badge_progress, user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.metrics)
+
+
+# Instância global do serviço
+_progress_instance: Optional[BadgeProgressService] = None
+_progress_lock = threading.Lock()
+
+
+def get_badge_progress_service() -> BadgeProgressService:
+    """Retorna instância singleton do BadgeProgressService"""
+    global _progress_instance
+
+    if _progress_instance is None:
+        with _progress_lock:
+            if _progress_instance is None:
+                _progress_instance = BadgeProgressService(get_badge_repository(), get_validation_service())
+
+    return _progress_instance
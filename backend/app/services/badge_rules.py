@@ -0,0 +1,567 @@
+"""
+Motor de regras de badges orientado a dados.
+Os `requirements` de cada badge da coleção `badges` são compilados uma vez em
+predicados (closures), indexados pelos tipos de evento que podem dispará-los
+e pelos campos do usuário de que dependem. Cada evento avalia só as regras
+candidatas, todas contra um único snapshot do usuário em memória.
+"""
+import logging
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.models.events import (
+    BaseEvent, EventType, LearningPathCompletedEvent, LevelUpEvent, MissionCompletedEvent,
+    PointsEarnedEvent, QuizCompletedEvent, StreakUpdatedEvent
+)
+from app.models.reward import Badge
+
+logger = logging.getLogger(__name__)
+
+# Campos do snapshot que não vêm do perfil do usuário
+PATH_PROGRESS_FIELDS = frozenset({"completed_paths", "modules_completed"})
+QUIZ_FIELDS = frozenset({"quiz_scores"})
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Estado do usuário lido uma vez e compartilhado por todas as regras"""
+    user_id: str
+    level: int = 1
+    points: int = 0
+    xp: int = 0
+    current_streak: int = 0
+    missions_completed: int = 0
+    has_completed_questionnaire: bool = False
+    knowledge_profile: Optional[str] = None
+    completed_paths: FrozenSet[str] = frozenset()
+    modules_completed: int = 0
+    quiz_scores: Tuple[float, ...] = ()
+
+    @classmethod
+    def from_profile(cls, user_id: str, profile: Any, **extra) -> "UserSnapshot":
+        """Snapshot a partir do UserProfile (perfil ausente vale o usuário zerado)"""
+        if profile is None:
+            return cls(user_id=user_id, **extra)
+        knowledge_profile = getattr(profile, "knowledge_profile", None) or {}
+        return cls(
+            user_id=user_id,
+            level=profile.level or 1,
+            points=profile.points or 0,
+            xp=profile.xp or 0,
+            current_streak=profile.current_streak or 0,
+            missions_completed=len(profile.completed_missions or {}),
+            has_completed_questionnaire=bool(profile.has_completed_questionnaire),
+            knowledge_profile=knowledge_profile.get("profile_name") if isinstance(knowledge_profile, dict) else None,
+            **extra
+        )
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], **extra) -> "UserSnapshot":
+        """Snapshot a partir de uma linha projetada de `users` (campos ausentes valem o padrão)"""
+        knowledge_profile = row.get("knowledge_profile") or {}
+        return cls(
+            user_id=row["uid"],
+            level=row.get("level") or 1,
+            points=row.get("points") or 0,
+            xp=row.get("xp") or 0,
+            current_streak=row.get("current_streak") or 0,
+            missions_completed=len(row.get("completed_missions") or {}),
+            has_completed_questionnaire=bool(row.get("has_completed_questionnaire")),
+            knowledge_profile=knowledge_profile.get("profile_name") if isinstance(knowledge_profile, dict) else None,
+            **extra
+        )
+
+    @classmethod
+    def from_progress(cls, user_id: str, progress: Dict[str, Any]) -> "UserSnapshot":
+        """Snapshot a partir do documento incremental de `badge_progress`"""
+        return cls(
+            user_id=user_id,
+            level=progress.get("level") or 1,
+            points=progress.get("points") or 0,
+            current_streak=progress.get("current_streak") or 0,
+            missions_completed=len(progress.get("mission_ids") or ()),
+            completed_paths=frozenset(progress.get("completed_paths") or ()),
+            modules_completed=progress.get("modules_completed") or 0
+        )
+
+
+Predicate = Callable[[UserSnapshot, Optional[BaseEvent]], bool]
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    """
+    Requisito compilado de um badge.
+
+    `metric`/`threshold` descrevem regras de marco numérico (nível, pontos,
+    streak...) para quem precisa do limiar sem executar o predicado.
+    """
+    badge_id: str
+    requirement_type: str
+    predicate: Predicate
+    event_types: FrozenSet[EventType] = frozenset()
+    fields: FrozenSet[str] = frozenset()
+    metric: Optional[str] = None
+    threshold: Optional[float] = None
+
+    def matches(self, snapshot: UserSnapshot, event: Optional[BaseEvent] = None) -> bool:
+        try:
+            return bool(self.predicate(snapshot, event))
+        except Exception as e:
+            logger.error(f"Erro ao avaliar regra do badge {self.badge_id}: {e}")
+            return False
+
+
+class ThresholdIndex:
+    """Regras de marco de uma métrica ordenadas pelo limiar"""
+
+    def __init__(self, rules: Iterable[BadgeRule]):
+        ordered = sorted(rules, key=lambda rule: rule.threshold)
+        self.thresholds = [rule.threshold for rule in ordered]
+        self.rules = tuple(ordered)
+
+    def crossed(self, old: float, new: float) -> Tuple[BadgeRule, ...]:
+        """Regras com old < limiar <= new (bisect nas duas pontas)"""
+        if new <= old:
+            return ()
+        return self.rules[bisect_right(self.thresholds, old):bisect_right(self.thresholds, new)]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+RuleCompiler = Callable[[str, Dict[str, Any]], Optional[BadgeRule]]
+_COMPILERS: Dict[str, RuleCompiler] = {}
+
+
+def rule_compiler(*requirement_types: str):
+    """Registra o compilador de um ou mais tipos de requirement"""
+    def register(compiler: RuleCompiler) -> RuleCompiler:
+        for requirement_type in requirement_types:
+            _COMPILERS[requirement_type] = compiler
+        return compiler
+    return register
+
+
+def _threshold(requirements: Dict[str, Any], *keys: str, default: float = 1) -> float:
+    """Limiar do requirement (os scripts de badges usam value, count ou score)"""
+    for key in keys:
+        if requirements.get(key) is not None:
+            return requirements[key]
+    return default
+
+
+def _metric_rule(
+    badge_id: str,
+    requirement_type: str,
+    metric: str,
+    threshold: float,
+    event_types: Iterable[EventType]
+) -> BadgeRule:
+    """Regra de marco: valor atual da métrica >= limiar"""
+    value_of = METRIC_VALUES[metric]
+    return BadgeRule(
+        badge_id=badge_id,
+        requirement_type=requirement_type,
+        predicate=lambda snapshot, event: value_of(snapshot, event) >= threshold,
+        event_types=frozenset(event_types),
+        fields=frozenset({metric}),
+        metric=metric,
+        threshold=threshold
+    )
+
+
+# Valor de cada métrica: o evento pode trazer um total mais novo que o perfil lido
+
+def level_value(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> int:
+    if isinstance(event, LevelUpEvent):
+        return max(snapshot.level, event.new_level)
+    return snapshot.level
+
+
+def points_value(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> int:
+    if isinstance(event, (PointsEarnedEvent, MissionCompletedEvent)) and event.total_points is not None:
+        return max(snapshot.points, event.total_points)
+    return snapshot.points
+
+
+def streak_value(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> int:
+    if isinstance(event, StreakUpdatedEvent):
+        return max(snapshot.current_streak, event.current_streak)
+    return snapshot.current_streak
+
+
+def missions_value(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> int:
+    # A missão do evento já conta, mesmo se o perfil foi lido antes da gravação
+    return max(snapshot.missions_completed, 1 if isinstance(event, MissionCompletedEvent) else 0)
+
+
+def paths_value(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> int:
+    if isinstance(event, LearningPathCompletedEvent):
+        return len(snapshot.completed_paths | {event.learning_path_id})
+    return len(snapshot.completed_paths)
+
+
+def modules_value(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> int:
+    return snapshot.modules_completed
+
+
+# Métrica (campo do snapshot) -> valor atual
+METRIC_VALUES: Dict[str, Callable[[UserSnapshot, Optional[BaseEvent]], int]] = {
+    "level": level_value,
+    "points": points_value,
+    "current_streak": streak_value,
+    "missions_completed": missions_value,
+    "completed_paths": paths_value,
+    "modules_completed": modules_value
+}
+
+
+def metric_transitions(event: Optional[BaseEvent]) -> Dict[str, Tuple[float, float]]:
+    """Valor anterior e novo das métricas que o evento move, quando ele traz os dois"""
+    if isinstance(event, LevelUpEvent):
+        return {"level": (event.old_level, event.new_level)}
+    if isinstance(event, StreakUpdatedEvent):
+        return {"current_streak": (event.previous_streak, event.current_streak)}
+    if isinstance(event, (PointsEarnedEvent, MissionCompletedEvent)) and event.total_points is not None:
+        return {"points": (event.total_points - (event.points_earned or 0), event.total_points)}
+    return {}
+
+
+@rule_compiler("level")
+def _compile_level(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return _metric_rule(badge_id, "level", "level", _threshold(requirements, "value"),
+                        {EventType.LEVEL_UP})
+
+
+@rule_compiler("points")
+def _compile_points(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return _metric_rule(badge_id, "points", "points", _threshold(requirements, "value"),
+                        {EventType.POINTS_EARNED, EventType.MISSION_COMPLETED})
+
+
+@rule_compiler("streak")
+def _compile_streak(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return _metric_rule(badge_id, "streak", "current_streak", _threshold(requirements, "value"),
+                        {EventType.MISSION_COMPLETED, EventType.STREAK_UPDATED})
+
+
+@rule_compiler("first_completion")
+def _compile_first_completion(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return _metric_rule(badge_id, "first_completion", "missions_completed", _threshold(requirements, "value"),
+                        {EventType.MISSION_COMPLETED})
+
+
+@rule_compiler("path_complete", "paths_completed", "learning_paths_completed")
+def _compile_paths_completed(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return _metric_rule(badge_id, requirements["type"], "completed_paths", _threshold(requirements, "value", "count"),
+                        {EventType.LEARNING_PATH_COMPLETED})
+
+
+@rule_compiler("modules_completed")
+def _compile_modules_completed(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return _metric_rule(badge_id, "modules_completed", "modules_completed", _threshold(requirements, "value", "count"),
+                        {EventType.MODULE_COMPLETED})
+
+
+@rule_compiler("learning_path_completed")
+def _compile_learning_path_completed(badge_id: str, requirements: Dict[str, Any]) -> Optional[BadgeRule]:
+    path_id = requirements.get("learning_path_id")
+    if not path_id:
+        return None
+
+    def predicate(snapshot: UserSnapshot, event: Optional[BaseEvent]) -> bool:
+        if isinstance(event, LearningPathCompletedEvent) and event.learning_path_id == path_id:
+            return True
+        return path_id in snapshot.completed_paths
+
+    return BadgeRule(badge_id, "learning_path_completed", predicate,
+                     frozenset({EventType.LEARNING_PATH_COMPLETED}), frozenset({"completed_paths"}))
+
+
+@rule_compiler("perfect_score")
+def _compile_perfect_score(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    minimum = _threshold(requirements, "value", "score", default=100)
+    return BadgeRule(
+        badge_id, "perfect_score",
+        lambda snapshot, event: isinstance(event, MissionCompletedEvent) and event.score >= minimum,
+        frozenset({EventType.MISSION_COMPLETED})
+    )
+
+
+@rule_compiler("perfect_quiz_score")
+def _compile_perfect_quiz_score(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    minimum = _threshold(requirements, "score", "value", default=100)
+    return BadgeRule(
+        badge_id, "perfect_quiz_score",
+        lambda snapshot, event: isinstance(event, QuizCompletedEvent) and event.score >= minimum,
+        frozenset({EventType.QUIZ_COMPLETED})
+    )
+
+
+@rule_compiler("excellent_quiz_scores")
+def _compile_excellent_quiz_scores(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    count = _threshold(requirements, "count", "value")
+    min_score = requirements.get("min_score", 90)
+    return BadgeRule(
+        badge_id, "excellent_quiz_scores",
+        lambda snapshot, event: sum(1 for score in snapshot.quiz_scores if score >= min_score) >= count,
+        frozenset({EventType.QUIZ_COMPLETED}), QUIZ_FIELDS
+    )
+
+
+@rule_compiler("level_up")
+def _compile_level_up(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    return BadgeRule(
+        badge_id, "level_up",
+        lambda snapshot, event: isinstance(event, LevelUpEvent) and event.new_level > event.old_level,
+        frozenset({EventType.LEVEL_UP})
+    )
+
+
+@rule_compiler("questionnaire_completed")
+def _compile_questionnaire_completed(badge_id: str, requirements: Dict[str, Any]) -> BadgeRule:
+    # Sem evento próprio: só entra em verificações completas (force_check)
+    profile_name = requirements.get("profile")
+    return BadgeRule(
+        badge_id, "questionnaire_completed",
+        lambda snapshot, event: snapshot.has_completed_questionnaire and (
+            profile_name is None or snapshot.knowledge_profile == profile_name
+        ),
+        frozenset(), frozenset({"has_completed_questionnaire", "knowledge_profile"})
+    )
+
+
+def compile_badge_rule(badge: Badge) -> Optional[BadgeRule]:
+    """Compila os requirements de um badge (None se ausentes ou de tipo desconhecido)"""
+    requirements = badge.requirements or {}
+    compiler = _COMPILERS.get(requirements.get("type"))
+    if not badge.id or compiler is None:
+        return None
+    return compiler(badge.id, requirements)
+
+
+def describe_progress(badge: Badge, rule: Optional[BadgeRule], snapshot: UserSnapshot, has_badge: bool) -> Dict[str, Any]:
+    """Progresso de um badge a partir do snapshot (mensurável só em regras de marco numérico)"""
+    progress = 0
+    completed = has_badge
+    if rule and rule.metric and rule.threshold:
+        value = METRIC_VALUES[rule.metric](snapshot, None)
+        progress = min(value / rule.threshold * 100, 100)
+        completed = has_badge or rule.matches(snapshot)
+
+    return {
+        "progress": progress,
+        "completed": completed,
+        "requirements": badge.requirements or {},
+        "badge_info": {
+            "id": badge.id,
+            "name": badge.name,
+            "description": badge.description
+        }
+    }
+
+
+class BadgeRuleEngine:
+    """
+    Regras compiladas do catálogo de badges, indexadas por tipo de evento.
+
+    O catálogo vem do BadgeCatalog versionado do repositório e é recompilado
+    quando a versão muda; `compile` troca o conjunto inteiro de regras de uma
+    vez (leitores nunca veem um índice pela metade). Um motor compilado
+    diretamente com `compile` mantém esse catálogo fixo.
+    """
+
+    def __init__(self):
+        self._badges: Dict[str, Badge] = {}
+        self._rules: Dict[str, BadgeRule] = {}
+        self._rules_by_event: Dict[EventType, Tuple[BadgeRule, ...]] = {}
+        self._thresholds: Dict[str, ThresholdIndex] = {}
+        self._catalog = None
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.skipped: List[str] = []
+
+    def compile(self, badges: Iterable[Badge], catalog=None) -> int:
+        """Compila o catálogo (`catalog`: BadgeCatalog de origem, se houver); retorna o número de regras"""
+        badges_by_id: Dict[str, Badge] = {}
+        rules: Dict[str, BadgeRule] = {}
+        skipped: List[str] = []
+        for badge in badges:
+            if badge.id:
+                badges_by_id[badge.id] = badge
+            rule = compile_badge_rule(badge)
+            if rule is None:
+                skipped.append(badge.id or "?")
+                continue
+            rules[rule.badge_id] = rule
+
+        by_event: Dict[EventType, List[BadgeRule]] = {}
+        by_metric: Dict[str, List[BadgeRule]] = {}
+        for rule in rules.values():
+            for event_type in rule.event_types:
+                by_event.setdefault(event_type, []).append(rule)
+            if rule.metric and rule.threshold is not None:
+                by_metric.setdefault(rule.metric, []).append(rule)
+
+        self._badges = badges_by_id
+        self._rules = rules
+        self._rules_by_event = {event_type: tuple(group) for event_type, group in by_event.items()}
+        self._thresholds = {metric: ThresholdIndex(group) for metric, group in by_metric.items()}
+        self.skipped = skipped
+        self._catalog = catalog
+        self.loaded = True
+
+        if skipped:
+            logger.warning(f"⚠️ Badges sem regra compilável: {skipped}")
+        logger.info(f"🏅 {len(rules)} regras de badges compiladas ({len(self._rules_by_event)} tipos de evento)")
+        return len(rules)
+
+    def load(self, badge_repo) -> int:
+        """Compila as regras do catálogo atual do repositório"""
+        catalog = badge_repo.get_catalog()
+        return self.compile(catalog.all(), catalog)
+
+    def _is_current(self, badge_repo) -> bool:
+        if not self.loaded:
+            return False
+        # Catálogo fixado via compile() não acompanha o repositório
+        return self._catalog is None or badge_repo.get_catalog() is self._catalog
+
+    def ensure_loaded(self, badge_repo):
+        """Compila o catálogo na primeira utilização e a cada nova versão"""
+        if self._is_current(badge_repo):
+            return
+        with self._lock:
+            if not self._is_current(badge_repo):
+                self.load(badge_repo)
+
+    @property
+    def rules(self) -> Dict[str, BadgeRule]:
+        return self._rules
+
+    @property
+    def badges(self) -> Dict[str, Badge]:
+        return self._badges
+
+    def get_badge(self, badge_id: str) -> Optional[Badge]:
+        return self._badges.get(badge_id)
+
+    def get_rule(self, badge_id: str) -> Optional[BadgeRule]:
+        return self._rules.get(badge_id)
+
+    def rules_for_event(self, event_type: EventType) -> Tuple[BadgeRule, ...]:
+        """Regras que o tipo de evento pode disparar"""
+        return self._rules_by_event.get(event_type, ())
+
+    def candidate_rules(self, event: BaseEvent) -> List[BadgeRule]:
+        """
+        Regras que o evento pode satisfazer.
+
+        Para as métricas cuja transição o evento traz (nível, pontos, streak),
+        só entram os marcos cruzados entre o valor anterior e o novo, achados
+        por bisect no índice de limiares; as demais regras do tipo de evento
+        entram todas.
+        """
+        transitions = metric_transitions(event)
+        if not transitions:
+            return list(self.rules_for_event(event.event_type))
+
+        rules = [rule for rule in self.rules_for_event(event.event_type) if rule.metric not in transitions]
+        for metric, (old, new) in transitions.items():
+            index = self._thresholds.get(metric)
+            if index is not None:
+                rules.extend(rule for rule in index.crossed(old, new) if event.event_type in rule.event_types)
+        return rules
+
+    def rules_for_events(self, event_types: Iterable[EventType]) -> Tuple[BadgeRule, ...]:
+        """Regras candidatas de um lote de eventos (sem repetição)"""
+        rules: Dict[str, BadgeRule] = {}
+        for event_type in event_types:
+            for rule in self.rules_for_event(event_type):
+                rules[rule.badge_id] = rule
+        return tuple(rules.values())
+
+    @staticmethod
+    def fields_for(rules: Iterable[BadgeRule]) -> FrozenSet[str]:
+        """Campos do snapshot exigidos por um conjunto de regras"""
+        return frozenset().union(*(rule.fields for rule in rules))
+
+    @staticmethod
+    def evaluate(
+        rules: Iterable[BadgeRule],
+        snapshot: UserSnapshot,
+        event: Optional[BaseEvent] = None
+    ) -> List[str]:
+        """IDs dos badges cujas regras são satisfeitas"""
+        return [rule.badge_id for rule in rules if rule.matches(snapshot, event)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "catalog_version": self._catalog.version if self._catalog else None,
+            "rules": len(self._rules),
+            "skipped_badges": list(self.skipped),
+            "rules_by_event": {event_type.value: len(group) for event_type, group in self._rules_by_event.items()},
+            "thresholds_by_metric": {metric: len(index) for metric, index in self._thresholds.items()}
+        }
+
+
+@dataclass
+class BadgeEvaluationContext:
+    """
+    Tudo o que a avaliação de badges de um usuário lê, montado uma vez por
+    evento (ou lote de eventos): perfil, snapshot com o progresso de trilhas,
+    badges já conquistados e o catálogo compilado. As verificações leem só
+    daqui, sem voltar ao Firestore por badge.
+    """
+    snapshot: UserSnapshot
+    earned_badges: Set[str]
+    engine: BadgeRuleEngine
+    profile: Any = None
+
+    @property
+    def user_id(self) -> str:
+        return self.snapshot.user_id
+
+    def has_badge(self, badge_id: str) -> bool:
+        return badge_id in self.earned_badges
+
+    def mark_earned(self, badge_id: str):
+        """Badge concedido durante a avaliação (eventos seguintes do lote o ignoram)"""
+        self.earned_badges.add(badge_id)
+
+    def get_badge(self, badge_id: str) -> Optional[Badge]:
+        return self.engine.get_badge(badge_id)
+
+    def eligible_badges(self, event: BaseEvent) -> List[str]:
+        """Badges ainda não conquistados que o evento satisfaz (marcos: só os recém-cruzados)"""
+        candidates = [
+            rule for rule in self.engine.candidate_rules(event)
+            if rule.badge_id not in self.earned_badges
+        ]
+        return self.engine.evaluate(candidates, self.snapshot, event)
+
+    def is_eligible(self, badge_id: str, event: Optional[BaseEvent] = None) -> bool:
+        """Badge não conquistado e com a regra satisfeita"""
+        rule = self.engine.get_rule(badge_id)
+        return rule is not None and not self.has_badge(badge_id) and rule.matches(self.snapshot, event)
+
+
+# Instância global do motor de regras
+_rule_engine_instance: Optional[BadgeRuleEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_badge_rule_engine() -> BadgeRuleEngine:
+    """Retorna instância singleton do BadgeRuleEngine"""
+    global _rule_engine_instance
+
+    if _rule_engine_instance is None:
+        with _engine_lock:
+            if _rule_engine_instance is None:
+                _rule_engine_instance = BadgeRuleEngine()
+
+    return _rule_engine_instance
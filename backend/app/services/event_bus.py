@@ -5,7 +5,7 @@ Permite desacoplamento entre componentes através de eventos.
 
 import asyncio
 import logging
-from typing import Dict, List, Callable, Any
+from typing import Dict, List, Callable, Any, Set
 from collections import defaultdict
 from app.models.events import BaseEvent, EventType
 
@@ -27,6 +27,7 @@ class EventBus:
         self._handlers: Dict[EventType, List[Callable]] = defaultdict(list)
         self._event_log: List[BaseEvent] = []
         self._max_log_size = 1000  # Limite de eventos no log
+        self._pending_emits: Set[asyncio.Task] = set()
         
     async def emit(self, event: BaseEvent) -> None:
         """
@@ -66,6 +67,22 @@ class EventBus:
             logger.error(f"Erro ao emitir evento {event.event_type}: {e}")
             raise
     
+    def emit_nowait(self, event: BaseEvent) -> asyncio.Task:
+        """
+        Emite um evento sem aguardar os handlers (fire-and-forget).
+        
+        Usado em caminhos de escrita sensíveis a latência: a requisição não
+        espera handlers lentos (ex: verificação de badges).
+        
+        Args:
+            event: Evento a ser emitido
+        """
+        task = asyncio.create_task(self.emit(event))
+        # Manter referência até terminar para a tarefa não ser coletada
+        self._pending_emits.add(task)
+        task.add_done_callback(self._pending_emits.discard)
+        return task
+    
     async def subscribe(self, event_type: EventType, handler: Callable[[BaseEvent], None]) -> None:
         """
         Registra um handler para um tipo específico de evento.
@@ -0,0 +1,413 @@
+"""
+Estruturas de dados para leaderboards em memória.
+Índice ordenado por score com consultas de rank, top-K e páginas em O(log n)
+e buckets diários de score para rankings por janela de tempo.
+"""
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, UTC
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.models.user import earned_badge_ids
+
+
+class _SkipNode:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key: Any, level: int):
+        self.key = key
+        self.next: List[Optional["_SkipNode"]] = [None] * level
+        # Distância (em posições do nível 0) até o próximo nó em cada nível
+        self.width: List[int] = [1] * level
+
+
+class IndexableSkipList:
+    """
+    Skip list indexável: mantém chaves ordenadas e permite buscar a posição
+    de uma chave ou a chave de uma posição em O(log n) esperado.
+
+    Cada link guarda quantos elementos ele pula (`width`), então a posição
+    de um nó é a soma das larguras percorridas até ele.
+    """
+
+    MAX_LEVEL = 24
+    P = 0.25
+
+    def __init__(self):
+        self._head = _SkipNode(None, self.MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def _find_predecessors(self, key: Any) -> Tuple[List[_SkipNode], List[int]]:
+        """Último nó com chave < key em cada nível e sua posição"""
+        update: List[_SkipNode] = [self._head] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node = self._head
+        position = 0
+
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            positions[level] = position
+
+        return update, positions
+
+    @classmethod
+    def from_sorted(cls, keys: List[Any]) -> "IndexableSkipList":
+        """
+        Constrói a skip list a partir de chaves já ordenadas e únicas em O(n),
+        sem as buscas de cada inserção.
+        """
+        skiplist = cls()
+        last_nodes = [skiplist._head] * cls.MAX_LEVEL
+        last_positions = [0] * cls.MAX_LEVEL
+
+        for position, key in enumerate(keys, start=1):
+            level = skiplist._random_level()
+            node = _SkipNode(key, level)
+            for lvl in range(level):
+                last_nodes[lvl].next[lvl] = node
+                last_nodes[lvl].width[lvl] = position - last_positions[lvl]
+                last_nodes[lvl] = node
+                last_positions[lvl] = position
+
+        size = len(keys)
+        # Último nó de cada nível aponta para o "fim" (largura até size + 1)
+        for lvl in range(cls.MAX_LEVEL):
+            last_nodes[lvl].width[lvl] = size + 1 - last_positions[lvl]
+        skiplist._size = size
+        return skiplist
+
+    def insert(self, key: Any):
+        """Insere a chave (chaves devem ser únicas)"""
+        update, positions = self._find_predecessors(key)
+        position = positions[0]
+        new_level = self._random_level()
+        new_node = _SkipNode(key, new_level)
+
+        for level in range(self.MAX_LEVEL):
+            prev = update[level]
+            if level < new_level:
+                new_node.next[level] = prev.next[level]
+                prev.next[level] = new_node
+                new_node.width[level] = prev.width[level] - (position - positions[level])
+                prev.width[level] = position - positions[level] + 1
+            else:
+                prev.width[level] += 1
+
+        self._size += 1
+
+    def remove(self, key: Any) -> bool:
+        """Remove a chave. Retorna False se ela não existe."""
+        update, _ = self._find_predecessors(key)
+        target = update[0].next[0]
+        if target is None or target.key != key:
+            return False
+
+        for level in range(self.MAX_LEVEL):
+            prev = update[level]
+            if prev.next[level] is target:
+                prev.width[level] += target.width[level] - 1
+                prev.next[level] = target.next[level]
+            else:
+                prev.width[level] -= 1
+
+        self._size -= 1
+        return True
+
+    def count_less(self, key: Any) -> int:
+        """Quantidade de chaves estritamente menores que key"""
+        _, positions = self._find_predecessors(key)
+        return positions[0]
+
+    def iter_from(self, index: int) -> Iterator[Any]:
+        """Itera as chaves a partir da posição `index` (0-based)"""
+        if index < 0 or index >= self._size:
+            return
+
+        node = self._head
+        position = 0
+        target = index + 1
+
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= target:
+                position += node.width[level]
+                node = node.next[level]
+
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.iter_from(0)
+
+
+@dataclass
+class LeaderboardMember:
+    """Dados de um usuário necessários para montar uma entrada de ranking"""
+    user_id: str
+    name: str = ""
+    email: str = ""
+    points: int = 0
+    xp: int = 0
+    level: int = 1
+    badges: List[str] = field(default_factory=list)
+    last_activity: datetime = field(default_factory=lambda: datetime.now(UTC))
+    # Bônus de streak/diversidade/qualidade, calculado na carga completa
+    bonus: int = 0
+
+    @property
+    def score(self) -> int:
+        """Score de ranking: pontos + XP + bônus"""
+        return self.points + self.xp + self.bonus
+
+    @classmethod
+    def from_profile(cls, profile: Any, bonus: int = 0) -> "LeaderboardMember":
+        """Cria a partir de um UserProfile"""
+        return cls(
+            user_id=profile.uid,
+            name=profile.name or "",
+            email=profile.email or "",
+            points=profile.points or 0,
+            xp=profile.xp or 0,
+            level=profile.level or 1,
+            badges=earned_badge_ids(getattr(profile, "badge_summary", None), profile.badges),
+            last_activity=profile.register_date,
+            bonus=bonus
+        )
+
+
+class LeaderboardIndex:
+    """
+    Leaderboard ordenado por score (decrescente), desempate por user_id.
+
+    Todas as operações são O(log n) esperado, exceto páginas, que custam
+    O(log n + k). Thread-safe: é atualizado pelo event loop e por threads
+    do pool de tarefas em background.
+    """
+
+    def __init__(self, name: str = "global"):
+        self.name = name
+        self._skiplist = IndexableSkipList()
+        self._members: Dict[str, LeaderboardMember] = {}
+        self._scores: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._members
+
+    @staticmethod
+    def _key(score: int, user_id: str) -> Tuple[int, str]:
+        return (-score, user_id)
+
+    def upsert(self, member: LeaderboardMember, score: Optional[int] = None):
+        """Insere ou atualiza um usuário (score padrão: member.score)"""
+        new_score = member.score if score is None else score
+
+        with self._lock:
+            old_score = self._scores.get(member.user_id)
+            if old_score is not None and old_score != new_score:
+                self._skiplist.remove(self._key(old_score, member.user_id))
+            if old_score is None or old_score != new_score:
+                self._skiplist.insert(self._key(new_score, member.user_id))
+
+            self._members[member.user_id] = member
+            self._scores[member.user_id] = new_score
+
+    def remove(self, user_id: str) -> bool:
+        """Remove um usuário do leaderboard"""
+        with self._lock:
+            score = self._scores.pop(user_id, None)
+            if score is None:
+                return False
+            self._members.pop(user_id, None)
+            return self._skiplist.remove(self._key(score, user_id))
+
+    def get(self, user_id: str) -> Optional[LeaderboardMember]:
+        """Dados do usuário no leaderboard"""
+        return self._members.get(user_id)
+
+    def get_score(self, user_id: str) -> Optional[int]:
+        """Score atual do usuário"""
+        return self._scores.get(user_id)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """Posição 1-based do usuário, ou None se não está no leaderboard"""
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            return self._skiplist.count_less(self._key(score, user_id)) + 1
+
+    def rank_for_score(self, score: int, user_id: str) -> int:
+        """Posição que um usuário com esse score ocuparia (para quem ainda não está no índice)"""
+        with self._lock:
+            return self._skiplist.count_less(self._key(score, user_id)) + 1
+
+    def page(self, offset: int = 0, limit: int = 100) -> List[Tuple[int, LeaderboardMember, int]]:
+        """
+        Página do leaderboard.
+
+        Returns:
+            Lista de (rank, membro, score)
+        """
+        with self._lock:
+            entries = []
+            for rank, (neg_score, user_id) in enumerate(self._skiplist.iter_from(offset), start=offset + 1):
+                if len(entries) >= limit:
+                    break
+                entries.append((rank, self._members[user_id], -neg_score))
+            return entries
+
+    def page_after(self, score: int, user_id: str, limit: int = 100) -> List[Tuple[int, LeaderboardMember, int]]:
+        """
+        Página que começa logo depois da chave (score, user_id) (paginação por cursor).
+
+        Estável sob atualizações concorrentes: continua da posição da chave na
+        ordenação, mesmo que o usuário do cursor tenha mudado de score.
+        """
+        with self._lock:
+            key = self._key(score, user_id)
+            start = self._skiplist.count_less(key)
+            if self._scores.get(user_id) == score:
+                start += 1
+            return self.page(start, limit)
+
+    def top(self, k: int) -> List[Tuple[int, LeaderboardMember, int]]:
+        """Os k primeiros colocados"""
+        return self.page(0, k)
+
+    def replace_all(self, members: List[LeaderboardMember], presorted: bool = False):
+        """
+        Reconstrói o índice inteiro e troca de uma vez (leitores não veem estado parcial).
+
+        Com `presorted=True` os membros já vêm na ordem do ranking (score
+        decrescente, empate por user_id, sem repetição) e a construção é O(n).
+        """
+        members_by_id = {}
+        scores = {}
+
+        if presorted:
+            for member in members:
+                members_by_id[member.user_id] = member
+                scores[member.user_id] = member.score
+            skiplist = IndexableSkipList.from_sorted([
+                self._key(member.score, member.user_id) for member in members
+            ])
+        else:
+            skiplist = IndexableSkipList()
+            for member in members:
+                if member.user_id in scores:
+                    skiplist.remove(self._key(scores[member.user_id], member.user_id))
+                members_by_id[member.user_id] = member
+                scores[member.user_id] = member.score
+                skiplist.insert(self._key(member.score, member.user_id))
+
+        with self._lock:
+            self._skiplist = skiplist
+            self._members = members_by_id
+            self._scores = scores
+
+
+class DailyScoreBuckets:
+    """
+    Pontos e XP ganhos por usuário em cada dia (UTC), com retenção limitada.
+
+    O score de uma janela (semana, mês) é a soma de no máximo `days` buckets
+    do usuário, e só usuários com atividade dentro da retenção ficam em memória.
+    """
+
+    def __init__(self, retention_days: int = 31):
+        self.retention_days = retention_days
+        self._buckets: Dict[str, Dict[date, List[int]]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def add(self, user_id: str, day: date, points: int, xp: int):
+        """Soma uma recompensa ao bucket do dia"""
+        with self._lock:
+            bucket = self._buckets.setdefault(user_id, {}).setdefault(day, [0, 0])
+            bucket[0] += points
+            bucket[1] += xp
+
+    def merge_max(self, user_id: str, day: date, points: int, xp: int):
+        """
+        Combina um total do dia vindo de outra fonte (ledger de recompensas).
+
+        Mantém o maior valor de cada campo: as duas fontes são parciais, e o
+        máximo nunca conta a mesma recompensa duas vezes.
+        """
+        with self._lock:
+            bucket = self._buckets.setdefault(user_id, {}).setdefault(day, [0, 0])
+            bucket[0] = max(bucket[0], points)
+            bucket[1] = max(bucket[1], xp)
+
+    def window_totals(self, user_id: str, end_day: date, days: int) -> Tuple[int, int]:
+        """(pontos, xp) do usuário nos `days` dias terminados em end_day"""
+        with self._lock:
+            user_buckets = self._buckets.get(user_id)
+            if not user_buckets:
+                return 0, 0
+            return self._sum_window(user_buckets, end_day, days)
+
+    def active_users(self, end_day: date, days: int) -> Dict[str, Tuple[int, int]]:
+        """Totais de todos os usuários com atividade na janela"""
+        with self._lock:
+            totals = {}
+            for user_id, user_buckets in self._buckets.items():
+                points, xp = self._sum_window(user_buckets, end_day, days)
+                if points or xp:
+                    totals[user_id] = (points, xp)
+            return totals
+
+    def prune(self, today: date) -> int:
+        """
+        Descarta buckets fora da retenção.
+
+        Returns:
+            Quantidade de usuários que saíram da memória
+        """
+        cutoff = today - timedelta(days=self.retention_days - 1)
+        with self._lock:
+            removed = 0
+            for user_id in list(self._buckets):
+                user_buckets = self._buckets[user_id]
+                for day in [day for day in user_buckets if day < cutoff]:
+                    del user_buckets[day]
+                if not user_buckets:
+                    del self._buckets[user_id]
+                    removed += 1
+            return removed
+
+    @staticmethod
+    def _sum_window(user_buckets: Dict[date, List[int]], end_day: date, days: int) -> Tuple[int, int]:
+        points = xp = 0
+        if len(user_buckets) <= days:
+            start_day = end_day - timedelta(days=days - 1)
+            for day, (day_points, day_xp) in user_buckets.items():
+                if start_day <= day <= end_day:
+                    points += day_points
+                    xp += day_xp
+        else:
+            for offset in range(days):
+                bucket = user_buckets.get(end_day - timedelta(days=offset))
+                if bucket:
+                    points += bucket[0]
+                    xp += bucket[1]
+        return points, xp
@@ -0,0 +1,614 @@
+"""
+Serviço de leaderboards em memória.
+Mantém o índice ordenado do ranking global, carregado uma vez do Firestore
+e atualizado incrementalmente pelos eventos de recompensa do EventBus, e os
+rankings semanal/mensal calculados a partir de buckets diários de score.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+from collections import defaultdict
+from dataclasses import replace
+from datetime import date, datetime, timedelta, UTC
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models.events import BaseEvent, EventType
+from app.models.ranking import RankingEntry
+from app.models.user import earned_badge_ids
+from app.services.advanced_cache_service import get_advanced_cache
+from app.services.event_bus import get_event_bus
+from app.services.leaderboard_index import DailyScoreBuckets, LeaderboardIndex, LeaderboardMember
+from app.services.ranking_scoring import compute_bonuses, extract_score_columns, rank_order, ranking_bonus
+
+logger = logging.getLogger(__name__)
+
+# Tamanho das janelas de rank usadas como tags no cache de páginas do ranking
+RANKING_CACHE_WINDOW = int(os.getenv("RANKING_CACHE_WINDOW", "100"))
+
+# Rankings por janela de tempo: nome -> quantidade de dias (terminando hoje, UTC)
+WINDOW_DAYS = {"weekly": 7, "monthly": 31}
+
+
+def ranking_window_tags(first_rank: int, last_rank: int) -> List[str]:
+    """Tags das janelas de rank cobertas pelo intervalo [first_rank, last_rank]"""
+    first_window = (max(first_rank, 1) - 1) // RANKING_CACHE_WINDOW
+    last_window = (max(last_rank, 1) - 1) // RANKING_CACHE_WINDOW
+    return [f"global_window:{window}" for window in range(first_window, last_window + 1)]
+
+
+def ranking_entries(
+    index: LeaderboardIndex,
+    offset: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple[int, str]] = None
+) -> List[RankingEntry]:
+    """
+    Entradas de ranking das posições offset+1 até offset+limit de um índice,
+    ou das `limit` posições seguintes à chave `after` = (score, user_id).
+    """
+    rows = index.page_after(after[0], after[1], limit) if after else index.page(offset, limit)
+    return [
+        RankingEntry(
+            user_id=member.user_id,
+            name=member.name,
+            email=member.email,
+            points=member.points,
+            xp=member.xp,
+            level=member.level,
+            rank=rank,
+            score=score,
+            badges=member.badges,
+            last_activity=member.last_activity
+        )
+        for rank, member, score in rows
+    ]
+
+
+class LeaderboardService:
+    """
+    Dono dos índices de leaderboard do processo.
+
+    Cada worker do gunicorn tem seu próprio índice: atualizações feitas em
+    outro processo chegam no próximo refresh completo (`refresh_seconds`).
+
+    Custo do refresh: cada worker lê a coleção `users` inteira (projetada),
+    todos os documentos de `user_path_progress` e o ledger `user_rewards` dos
+    últimos 31 dias. São N varreduras completas por intervalo, com N workers
+    por instância; por isso o padrão é 30 minutos, com jitter para os
+    workers não lerem ao mesmo tempo.
+    """
+
+    def __init__(self, refresh_seconds: float = 1800.0, refresh_jitter: float = 0.1):
+        self.global_index = LeaderboardIndex("global")
+        # Partição por nível: cada usuário está no índice do seu nível atual
+        self.level_indexes: Dict[int, LeaderboardIndex] = {}
+        # Janelas móveis: só usuários com pontos dentro da janela
+        self.score_buckets = DailyScoreBuckets(retention_days=max(WINDOW_DAYS.values()))
+        self.window_indexes: Dict[str, LeaderboardIndex] = {
+            window: LeaderboardIndex(window) for window in WINDOW_DAYS
+        }
+        self._window_day: Optional[date] = None
+        # Partição por trilha: score = pontuação acumulada na trilha
+        self.path_indexes: Dict[str, LeaderboardIndex] = {}
+        self._lock = threading.RLock()
+        self.refresh_seconds = refresh_seconds
+        self.refresh_jitter = refresh_jitter  # Fração do intervalo sorteada por ciclo
+        self.loaded = False
+        self.last_loaded_at: Optional[datetime] = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._user_repo_factory: Optional[Callable[[], Any]] = None
+        self._reward_repo_factory: Optional[Callable[[], Any]] = None
+        self._path_repo_factory: Optional[Callable[[], Any]] = None
+        self._handlers_registered = False
+        self.metrics = {
+            "full_loads": 0,
+            "incremental_updates": 0,
+            "events_applied": 0,
+            "cache_windows_invalidated": 0,
+            "window_rebuilds": 0
+        }
+
+        logger.info("🏆 LeaderboardService inicializado")
+
+    async def load(self, user_repo, reward_repo=None, path_repo=None) -> int:
+        """
+        Carrega (ou recarrega) o índice global a partir dos perfis de usuário.
+
+        Com `reward_repo`, os buckets diários também são aquecidos com o
+        ledger de recompensas da retenção (31 dias). Com `path_repo`, os
+        rankings por trilha são reconstruídos a partir dos progressos.
+
+        Returns:
+            Quantidade de usuários indexados
+        """
+        async with self._load_lock:
+            # Leitura e montagem do índice rodam fora do event loop
+            count = await asyncio.to_thread(self._load_sync, user_repo, reward_repo, path_repo)
+            self.loaded = True
+            self.last_loaded_at = datetime.now(UTC)
+            self.metrics["full_loads"] += 1
+
+        logger.info(f"🏆 Leaderboard global carregado com {count} usuários")
+        return count
+
+    def _load_sync(self, user_repo, reward_repo=None, path_repo=None) -> int:
+        # Todas as leituras antes de qualquer troca: se uma falhar, os índices
+        # atuais continuam valendo até o próximo refresh
+        # Um documento por usuário: a última linha de um uid repetido vence
+        rows = list({row["uid"]: row for row in user_repo.get_users_ranking_fields()}.values())
+        path_rows = path_repo.get_path_scores() if path_repo is not None else None
+        ledger_rows = self._read_ledger(reward_repo) if reward_repo is not None else None
+
+        # Score e ordem de todos os usuários calculados em bloco (NumPy)
+        columns = extract_score_columns(rows)
+        bonuses = compute_bonuses(columns)
+        order = rank_order(columns.points + columns.xp + bonuses, columns.user_ids)
+
+        now = datetime.now(UTC)
+        members = []
+        for position in order.tolist():
+            row = rows[position]
+            members.append(LeaderboardMember(
+                user_id=row["uid"],
+                name=row.get("name") or "",
+                email=row.get("email") or "",
+                points=row.get("points") or 0,
+                xp=row.get("xp") or 0,
+                level=row.get("level") or 1,
+                badges=earned_badge_ids(row.get("badge_summary"), row.get("badges")),
+                last_activity=row.get("register_date") or now,
+                bonus=int(bonuses[position])
+            ))
+
+        # Partições por nível herdam a ordem global: construção em O(n)
+        by_level: Dict[int, List[LeaderboardMember]] = defaultdict(list)
+        for member in members:
+            by_level[member.level].append(member)
+
+        level_indexes = {}
+        for level, level_members in by_level.items():
+            level_indexes[level] = LeaderboardIndex(f"level_{level}")
+            level_indexes[level].replace_all(level_members, presorted=True)
+
+        with self._lock:
+            self.global_index.replace_all(members, presorted=True)
+            self.level_indexes = level_indexes
+
+        if path_rows is not None:
+            path_indexes = self._build_path_indexes(path_rows)
+            with self._lock:
+                self.path_indexes = path_indexes
+
+        if ledger_rows is not None:
+            self._warm_buckets_from_ledger(ledger_rows)
+        with self._lock:
+            self._rebuild_windows(self._today())
+        return len(members)
+
+    def _build_path_indexes(self, rows: List[Dict[str, Any]]) -> Dict[str, LeaderboardIndex]:
+        """Um índice por trilha, a partir das linhas (user_id, path_id, total_score)"""
+        members_by_path: Dict[str, List[LeaderboardMember]] = defaultdict(list)
+        for row in rows:
+            user_id, path_id = row.get("user_id"), row.get("path_id")
+            if not user_id or not path_id:
+                continue
+            members_by_path[path_id].append(self._path_member(user_id, row.get("total_score") or 0))
+
+        path_indexes = {}
+        for path_id, path_members in members_by_path.items():
+            path_members.sort(key=lambda member: (-member.score, member.user_id))
+            path_indexes[path_id] = LeaderboardIndex(f"path_{path_id}")
+            # Um progresso por usuário e trilha (id do documento): sem repetição
+            path_indexes[path_id].replace_all(path_members, presorted=True)
+        return path_indexes
+
+    def _path_member(self, user_id: str, total_score: int) -> LeaderboardMember:
+        """Entrada de trilha: dados do perfil (índice global) com a pontuação na trilha"""
+        base = self.global_index.get(user_id) or LeaderboardMember(user_id=user_id)
+        return replace(base, points=total_score, xp=0, bonus=0)
+
+    def _read_ledger(self, reward_repo) -> List[Dict[str, Any]]:
+        """Ledger de recompensas da retenção dos buckets"""
+        since = datetime.combine(
+            self._today() - timedelta(days=self.score_buckets.retention_days - 1),
+            datetime.min.time(), tzinfo=UTC
+        )
+        return reward_repo.get_rewards_since(since)
+
+    def _warm_buckets_from_ledger(self, ledger_rows: List[Dict[str, Any]]):
+        """Soma o ledger de recompensas por usuário/dia e combina com os buckets"""
+        daily: Dict[Tuple[str, date], List[int]] = defaultdict(lambda: [0, 0])
+        for row in ledger_rows:
+            totals = daily[(row["user_id"], self._bucket_day(row["earned_at"]))]
+            totals[0] += row.get("points_earned") or 0
+            totals[1] += row.get("xp_earned") or 0
+
+        for (user_id, day), (points, xp) in daily.items():
+            self.score_buckets.merge_max(user_id, day, points, xp)
+
+    @staticmethod
+    def _today() -> date:
+        return datetime.now(UTC).date()
+
+    @staticmethod
+    def _bucket_day(moment: datetime) -> date:
+        """Dia (UTC) do bucket de um instante; datas sem fuso são tratadas como UTC"""
+        if moment.tzinfo is None:
+            return moment.date()
+        return moment.astimezone(UTC).date()
+
+    def _window_member(self, user_id: str, points: int, xp: int) -> LeaderboardMember:
+        """Entrada de janela: dados do perfil (índice global) com o score da janela"""
+        base = self.global_index.get(user_id)
+        if base is None:
+            for board in self.window_indexes.values():
+                base = board.get(user_id)
+                if base is not None:
+                    break
+        if base is None:
+            base = LeaderboardMember(user_id=user_id)
+        # Nas janelas vale só o ganho do período, sem bônus
+        return replace(base, points=points, xp=xp, bonus=0)
+
+    def _rebuild_windows(self, today: date):
+        """Recalcula todas as janelas a partir dos buckets (virada de dia ou carga)"""
+        self.score_buckets.prune(today)
+        for window, days in WINDOW_DAYS.items():
+            self.window_indexes[window].replace_all([
+                self._window_member(user_id, points, xp)
+                for user_id, (points, xp) in self.score_buckets.active_users(today, days).items()
+            ])
+        self._window_day = today
+        self.metrics["window_rebuilds"] += 1
+
+    def _ensure_current_windows(self):
+        """Na virada do dia, buckets antigos saem das janelas"""
+        today = self._today()
+        if self._window_day != today:
+            self._rebuild_windows(today)
+
+    def record_window_score(self, user_id: str, points: int, xp: int, day: Optional[date] = None):
+        """
+        Registra pontos/XP ganhos em um dia e atualiza as janelas do usuário.
+
+        Custa O(31 + log n): soma os buckets da janela e reposiciona o usuário.
+        """
+        with self._lock:
+            self._ensure_current_windows()
+            day = day or self._window_day
+            self.score_buckets.add(user_id, day, points, xp)
+
+            for window, days in WINDOW_DAYS.items():
+                window_points, window_xp = self.score_buckets.window_totals(user_id, self._window_day, days)
+                board = self.window_indexes[window]
+                if window_points or window_xp:
+                    board.upsert(self._window_member(user_id, window_points, window_xp))
+                else:
+                    board.remove(user_id)
+
+    def get_window_index(self, window: str) -> LeaderboardIndex:
+        """Índice da janela ("weekly" ou "monthly"), já com a virada de dia aplicada"""
+        with self._lock:
+            self._ensure_current_windows()
+            return self.window_indexes[window]
+
+    def get_window_bounds(self, window: str) -> Tuple[date, date]:
+        """Primeiro e último dia (inclusive) da janela atual"""
+        end_day = self._window_day or self._today()
+        return end_day - timedelta(days=WINDOW_DAYS[window] - 1), end_day
+
+    def _get_level_index(self, level: int) -> LeaderboardIndex:
+        board = self.level_indexes.get(level)
+        if board is None:
+            board = self.level_indexes.setdefault(level, LeaderboardIndex(f"level_{level}"))
+        return board
+
+    def get_level_indexes(self) -> Dict[int, LeaderboardIndex]:
+        """Cópia do mapa nível -> índice (seguro para iterar fora do lock)"""
+        with self._lock:
+            return dict(self.level_indexes)
+
+    def get_level_index(self, level: int) -> Optional[LeaderboardIndex]:
+        """Índice de um nível (None se ninguém está nele)"""
+        with self._lock:
+            return self.level_indexes.get(level)
+
+    def get_path_index(self, path_id: str) -> Optional[LeaderboardIndex]:
+        """Índice de uma trilha (None se ninguém pontuou nela)"""
+        with self._lock:
+            return self.path_indexes.get(path_id)
+
+    def get_path_indexes(self) -> Dict[str, LeaderboardIndex]:
+        """Cópia do mapa trilha -> índice (seguro para iterar fora do lock)"""
+        with self._lock:
+            return dict(self.path_indexes)
+
+    def record_path_score(self, user_id: str, path_id: str, total_score: int) -> int:
+        """
+        Atualiza a pontuação do usuário em uma trilha (O(log n)).
+
+        Returns:
+            Rank atual do usuário na trilha
+        """
+        with self._lock:
+            board = self.path_indexes.get(path_id)
+            if board is None:
+                board = self.path_indexes.setdefault(path_id, LeaderboardIndex(f"path_{path_id}"))
+            board.upsert(self._path_member(user_id, total_score))
+            self.metrics["incremental_updates"] += 1
+            return board.rank(user_id)
+
+    def _upsert_member(self, member: LeaderboardMember):
+        """Atualiza o índice global e o do nível, movendo de partição se o nível mudou"""
+        with self._lock:
+            previous = self.global_index.get(member.user_id)
+            self.global_index.upsert(member)
+
+            if previous is not None and previous.level != member.level:
+                old_board = self.level_indexes.get(previous.level)
+                if old_board is not None:
+                    old_board.remove(member.user_id)
+            self._get_level_index(member.level).upsert(member)
+
+            # Nas janelas o score é outro; só os dados de perfil acompanham
+            for board in self.window_indexes.values():
+                current = board.get(member.user_id)
+                if current is not None:
+                    board.upsert(replace(member, points=current.points, xp=current.xp, bonus=0))
+            for board in self.path_indexes.values():
+                current = board.get(member.user_id)
+                if current is not None:
+                    board.upsert(replace(member, points=current.points, xp=0, bonus=0))
+
+    async def ensure_loaded(self, user_repo):
+        """Carrega o índice na primeira utilização"""
+        if not self.loaded:
+            await self.load(user_repo)
+
+    def record_user_score(
+        self,
+        user_id: str,
+        points: int,
+        xp: int,
+        profile: Optional[Any] = None,
+        level: Optional[int] = None
+    ) -> Tuple[Optional[int], int]:
+        """
+        Atualiza o score de um usuário após uma recompensa (O(log n)).
+
+        Args:
+            user_id: ID do usuário
+            points: Total de pontos após a recompensa
+            xp: Total de XP após a recompensa
+            profile: UserProfile, usado se o usuário ainda não está no índice
+            level: Nível atual, se conhecido
+            
+        Returns:
+            (rank anterior ou None se o usuário era novo, rank atual)
+        """
+        with self._lock:
+            old_rank = self.global_index.rank(user_id)
+            member = self.global_index.get(user_id)
+
+            if member is None:
+                member = (
+                    LeaderboardMember.from_profile(profile, bonus=ranking_bonus(profile.current_streak))
+                    if profile else LeaderboardMember(user_id=user_id)
+                )
+
+            updates: Dict[str, Any] = {"points": points, "xp": xp}
+            if level is not None:
+                updates["level"] = level
+
+            self._upsert_member(replace(member, **updates))
+            self.metrics["incremental_updates"] += 1
+            return old_rank, self.global_index.rank(user_id)
+
+    def get_rank_stats(self, user_id: str) -> Dict[str, Any]:
+        """
+        Posição exata do usuário no ranking global, no do seu nível e nas
+        janelas semanal/mensal (O(log n)).
+
+        Usuários ainda fora do índice (sem pontos) são posicionados como
+        score 0, sem alterar o índice. Nas janelas, quem não pontuou no
+        período fica com rank 0.
+        """
+        with self._lock:
+            self._ensure_current_windows()
+            window_ranks = {
+                f"{window}_rank": board.rank(user_id) or 0
+                for window, board in self.window_indexes.items()
+            }
+            member = self.global_index.get(user_id)
+            total_users = len(self.global_index)
+
+            if member is None:
+                level_board = self.level_indexes.get(1)
+                global_rank = self.global_index.rank_for_score(0, user_id)
+                level_rank = level_board.rank_for_score(0, user_id) if level_board else 1
+                total_users += 1
+                level_total = (len(level_board) if level_board else 0) + 1
+                level = 1
+            else:
+                level_board = self._get_level_index(member.level)
+                global_rank = self.global_index.rank(user_id)
+                level_rank = level_board.rank(user_id)
+                level_total = len(level_board)
+                level = member.level
+
+        return {
+            "user_id": user_id,
+            "global_rank": global_rank,
+            "level": level,
+            "level_rank": level_rank,
+            "level_total_users": level_total,
+            **window_ranks,
+            "total_users": total_users,
+            "percentile": round((total_users - global_rank + 1) / total_users * 100, 2)
+        }
+
+    async def register_event_handlers(self):
+        """Inscreve o leaderboard nos eventos que alteram score ou nível"""
+        if self._handlers_registered:
+            return
+
+        event_bus = get_event_bus()
+        await event_bus.subscribe(EventType.POINTS_EARNED, self._handle_score_event)
+        await event_bus.subscribe(EventType.MISSION_COMPLETED, self._handle_score_event)
+        await event_bus.subscribe(EventType.LEVEL_UP, self._handle_level_up)
+        await event_bus.subscribe(EventType.LEARNING_PATH_PROGRESS, self._handle_path_progress)
+        self._handlers_registered = True
+
+        logger.info("🎯 Handlers de eventos registrados no LeaderboardService")
+
+    async def _handle_score_event(self, event: BaseEvent):
+        """
+        Aplica POINTS_EARNED / MISSION_COMPLETED ao índice.
+
+        Com os totais no evento a atualização é idempotente (eventos repetidos
+        não somam duas vezes); sem eles, aplica o delta sobre o score atual.
+        O ganho do evento também entra no bucket do dia para as janelas.
+        """
+        member = self.global_index.get(event.user_id)
+        total_points = getattr(event, "total_points", None)
+        total_xp = getattr(event, "total_xp", None)
+        points_earned = getattr(event, "points_earned", 0) or 0
+        xp_earned = getattr(event, "xp_earned", 0) or 0
+
+        already_applied = (
+            member is not None and total_points is not None and total_xp is not None
+            and (member.points, member.xp) == (total_points, total_xp)
+        )
+        if (points_earned or xp_earned) and not already_applied:
+            self.record_window_score(
+                event.user_id, points_earned, xp_earned, day=self._bucket_day(event.timestamp)
+            )
+
+        if not self.loaded:
+            return  # A carga inicial já trará o valor persistido
+
+        if total_points is None or total_xp is None:
+            if member is None:
+                return  # Sem base para o delta; o próximo refresh corrige
+            total_points = member.points + points_earned
+            total_xp = member.xp + xp_earned
+
+        profile = None
+        if member is None and self._user_repo_factory is not None:
+            # Usuário novo no ranking: busca nome/email uma única vez
+            profile = await asyncio.to_thread(self._user_repo_factory().get_user_profile, event.user_id)
+
+        old_rank, new_rank = self.record_user_score(event.user_id, total_points, total_xp, profile=profile)
+        self.metrics["events_applied"] += 1
+        await self._invalidate_rank_window(old_rank, new_rank)
+
+    async def _handle_level_up(self, event: BaseEvent):
+        """Atualiza o nível exibido no ranking (o score não muda)"""
+        member = self.global_index.get(event.user_id)
+        if member is None:
+            return
+
+        self._upsert_member(replace(member, level=event.new_level))
+        rank = self.global_index.rank(event.user_id)
+        self.metrics["events_applied"] += 1
+        await self._invalidate_rank_window(rank, rank)
+
+    async def _handle_path_progress(self, event: BaseEvent):
+        """Reposiciona o usuário no ranking da trilha (o total no evento torna a atualização idempotente)"""
+        self.record_path_score(event.user_id, event.learning_path_id, event.total_score)
+        self.metrics["events_applied"] += 1
+        await get_advanced_cache().delete_by_tags([f"path:{event.learning_path_id}"])
+
+    async def _invalidate_rank_window(self, old_rank: Optional[int], new_rank: int):
+        """
+        Invalida só as páginas em cache afetadas pela mudança de posição.
+
+        Quem está entre o rank antigo e o novo desloca uma posição; fora desse
+        intervalo as páginas continuam corretas. Um usuário novo muda o total
+        de usuários de todas as páginas.
+        """
+        cache = get_advanced_cache()
+
+        if old_rank is None:
+            await cache.delete_by_tags(["global"])
+            return
+
+        tags = ranking_window_tags(min(old_rank, new_rank), max(old_rank, new_rank))
+        await cache.delete_by_tags(tags)
+        self.metrics["cache_windows_invalidated"] += len(tags)
+
+    async def start_refresh_worker(
+        self,
+        user_repo_factory: Callable[[], Any],
+        reward_repo_factory: Optional[Callable[[], Any]] = None,
+        path_repo_factory: Optional[Callable[[], Any]] = None
+    ):
+        """Carrega o índice em background e o recarrega periodicamente"""
+        if self._refresh_task is not None:
+            return
+
+        self._user_repo_factory = user_repo_factory
+        self._reward_repo_factory = reward_repo_factory
+        self._path_repo_factory = path_repo_factory
+        self._refresh_task = asyncio.create_task(self._refresh_loop(user_repo_factory))
+        logger.info(f"✅ Refresh do leaderboard agendado a cada {self.refresh_seconds:.0f}s")
+
+    async def stop_refresh_worker(self):
+        """Para o refresh periódico"""
+        if self._refresh_task is None:
+            return
+
+        self._refresh_task.cancel()
+        try:
+            await self._refresh_task
+        except asyncio.CancelledError:
+            pass
+        self._refresh_task = None
+
+    async def _refresh_loop(self, user_repo_factory: Callable[[], Any]):
+        while True:
+            try:
+                reward_repo = self._reward_repo_factory() if self._reward_repo_factory else None
+                path_repo = self._path_repo_factory() if self._path_repo_factory else None
+                await self.load(user_repo_factory(), reward_repo, path_repo)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao carregar leaderboard: {e}")
+
+            await asyncio.sleep(self.refresh_seconds * (1 + self.refresh_jitter * random.random()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas dos índices"""
+        return {
+            **self.metrics,
+            "loaded": self.loaded,
+            "last_loaded_at": self.last_loaded_at.isoformat() if self.last_loaded_at else None,
+            "global_size": len(self.global_index),
+            "level_boards": {level: len(board) for level, board in sorted(self.level_indexes.items())},
+            "window_boards": {window: len(board) for window, board in self.window_indexes.items()},
+            "path_boards": {path_id: len(board) for path_id, board in sorted(self.path_indexes.items())},
+            "bucketed_users": len(self.score_buckets)
+        }
+
+
+# Instância global do serviço
+_leaderboard_service_instance: Optional[LeaderboardService] = None
+_service_lock = threading.Lock()
+
+
+def get_leaderboard_service() -> LeaderboardService:
+    """Retorna instância singleton do LeaderboardService"""
+    global _leaderboard_service_instance
+
+    if _leaderboard_service_instance is None:
+        with _service_lock:
+            if _leaderboard_service_instance is None:
+                _leaderboard_service_instance = LeaderboardService(
+                    refresh_seconds=float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "1800"))
+                )
+
+    return _leaderboard_service_instance
@@ -0,0 +1,198 @@
+"""
+Índice compilado de uma trilha de aprendizado.
+Localizar missões, verificar a conclusão de módulos e da trilha e achar o
+próximo módulo percorriam módulos e missões a cada chamada (com `in` em
+listas). O índice é compilado uma vez por instância da trilha — a que fica
+no cache do processo — e guardado nela.
+
+As missões ganham ordinais na ordem da trilha; o progresso do usuário guarda
+um bitset sobre esses ordinais (`completed_mission_bits`) ao lado da lista de
+IDs. A chave do espaço de ordinais vai junto: se a trilha mudar, ou se o
+bitset divergir da lista, ele é recalculado a partir da lista.
+"""
+import hashlib
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Collection, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from app.models.learning_path import LearningPath, MissionReference, Module, UserPathProgress
+
+
+@dataclass(frozen=True)
+class MissionLocation:
+    """Onde uma missão está na trilha"""
+    module_id: str
+    # Posição da missão dentro do módulo
+    position: int
+    # Posição da missão na trilha inteira (módulos em ordem)
+    ordinal: int
+
+
+@dataclass(frozen=True)
+class LearningPathIndex:
+    """Estrutura imutável com os lookups de uma trilha"""
+    path_id: str
+    modules: Tuple[Module, ...]
+    module_positions: Mapping[str, int]
+    module_missions: Mapping[str, FrozenSet[str]]
+    missions: Mapping[str, MissionReference]
+    locations: Mapping[str, MissionLocation]
+    # Módulos de cada missão (uma missão pode aparecer em mais de um)
+    mission_modules: Mapping[str, Tuple[str, ...]]
+    mission_ids: Tuple[str, ...]
+    total_missions: int
+    # Bitsets: missões de cada módulo e da trilha inteira
+    module_masks: Mapping[str, int]
+    full_mask: int
+    # Identifica o espaço de ordinais (muda se missões forem incluídas/reordenadas)
+    bits_key: str
+
+    @classmethod
+    def compile(cls, path: LearningPath) -> "LearningPathIndex":
+        # sorted é estável: módulos com a mesma ordem mantêm a ordem do documento
+        modules = tuple(sorted(path.modules, key=lambda module: module.order))
+        missions: Dict[str, MissionReference] = {}
+        locations: Dict[str, MissionLocation] = {}
+        mission_modules: Dict[str, List[str]] = {}
+        mission_ids: List[str] = []
+
+        for module in modules:
+            for position, mission in enumerate(module.missions):
+                owners = mission_modules.setdefault(mission.id, [])
+                if module.id not in owners:
+                    owners.append(module.id)
+                # Missão repetida em outro módulo: vale a primeira ocorrência
+                if mission.id in locations:
+                    continue
+                missions[mission.id] = mission
+                locations[mission.id] = MissionLocation(module.id, position, len(mission_ids))
+                mission_ids.append(mission.id)
+
+        module_missions = {module.id: frozenset(mission.id for mission in module.missions) for module in modules}
+        module_masks = {
+            module_id: sum(1 << locations[mission_id].ordinal for mission_id in ids)
+            for module_id, ids in module_missions.items()
+        }
+
+        return cls(
+            path_id=path.id,
+            modules=modules,
+            module_positions=MappingProxyType({module.id: position for position, module in enumerate(modules)}),
+            module_missions=MappingProxyType(module_missions),
+            missions=MappingProxyType(missions),
+            locations=MappingProxyType(locations),
+            mission_modules=MappingProxyType({key: tuple(value) for key, value in mission_modules.items()}),
+            mission_ids=tuple(mission_ids),
+            # Mesma contagem usada antes do índice (referências, não IDs distintos)
+            total_missions=sum(len(module.missions) for module in modules),
+            module_masks=MappingProxyType(module_masks),
+            full_mask=(1 << len(mission_ids)) - 1,
+            bits_key=hashlib.blake2b("\n".join(mission_ids).encode(), digest_size=8).hexdigest()
+        )
+
+    @property
+    def total_modules(self) -> int:
+        return len(self.modules)
+
+    def find_mission(self, mission_id: str) -> Optional[MissionReference]:
+        return self.missions.get(mission_id)
+
+    def module_of(self, mission_id: str) -> Optional[str]:
+        location = self.locations.get(mission_id)
+        return location.module_id if location else None
+
+    def get_module(self, module_id: str) -> Optional[Module]:
+        position = self.module_positions.get(module_id)
+        return self.modules[position] if position is not None else None
+
+    def first_module(self) -> Optional[Module]:
+        return self.modules[0] if self.modules else None
+
+    def mission_bit(self, mission_id: str) -> int:
+        location = self.locations.get(mission_id)
+        return 1 << location.ordinal if location else 0
+
+    def encode(self, mission_ids: Iterable[str]) -> int:
+        """Bitset das missões informadas (IDs fora da trilha são ignorados)"""
+        bits = 0
+        for mission_id in mission_ids:
+            bits |= self.mission_bit(mission_id)
+        return bits
+
+    def progress_bits(self, progress: UserPathProgress) -> int:
+        """
+        Bitset das missões concluídas do progresso.
+
+        O bitset gravado só vale se for do mesmo espaço de ordinais e tiver
+        tantas missões quanto a lista (uma gravação concorrente pode ter
+        perdido um bit); senão é recalculado a partir da lista.
+        """
+        stored = progress.completed_mission_bits
+        if stored is not None and progress.mission_bits_key == self.bits_key:
+            bits = int.from_bytes(stored, "little")
+            if bits.bit_count() == len(progress.completed_missions):
+                return bits
+        return self.encode(progress.completed_missions)
+
+    def store_bits(self, progress: UserPathProgress, bits: int) -> Dict[str, object]:
+        """Grava o bitset no progresso e retorna os campos para persistir"""
+        progress.completed_mission_bits = bits.to_bytes((len(self.mission_ids) + 7) // 8, "little")
+        progress.mission_bits_key = self.bits_key
+        return {
+            "completed_mission_bits": progress.completed_mission_bits,
+            "mission_bits_key": self.bits_key
+        }
+
+    def is_module_complete(self, module_id: str, bits: int) -> bool:
+        """Todas as missões do módulo estão no bitset"""
+        mask = self.module_masks.get(module_id)
+        return mask is not None and bits & mask == mask
+
+    def completed_modules(
+        self,
+        bits: int,
+        already_completed: Collection[str] = (),
+        changed_missions: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """
+        Módulos concluídos que ainda não estão em `already_completed`, em ordem.
+
+        Com `changed_missions`, só os módulos dessas missões são verificados.
+        """
+        if changed_missions is None:
+            candidates = [module.id for module in self.modules]
+        else:
+            candidates = sorted(
+                {module_id for mission_id in changed_missions for module_id in self.mission_modules.get(mission_id, ())},
+                key=self.module_positions.__getitem__
+            )
+        return [
+            module_id for module_id in candidates
+            if module_id not in already_completed and self.is_module_complete(module_id, bits)
+        ]
+
+    def next_module(self, module_id: str, completed_modules: Collection[str]) -> Optional[Module]:
+        """Primeiro módulo depois de `module_id` (em ordem) ainda não concluído"""
+        position = self.module_positions.get(module_id)
+        if position is None:
+            return None
+        current_order = self.modules[position].order
+        for module in self.modules[position + 1:]:
+            if module.order > current_order and module.id not in completed_modules:
+                return module
+        return None
+
+    def is_path_complete(self, bits: int) -> bool:
+        return bits & self.full_mask == self.full_mask
+
+    def progress_percentage(self, bits: int) -> float:
+        return (bits.bit_count() / len(self.mission_ids) * 100) if self.mission_ids else 0
+
+
+def get_path_index(path: LearningPath) -> LearningPathIndex:
+    """Índice da trilha, compilado na primeira chamada e guardado na instância"""
+    index = path._index
+    if index is None or index.path_id != path.id:
+        index = LearningPathIndex.compile(path)
+        path._index = index
+    return index
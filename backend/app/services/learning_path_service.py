@@ -1,14 +1,21 @@
 import logging
 import asyncio
+import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime, UTC
+from firebase_admin import firestore
 from app.models.learning_path import LearningPath, UserPathProgress, LearningPathResponse
 from app.models.mission import QuizSubmision, EnhancedQuizSubmission
 from app.repositories.learning_path_repository import LearningPathRepository
 from app.core.firebase import get_firestore_db_async
 from app.services.reward_service import RewardService
+from app.repositories.user_repository import get_user_repository
+from app.repositories.reward_repository import RewardRepository
+from app.repositories.badge_repository import get_badge_repository
 from app.services.event_bus import get_event_bus
-from app.models.events import LearningPathCompletedEvent, QuizCompletedEvent
+from app.services.learning_path_index import get_path_index
+from app.models.events import LearningPathCompletedEvent, LearningPathProgressEvent, QuizCompletedEvent, PointsEarnedEvent
+from app.models.reward import RewardType, UserReward
 from app.core.logging_config import get_cryptoquest_logger
 
 # 🆕 Imports para IA - ATIVADOS
@@ -17,12 +24,21 @@ from app.ai.services.recommendation_engine import get_recommendation_engine
 from app.ai.data.behavioral_data_collector import get_behavioral_collector
 
 # ⚡ Imports para processamento assíncrono
-from app.services.background_task_service import get_background_service, ensure_worker_started, TaskPriority
+from app.services.background_task_service import (
+    get_background_service, ensure_worker_started, TaskPriority, RetryPolicy, NO_RETRY
+)
 from app.services.fast_cache_service import get_fast_cache, invalidate_user_cache
 
 logger = logging.getLogger(__name__)
 cryptoquest_logger = get_cryptoquest_logger()
 
+# Políticas de retry das tarefas de background (falhas transitórias do Firestore).
+# Só para handlers idempotentes: badges usam reward_id e insights um ID fixo.
+# Eventos não têm retry: reemitir o QuizCompletedEvent reaciona os assinantes
+BADGE_TASK_RETRY = RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=60.0)
+AI_INSIGHTS_TASK_RETRY = RetryPolicy(max_attempts=3, base_delay=5.0, max_delay=120.0)
+EVENTS_TASK_RETRY = NO_RETRY
+
 class LearningPathService:
     """Service para lógica de negócio das trilhas de aprendizado"""
     
@@ -147,8 +163,8 @@ class LearningPathService:
             progress = self.repository.start_learning_path(user_id, path_id)
             
             # Define o primeiro módulo como atual
-            if path.modules:
-                first_module = min(path.modules, key=lambda x: x.order)
+            first_module = get_path_index(path).first_module()
+            if first_module:
                 progress.current_module_id = first_module.id
                 self.repository.update_progress(progress)
             
@@ -165,17 +181,20 @@ class LearningPathService:
     async def _calculate_path_stats(self, path: LearningPath, progress: Optional[UserPathProgress]) -> Dict[str, Any]:
         """Calcula estatísticas da trilha"""
         try:
-            total_modules = len(path.modules)
-            total_missions = sum(len(module.missions) for module in path.modules)
+            index = get_path_index(path)
+            total_modules = index.total_modules
+            total_missions = index.total_missions
             
             if progress:
+                bits = index.progress_bits(progress)
                 completed_modules = len(progress.completed_modules)
-                completed_missions = len(progress.completed_missions)
-                progress_percentage = (completed_missions / total_missions * 100) if total_missions > 0 else 0
+                completed_missions = bits.bit_count()
+                progress_percentage = index.progress_percentage(bits)
                 
                 # Atualiza o progresso se necessário
                 if progress.progress_percentage != progress_percentage:
                     progress.progress_percentage = progress_percentage
+                    index.store_bits(progress, bits)
                     self.repository.update_progress(progress)
             else:
                 completed_modules = 0
@@ -196,36 +215,30 @@ class LearningPathService:
             logger.error(f"Erro ao calcular estatísticas: {e}")
             return {}
     
-    async def _check_and_persist_module_completion(self, progress: UserPathProgress, learning_path) -> None:
-        """Verifica e persiste conclusão de módulos de forma robusta"""
+    async def _check_and_persist_module_completion(
+        self, progress: UserPathProgress, learning_path, changed_missions: Optional[List[str]] = None
+    ) -> None:
+        """
+        Verifica e persiste conclusão de módulos de forma robusta.
+        
+        Com `changed_missions`, só os módulos dessas missões são verificados.
+        """
         try:
-            modules_completed = []
+            index = get_path_index(learning_path)
             
             logger.info(f"🔍 [DEBUG] Verificando conclusão de módulos para usuário {progress.user_id}")
             logger.info(f"🔍 [DEBUG] Progresso atual: {progress.completed_missions}")
             
-            for module in learning_path.modules:
-                # Obter missões do módulo
-                module_missions = [mission.id for mission in module.missions]
-                
-                # Verificar quais missões do módulo foram concluídas
-                completed_module_missions = [mid for mid in progress.completed_missions if mid in module_missions]
-                
-                # Verificar se módulo foi concluído
-                is_module_completed = len(completed_module_missions) == len(module_missions)
-                
-                logger.info(f"🔍 [DEBUG] Módulo {module.id}: {len(completed_module_missions)}/{len(module_missions)} missões completadas")
-                logger.info(f"🔍 [DEBUG] Módulo {module.id} completo: {is_module_completed}")
-                logger.info(f"🔍 [DEBUG] Módulo {module.id} já em completed_modules: {module.id in progress.completed_modules}")
+            modules_completed = index.completed_modules(
+                index.progress_bits(progress), set(progress.completed_modules), changed_missions
+            )
+            
+            for module_id in modules_completed:
+                progress.completed_modules.append(module_id)
+                logger.info(f"✅ [DEBUG] Módulo {module_id} marcado como completo!")
                 
-                if is_module_completed and module.id not in progress.completed_modules:
-                    progress.completed_modules.append(module.id)
-                    modules_completed.append(module.id)
-                    
-                    logger.info(f"✅ [DEBUG] Módulo {module.id} marcado como completo!")
-                    
-                    # Persistir imediatamente no banco
-                    self.repository.complete_module(progress.user_id, progress.path_id, module.id)
+                # Persistir imediatamente no banco
+                self.repository.complete_module(progress.user_id, progress.path_id, module_id)
             
             if modules_completed:
                 logger.info(f"Módulos concluídos: {modules_completed}")
@@ -233,8 +246,7 @@ class LearningPathService:
                 # Emitir eventos de módulo completado
                 for module_id in modules_completed:
                     try:
-                        # Encontrar o módulo para obter o nome
-                        module = next((m for m in learning_path.modules if m.id == module_id), None)
+                        module = index.get_module(module_id)
                         if module:
                             from app.models.events import ModuleCompletedEvent
                             module_event = ModuleCompletedEvent(
@@ -273,10 +285,7 @@ class LearningPathService:
     async def _check_module_completion(self, progress: UserPathProgress, module) -> bool:
         """Verifica se um módulo foi concluído"""
         try:
-            module_missions = [mission.id for mission in module.missions]
-            completed_module_missions = [mid for mid in progress.completed_missions if mid in module_missions]
-            
-            if len(completed_module_missions) == len(module_missions):
+            if {mission.id for mission in module.missions} <= set(progress.completed_missions):
                 # Módulo concluído
                 if module.id not in progress.completed_modules:
                     self.repository.complete_module(progress.user_id, progress.path_id, module.id)
@@ -295,8 +304,9 @@ class LearningPathService:
             if progress.completed_at:
                 return True
             
-            total_missions = sum(len(module.missions) for module in path.modules)
-            if len(progress.completed_missions) >= total_missions:
+            index = get_path_index(path)
+            total_missions = index.total_missions
+            if index.is_path_complete(index.progress_bits(progress)):
                 # Trilha concluída
                 progress.completed_at = datetime.now(UTC)
                 progress.progress_percentage = 100.0
@@ -336,33 +346,13 @@ class LearningPathService:
     async def _get_next_module(self, path: LearningPath, progress: UserPathProgress) -> Optional[Dict[str, Any]]:
         """Retorna o próximo módulo a ser executado"""
         try:
+            index = get_path_index(path)
             if not progress.current_module_id:
                 # Se não há módulo atual, retorna o primeiro
-                if path.modules:
-                    first_module = min(path.modules, key=lambda x: x.order)
-                    return {
-                        "id": first_module.id,
-                        "name": first_module.name,
-                        "order": first_module.order
-                    }
-                return None
-            
-            # Busca o próximo módulo não concluído
-            current_module_order = None
-            for module in path.modules:
-                if module.id == progress.current_module_id:
-                    current_module_order = module.order
-                    break
-            
-            if current_module_order is None:
-                return None
-            
-            # Busca o próximo módulo
-            next_module = None
-            for module in path.modules:
-                if module.order > current_module_order and module.id not in progress.completed_modules:
-                    if next_module is None or module.order < next_module.order:
-                        next_module = module
+                next_module = index.first_module()
+            else:
+                # Busca o próximo módulo não concluído
+                next_module = index.next_module(progress.current_module_id, set(progress.completed_modules))
             
             if next_module:
                 return {
@@ -436,12 +426,13 @@ class LearningPathService:
                     score=score,
                     success=success,
                     points=points_earned,
-                    xp=xp_earned
+                    xp=xp_earned,
+                    learning_path=learning_path
                 )
                 
                 # 🔧 VERIFICAR CONCLUSÃO DE MÓDULOS APÓS MISSÃO COMPLETA
                 if updated_progress and learning_path:
-                    await self._check_and_persist_module_completion(updated_progress, learning_path)
+                    await self._check_and_persist_module_completion(updated_progress, learning_path, [mission_id])
             else:
                 # Se não teve sucesso, só atualiza o progresso
                 updated_progress = await self._update_user_progress_fast(
@@ -486,9 +477,12 @@ class LearningPathService:
                     "mission_id": mission_id,
                     "submission": submission,
                     "score": score,
-                    "success": success
+                    "success": success,
+                    "insights_id": f"{user_id}_{mission_id}_{uuid.uuid4().hex}"
                 },
-                priority=TaskPriority.NORMAL
+                priority=TaskPriority.NORMAL,
+                retry_policy=AI_INSIGHTS_TASK_RETRY,
+                discard_result=True  # Resultado não é consultado
             )
             
             # Task 2: Verificar e conceder badges
@@ -500,9 +494,12 @@ class LearningPathService:
                     "path_id": path_id,
                     "mission_id": mission_id,
                     "score": score,
-                    "success": success
+                    "success": success,
+                    "reward_id": f"lp_{user_id}_{mission_id}_{uuid.uuid4().hex}"
                 },
-                priority=TaskPriority.HIGH  # Badges são importantes
+                priority=TaskPriority.HIGH,  # Badges são importantes
+                retry_policy=BADGE_TASK_RETRY,
+                discard_result=True  # Resultado não é consultado
             )
             
             # Task 3: Emitir eventos e atualizar rankings
@@ -516,7 +513,9 @@ class LearningPathService:
                     "score": score,
                     "success": success
                 },
-                priority=TaskPriority.LOW
+                priority=TaskPriority.LOW,
+                retry_policy=EVENTS_TASK_RETRY,
+                discard_result=True  # Resultado não é consultado
             )
             
             # Log de evento de negócio
@@ -670,12 +669,13 @@ class LearningPathService:
                     score=score,
                     success=success,
                     points=points_earned,
-                    xp=xp_earned
+                    xp=xp_earned,
+                    learning_path=learning_path
                 )
                 
                 # 🔧 VERIFICAR CONCLUSÃO DE MÓDULOS APÓS MISSÃO COMPLETA
                 if updated_progress and learning_path:
-                    await self._check_and_persist_module_completion(updated_progress, learning_path)
+                    await self._check_and_persist_module_completion(updated_progress, learning_path, [mission_id])
             else:
                 # Se não teve sucesso, só atualiza progresso
                 updated_progress = await self._update_user_progress_fast(
@@ -703,9 +703,12 @@ class LearningPathService:
                     "path_id": path_id,
                     "mission_id": mission_id,
                     "score": score,
-                    "success": success
+                    "success": success,
+                    "reward_id": f"lp_{user_id}_{mission_id}_{uuid.uuid4().hex}"
                 },
-                priority=TaskPriority.HIGH
+                priority=TaskPriority.HIGH,
+                retry_policy=BADGE_TASK_RETRY,
+                discard_result=True  # Resultado não é consultado
             )
             
             # Task 2: Emitir eventos
@@ -719,7 +722,9 @@ class LearningPathService:
                     "score": score,
                     "success": success
                 },
-                priority=TaskPriority.LOW
+                priority=TaskPriority.LOW,
+                retry_policy=EVENTS_TASK_RETRY,
+                discard_result=True  # Resultado não é consultado
             )
             
             # Log de evento de negócio
@@ -798,18 +803,17 @@ class LearningPathService:
             # Atualizar módulo atual
             learning_path = self.repository.get_learning_path_by_id(path_id)
             if learning_path:
-                # Encontrar o módulo da missão
-                for module in learning_path.modules:
-                    for mission in module.missions:
-                        if mission.id == mission_id:
-                            progress.current_module_id = module.id
-                            break
-                    if progress.current_module_id:
-                        break
+                index = get_path_index(learning_path)
+                
+                # Módulo da missão
+                progress.current_module_id = index.module_of(mission_id) or progress.current_module_id
+                
+                bits = index.progress_bits(progress)
+                index.store_bits(progress, bits)
                 
                 # Verificar se a trilha foi completada
-                total_missions = sum(len(module.missions) for module in learning_path.modules)
-                if len(progress.completed_missions) >= total_missions and not progress.completed_at:
+                total_missions = index.total_missions
+                if index.is_path_complete(bits) and not progress.completed_at:
                     progress.completed_at = datetime.now(UTC)
                     progress.progress_percentage = 100.0
                     
@@ -829,7 +833,7 @@ class LearningPathService:
             
             # Verificar e persistir conclusão de módulos
             if learning_path:
-                await self._check_and_persist_module_completion(progress, learning_path)
+                await self._check_and_persist_module_completion(progress, learning_path, [mission_id])
             
             # Salvar progresso
             self.repository.update_progress(progress)
@@ -847,35 +851,20 @@ class LearningPathService:
     async def _advance_to_next_module(self, progress: UserPathProgress, learning_path: LearningPath):
         """Avança para o próximo módulo disponível"""
         try:
+            index = get_path_index(learning_path)
+            
             # Se não há módulo atual, define o primeiro
             if not progress.current_module_id:
-                if learning_path.modules:
-                    first_module = min(learning_path.modules, key=lambda x: x.order)
+                first_module = index.first_module()
+                if first_module:
                     progress.current_module_id = first_module.id
                     self.repository.update_progress(progress)
                 return
             
-            # Encontra o módulo atual
-            current_module = None
-            for module in learning_path.modules:
-                if module.id == progress.current_module_id:
-                    current_module = module
-                    break
-            
-            if not current_module:
-                return
-            
             # Verifica se o módulo atual foi concluído
-            module_missions = [mission.id for mission in current_module.missions]
-            completed_module_missions = [mid for mid in progress.completed_missions if mid in module_missions]
-            
-            if len(completed_module_missions) == len(module_missions):
+            if index.is_module_complete(progress.current_module_id, index.progress_bits(progress)):
                 # Módulo concluído, avança para o próximo
-                next_module = None
-                for module in learning_path.modules:
-                    if module.order > current_module.order and module.id not in progress.completed_modules:
-                        next_module = module
-                        break
+                next_module = index.next_module(progress.current_module_id, set(progress.completed_modules))
                 
                 if next_module:
                     progress.current_module_id = next_module.id
@@ -895,8 +884,9 @@ class LearningPathService:
                 return None
             
             # Encontra o próximo módulo não concluído
-            for module in sorted(learning_path.modules, key=lambda x: x.order):
-                if module.id not in progress.completed_modules:
+            completed_modules = set(progress.completed_modules)
+            for module in get_path_index(learning_path).modules:
+                if module.id not in completed_modules:
                     return {
                         "id": module.id,
                         "name": module.name,
@@ -924,6 +914,8 @@ class LearningPathService:
         # Cache miss - buscar do repositório
         path = self.repository.get_learning_path_by_id(path_id)
         if path:
+            # Índice compilado uma vez, junto com a trilha em cache
+            get_path_index(path)
             # Cachear por 10 minutos
             cache.set(cache_key, path, ttl_seconds=600)
         
@@ -931,11 +923,7 @@ class LearningPathService:
     
     async def _find_mission_in_path(self, learning_path: LearningPath, mission_id: str):
         """Encontra missão na trilha"""
-        for module in learning_path.modules:
-            for mission in module.missions:
-                if mission.id == mission_id:
-                    return mission
-        return None
+        return get_path_index(learning_path).find_mission(mission_id)
     
     async def _calculate_mission_score_fast(self, mission, submission):
         """Calcula score da missão de forma otimizada"""
@@ -1021,7 +1009,8 @@ class LearningPathService:
         score: float, 
         success: bool,
         points: int,
-        xp: int
+        xp: int,
+        learning_path: Optional[LearningPath] = None
     ) -> Optional[UserPathProgress]:
         """
         ⚡ OTIMIZAÇÃO CRÍTICA: Batch write para atualizar progresso E perfil em 1 operação!
@@ -1064,6 +1053,7 @@ class LearningPathService:
             
             # Aguardar progresso
             progress = await progress_future
+            is_new_progress = progress is None
             
             if not progress:
                 progress = UserPathProgress(
@@ -1076,12 +1066,20 @@ class LearningPathService:
                     total_score=0
                 )
             
-            # Preparar atualizações
+            # Preparar atualizações (só os campos alterados quando o documento já existe)
+            progress_updates: Dict[str, Any] = {}
             if success and mission_id not in progress.completed_missions:
+                if learning_path:
+                    # Bitset lido antes de incluir a missão na lista: um OR, sem recodificar
+                    index = get_path_index(learning_path)
+                    bits = index.progress_bits(progress) | index.mission_bit(mission_id)
+                    progress_updates.update(index.store_bits(progress, bits))
                 progress.completed_missions.append(mission_id)
+                progress_updates["completed_missions"] = firestore.ArrayUnion([mission_id])
             
             if success:
                 progress.total_score += int(score)
+                progress_updates["total_score"] = firestore.Increment(int(score))
             
             # Calcular novos valores de pontos e XP
             current_points = user.points if user else 0
@@ -1093,10 +1091,13 @@ class LearningPathService:
             db = await get_firestore_db_async()
             batch = db.batch()
             
-            # Adicionar update de progresso ao batch
+            # Adicionar update de progresso ao batch: documento completo só na criação
             progress_doc_id = f"{user_id}_{path_id}"
             progress_ref = db.collection("user_path_progress").document(progress_doc_id)
-            batch.set(progress_ref, progress.model_dump(), merge=True)
+            if is_new_progress:
+                batch.set(progress_ref, progress.model_dump())
+            elif progress_updates:
+                batch.update(progress_ref, progress_updates)
             
             # Adicionar update de perfil ao batch
             user_ref = db.collection("users").document(user_id)
@@ -1105,8 +1106,40 @@ class LearningPathService:
                 'xp': new_total_xp
             }, merge=True)
             
+            # Registro no ledger de recompensas (rankings semanal/mensal); tipo próprio
+            # para não contar como nota de quiz (a recompensa do módulo já é gravada
+            # pelo award_mission_completion em background)
+            if points or xp:
+                reward_ref = db.collection("user_rewards").document()
+                batch.set(reward_ref, UserReward(
+                    user_id=user_id,
+                    reward_type=RewardType.LEARNING_PATH_PROGRESS,
+                    points_earned=points,
+                    xp_earned=xp,
+                    context={'path_id': path_id, 'mission_id': mission_id},
+                    earned_at=datetime.now(UTC)
+                ).model_dump())
+            
             # ⚡ Commit batch - 1 operação apenas!
             await batch.commit()
+            if points or xp:
+                # Ranking e badges reagem ao evento fora do caminho da requisição
+                self.event_bus.emit_nowait(PointsEarnedEvent(
+                    user_id=user_id,
+                    points_earned=points,
+                    xp_earned=xp,
+                    total_points=new_total_points,
+                    total_xp=new_total_xp,
+                    source="learning_path"
+                ))
+            if success:
+                # Ranking da trilha acompanha a pontuação acumulada
+                self.event_bus.emit_nowait(LearningPathProgressEvent(
+                    user_id=user_id,
+                    learning_path_id=path_id,
+                    total_score=progress.total_score,
+                    mission_id=mission_id
+                ))
             
             # Invalidar caches
             cache.invalidate(cache_key)
@@ -1138,8 +1171,14 @@ class LearningPathService:
     # ========== MÉTODOS PARA PROCESSAMENTO EM BACKGROUND ==========
     
     async def _process_ai_insights_background(self, user_id: str, path_id: str, mission_id: str, 
-                                             submission, score: float, success: bool):
-        """Processa insights de IA em background"""
+                                             submission, score: float, success: bool,
+                                             insights_id: Optional[str] = None):
+        """
+        Processa insights de IA em background.
+
+        `insights_id` é gerado na submissão: retries gravam o mesmo documento em
+        vez de um novo por tentativa. Tarefas persistidas antes dele usam o horário.
+        """
         try:
             logger.info(f"🤖 [BACKGROUND] Processando insights de IA para usuário {user_id}")
             
@@ -1170,7 +1209,7 @@ class LearningPathService:
             }
             
             await db.collection("ai_insights").document(
-                f"{user_id}_{mission_id}_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
+                insights_id or f"{user_id}_{mission_id}_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}"
             ).set(insights_doc)
             
             logger.info(f"✅ [BACKGROUND] Insights de IA processados para usuário {user_id}")
@@ -1178,11 +1217,18 @@ class LearningPathService:
             
         except Exception as e:
             logger.error(f"❌ [BACKGROUND] Erro ao processar insights de IA: {e}")
-            return None
+            # Propagar para o BackgroundTaskService aplicar retry/dead-letter
+            raise
     
     async def _process_badges_background(self, user_id: str, path_id: str, mission_id: str, 
-                                        score: float, success: bool):
-        """Processa verificação e concessão de badges em background"""
+                                        score: float, success: bool, reward_id: Optional[str] = None):
+        """
+        Processa verificação e concessão de badges em background.
+
+        `reward_id` é gerado na submissão e vai nos argumentos da tarefa: retries,
+        a fila durável e o redrive reexecutam com o mesmo ID e a recompensa não
+        é creditada de novo. Tarefas persistidas antes dele seguem sem a chave.
+        """
         try:
             logger.info(f"🏆 [BACKGROUND] Verificando badges para usuário {user_id}")
             
@@ -1196,7 +1242,8 @@ class LearningPathService:
                     user_id=user_id,
                     mission_id=mission_id,
                     score=score,
-                    mission_type='learning_path'
+                    mission_type='learning_path',
+                    reward_id=reward_id
                 )
                 
                 logger.info(f"✅ [BACKGROUND] Badges verificados: {reward_result}")
@@ -1204,7 +1251,8 @@ class LearningPathService:
             
         except Exception as e:
             logger.error(f"❌ [BACKGROUND] Erro ao processar badges: {e}")
-            return None
+            # Propagar para o BackgroundTaskService aplicar retry/dead-letter
+            raise
     
     async def _process_events_background(self, user_id: str, path_id: str, mission_id: str, 
                                         score: float, success: bool):
@@ -1235,9 +1283,10 @@ class LearningPathService:
                 progress = self.repository.get_user_progress(user_id, path_id)
                 
                 if learning_path and progress:
-                    total_missions = sum(len(module.missions) for module in learning_path.modules)
+                    index = get_path_index(learning_path)
+                    total_missions = index.total_missions
                     
-                    if len(progress.completed_missions) >= total_missions and not progress.completed_at:
+                    if index.is_path_complete(index.progress_bits(progress)) and not progress.completed_at:
                         # Trilha completada!
                         progress.completed_at = datetime.now(UTC)
                         progress.progress_percentage = 100.0
@@ -1260,4 +1309,37 @@ class LearningPathService:
             
         except Exception as e:
             logger.error(f"❌ [BACKGROUND] Erro ao processar eventos: {e}")
-            return None
\ No newline at end of file
+            # Propagar para o BackgroundTaskService aplicar retry/dead-letter
+            raise
+
+
+async def register_background_task_handlers():
+    """
+    Registra os handlers das tarefas de conclusão de missão no
+    BackgroundTaskService, para que tarefas da fila durável possam ser
+    reexecutadas após um restart (a instância original do service não
+    sobrevive ao processo).
+    """
+    db_client = await get_firestore_db_async()
+    reward_service = RewardService(
+        get_user_repository(),
+        RewardRepository(db_client),
+        get_badge_repository(),
+        db_client
+    )
+    service = LearningPathService(reward_service=reward_service)
+    background_service = get_background_service()
+    
+    handlers = {
+        "ai_insights_generation": (service._process_ai_insights_background, AI_INSIGHTS_TASK_RETRY),
+        "badge_verification": (service._process_badges_background, BADGE_TASK_RETRY),
+        "badge_verification_simple": (service._process_badges_background, BADGE_TASK_RETRY),
+        "events_and_rankings": (service._process_events_background, EVENTS_TASK_RETRY),
+        "events_simple": (service._process_events_background, EVENTS_TASK_RETRY),
+    }
+    
+    for task_name, (handler, retry_policy) in handlers.items():
+        background_service.register_task_handler(task_name, handler)
+        background_service.register_retry_policy(task_name, retry_policy)
+    
+    logger.info(f"✅ {len(handlers)} handlers de tarefas em background registrados")
\ No newline at end of file
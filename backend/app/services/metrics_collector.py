@@ -11,6 +11,15 @@ from typing import Dict, Any, List, Optional
 from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from app.core.logging_config import get_cryptoquest_logger, LogCategory
+from app.services.sharded_counter import (
+    COUNTER_BADGES_AWARDED,
+    COUNTER_LEARNING_PATHS_COMPLETED,
+    COUNTER_MISSIONS_COMPLETED,
+    COUNTER_POINTS_DISTRIBUTED,
+    COUNTER_USERS,
+    COUNTER_XP_DISTRIBUTED,
+    get_sharded_counters,
+)
 import json
 import os
 
@@ -41,6 +50,7 @@ class APIMetrics:
 @dataclass
 class BusinessMetrics:
     """Métricas de negócio"""
+    total_users: int = 0
     missions_completed: int = 0
     learning_paths_completed: int = 0
     badges_awarded: int = 0
@@ -155,66 +165,42 @@ class MetricsCollector:
             logger.error(f"Erro ao coletar métricas de sistema: {e}")
     
     async def _collect_business_metrics(self):
-        """Coleta métricas de negócio dos logs"""
+        """Coleta métricas de negócio (totais globais dos contadores distribuídos)"""
         try:
             # Resetar métricas diárias se necessário
             if datetime.now(UTC).hour == 0 and datetime.now(UTC).minute < 5:
                 self.business_metrics.daily_active_users.clear()
             
-            # Ler logs de negócio para extrair métricas
-            await self._analyze_business_logs()
+            # Totais de todos os workers, incrementados na escrita
+            await self._read_business_counters()
             
-        except Exception as e:
-            logger.error(f"Erro ao coletar métricas de negócio: {e}")
-    
-    async def _analyze_business_logs(self):
-        """Analisa logs de negócio para extrair métricas"""
-        try:
-            business_logs_dir = "logs/business"
-            if not os.path.exists(business_logs_dir):
-                return
-            
-            # Analisar logs de eventos
-            events_file = os.path.join(business_logs_dir, "events.log")
-            if os.path.exists(events_file):
-                await self._analyze_events_log(events_file)
-            
-            # Analisar logs de ações do usuário
-            actions_file = os.path.join(business_logs_dir, "user-actions.log")
+            # Usuários ativos ainda vêm do log de ações
+            actions_file = os.path.join("logs/business", "user-actions.log")
             if os.path.exists(actions_file):
                 await self._analyze_user_actions_log(actions_file)
-                
+            
         except Exception as e:
-            logger.error(f"Erro ao analisar logs de negócio: {e}")
+            logger.error(f"Erro ao coletar métricas de negócio: {e}")
     
-    async def _analyze_events_log(self, file_path: str):
-        """Analisa arquivo de eventos de negócio"""
+    async def _read_business_counters(self):
+        """Lê os totais de negócio (soma dos shards, com cache do serviço de contadores)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            data = json.loads(line.strip())
-                            message = data.get('message', '')
-                            context = data.get('context', {})
-                            
-                            if 'mission_completion' in message:
-                                self.business_metrics.missions_completed += 1
-                                if 'points_earned' in context:
-                                    self.business_metrics.points_distributed += context.get('points_earned', 0)
-                                if 'xp_earned' in context:
-                                    self.business_metrics.xp_distributed += context.get('xp_earned', 0)
-                            
-                            elif 'learning_path_completed' in message:
-                                self.business_metrics.learning_paths_completed += 1
-                            
-                            elif 'badge_awarded' in message:
-                                self.business_metrics.badges_awarded += 1
-                                
-                        except json.JSONDecodeError:
-                            continue
+            totals = await asyncio.to_thread(get_sharded_counters().get_many, [
+                COUNTER_USERS,
+                COUNTER_MISSIONS_COMPLETED,
+                COUNTER_LEARNING_PATHS_COMPLETED,
+                COUNTER_BADGES_AWARDED,
+                COUNTER_POINTS_DISTRIBUTED,
+                COUNTER_XP_DISTRIBUTED
+            ])
+            self.business_metrics.total_users = totals[COUNTER_USERS]
+            self.business_metrics.missions_completed = totals[COUNTER_MISSIONS_COMPLETED]
+            self.business_metrics.learning_paths_completed = totals[COUNTER_LEARNING_PATHS_COMPLETED]
+            self.business_metrics.badges_awarded = totals[COUNTER_BADGES_AWARDED]
+            self.business_metrics.points_distributed = totals[COUNTER_POINTS_DISTRIBUTED]
+            self.business_metrics.xp_distributed = totals[COUNTER_XP_DISTRIBUTED]
         except Exception as e:
-            logger.error(f"Erro ao analisar log de eventos: {e}")
+            logger.error(f"Erro ao ler contadores de negócio: {e}")
     
     async def _analyze_user_actions_log(self, file_path: str):
         """Analisa arquivo de ações do usuário"""
@@ -316,6 +302,7 @@ class MetricsCollector:
                     for endpoint, m in self.api_metrics.items()
                 },
                 "business_metrics": {
+                    "total_users": self.business_metrics.total_users,
                     "missions_completed": self.business_metrics.missions_completed,
                     "learning_paths_completed": self.business_metrics.learning_paths_completed,
                     "badges_awarded": self.business_metrics.badges_awarded,
@@ -397,6 +384,7 @@ class MetricsCollector:
                 for endpoint, m in self.api_metrics.items()
             },
             "business_metrics": {
+                "total_users": self.business_metrics.total_users,
                 "missions_completed": self.business_metrics.missions_completed,
                 "learning_paths_completed": self.business_metrics.learning_paths_completed,
                 "badges_awarded": self.business_metrics.badges_awarded,
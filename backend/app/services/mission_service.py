@@ -343,7 +343,9 @@ class MissionService:
                     score=score_percentage,
                     mission_type=mission_type,
                     points_earned=mission_data.get("reward_points", 0) or 0,
-                    xp_earned=mission_data.get("reward_xp", 0) or 0
+                    xp_earned=mission_data.get("reward_xp", 0) or 0,
+                    total_points=new_points,
+                    total_xp=new_xp
                 )
                 await self.event_bus.emit(mission_event)
                 logger.info(f"Evento de missão completada emitido: {mission_id}")
@@ -0,0 +1,284 @@
+"""
+Materializador de snapshots de ranking.
+Gera periodicamente os rankings completos (global, semanal, mensal, por nível
+e por trilha) fora do caminho das requisições e publica cada um como páginas
+em documentos separados mais um manifesto, trocando o ponteiro "atual" no fim.
+Também grava cada ranking no formato colunar local, mapeado pelos workers.
+"""
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, UTC
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.models.ranking import RankingType
+from app.repositories.ranking_repository import get_ranking_repository
+from app.repositories.user_repository import get_user_repository
+from app.services.leaderboard_index import LeaderboardIndex
+from app.services.leaderboard_service import WINDOW_DAYS, LeaderboardService, get_leaderboard_service, ranking_entries
+from app.services.ranking_snapshot_file import LocalSnapshotStore, get_local_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+# (tipo, período, índice) de cada ranking a materializar
+BoardSource = Tuple[RankingType, str, LeaderboardIndex]
+
+# Campos publicados nas páginas: os snapshots são servidos a qualquer usuário,
+# então dados privados do perfil (ex.: email) ficam de fora
+PUBLIC_ENTRY_FIELDS = frozenset({
+    "user_id", "name", "points", "xp", "level", "rank", "score", "avatar_url", "badges", "last_activity"
+})
+
+
+class RankingMaterializer:
+    """
+    Publica snapshots consistentes dos rankings no Firestore.
+
+    Cada snapshot é lido do índice em memória de uma vez (sob o lock do
+    índice), dividido em páginas de `page_size` entradas e escrito antes da
+    troca do ponteiro. Um lease no Firestore garante que só um worker do
+    gunicorn materializa por vez.
+    """
+
+    def __init__(
+        self,
+        leaderboard: LeaderboardService,
+        ranking_repo_factory: Callable[[], Any],
+        user_repo_factory: Callable[[], Any],
+        page_size: int = 100,
+        interval_seconds: float = 600.0,
+        local_store: Optional[LocalSnapshotStore] = None
+    ):
+        self.leaderboard = leaderboard
+        self._ranking_repo_factory = ranking_repo_factory
+        self._user_repo_factory = user_repo_factory
+        self.page_size = page_size
+        self.interval_seconds = interval_seconds
+        self.local_store = local_store
+        self.owner_id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {
+            "runs": 0,
+            "skipped_runs": 0,
+            "failed_runs": 0,
+            "snapshots_published": 0,
+            "snapshots_deleted": 0,
+            "local_snapshots_written": 0,
+            "last_run_at": None,
+            "last_duration_ms": 0.0
+        }
+
+        logger.info(f"📸 RankingMaterializer inicializado (a cada {interval_seconds:.0f}s, páginas de {page_size})")
+
+    def collect_boards(self) -> Dict[str, BoardSource]:
+        """Rankings a materializar, indexados pelo nome usado no ponteiro"""
+        boards: Dict[str, BoardSource] = {
+            "global": (RankingType.GLOBAL, "all_time", self.leaderboard.global_index)
+        }
+
+        for window in WINDOW_DAYS:
+            start_day, end_day = self.leaderboard.get_window_bounds(window)
+            boards[window] = (
+                RankingType(window),
+                f"{start_day.isoformat()}_{end_day.isoformat()}",
+                self.leaderboard.get_window_index(window)
+            )
+
+        for level, index in sorted(self.leaderboard.get_level_indexes().items()):
+            boards[f"level_{level}"] = (RankingType.LEVEL_BASED, f"level_{level}", index)
+
+        for path_id, index in sorted(self.leaderboard.get_path_indexes().items()):
+            boards[f"path_{path_id}"] = (RankingType.LEARNING_PATH, path_id, index)
+
+        return boards
+
+    def build_snapshot(
+        self,
+        board: str,
+        source: BoardSource,
+        generated_at: datetime
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Monta manifesto e páginas de um ranking.
+
+        Returns:
+            (manifesto, lista de páginas)
+        """
+        ranking_type, period, index = source
+        snapshot_id = f"{board}_{generated_at:%Y%m%d%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+        # Uma única leitura do índice: todas as páginas vêm do mesmo estado
+        entries = ranking_entries(index, 0, len(index))
+        total_users = len(entries)
+        page_count = max(1, math.ceil(total_users / self.page_size))
+
+        manifest = {
+            "snapshot_id": snapshot_id,
+            "board": board,
+            "type": ranking_type.value,
+            "period": period,
+            "total_users": total_users,
+            "page_size": self.page_size,
+            "page_count": page_count,
+            "generated_at": generated_at
+        }
+        chunks = [
+            {
+                **manifest,
+                "page": page,
+                "entries": [
+                    entry.model_dump(include=PUBLIC_ENTRY_FIELDS)
+                    for entry in entries[page * self.page_size:(page + 1) * self.page_size]
+                ]
+            }
+            for page in range(page_count)
+        ]
+        return manifest, chunks
+
+    async def materialize_once(self) -> Dict[str, int]:
+        """
+        Materializa todos os rankings (se este processo detém o lease).
+
+        Returns:
+            Total de usuários por ranking publicado (vazio se não materializou)
+        """
+        await self.leaderboard.ensure_loaded(self._user_repo_factory())
+        return await asyncio.to_thread(self._materialize_sync)
+
+    def write_local_snapshots(self, boards: Dict[str, BoardSource], generated_at: datetime) -> int:
+        """
+        Grava os rankings no diretório local compartilhado pelos workers.
+
+        O lease do Firestore elege um worker no cluster; aqui a eleição é por
+        máquina (lock de arquivo) e quem chega com um snapshot ainda recente
+        não regrava.
+
+        Returns:
+            Quantidade de rankings gravados
+        """
+        if self.local_store is None:
+            return 0
+
+        written = 0
+        with self.local_store.writer_lock() as acquired:
+            age = self.local_store.age_seconds("global")
+            if not acquired or (age is not None and age < self.interval_seconds / 2):
+                return 0
+
+            for board, (ranking_type, period, index) in boards.items():
+                try:
+                    rows = index.page(0, len(index))
+                    self.local_store.write(board, rows, {
+                        "snapshot_id": f"{board}_{generated_at:%Y%m%d%H%M%S}_local",
+                        "type": ranking_type.value,
+                        "period": period,
+                        "total_users": len(rows),
+                        "page_size": self.page_size,
+                        "generated_at": generated_at.isoformat()
+                    })
+                    written += 1
+                except Exception as e:
+                    logger.error(f"Erro ao gravar snapshot local do ranking {board}: {e}")
+
+        self.metrics["local_snapshots_written"] += written
+        return written
+
+    def _materialize_sync(self) -> Dict[str, int]:
+        generated_at = datetime.now(UTC)
+        boards = self.collect_boards()
+        # Cópia local independe do lease: cada máquina precisa da sua
+        self.write_local_snapshots(boards, generated_at)
+
+        ranking_repo = self._ranking_repo_factory()
+        # Lease mais longo que o intervalo: o dono renova a cada execução
+        if not ranking_repo.try_acquire_lease("materializer", self.owner_id, self.interval_seconds * 1.5):
+            self.metrics["skipped_runs"] += 1
+            logger.debug("Materialização de rankings ignorada: outro processo detém o lease")
+            return {}
+
+        started = time.perf_counter()
+        published = {}
+
+        for board, source in boards.items():
+            try:
+                manifest, chunks = self.build_snapshot(board, source, generated_at)
+                ranking_repo.write_snapshot_chunks(manifest["snapshot_id"], chunks)
+                ranking_repo.write_snapshot_manifest(manifest)
+                stale_snapshot_id = ranking_repo.swap_current_snapshot(board, manifest)
+                published[board] = manifest["total_users"]
+                self.metrics["snapshots_published"] += 1
+
+                if stale_snapshot_id:
+                    ranking_repo.delete_snapshot(stale_snapshot_id)
+                    self.metrics["snapshots_deleted"] += 1
+            except Exception as e:
+                logger.error(f"Erro ao materializar ranking {board}: {e}")
+
+        self.metrics["runs"] += 1
+        self.metrics["last_run_at"] = generated_at.isoformat()
+        self.metrics["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"📸 {len(published)} rankings materializados em {self.metrics['last_duration_ms']}ms")
+        return published
+
+    async def start(self):
+        """Agenda a materialização periódica"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info("✅ Materialização de rankings agendada")
+
+    async def stop(self):
+        """Para a materialização periódica"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.materialize_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics["failed_runs"] += 1
+                logger.error(f"Erro na materialização de rankings: {e}")
+
+            await asyncio.sleep(self.interval_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas do materializador"""
+        return {**self.metrics, "owner_id": self.owner_id, "running": self._task is not None}
+
+
+# Instância global do materializador
+_materializer_instance: Optional[RankingMaterializer] = None
+_materializer_lock = threading.Lock()
+
+
+def get_ranking_materializer() -> RankingMaterializer:
+    """Retorna instância singleton do RankingMaterializer"""
+    global _materializer_instance
+
+    if _materializer_instance is None:
+        with _materializer_lock:
+            if _materializer_instance is None:
+                _materializer_instance = RankingMaterializer(
+                    leaderboard=get_leaderboard_service(),
+                    ranking_repo_factory=get_ranking_repository,
+                    user_repo_factory=get_user_repository,
+                    page_size=int(os.getenv("RANKING_SNAPSHOT_PAGE_SIZE", "100")),
+                    interval_seconds=float(os.getenv("RANKING_SNAPSHOT_INTERVAL_SECONDS", "600")),
+                    local_store=get_local_snapshot_store()
+                )
+
+    return _materializer_instance
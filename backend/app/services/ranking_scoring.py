@@ -0,0 +1,88 @@
+"""
+Cálculo vetorizado do score de ranking.
+Extrai colunas NumPy das linhas projetadas de usuários e calcula score e
+ordem de todos os usuários de uma vez, sem laços Python por usuário.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+# Fórmula do score de ranking
+STREAK_BONUS_PER_DAY = 10
+STREAK_BONUS_CAP = 200
+DIVERSITY_BONUS_PER_PATH = 50
+QUALITY_BONUS_FACTOR = 2
+
+# Campos do perfil lidos pelo ranking (projeção da consulta de usuários)
+SCORE_FIELDS = ["points", "xp", "current_streak", "completed_learning_paths", "average_score"]
+
+
+@dataclass
+class ScoreColumns:
+    """Colunas do ranking, uma posição por usuário (mesma ordem das linhas)"""
+    user_ids: np.ndarray
+    points: np.ndarray
+    xp: np.ndarray
+    current_streak: np.ndarray
+    completed_paths: np.ndarray
+    average_score: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+
+def _count(value: Any) -> int:
+    """completed_learning_paths pode vir como lista de IDs ou contagem"""
+    if isinstance(value, (list, tuple, set, dict)):
+        return len(value)
+    return int(value or 0)
+
+
+def extract_score_columns(rows: Sequence[Dict[str, Any]], id_field: str = "uid") -> ScoreColumns:
+    """Monta as colunas a partir das linhas projetadas (campos ausentes valem 0)"""
+    count = len(rows)
+    return ScoreColumns(
+        user_ids=np.array([row[id_field] for row in rows], dtype=str),
+        points=np.fromiter((row.get("points") or 0 for row in rows), dtype=np.int64, count=count),
+        xp=np.fromiter((row.get("xp") or 0 for row in rows), dtype=np.int64, count=count),
+        current_streak=np.fromiter((row.get("current_streak") or 0 for row in rows), dtype=np.int64, count=count),
+        completed_paths=np.fromiter(
+            (_count(row.get("completed_learning_paths")) for row in rows), dtype=np.int64, count=count
+        ),
+        average_score=np.fromiter((row.get("average_score") or 0.0 for row in rows), dtype=np.float64, count=count)
+    )
+
+
+def bonus_formula(current_streak, completed_paths, average_score):
+    """
+    Bônus de consistência (streak), diversidade (trilhas) e qualidade (nota
+    média). Aceita arrays NumPy ou escalares.
+    """
+    streak_bonus = np.minimum(np.asarray(current_streak, dtype=np.int64) * STREAK_BONUS_PER_DAY, STREAK_BONUS_CAP)
+    diversity_bonus = np.asarray(completed_paths, dtype=np.int64) * DIVERSITY_BONUS_PER_PATH
+    quality_bonus = np.rint(np.asarray(average_score, dtype=np.float64) * QUALITY_BONUS_FACTOR).astype(np.int64)
+    return streak_bonus + diversity_bonus + quality_bonus
+
+
+def compute_bonuses(columns: ScoreColumns) -> np.ndarray:
+    """Bônus de todos os usuários"""
+    return bonus_formula(columns.current_streak, columns.completed_paths, columns.average_score)
+
+
+def compute_ranking_scores(columns: ScoreColumns) -> np.ndarray:
+    """Score de ranking: pontos + XP + bônus"""
+    return columns.points + columns.xp + compute_bonuses(columns)
+
+
+def rank_order(scores: np.ndarray, user_ids: np.ndarray) -> np.ndarray:
+    """
+    Índices das linhas em ordem de ranking: score decrescente, empate por
+    user_id crescente (determinístico, mesma ordem do LeaderboardIndex).
+    """
+    return np.lexsort((user_ids, -scores))
+
+
+def ranking_bonus(current_streak: int = 0, completed_paths: Any = 0, average_score: float = 0.0) -> int:
+    """Bônus de um único usuário (mesma fórmula da versão vetorizada)"""
+    return int(bonus_formula(current_streak or 0, _count(completed_paths), average_score or 0.0))
@@ -1,25 +1,44 @@
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta, UTC
+import asyncio
+import math
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, UTC
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
 from app.models.ranking import Ranking, RankingEntry, RankingType, UserRankingStats
-from app.models.user import UserProfile
 from app.repositories.user_repository import UserRepository, get_user_repository
 from app.repositories.ranking_repository import RankingRepository, get_ranking_repository
 from app.services.advanced_cache_service import get_advanced_cache
+from app.services.leaderboard_index import LeaderboardIndex
+from app.services.leaderboard_service import LeaderboardService, get_leaderboard_service, ranking_entries, ranking_window_tags
+from app.services.ranking_snapshot_file import LocalSnapshotStore, get_local_snapshot_store
 from fastapi import Depends
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RankingService:
-    def __init__(self, user_repo: UserRepository, ranking_repo: RankingRepository):
+    def __init__(
+        self,
+        user_repo: UserRepository,
+        ranking_repo: RankingRepository,
+        leaderboard: Optional[LeaderboardService] = None,
+        local_snapshots: Optional[LocalSnapshotStore] = None
+    ):
         self.user_repo = user_repo
         self.ranking_repo = ranking_repo
         self.cache = get_advanced_cache()
+        self.leaderboard = leaderboard or get_leaderboard_service()
+        self.local_snapshots = local_snapshots or get_local_snapshot_store()
 
-    async def generate_global_ranking(self, limit: int = 100, offset: int = 0) -> Ranking:
-        """Gera ranking global de usuários com cache e paginação otimizada"""
+    async def generate_global_ranking(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Ranking:
+        """
+        Gera ranking global a partir do leaderboard em memória (O(log n + limit)).
+
+        Com `cursor` (token `next_cursor` da página anterior) a página começa
+        logo após o último usuário entregue e `offset` é ignorado.
+        """
         try:
-            cache_key = f"global_ranking_{limit}_{offset}"
+            after = self._decode_ranking_cursor(cursor) if cursor else None
+            cache_key = f"global_ranking_{limit}_{cursor or offset}"
             
             # Tentar buscar do cache primeiro
             cached_ranking = await self.cache.get(cache_key)
@@ -27,179 +46,318 @@ class RankingService:
                 logger.debug(f"Cache hit para ranking global (limit: {limit}, offset: {offset})")
                 return cached_ranking
             
-            # Buscar usuários com paginação otimizada
-            users = self.user_repo.get_users_paginated(limit=limit * 2, offset=offset)
-            
-            if not users:
-                empty_ranking = Ranking(
-                    type=RankingType.GLOBAL,
-                    period="all_time",
-                    entries=[],
-                    total_users=0,
-                    generated_at=datetime.now(UTC),
-                    context={"offset": offset, "limit": limit}
-                )
-                # Cache resultado vazio por 5 minutos
-                await self.cache.set(cache_key, empty_ranking, ttl_seconds=300, tags=["ranking", "global"])
-                return empty_ranking
-            
-            # Calcular score de ranking para cada usuário
-            ranking_entries = []
-            for user in users:
-                score = await self._calculate_ranking_score(user)
-                entry = RankingEntry(
-                    user_id=user.uid,
-                    name=user.name,
-                    email=user.email,
-                    points=user.points,
-                    xp=user.xp,
-                    level=user.level,
-                    rank=0,  # Será definido após ordenação
-                    badges=user.badges,
-                    last_activity=user.register_date
-                )
-                ranking_entries.append(entry)
-
-            # Ordenar por score de ranking
-            ranking_entries.sort(key=lambda x: x.xp + x.points, reverse=True)
+            await self.leaderboard.ensure_loaded(self.user_repo)
+            index = self.leaderboard.global_index
             
-            # Definir ranks baseados no offset
-            for i, entry in enumerate(ranking_entries[:limit]):
-                entry.rank = offset + i + 1
-
-            # Obter total de usuários para contexto
-            total_users = await self._get_total_users_count()
+            # Página exata do ranking: posições offset+1 até offset+limit
+            entries = ranking_entries(index, offset, limit, after=after)
+            total_users = len(index)
 
             ranking = Ranking(
                 type=RankingType.GLOBAL,
                 period="all_time",
-                entries=ranking_entries[:limit],
+                entries=entries,
                 total_users=total_users,
                 generated_at=datetime.now(UTC),
-                context={"offset": offset, "limit": limit, "has_more": len(ranking_entries) > limit}
+                context=self._page_context(entries, total_users, limit, offset)
             )
-
-            # Salvar ranking apenas se for a primeira página (offset=0)
-            if offset == 0:
-                self.ranking_repo.save_ranking(ranking)
             
-            # Cache por 10 minutos
-            await self.cache.set(cache_key, ranking, ttl_seconds=600, tags=["ranking", "global"])
+            # Cache por 10 minutos; tags de janela permitem invalidar só as
+            # páginas afetadas quando um usuário muda de posição
+            first_rank = entries[0].rank if entries else offset + 1
+            await self.cache.set(
+                cache_key, ranking, ttl_seconds=600,
+                tags=["ranking", "global", *ranking_window_tags(first_rank, first_rank + limit - 1)]
+            )
             
-            logger.info(f"Ranking global gerado: {len(ranking_entries[:limit])} usuários (offset: {offset})")
+            logger.info(f"Ranking global gerado: {len(entries)} usuários (a partir do rank {first_rank})")
             return ranking
 
         except Exception as e:
             logger.error(f"Erro ao gerar ranking global: {e}")
             raise
 
-    async def generate_weekly_ranking(self, week_start: datetime) -> Ranking:
-        """Gera ranking semanal"""
+    async def generate_weekly_ranking(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Ranking:
+        """Gera ranking semanal (últimos 7 dias, somando os buckets diários de score)"""
+        return await self._generate_window_ranking(RankingType.WEEKLY, "weekly", limit, offset, cursor)
+
+    async def generate_monthly_ranking(self, limit: int = 100, offset: int = 0, cursor: Optional[str] = None) -> Ranking:
+        """Gera ranking mensal (últimos 31 dias, somando os buckets diários de score)"""
+        return await self._generate_window_ranking(RankingType.MONTHLY, "monthly", limit, offset, cursor)
+
+    async def _generate_window_ranking(
+        self,
+        ranking_type: RankingType,
+        window: str,
+        limit: int,
+        offset: int,
+        cursor: Optional[str] = None
+    ) -> Ranking:
+        """Página de um ranking por janela; só usuários que pontuaram no período"""
         try:
-            week_end = week_start + timedelta(days=7)
-            users = self.user_repo.get_users_by_activity_period(week_start, week_end)
+            after = self._decode_ranking_cursor(cursor) if cursor else None
+            cache_key = f"{window}_ranking_{limit}_{cursor or offset}"
             
-            # Implementar lógica específica para ranking semanal
-            ranking_entries = []
-            for user in users:
-                weekly_score = await self._calculate_weekly_score(user, week_start, week_end)
-                entry = RankingEntry(
-                    user_id=user.uid,
-                    name=user.name,
-                    email=user.email,
-                    points=weekly_score,
-                    xp=weekly_score,
-                    level=user.level,
-                    rank=0,
-                    badges=user.badges,
-                    last_activity=week_start
-                )
-                ranking_entries.append(entry)
-
-            ranking_entries.sort(key=lambda x: x.xp, reverse=True)
-            for i, entry in enumerate(ranking_entries):
-                entry.rank = i + 1
+            cached_ranking = await self.cache.get(cache_key)
+            if cached_ranking is not None:
+                logger.debug(f"Cache hit para ranking {window} (limit: {limit}, offset: {offset})")
+                return cached_ranking
+            
+            await self.leaderboard.ensure_loaded(self.user_repo)
+            index = self.leaderboard.get_window_index(window)
+            start_day, end_day = self.leaderboard.get_window_bounds(window)
+            
+            entries = ranking_entries(index, offset, limit, after=after)
+            total_users = len(index)
 
             ranking = Ranking(
-                type=RankingType.WEEKLY,
-                period=week_start.strftime("%Y-W%U"),
-                entries=ranking_entries,
-                total_users=len(users)
+                type=ranking_type,
+                period=f"{start_day.isoformat()}_{end_day.isoformat()}",
+                entries=entries,
+                total_users=total_users,
+                generated_at=datetime.now(UTC),
+                context={
+                    **self._page_context(entries, total_users, limit, offset),
+                    "start_date": start_day.isoformat(),
+                    "end_date": end_day.isoformat()
+                }
             )
+            
+            # Janelas mudam a cada recompensa: cache curto em vez de invalidação por evento
+            await self.cache.set(cache_key, ranking, ttl_seconds=60, tags=["ranking", window])
+            
+            logger.info(f"Ranking {window} gerado: {len(entries)} usuários")
+            return ranking
+
+        except Exception as e:
+            logger.error(f"Erro ao gerar ranking {window}: {e}")
+            raise
+
+    async def generate_level_ranking(
+        self,
+        level: int,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Ranking:
+        """Gera ranking dos usuários de um nível (partição em memória do leaderboard)"""
+        await self.leaderboard.ensure_loaded(self.user_repo)
+        return await self._generate_partition_ranking(
+            RankingType.LEVEL_BASED, f"level_{level}", f"level:{level}", self.leaderboard.get_level_index(level),
+            limit, offset, cursor, ttl_seconds=60
+        )
+
+    async def generate_learning_path_ranking(
+        self,
+        path_id: str,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Ranking:
+        """Gera ranking de uma trilha pela pontuação acumulada nela, sem consultar o Firestore"""
+        await self.leaderboard.ensure_loaded(self.user_repo)
+        return await self._generate_partition_ranking(
+            RankingType.LEARNING_PATH, path_id, f"path:{path_id}", self.leaderboard.get_path_index(path_id),
+            limit, offset, cursor, ttl_seconds=600
+        )
+
+    async def _generate_partition_ranking(
+        self,
+        ranking_type: RankingType,
+        period: str,
+        partition_tag: str,
+        index: Optional[LeaderboardIndex],
+        limit: int,
+        offset: int,
+        cursor: Optional[str],
+        ttl_seconds: int
+    ) -> Ranking:
+        """
+        Página de um ranking particionado (nível ou trilha).
+
+        Partições de nível mudam a cada recompensa e ficam pouco em cache; as
+        de trilha são invalidadas pelo evento de progresso (tag `path:<id>`).
+        """
+        try:
+            after = self._decode_ranking_cursor(cursor) if cursor else None
+            cache_key = f"{partition_tag}_ranking_{limit}_{cursor or offset}"
+
+            cached_ranking = await self.cache.get(cache_key)
+            if cached_ranking is not None:
+                logger.debug(f"Cache hit para ranking {partition_tag} (limit: {limit}, offset: {offset})")
+                return cached_ranking
+
+            entries = ranking_entries(index, offset, limit, after=after) if index is not None else []
+            total_users = len(index) if index is not None else 0
 
-            self.ranking_repo.save_ranking(ranking)
+            ranking = Ranking(
+                type=ranking_type,
+                period=period,
+                entries=entries,
+                total_users=total_users,
+                generated_at=datetime.now(UTC),
+                context=self._page_context(entries, total_users, limit, offset)
+            )
+
+            await self.cache.set(cache_key, ranking, ttl_seconds=ttl_seconds, tags=["ranking", partition_tag])
+
+            logger.info(f"Ranking {partition_tag} gerado: {len(entries)} usuários")
+            return ranking
+
+        except Exception as e:
+            logger.error(f"Erro ao gerar ranking {partition_tag}: {e}")
+            raise
+
+    @staticmethod
+    def _page_context(entries: List[RankingEntry], total_users: int, limit: int, offset: int) -> Dict[str, Any]:
+        """Metadados de paginação; `next_cursor` continua depois do último usuário"""
+        has_more = bool(entries) and entries[-1].rank < total_users
+        last = entries[-1] if entries else None
+        return {
+            "offset": entries[0].rank - 1 if entries else offset,
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": encode_cursor({"s": last.score, "u": last.user_id}) if has_more else None
+        }
+
+    @staticmethod
+    def _decode_ranking_cursor(cursor: str) -> Tuple[int, str]:
+        """(score, user_id) do último usuário da página anterior"""
+        values = decode_cursor(cursor)
+        try:
+            return int(values["s"]), str(values["u"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidCursorError(f"Cursor de ranking inválido: {e}") from e
+
+    async def get_ranking_snapshot_page(self, board: str, page: int = 0) -> Optional[Ranking]:
+        """
+        Página de um ranking materializado (global, weekly, monthly, level_N, path_ID).
+
+        Com o snapshot colunar local disponível, a página sai do arquivo
+        mapeado em memória. Senão, o ponteiro do snapshot atual no Firestore
+        fica 30s em cache; a página em si é uma única leitura de documento e,
+        por ser imutável, fica em cache até o snapshot ser substituído.
+        """
+        try:
+            local_snapshot = self.local_snapshots.open(board) if self.local_snapshots else None
+            if local_snapshot is not None:
+                return self._local_snapshot_page(local_snapshot, page)
+
+            pointer_key = f"ranking_snapshot_pointer:{board}"
+            pointer = await self.cache.get(pointer_key)
+            if pointer is None:
+                pointer = await asyncio.to_thread(self.ranking_repo.get_current_snapshot, board)
+                if pointer is None:
+                    return None
+                await self.cache.set(pointer_key, pointer, ttl_seconds=30, tags=["ranking", "snapshot"])
+
+            if page >= pointer["page_count"]:
+                return None
+
+            page_key = f"ranking_snapshot:{pointer['snapshot_id']}:{page}"
+            cached_page = await self.cache.get(page_key)
+            if cached_page is not None:
+                return cached_page
+
+            chunk = await asyncio.to_thread(self.ranking_repo.get_snapshot_chunk, pointer["snapshot_id"], page)
+            if chunk is None:
+                return None
+
+            ranking = Ranking(
+                type=chunk["type"],
+                period=chunk["period"],
+                # Snapshots não guardam email (nem os antigos são repassados)
+                entries=[RankingEntry(**{**entry, "email": ""}) for entry in chunk["entries"]],
+                total_users=chunk["total_users"],
+                generated_at=chunk["generated_at"],
+                context={
+                    "snapshot_id": chunk["snapshot_id"],
+                    "page": page,
+                    "page_size": chunk["page_size"],
+                    "page_count": chunk["page_count"],
+                    "has_more": page + 1 < chunk["page_count"]
+                }
+            )
+            await self.cache.set(page_key, ranking, ttl_seconds=3600, tags=["ranking", "snapshot"])
             return ranking
 
         except Exception as e:
-            logger.error(f"Erro ao gerar ranking semanal: {e}")
+            logger.error(f"Erro ao buscar snapshot do ranking {board}: {e}")
             raise
 
+    @staticmethod
+    def _local_snapshot_page(snapshot, page: int) -> Optional[Ranking]:
+        """Página de um snapshot colunar local (sem cache: a leitura já é da memória)"""
+        metadata = snapshot.metadata
+        page_size = metadata["page_size"]
+        page_count = max(1, math.ceil(len(snapshot) / page_size))
+        if page >= page_count:
+            return None
+
+        return Ranking(
+            type=metadata["type"],
+            period=metadata["period"],
+            entries=snapshot.page(page * page_size, page_size),
+            total_users=len(snapshot),
+            generated_at=metadata["generated_at"],
+            context={
+                "snapshot_id": metadata["snapshot_id"],
+                "page": page,
+                "page_size": page_size,
+                "page_count": page_count,
+                "has_more": page + 1 < page_count
+            }
+        )
+
+    def _rank_stats_from_local_snapshots(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Posições do usuário pelos snapshots locais, para quando o leaderboard
+        deste worker ainda não carregou (None se não há snapshot ou usuário).
+        """
+        global_snapshot = self.local_snapshots.open("global") if self.local_snapshots else None
+        global_rank = global_snapshot.rank_of(user_id) if global_snapshot is not None else None
+        if global_rank is None:
+            return None
+
+        def rank_in(board: str) -> int:
+            snapshot = self.local_snapshots.open(board)
+            return (snapshot.rank_of(user_id) or 0) if snapshot is not None else 0
+
+        total_users = len(global_snapshot)
+        return {
+            "global_rank": global_rank,
+            "level_rank": rank_in(f"level_{global_snapshot.level_at(global_rank)}"),
+            "weekly_rank": rank_in("weekly"),
+            "monthly_rank": rank_in("monthly"),
+            "total_users": total_users,
+            "percentile": round((total_users - global_rank + 1) / total_users * 100, 2)
+        }
+
     async def get_user_ranking_stats(self, user_id: str) -> UserRankingStats:
-        """Retorna estatísticas de ranking do usuário"""
+        """Retorna estatísticas de ranking do usuário (posições exatas via leaderboard)"""
         try:
-            global_ranking = self.ranking_repo.get_latest_ranking(RankingType.GLOBAL)
-            weekly_ranking = self.ranking_repo.get_latest_ranking(RankingType.WEEKLY)
-            
-            # Encontrar posição do usuário em cada ranking
-            global_rank = self._find_user_rank(global_ranking, user_id)
-            weekly_rank = self._find_user_rank(weekly_ranking, user_id)
-            
-            # Calcular percentil
-            total_users = global_ranking.total_users if global_ranking else 0
-            percentile = ((total_users - global_rank + 1) / total_users * 100) if total_users > 0 else 0
+            stats = None
+            if not self.leaderboard.loaded:
+                # Worker recém-iniciado: responde pelo snapshot compartilhado
+                stats = self._rank_stats_from_local_snapshots(user_id)
+            if stats is None:
+                await self.leaderboard.ensure_loaded(self.user_repo)
+                stats = self.leaderboard.get_rank_stats(user_id)
 
             return UserRankingStats(
                 user_id=user_id,
-                global_rank=global_rank,
-                weekly_rank=weekly_rank,
-                monthly_rank=0,  # Implementar
-                level_rank=0,    # Implementar
-                total_users=total_users,
-                percentile=percentile
+                global_rank=stats["global_rank"],
+                weekly_rank=stats["weekly_rank"],
+                monthly_rank=stats["monthly_rank"],
+                level_rank=stats["level_rank"],
+                total_users=stats["total_users"],
+                percentile=stats["percentile"]
             )
 
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas de ranking: {e}")
             raise
 
-    async def _calculate_ranking_score(self, user: UserProfile) -> int:
-        """Calcula score de ranking para o usuário"""
-        base_score = user.points + (user.xp if hasattr(user, 'xp') else 0)
-        
-        # Bônus por consistência (streak)
-        streak_bonus = min(user.current_streak * 10, 200) if hasattr(user, 'current_streak') else 0
-        
-        # Bônus por diversidade (diferentes trilhas)
-        diversity_bonus = len(user.completed_learning_paths) * 50 if hasattr(user, 'completed_learning_paths') else 0
-        
-        # Bônus por qualidade (scores altos)
-        quality_bonus = user.average_score * 2 if hasattr(user, 'average_score') else 0
-        
-        return base_score + streak_bonus + diversity_bonus + quality_bonus
-
-    async def _calculate_weekly_score(self, user: UserProfile, start: datetime, end: datetime) -> int:
-        """Calcula score semanal do usuário"""
-        # Implementar lógica específica para score semanal
-        return user.points  # Placeholder
-
-    async def _get_total_users_count(self) -> int:
-        """Obtém o total de usuários no sistema"""
-        try:
-            return self.user_repo.get_users_count()
-        except Exception as e:
-            logger.error(f"Erro ao obter contagem de usuários: {e}")
-            return 0
-
-    def _find_user_rank(self, ranking: Ranking, user_id: str) -> int:
-        """Encontra a posição do usuário no ranking"""
-        if not ranking:
-            return 0
-        
-        for entry in ranking.entries:
-            if entry.user_id == user_id:
-                return entry.rank
-        return 0
-
     async def invalidate_ranking_cache(self) -> None:
         """Invalida todo o cache de rankings"""
         try:
@@ -0,0 +1,330 @@
+"""
+Snapshots de ranking em formato binário colunar no disco local.
+Arrays de largura fixa (score, pontos, XP, nível, atividade) mais uma tabela
+de strings internadas (user_id, nome, badges). O arquivo é mapeado em memória
+(mmap) e compartilhado pelos workers do gunicorn via page cache do sistema:
+ler uma página não desserializa o ranking inteiro nem monta modelos extras.
+"""
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.ranking import RankingEntry
+from app.services.leaderboard_index import LeaderboardMember
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local): sem lock entre processos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CQRK"
+VERSION = 1
+# magic, versão, tamanho do cabeçalho JSON
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGN = 8
+
+# Uma linha por posição do ranking (rank = posição + 1); strings são índices
+# na tabela de strings. Email não é gravado: o ranking público não o exibe.
+ROW_DTYPE = np.dtype([
+    ("score", "<i8"),
+    ("points", "<i8"),
+    ("xp", "<i8"),
+    ("last_activity", "<f8"),
+    ("user", "<i4"),
+    ("name", "<i4"),
+    ("level", "<i4"),
+    ("badge_start", "<i4"),
+    ("badge_count", "<i4"),
+])
+
+_BOARD_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_snapshot_file(
+    path: str,
+    rows: Sequence[Tuple[int, LeaderboardMember, int]],
+    metadata: Dict[str, Any]
+) -> int:
+    """
+    Grava um ranking (linhas de `LeaderboardIndex.page`) no formato colunar.
+
+    O arquivo é escrito ao lado e trocado com os.replace: quem já tem o
+    antigo mapeado continua lendo-o até reabrir.
+
+    Returns:
+        Tamanho do arquivo em bytes
+    """
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value)
+        return index
+
+    count = len(rows)
+    table = np.zeros(count, dtype=ROW_DTYPE)
+    badge_refs: List[int] = []
+    columns: Dict[str, List[Any]] = {name: [] for name in ROW_DTYPE.names}
+    for _, member, score in rows:
+        columns["score"].append(score)
+        columns["points"].append(member.points)
+        columns["xp"].append(member.xp)
+        columns["last_activity"].append(member.last_activity.timestamp())
+        columns["user"].append(intern(member.user_id))
+        columns["name"].append(intern(member.name))
+        columns["level"].append(member.level)
+        columns["badge_start"].append(len(badge_refs))
+        columns["badge_count"].append(len(member.badges))
+        badge_refs.extend(intern(badge) for badge in member.badges)
+    for name, values in columns.items():
+        table[name] = values
+
+    # Posições ordenadas por user_id: rank de um usuário por busca binária
+    user_ids = np.array([strings[index] for index in columns["user"]], dtype=str)
+    by_user = np.argsort(user_ids, kind="stable").astype("<i4")
+
+    encoded = [value.encode("utf-8") for value in strings]
+    string_offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    np.cumsum([len(value) for value in encoded], out=string_offsets[1:])
+
+    sections = [
+        ("rows", table.tobytes()),
+        ("by_user", by_user.tobytes()),
+        ("badges", np.array(badge_refs, dtype="<i4").tobytes()),
+        ("string_offsets", string_offsets.tobytes()),
+        ("strings", b"".join(encoded)),
+    ]
+    layout, position = {}, 0
+    for name, data in sections:
+        layout[name] = position
+        position = _aligned(position + len(data))
+
+    header = json.dumps({
+        **metadata,
+        "count": count,
+        "string_count": len(strings),
+        "badge_refs": len(badge_refs),
+        "sections": layout
+    }, default=str).encode("utf-8")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+        data_start = f.tell()
+        for name, data in sections:
+            f.seek(data_start + layout[name])
+            f.write(data)
+        # Seções vazias no fim ainda precisam existir no arquivo para o mmap
+        size = data_start + position
+        f.truncate(size)
+    os.replace(temp_path, path)
+    return size
+
+
+class RankingSnapshotFile:
+    """
+    Leitor de um snapshot colunar mapeado em memória.
+
+    As colunas são views NumPy sobre o mmap (sem cópia); strings só são
+    decodificadas para as linhas efetivamente lidas.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_size = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Snapshot de ranking inválido: {path}")
+
+        self.metadata: Dict[str, Any] = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_size])
+        data_start = _aligned(_PREAMBLE.size + header_size)
+        sections = self.metadata["sections"]
+        count = self.metadata["count"]
+
+        self.rows = np.frombuffer(self._mmap, ROW_DTYPE, count, data_start + sections["rows"])
+        self._by_user = np.frombuffer(self._mmap, "<i4", count, data_start + sections["by_user"])
+        self._badges = np.frombuffer(self._mmap, "<i4", self.metadata["badge_refs"], data_start + sections["badges"])
+        self._string_offsets = np.frombuffer(
+            self._mmap, "<i8", self.metadata["string_count"] + 1, data_start + sections["string_offsets"]
+        )
+        self._strings_start = data_start + sections["strings"]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _string(self, index: int) -> str:
+        start = self._strings_start + int(self._string_offsets[index])
+        end = self._strings_start + int(self._string_offsets[index + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def entry(self, position: int) -> RankingEntry:
+        """Entrada de ranking da posição (0 = primeiro lugar)"""
+        row = self.rows[position]
+        badge_start = int(row["badge_start"])
+        return RankingEntry(
+            user_id=self._string(int(row["user"])),
+            name=self._string(int(row["name"])),
+            email="",
+            points=int(row["points"]),
+            xp=int(row["xp"]),
+            level=int(row["level"]),
+            rank=position + 1,
+            score=int(row["score"]),
+            badges=[
+                self._string(int(index))
+                for index in self._badges[badge_start:badge_start + int(row["badge_count"])]
+            ],
+            last_activity=datetime.fromtimestamp(float(row["last_activity"]), UTC)
+        )
+
+    def page(self, offset: int = 0, limit: int = 100) -> List[RankingEntry]:
+        """Entradas das posições offset+1 até offset+limit"""
+        return [self.entry(position) for position in range(offset, min(offset + limit, len(self)))]
+
+    def rank_of(self, user_id: str) -> Optional[int]:
+        """Rank do usuário (busca binária no índice por user_id), None se ausente"""
+        low, high = 0, len(self._by_user)
+        while low < high:
+            middle = (low + high) // 2
+            if self._string(int(self.rows[self._by_user[middle]]["user"])) < user_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._by_user):
+            position = int(self._by_user[low])
+            if self._string(int(self.rows[position]["user"])) == user_id:
+                return position + 1
+        return None
+
+    def level_at(self, rank: int) -> int:
+        """Nível do usuário na posição `rank`"""
+        return int(self.rows[rank - 1]["level"])
+
+
+class LocalSnapshotStore:
+    """
+    Diretório de snapshots colunares compartilhado pelos workers da máquina.
+
+    Um worker por vez grava (lock de arquivo); leitores reabrem o arquivo
+    quando ele é substituído e, até lá, seguem com o mapeamento atual.
+    """
+
+    EXTENSION = ".cqr"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._open_files: Dict[str, Tuple[Tuple[int, int], RankingSnapshotFile]] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, board: str) -> Optional[str]:
+        """Caminho do arquivo do ranking (None para nomes que não são de ranking)"""
+        if not _BOARD_NAME.match(board):
+            return None
+        return os.path.join(self.directory, f"{board}{self.EXTENSION}")
+
+    def write(self, board: str, rows: Sequence[Tuple[int, LeaderboardMember, int]], metadata: Dict[str, Any]) -> int:
+        """Grava o snapshot de um ranking"""
+        path = self.path_for(board)
+        if path is None:
+            raise ValueError(f"Nome de ranking inválido: {board}")
+        return write_snapshot_file(path, rows, {**metadata, "board": board})
+
+    def open(self, board: str) -> Optional[RankingSnapshotFile]:
+        """Snapshot atual do ranking (mapeado uma vez por versão do arquivo)"""
+        path = self.path_for(board)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        version = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._open_files.get(board)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            try:
+                snapshot = RankingSnapshotFile(path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao abrir snapshot local do ranking {board}: {e}")
+                return None
+            self._open_files[board] = (version, snapshot)
+            return snapshot
+
+    def age_seconds(self, board: str) -> Optional[float]:
+        """Idade do arquivo do ranking (None se não existe)"""
+        path = self.path_for(board)
+        try:
+            return time.time() - os.stat(path).st_mtime if path else None
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def writer_lock(self) -> Iterator[bool]:
+        """Lock exclusivo de escrita entre processos; True se este processo o obteve"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".writer.lock"), "w") as lock_file:
+            if fcntl is None:
+                yield True
+                return
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Instância global do diretório de snapshots locais
+_local_store_instance: Optional[LocalSnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_local_snapshot_store() -> Optional[LocalSnapshotStore]:
+    """
+    Retorna o LocalSnapshotStore (None se RANKING_LOCAL_SNAPSHOT_DIR está vazio,
+    o padrão). Desativado por padrão para não gravar arquivos mmap relativos ao
+    diretório de trabalho; configurar com um caminho absoluto de runtime.
+    """
+    global _local_store_instance
+
+    directory = os.getenv("RANKING_LOCAL_SNAPSHOT_DIR", "")
+    if not directory:
+        return None
+
+    if _local_store_instance is None:
+        with _store_lock:
+            if _local_store_instance is None:
+                _local_store_instance = LocalSnapshotStore(directory)
+
+    return _local_store_instance
@@ -1,5 +1,5 @@
-from typing import Dict, Any, List
-from datetime import datetime
+from typing import Dict, Any, List, Optional
+from datetime import datetime, UTC
 from app.models.reward import UserReward, UserBadge, RewardType
 from app.repositories.user_repository import UserRepository, get_user_repository
 from app.repositories.reward_repository import RewardRepository, get_reward_repository
@@ -9,6 +9,7 @@ from app.services.event_bus import get_event_bus
 from app.core.firebase import get_firestore_db_async
 from app.core.logging_config import get_cryptoquest_logger
 from app.services.fast_cache_service import get_fast_cache
+from app.models.events import PointsEarnedEvent
 from fastapi import Depends
 import logging
 
@@ -42,8 +43,14 @@ class RewardService:
             RewardType.LEVEL_UP: {"points": 0, "xp": 0, "badge": "level_up"},
         }
 
-    async def award_mission_completion(self, user_id: str, mission_id: str, score: float, mission_type: str = 'daily') -> Dict[str, Any]:
-        """Concede recompensas por conclusão de missão"""
+    async def award_mission_completion(self, user_id: str, mission_id: str, score: float, mission_type: str = 'daily',
+                                       reward_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Concede recompensas por conclusão de missão.
+
+        Com `reward_id` (tarefas em background, que podem ser reexecutadas),
+        pontos/XP são creditados uma única vez por ID; badges já são únicos.
+        """
         try: 
             user = self.user_repo.get_user_profile(user_id)
             if not user: 
@@ -72,7 +79,7 @@ class RewardService:
                 'mission_id': mission_id,
                 'score': score,
                 'mission_type': mission_type
-            })
+            }, reward_id=reward_id)
             
             # Verificar streaks
             await self._check_streak_rewards(user_id)
@@ -143,8 +150,12 @@ class RewardService:
             logger.error(f"Erro ao conceder recompensa de trilha: {e}")
             raise
 
-    async def apply_rewards(self, user_id: str, reward_type: RewardType, points: int, xp: int, context: Dict[str, Any]):
+    async def apply_rewards(self, user_id: str, reward_type: RewardType, points: int, xp: int, context: Dict[str, Any],
+                            reward_id: Optional[str] = None):
         """Aplica recompensas ao usuário"""
+        if reward_id:
+            return await self._apply_rewards_once(user_id, reward_type, points, xp, context, reward_id)
+
         # ✅ CORREÇÃO: Buscar valores atuais e SOMAR (não sobrescrever!)
         user = self.user_repo.get_user_profile(user_id)
         if not user:
@@ -161,19 +172,20 @@ class RewardService:
             'points': new_total_points,
             'xp': new_total_xp
         })
+        self._publish_points_earned(user_id, points, xp, new_total_points, new_total_xp, reward_type.value)
         
         logger.info(f"✅ Recompensas aplicadas: {user_id} ganhou +{points} pontos e +{xp} XP")
         logger.info(f"   Pontos: {current_points} → {new_total_points}")
         logger.info(f"   XP: {current_xp} → {new_total_xp}")
 
-        # Criar registro de recompensa
+        # Criar registro de recompensa (ledger usado pelos rankings semanal/mensal)
         user_reward = UserReward(
             user_id=user_id,
             reward_type=reward_type,
-            points=points,
-            xp=xp,
+            points_earned=points,
+            xp_earned=xp,
             context=context,
-            awarded_at=datetime.now()
+            earned_at=datetime.now(UTC)
         )
         
         # Salvar registro de recompensa
@@ -188,6 +200,39 @@ class RewardService:
             'badges_earned': []  # Será populado pelo sistema de badges se funcionar
         }
     
+    async def _apply_rewards_once(self, user_id: str, reward_type: RewardType, points: int, xp: int,
+                                  context: Dict[str, Any], reward_id: str):
+        """Aplica recompensas idempotentes: ledger com ID determinístico + Increment no mesmo batch"""
+        user_reward = UserReward(
+            user_id=user_id,
+            reward_id=reward_id,
+            reward_type=reward_type,
+            points_earned=points,
+            xp_earned=xp,
+            context=context,
+            earned_at=datetime.now(UTC)
+        )
+        applied = await self.reward_repo.apply_user_reward_once(reward_id, user_reward)
+        
+        user = self.user_repo.get_user_profile(user_id)
+        total_points = user.points if user and user.points else 0
+        total_xp = user.xp if user and user.xp else 0
+        
+        if applied:
+            self._publish_points_earned(user_id, points, xp, total_points, total_xp, reward_type.value)
+            logger.info(f"✅ Recompensas aplicadas: {user_id} ganhou +{points} pontos e +{xp} XP")
+        else:
+            logger.info(f"⏭️ Recompensa {reward_id} já aplicada para {user_id}, ignorando reexecução")
+        
+        return {
+            'points_earned': points if applied else 0,
+            'xp_earned': xp if applied else 0,
+            'total_points': total_points,
+            'total_xp': total_xp,
+            'badges_earned': [],
+            'already_applied': not applied
+        }
+    
     async def apply_basic_rewards_fast(self, user_id: str, points: int, xp: int):
         """
         ⚡ OTIMIZADO: Versão rápida para aplicar recompensas básicas com cache.
@@ -223,6 +268,7 @@ class RewardService:
                 'points': new_total_points,
                 'xp': new_total_xp
             })
+            self._publish_points_earned(user_id, points, xp, new_total_points, new_total_xp, "mission_fast")
             
             # ⚡ Invalidar cache após atualização
             cache.invalidate(cache_key)
@@ -240,6 +286,20 @@ class RewardService:
             logger.error(f"Erro ao aplicar recompensas rápidas: {e}")
             raise
     
+    def _publish_points_earned(self, user_id: str, points: int, xp: int, total_points: int, total_xp: int, source: str):
+        """Emite POINTS_EARNED sem bloquear quem aplicou a recompensa (ranking, badges)"""
+        try:
+            self.event_bus.emit_nowait(PointsEarnedEvent(
+                user_id=user_id,
+                points_earned=points,
+                xp_earned=xp,
+                total_points=total_points,
+                total_xp=total_xp,
+                source=source
+            ))
+        except Exception as e:
+            logger.error(f"Erro ao emitir evento de pontos: {e}")
+    
     async def award_badge(self, user_id: str, badge_id: str, context: Dict[str, Any]): 
         """Concede badge ao usuário usando o novo sistema"""
         try:
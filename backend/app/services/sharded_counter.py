@@ -0,0 +1,292 @@
+"""
+Contadores distribuídos (sharded counters) para agregados globais.
+Cada contador é dividido em N shards: um incremento cai em um shard aleatório
+(sem disputa de escrita em um único documento) e a leitura soma os shards,
+com cache curto em processo.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.models.events import BaseEvent, EventType
+from app.services.event_bus import get_event_bus
+
+logger = logging.getLogger(__name__)
+
+# Contadores globais conhecidos
+COUNTER_USERS = "users_total"
+COUNTER_MISSIONS_COMPLETED = "missions_completed"
+COUNTER_LEARNING_PATHS_COMPLETED = "learning_paths_completed"
+COUNTER_BADGES_AWARDED = "badges_awarded"
+COUNTER_POINTS_DISTRIBUTED = "points_distributed"
+COUNTER_XP_DISTRIBUTED = "xp_distributed"
+
+
+class InMemoryCounterStore:
+    """
+    Substituto local do Firestore (desenvolvimento e testes).
+
+    Os valores vivem só neste processo: com vários workers do gunicorn cada
+    um enxerga apenas os próprios incrementos.
+    """
+
+    def __init__(self):
+        self._bases: Dict[str, int] = {}
+        self._shards: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, shard: int, amount: int):
+        with self._lock:
+            shards = self._shards[name]
+            shards[shard] = shards.get(shard, 0) + amount
+
+    def read(self, name: str) -> Tuple[Optional[int], int]:
+        """(valor inicial ou None se nunca semeado, soma dos shards)"""
+        with self._lock:
+            return self._bases.get(name), sum(self._shards.get(name, {}).values())
+
+    def seed(self, name: str, value: int) -> bool:
+        """Define o valor inicial uma única vez. Retorna False se já existia."""
+        with self._lock:
+            if name in self._bases:
+                return False
+            self._bases[name] = value
+            return True
+
+
+class FirestoreCounterStore:
+    """
+    Contadores no Firestore: `counters/{nome}` guarda o valor inicial
+    (semeado uma vez a partir da fonte de verdade) e
+    `counters/{nome}/shards/{n}` os incrementos atômicos.
+    """
+
+    COLLECTION = "counters"
+
+    def __init__(self, db_client, read_timeout_seconds: float = 5.0):
+        self.db = db_client
+        # Leitura é best-effort (métricas, cache curto): falha rápido em vez
+        # de segurar a thread nas retentativas padrão do cliente
+        self.read_timeout_seconds = read_timeout_seconds
+
+    def _counter_ref(self, name: str):
+        return self.db.collection(self.COLLECTION).document(name)
+
+    def increment(self, name: str, shard: int, amount: int):
+        from firebase_admin import firestore
+
+        self._counter_ref(name).collection("shards").document(str(shard)).set(
+            {"count": firestore.Increment(amount)}, merge=True
+        )
+
+    def read(self, name: str) -> Tuple[Optional[int], int]:
+        """(valor inicial ou None se nunca semeado, soma dos shards)"""
+        counter_ref = self._counter_ref(name)
+        counter = counter_ref.get(retry=None, timeout=self.read_timeout_seconds)
+        base = (counter.to_dict() or {}).get("base", 0) if counter.exists else None
+        shards_total = sum(
+            (doc.to_dict() or {}).get("count", 0)
+            for doc in counter_ref.collection("shards").stream(retry=None, timeout=self.read_timeout_seconds)
+        )
+        return base, shards_total
+
+    def seed(self, name: str, value: int) -> bool:
+        """Define o valor inicial uma única vez (create falha se já existe)"""
+        from google.api_core.exceptions import AlreadyExists
+
+        try:
+            self._counter_ref(name).create({"base": value})
+            return True
+        except AlreadyExists:
+            return False
+
+
+class ShardedCounterService:
+    """
+    Incrementa e lê contadores globais.
+
+    Leituras somam os shards e ficam `cache_seconds` em cache no processo;
+    incrementos feitos por este processo atualizam o valor em cache na hora.
+    Contadores com valor anterior à sua criação (ex.: usuários já
+    cadastrados) registram um `seeder`, chamado no startup (seed_registered)
+    ou, se ele falhar, na primeira leitura.
+    """
+
+    def __init__(self, store, num_shards: int = 10, cache_seconds: float = 30.0):
+        self.store = store
+        self.num_shards = num_shards
+        self.cache_seconds = cache_seconds
+        self._cache: Dict[str, Tuple[int, float]] = {}
+        self._seeders: Dict[str, Callable[[], int]] = {}
+        self._lock = threading.Lock()
+        self._handlers_registered = False
+        self.metrics = {
+            "increments": 0,
+            "failed_increments": 0,
+            "reads": 0,
+            "cache_hits": 0,
+            "seeds": 0
+        }
+
+        logger.info(f"🔢 ShardedCounterService inicializado ({num_shards} shards, cache de {cache_seconds:.0f}s)")
+
+    def register_seed(self, name: str, seeder: Callable[[], int]):
+        """Fonte do valor inicial de um contador (usada só se ele nunca foi semeado)"""
+        self._seeders[name] = seeder
+
+    def increment(self, name: str, amount: int = 1):
+        """Soma `amount` em um shard aleatório (uma escrita, sem leitura)"""
+        if not amount:
+            return
+
+        try:
+            self.store.increment(name, random.randrange(self.num_shards), amount)
+        except Exception as e:
+            self.metrics["failed_increments"] += 1
+            logger.error(f"Erro ao incrementar contador {name}: {e}")
+            return
+
+        with self._lock:
+            self.metrics["increments"] += 1
+            cached = self._cache.get(name)
+            if cached is not None:
+                self._cache[name] = (cached[0] + amount, cached[1])
+
+    async def increment_async(self, name: str, amount: int = 1):
+        """Incremento fora do event loop"""
+        await asyncio.to_thread(self.increment, name, amount)
+
+    def get(self, name: str) -> int:
+        """Valor atual do contador (soma dos shards, com cache curto)"""
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and time.monotonic() - cached[1] < self.cache_seconds:
+                self.metrics["cache_hits"] += 1
+                return cached[0]
+
+        base, shards_total = self.store.read(name)
+        if base is None and name in self._seeders:
+            base = self._seed(name)
+
+        value = (base or 0) + shards_total
+        with self._lock:
+            self.metrics["reads"] += 1
+            self._cache[name] = (value, time.monotonic())
+        return value
+
+    def _seed(self, name: str) -> int:
+        # Incrementos feitos antes da semeadura (ex.: cadastros entre o deploy
+        # e a primeira leitura) já estão na contagem completa: o valor inicial
+        # desconta o que os shards tinham antes dela
+        _, shards_before = self.store.read(name)
+        value = self._seeders[name]() - shards_before
+        if self.store.seed(name, value):
+            self.metrics["seeds"] += 1
+            logger.info(f"🔢 Contador {name} semeado com {value}")
+            return value
+        # Outro processo semeou antes: vale o valor dele
+        base, _ = self.store.read(name)
+        return base or 0
+
+    def seed_registered(self) -> int:
+        """
+        Semeia os contadores com seeder que ainda não foram semeados
+        (chamado no startup, antes do tráfego chegar aos contadores).
+
+        Returns:
+            Quantidade de contadores semeados por este processo
+        """
+        seeded = self.metrics["seeds"]
+        for name in self._seeders:
+            base, _ = self.store.read(name)
+            if base is None:
+                self._seed(name)
+        return self.metrics["seeds"] - seeded
+
+    async def get_async(self, name: str) -> int:
+        """Leitura fora do event loop"""
+        return await asyncio.to_thread(self.get, name)
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, int]:
+        """Valores de vários contadores"""
+        return {name: self.get(name) for name in names}
+
+    async def register_event_handlers(self):
+        """Inscreve os contadores de negócio nos eventos do sistema"""
+        if self._handlers_registered:
+            return
+
+        event_bus = get_event_bus()
+        await event_bus.subscribe(EventType.MISSION_COMPLETED, self._handle_mission_completed)
+        await event_bus.subscribe(EventType.POINTS_EARNED, self._handle_points_earned)
+        await event_bus.subscribe(EventType.LEARNING_PATH_COMPLETED, self._handle_learning_path_completed)
+        self._handlers_registered = True
+
+        logger.info("🎯 Handlers de eventos registrados no ShardedCounterService")
+
+    async def _handle_mission_completed(self, event: BaseEvent):
+        await self.increment_async(COUNTER_MISSIONS_COMPLETED)
+        await self._count_distributed(event)
+
+    async def _handle_points_earned(self, event: BaseEvent):
+        await self._count_distributed(event)
+
+    async def _handle_learning_path_completed(self, event: BaseEvent):
+        await self.increment_async(COUNTER_LEARNING_PATHS_COMPLETED)
+
+    async def _count_distributed(self, event: BaseEvent):
+        """Pontos e XP entregues pelo evento (mesmos eventos que movem o ranking)"""
+        await self.increment_async(COUNTER_POINTS_DISTRIBUTED, getattr(event, "points_earned", 0) or 0)
+        await self.increment_async(COUNTER_XP_DISTRIBUTED, getattr(event, "xp_earned", 0) or 0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas do serviço"""
+        return {
+            **self.metrics,
+            "backend": type(self.store).__name__,
+            "num_shards": self.num_shards,
+            "cached_counters": len(self._cache)
+        }
+
+
+def create_counter_store():
+    """Cria o armazenamento dos contadores conforme COUNTERS_BACKEND"""
+    backend = os.getenv("COUNTERS_BACKEND", "firestore").lower()
+
+    if backend == "firestore":
+        from app.core.firebase import get_firestore_db
+        return FirestoreCounterStore(get_firestore_db())
+
+    if backend != "memory":
+        logger.warning(f"Backend de contadores desconhecido '{backend}', usando memória")
+    return InMemoryCounterStore()
+
+
+# Instância global do serviço
+_counter_service_instance: Optional[ShardedCounterService] = None
+_service_lock = threading.Lock()
+
+
+def get_sharded_counters() -> ShardedCounterService:
+    """Retorna instância singleton do ShardedCounterService"""
+    global _counter_service_instance
+
+    if _counter_service_instance is None:
+        with _service_lock:
+            if _counter_service_instance is None:
+                service = ShardedCounterService(
+                    create_counter_store(),
+                    num_shards=int(os.getenv("COUNTER_SHARDS", "10")),
+                    cache_seconds=float(os.getenv("COUNTER_CACHE_SECONDS", "30"))
+                )
+                # Usuários já cadastrados antes do contador: uma contagem completa, uma vez
+                from app.repositories.user_repository import get_user_repository
+                service.register_seed(COUNTER_USERS, lambda: get_user_repository().get_users_count())
+                _counter_service_instance = service
+
+    return _counter_service_instance
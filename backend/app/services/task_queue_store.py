@@ -0,0 +1,234 @@
+"""
+Armazenamento durável para a fila de tarefas em background.
+Permite que tarefas enfileiradas sobrevivam a deploys e reciclagem de workers.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredTask:
+    """Tarefa recuperada do armazenamento durável"""
+    task_id: str
+    task_name: str
+    priority: str
+    task_args: Dict[str, Any]
+    attempts: int
+    available_at: float
+    # 'dead': esgotou as tentativas, volta para a dead-letter queue
+    status: str = "pending"
+    last_error: Optional[str] = None
+
+
+class SQLiteTaskQueueStore:
+    """
+    Fila durável em SQLite (modo WAL) com entrega at-least-once.
+
+    Cada processo tem um `owner_id` e mantém leases sobre as tarefas que
+    carregou em memória, renovadas periodicamente por `heartbeat()`. Se o
+    processo morre (deploy, max-requests do gunicorn), os leases expiram e
+    qualquer processo vivo reivindica as tarefas em `claim_expired()`.
+    Tarefas mortas (dead-letter) também ficam sob lease do processo que as
+    guarda na DLQ em memória e são reivindicadas do mesmo jeito; saem do
+    disco quando reenviadas (save) ou descartadas da DLQ (discard).
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 60.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner_id = f"{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS background_tasks (
+                task_id TEXT PRIMARY KEY,
+                task_name TEXT NOT NULL,
+                priority TEXT NOT NULL,
+                task_args BLOB NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                owner_id TEXT,
+                lease_expires_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_background_tasks_lease "
+            "ON background_tasks (status, lease_expires_at)"
+        )
+
+        logger.info(f"💾 Fila durável de tarefas em {path} (owner: {self.owner_id})")
+
+    def save(self, task_id: str, task_name: str, priority: str, task_args: Dict[str, Any]) -> bool:
+        """
+        Persiste uma tarefa recém-submetida, já sob lease deste processo.
+
+        Returns:
+            True se persistida, False se os argumentos não são serializáveis
+        """
+        try:
+            payload = pickle.dumps(task_args)
+        except Exception as e:
+            logger.warning(f"Tarefa {task_name} não serializável, mantida só em memória: {e}")
+            return False
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO background_tasks "
+                "(task_id, task_name, priority, task_args, status, attempts, available_at, "
+                "owner_id, lease_expires_at, created_at) "
+                "VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?, ?)",
+                (task_id, task_name, priority, payload, now, self.owner_id, now + self.lease_seconds, now)
+            )
+        return True
+
+    def mark_running(self, task_id: str, attempts: int):
+        """Registra o início de uma tentativa"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_tasks SET status = 'running', attempts = ?, owner_id = ?, "
+                "lease_expires_at = ? WHERE task_id = ?",
+                (attempts, self.owner_id, time.time() + self.lease_seconds, task_id)
+            )
+
+    def reschedule(self, task_id: str, available_at: float, error: Optional[str] = None):
+        """Marca a tarefa como pendente até `available_at` (retry)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_tasks SET status = 'pending', available_at = ?, last_error = ? "
+                "WHERE task_id = ?",
+                (available_at, error, task_id)
+            )
+
+    def complete(self, task_id: str):
+        """Remove a tarefa concluída"""
+        with self._lock:
+            self._conn.execute("DELETE FROM background_tasks WHERE task_id = ?", (task_id,))
+
+    def mark_dead(self, task_id: str, error: Optional[str] = None):
+        """Move a tarefa para o estado de dead-letter (não é reexecutada, só reenviada)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_tasks SET status = 'dead', owner_id = ?, lease_expires_at = ?, "
+                "last_error = ? WHERE task_id = ?",
+                (self.owner_id, time.time() + self.lease_seconds, error, task_id)
+            )
+
+    def discard(self, task_id: str):
+        """Remove a tarefa descartada da dead-letter queue"""
+        with self._lock:
+            self._conn.execute("DELETE FROM background_tasks WHERE task_id = ?", (task_id,))
+
+    def heartbeat(self) -> int:
+        """Renova os leases de todas as tarefas deste processo"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE background_tasks SET lease_expires_at = ? "
+                "WHERE owner_id = ? AND status IN ('pending', 'running', 'dead')",
+                (time.time() + self.lease_seconds, self.owner_id)
+            )
+            return cursor.rowcount
+
+    def claim_expired(self) -> List[StoredTask]:
+        """
+        Reivindica tarefas cujo lease expirou (dono morto) para este processo.
+        Tarefas mortas continuam com status 'dead'.
+
+        Returns:
+            Tarefas agora sob lease deste processo
+        """
+        now = time.time()
+        claim_token = f"{self.owner_id}:{uuid.uuid4().hex[:8]}"
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_tasks SET owner_id = ?, lease_expires_at = ?, "
+                "status = CASE status WHEN 'dead' THEN 'dead' ELSE 'pending' END "
+                "WHERE status IN ('pending', 'running', 'dead') AND lease_expires_at < ?",
+                (claim_token, now + self.lease_seconds, now)
+            )
+            rows = self._conn.execute(
+                "SELECT task_id, task_name, priority, task_args, attempts, available_at, status, last_error "
+                "FROM background_tasks WHERE owner_id = ?",
+                (claim_token,)
+            ).fetchall()
+            self._conn.execute(
+                "UPDATE background_tasks SET owner_id = ? WHERE owner_id = ?",
+                (self.owner_id, claim_token)
+            )
+
+        claimed = []
+        for task_id, task_name, priority, payload, attempts, available_at, status, last_error in rows:
+            try:
+                task_args = pickle.loads(payload)
+            except Exception as e:
+                # Sem argumentos a tarefa não pode ser executada nem reenviada
+                logger.error(f"Não foi possível desserializar tarefa {task_id}, descartando: {e}")
+                self.discard(task_id)
+                continue
+            claimed.append(StoredTask(
+                task_id, task_name, priority, task_args, attempts, available_at, status, last_error
+            ))
+
+        if claimed:
+            logger.info(f"♻️ {len(claimed)} tarefas recuperadas da fila durável")
+        return claimed
+
+    def release_owned(self):
+        """Expira os leases deste processo (parada limpa) para outro reivindicar"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE background_tasks SET lease_expires_at = 0, "
+                "status = CASE status WHEN 'dead' THEN 'dead' ELSE 'pending' END "
+                "WHERE owner_id = ? AND status IN ('pending', 'running', 'dead')",
+                (self.owner_id,)
+            )
+
+    def get_stats(self) -> Dict[str, int]:
+        """Contagem de tarefas persistidas por status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM background_tasks GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        with self._lock:
+            self._conn.close()
+
+
+def create_task_queue_store() -> Optional[SQLiteTaskQueueStore]:
+    """Cria o armazenamento durável conforme BACKGROUND_QUEUE_BACKEND"""
+    backend = os.getenv("BACKGROUND_QUEUE_BACKEND", "memory").lower()
+
+    if backend == "sqlite":
+        return SQLiteTaskQueueStore(
+            path=os.getenv("BACKGROUND_QUEUE_PATH", "data/background_tasks.db"),
+            lease_seconds=float(os.getenv("BACKGROUND_TASK_LEASE_SECONDS", "60"))
+        )
+
+    if backend != "memory":
+        logger.warning(f"Backend de fila desconhecido '{backend}', usando apenas memória")
+    return None
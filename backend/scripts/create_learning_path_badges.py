@@ -224,6 +224,14 @@ def get_learning_path_badges():
         }
     ]
 
+def bump_catalog_version(db):
+    """Incrementa a versão do catálogo para os servidores recarregarem os badges"""
+    db.collection("badges_meta").document("catalog").set({
+        "version": firestore.Increment(1),
+        "updated_at": datetime.utcnow()
+    }, merge=True)
+    print("🔄 Versão do catálogo de badges atualizada (badges_meta/catalog)")
+
 def create_learning_path_badges():
     """Cria os badges das trilhas no Firestore"""
     try:
@@ -257,6 +265,7 @@ def create_learning_path_badges():
                 print(f"    ❌ Erro ao criar badge '{badge_id}': {e}")
                 continue
         
+        bump_catalog_version(db)
         print(f"🎉 Processo de criação concluído!")
         print(f"📈 Total de badges criados: {len(badges_data)}")
         
@@ -3,6 +3,7 @@ Script de migração para o sistema de eventos.
 Migra dados existentes do sistema legado para o novo sistema de badges.
 """
 
+import argparse
 import asyncio
 import sys
 from pathlib import Path
@@ -12,100 +13,34 @@ from datetime import datetime, timezone
 backend_path = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(backend_path))
 
-from app.core.firebase import get_firestore_db_async
+from app.core.firebase import get_firestore_db, get_firestore_db_async
 from app.repositories.badge_repository import BadgeRepository
+from app.repositories.learning_path_repository import LearningPathRepository
 from app.repositories.user_repository import UserRepository
+from app.services.badge_backfill import BadgeBackfillService
 from app.services.event_bus import get_event_bus
 from app.models.events import MissionCompletedEvent, LevelUpEvent
 
 
-async def migrate_user_badges():
-    """Migra badges existentes para o novo sistema"""
-    print("🔄 Iniciando migração de badges...")
+async def migrate_user_badges(job_id: str, badge_ids=None, resume: bool = True):
+    """Concede em lote os badges que os usuários já satisfazem (retomável)"""
+    print(f"🔄 Iniciando backfill de badges (job {job_id})...")
     
-    db = await get_firestore_db_async()
-    badge_repo = BadgeRepository(db)
-    user_repo = UserRepository(db)
+    db = get_firestore_db()
+    backfill = BadgeBackfillService(
+        UserRepository(db),
+        BadgeRepository(db),
+        path_repo_factory=LearningPathRepository
+    )
     
-    # Buscar todos os usuários
-    users = await user_repo.get_all_users()
-    print(f"📊 Encontrados {len(users)} usuários para migração")
-    
-    migrated_count = 0
-    error_count = 0
+    result = await backfill.run_async(job_id, badge_ids=badge_ids, resume=resume)
     
-    for user in users:
-        try:
-            user_id = user.uid
-            
-            # Verificar se já tem badges no novo sistema
-            existing_badges = await badge_repo.get_user_badges(user_id)
-            if existing_badges:
-                print(f"⏭️ Usuário {user_id} já tem badges no novo sistema, pulando...")
-                continue
-            
-            # Migrar badges baseados no perfil do usuário
-            badges_to_award = []
-            
-            # Badge de primeira missão
-            if user.completed_missions and len(user.completed_missions) > 0:
-                badges_to_award.append({
-                    'badge_id': 'first_steps',
-                    'context': {'migration': True, 'source': 'legacy_system'}
-                })
-            
-            # Badge de level up
-            if user.level > 1:
-                badges_to_award.append({
-                    'badge_id': 'level_up',
-                    'context': {'migration': True, 'level': user.level, 'source': 'legacy_system'}
-                })
-            
-            # Badge de nível específico
-            if user.level >= 5:
-                badges_to_award.append({
-                    'badge_id': 'level_5',
-                    'context': {'migration': True, 'level': user.level, 'source': 'legacy_system'}
-                })
-            
-            if user.level >= 10:
-                badges_to_award.append({
-                    'badge_id': 'level_10',
-                    'context': {'migration': True, 'level': user.level, 'source': 'legacy_system'}
-                })
-            
-            # Badge de pontos
-            if user.points >= 1000:
-                badges_to_award.append({
-                    'badge_id': 'point_collector',
-                    'context': {'migration': True, 'points': user.points, 'source': 'legacy_system'}
-                })
-            
-            if user.points >= 5000:
-                badges_to_award.append({
-                    'badge_id': 'point_master',
-                    'context': {'migration': True, 'points': user.points, 'source': 'legacy_system'}
-                })
-            
-            # Conceder badges
-            for badge_data in badges_to_award:
-                await badge_repo.award_badge(
-                    user_id, 
-                    badge_data['badge_id'], 
-                    badge_data['context']
-                )
-            
-            if badges_to_award:
-                migrated_count += 1
-                print(f"✅ Usuário {user_id}: {len(badges_to_award)} badges migrados")
-            
-        except Exception as e:
-            error_count += 1
-            print(f"❌ Erro ao migrar usuário {user.uid}: {e}")
-    
-    print(f"\n📊 Migração concluída:")
-    print(f"   ✅ Usuários migrados: {migrated_count}")
-    print(f"   ❌ Erros: {error_count}")
+    print(f"\n📊 Backfill {result['status']}:")
+    print(f"   👥 Usuários verificados: {result['users_scanned']}")
+    print(f"   ✅ Badges concedidos: {result['badges_awarded']}")
+    print(f"   ❌ Escritas com falha: {result['failed_writes']}")
+    if result.get('skipped_badges'):
+        print(f"   ⏭️ Badges concedidos só por eventos: {', '.join(result['skipped_badges'])}")
 
 
 async def simulate_legacy_events():
@@ -188,12 +123,21 @@ async def verify_migration():
 
 async def main():
     """Função principal de migração"""
+    parser = argparse.ArgumentParser(description='Migra usuários para o sistema de badges por eventos')
+    parser.add_argument('--job-id', default='migrate_to_event_system',
+                        help='ID do job de backfill (checkpoint para retomar)')
+    parser.add_argument('--badge', action='append', dest='badge_ids',
+                        help='Restringe o backfill a um badge (pode repetir)')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignora o checkpoint e recomeça do primeiro usuário')
+    args = parser.parse_args()
+    
     print("🚀 Iniciando migração para o sistema de eventos...")
     print("=" * 60)
     
     try:
         # 1. Migrar badges existentes
-        await migrate_user_badges()
+        await migrate_user_badges(args.job_id, args.badge_ids, resume=not args.restart)
         
         # 2. Simular eventos para dados existentes
         await simulate_legacy_events()
@@ -206,6 +206,14 @@ def create_badges_data():
         }
     }
 
+def bump_catalog_version(db):
+    """Incrementa a versão do catálogo para os servidores recarregarem os badges"""
+    db.collection("badges_meta").document("catalog").set({
+        "version": firestore.Increment(1),
+        "updated_at": datetime.now()
+    }, merge=True)
+    print("🔄 Versão do catálogo de badges atualizada (badges_meta/catalog)")
+
 def upsert_badges(db, badges_data, clear_first=False):
     """Insere ou atualiza badges na coleção"""
     if clear_first:
@@ -230,6 +238,8 @@ def upsert_badges(db, badges_data, clear_first=False):
             error_count += 1
     
     print(f"📊 badges: {success_count} sucessos, {error_count} erros")
+    if success_count or clear_first:
+        bump_catalog_version(db)
     return success_count, error_count
 
 def main():
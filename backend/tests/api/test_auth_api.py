@@ -83,4 +83,29 @@ async def test_get_me_sucess(mocker, mock_user_profile):
         assert data["uid"] == "test_uid_123"
         assert data["name"] == "Test User"
 
-    app.dependency_overrides = {}
\ No newline at end of file
+    app.dependency_overrides = {}
+
+
+@pytest.mark.asyncio
+async def test_dead_letter_endpoints_require_admin():
+    """
+    Testa que a dead-letter queue de background exige o custom claim admin
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/background/dead-letters")
+        assert response.status_code in (401, 403)
+
+        app.dependency_overrides[get_current_user] = override_get_current_user
+        response = await client.get("/background/dead-letters", headers={"Authorization": "Bearer fake-token"})
+        assert response.status_code == 403
+        response = await client.post("/background/dead-letters/task1/redrive", headers={"Authorization": "Bearer fake-token"})
+        assert response.status_code == 403
+
+        async def override_admin_user():
+            return FirebaseUser(uid="admin_uid", email="admin@example.com", admin=True)
+
+        app.dependency_overrides[get_current_user] = override_admin_user
+        response = await client.get("/background/dead-letters", headers={"Authorization": "Bearer fake-token"})
+        assert response.status_code == 200
+
+    app.dependency_overrides = {}
@@ -114,22 +114,40 @@ class TestRankingAPI:
         sample_ranking.type = RankingType.MONTHLY
         sample_ranking.period = "2024-01"
         
-        mock_ranking_service.generate_global_ranking.return_value = sample_ranking
+        mock_ranking_service.generate_monthly_ranking.return_value = sample_ranking
         
         # Substituir dependência
         app.dependency_overrides[get_ranking_service] = lambda: mock_ranking_service
         
         try:
-            # Testar - endpoint /monthly não existe na API
-            response = client.get("/ranking/monthly")
+            # Testar
+            response = client.get("/ranking/monthly?limit=50")
             
-            # Deve retornar 404 pois o endpoint não existe
-            assert response.status_code == 404
+            assert response.status_code == 200
+            assert response.json()["type"] == "monthly"
+            mock_ranking_service.generate_monthly_ranking.assert_called_once_with(50, 0, None)
             
         finally:
             # Limpar override
             app.dependency_overrides.clear()
 
+    def test_get_learning_path_ranking(self, client, mock_ranking_service, sample_ranking):
+        """Testa busca de ranking por trilha"""
+        sample_ranking.type = RankingType.LEARNING_PATH
+        sample_ranking.period = "bitcoin-basics"
+        mock_ranking_service.generate_learning_path_ranking.return_value = sample_ranking
+        app.dependency_overrides[get_ranking_service] = lambda: mock_ranking_service
+
+        try:
+            response = client.get("/ranking/learning-path/bitcoin-basics?limit=10")
+
+            assert response.status_code == 200
+            assert response.json()["type"] == "learning_path"
+            mock_ranking_service.generate_learning_path_ranking.assert_called_once_with("bitcoin-basics", 10, 0, None)
+
+        finally:
+            app.dependency_overrides.clear()
+
     def test_get_ranking_by_period(self, client, mock_ranking_service, sample_ranking):
         """Testa busca de ranking por período - endpoint não existe"""
         # Substituir dependência
@@ -8,7 +8,7 @@ from httpx import AsyncClient, ASGITransport
 
 from app.main import app
 from app.repositories.badge_repository import get_badge_repository
-from app.repositories.reward_repository import get_reward_repository
+from app.repositories.reward_repository import get_reward_history_repository, get_reward_repository
 from app.services.reward_service import get_reward_service
 from app.dependencies.auth import get_current_user
 from app.models.user import FirebaseUser
@@ -22,6 +22,7 @@ class TestRewardsAPI:
         """Mock do BadgeRepository"""
         mock_repo = AsyncMock()
         mock_repo.get_user_badges.return_value = []
+        mock_repo.get_earned_badges.return_value = []
         mock_repo.get_all_badges.return_value = []
         mock_repo.get_user_badge_stats.return_value = {
             'total_badges': 0,
@@ -146,17 +147,21 @@ class TestRewardsAPI:
         app.dependency_overrides.clear()
 
     @pytest.mark.asyncio
-    async def test_get_user_rewards(self, mock_reward_repo, mock_current_user):
+    async def test_get_user_rewards(self, mock_current_user):
         """Testa endpoint GET /rewards/user/{user_id}/rewards"""
         # Mock das dependências
-        app.dependency_overrides[get_reward_repository] = lambda: mock_reward_repo
+        mock_reward_repo = MagicMock()
+        mock_reward_repo.get_user_rewards_page.return_value = ([], "proxima")
+        app.dependency_overrides[get_reward_history_repository] = lambda: mock_reward_repo
         app.dependency_overrides[get_current_user] = lambda: mock_current_user
         
         async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            response = await client.get("/rewards/user/test_user/history")
+            response = await client.get("/rewards/user/test_user/history?limit=20")
         
         assert response.status_code == 200
         assert response.json() == []
+        assert response.headers["X-Next-Cursor"] == "proxima"
+        mock_reward_repo.get_user_rewards_page.assert_called_once_with("test_user", 20, None)
         
         # Limpar override
         app.dependency_overrides.clear()
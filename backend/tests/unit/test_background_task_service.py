@@ -0,0 +1,535 @@
+"""
+Testes unitários para BackgroundTaskService.
+"""
+
+import asyncio
+import pytest
+
+from app.services.background_task_service import (
+    BackgroundTask,
+    BackgroundTaskService,
+    PriorityTaskQueue,
+    RetryPolicy,
+    TaskPriority,
+)
+from app.services.task_queue_store import SQLiteTaskQueueStore
+
+
+def _make_task(task_id: str, priority: TaskPriority) -> BackgroundTask:
+    return BackgroundTask(
+        task_id=task_id,
+        task_name=task_id,
+        task_func=lambda: None,
+        task_args={},
+        priority=priority
+    )
+
+
+class TestPriorityTaskQueue:
+    """Testes para a fila de prioridades"""
+
+    def test_high_priority_served_first(self):
+        """Tarefa HIGH submetida depois é atendida antes da NORMAL"""
+        queue = PriorityTaskQueue(aging_seconds=60)
+        queue.put_nowait(_make_task("ai_insights", TaskPriority.NORMAL))
+        queue.put_nowait(_make_task("events", TaskPriority.LOW))
+        queue.put_nowait(_make_task("badges", TaskPriority.HIGH))
+
+        order = [queue.get_nowait().task_id for _ in range(3)]
+
+        assert order == ["badges", "ai_insights", "events"]
+        assert queue.get_nowait() is None
+
+    def test_fifo_within_same_priority(self):
+        """Tarefas da mesma prioridade mantêm ordem de chegada"""
+        queue = PriorityTaskQueue(aging_seconds=60)
+        for i in range(3):
+            queue.put_nowait(_make_task(f"task_{i}", TaskPriority.NORMAL))
+
+        assert [queue.get_nowait().task_id for _ in range(3)] == ["task_0", "task_1", "task_2"]
+
+    def test_aging_prevents_starvation(self):
+        """Tarefa LOW que esperou o suficiente passa na frente de HIGH nova"""
+        queue = PriorityTaskQueue(aging_seconds=1)
+        old_task = _make_task("old_low", TaskPriority.LOW)
+        queue.put_nowait(old_task)
+        old_task.enqueued_at -= 5  # Simula 5 segundos de espera
+
+        queue.put_nowait(_make_task("new_high", TaskPriority.HIGH))
+
+        assert queue.get_nowait().task_id == "old_low"
+        assert queue.aged_promotions == 1
+
+    def test_qsize_by_priority(self):
+        """Tamanho da fila é reportado por prioridade"""
+        queue = PriorityTaskQueue()
+        queue.put_nowait(_make_task("a", TaskPriority.HIGH))
+        queue.put_nowait(_make_task("b", TaskPriority.LOW))
+
+        assert queue.qsize() == 2
+        assert queue.qsize_by_priority() == {"high": 1, "normal": 0, "low": 1}
+
+
+class TestBackgroundTaskService:
+    """Testes para o BackgroundTaskService"""
+
+    @pytest.mark.asyncio
+    async def test_tasks_processed_by_priority(self):
+        """Worker processa tarefas respeitando a prioridade"""
+        service = BackgroundTaskService(num_workers=1)
+        executed = []
+
+        async def record(name):
+            executed.append(name)
+
+        service.submit_task("normal", record, {"name": "normal"}, TaskPriority.NORMAL)
+        service.submit_task("high", record, {"name": "high"}, TaskPriority.HIGH)
+
+        await service.start_worker()
+        for _ in range(50):
+            if len(executed) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        assert executed == ["high", "normal"]
+
+    @pytest.mark.asyncio
+    async def test_priority_metrics(self):
+        """Métricas de latência por prioridade são registradas"""
+        service = BackgroundTaskService()
+
+        async def noop():
+            return "ok"
+
+        task_id = service.submit_task("badge_verification", noop, {}, TaskPriority.HIGH)
+        await service._execute_task(service.task_queue.get_nowait())
+
+        metrics = service.get_metrics()
+        assert service.get_task_status(task_id)["status"] == "completed"
+        assert metrics["priority_metrics"]["high"]["started"] == 1
+        assert metrics["priority_metrics"]["normal"]["started"] == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_pool_runs_tasks_concurrently(self):
+        """Pool de workers executa várias tarefas ao mesmo tempo"""
+        service = BackgroundTaskService(num_workers=3)
+        running = 0
+        peak = 0
+
+        async def slow():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05)
+            running -= 1
+
+        for _ in range(3):
+            service.submit_task("slow", slow, {})
+
+        await service.start_worker()
+        for _ in range(100):
+            if service.metrics["completed_tasks"] == 3:
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        assert peak == 3
+        assert service.get_metrics()["throughput_per_second"] > 0
+
+    @pytest.mark.asyncio
+    async def test_task_concurrency_limit(self):
+        """Limite por nome de tarefa é respeitado pelo pool"""
+        service = BackgroundTaskService(
+            num_workers=4,
+            task_concurrency_limits={"ai_insights_generation": 1}
+        )
+        running = 0
+        peak = 0
+
+        async def insights():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        for _ in range(3):
+            service.submit_task("ai_insights_generation", insights, {})
+
+        await service.start_worker()
+        for _ in range(100):
+            if service.metrics["completed_tasks"] == 3:
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        assert service.metrics["completed_tasks"] == 3
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    async def test_saturated_task_does_not_block_workers(self):
+        """Tarefa no limite fica na fila; os workers seguem com as outras"""
+        service = BackgroundTaskService(
+            num_workers=2,
+            task_concurrency_limits={"ai_insights_generation": 1}
+        )
+        release = asyncio.Event()
+        order = []
+        busy = []
+
+        async def insights(name):
+            order.append(name)
+            await release.wait()
+
+        async def badges():
+            order.append("badges")
+            busy.append(service.get_metrics()["busy_workers"])
+
+        service.submit_task("ai_insights_generation", insights, {"name": "first"}, priority=TaskPriority.HIGH)
+        service.submit_task("ai_insights_generation", insights, {"name": "second"}, priority=TaskPriority.HIGH)
+        service.submit_task("badge_verification", badges, {}, priority=TaskPriority.LOW)
+
+        await service.start_worker()
+        for _ in range(100):
+            if "badges" in order:
+                break
+            await asyncio.sleep(0.01)
+
+        # A segunda de insights esperou na fila sem ocupar worker
+        assert order == ["first", "badges"]
+        assert busy == [2]
+        assert service.task_queue.qsize() == 1
+
+        release.set()
+        for _ in range(100):
+            if service.metrics["completed_tasks"] == 3:
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        assert order == ["first", "badges", "second"]
+        assert service.get_metrics()["busy_workers"] == 0
+
+
+class TestTaskRegistry:
+    """Testes do registro limitado de tarefas"""
+
+    @pytest.mark.asyncio
+    async def test_registry_evicts_oldest_finished_tasks(self):
+        """Registro não passa do limite; tarefas finalizadas antigas saem primeiro"""
+        service = BackgroundTaskService(max_tasks=2)
+
+        async def noop():
+            return "ok"
+
+        task_ids = []
+        for _ in range(3):
+            task_ids.append(service.submit_task("events_simple", noop, {}))
+            await service._execute_task(service.task_queue.get_nowait())
+
+        assert list(service.tasks) == task_ids[1:]
+        assert service.get_task_status(task_ids[0]) is None
+        assert service.metrics["evicted_tasks"] == 1
+
+    @pytest.mark.asyncio
+    async def test_pending_tasks_are_never_evicted(self):
+        """Tarefas ainda não finalizadas ficam no registro mesmo acima do limite"""
+        service = BackgroundTaskService(max_tasks=1)
+
+        async def noop():
+            return None
+
+        for _ in range(3):
+            service.submit_task("events_simple", noop, {})
+
+        assert len(service.tasks) == 3
+        assert service.get_metrics()["pending_tasks"] == 3
+
+    @pytest.mark.asyncio
+    async def test_ttl_eviction_and_status_counters(self):
+        """Tarefas finalizadas expiram pelo TTL e contadores acompanham o status"""
+        service = BackgroundTaskService(task_ttl_seconds=0)
+
+        async def noop():
+            return "ok"
+
+        service.submit_task("events_simple", noop, {})
+        metrics = service.get_metrics()
+        assert metrics["pending_tasks"] == 1
+        assert metrics["active_tasks"] == 0
+
+        await service._execute_task(service.task_queue.get_nowait())
+
+        metrics = service.get_metrics()
+        assert metrics["pending_tasks"] == 0
+        assert metrics["registry_size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_discard_result_releases_payload(self):
+        """Tarefa fire-and-forget não guarda resultado nem argumentos"""
+        service = BackgroundTaskService()
+
+        async def insights(submission):
+            return {"insights": submission}
+
+        task_id = service.submit_task(
+            "ai_insights_generation", insights, {"submission": "payload"}, discard_result=True
+        )
+        task = service.task_queue.get_nowait()
+        await service._execute_task(task)
+
+        assert service.get_task_status(task_id)["status"] == "completed"
+        assert task.result is None
+        assert task.task_args == {}
+
+
+class TestRetryAndDeadLetter:
+    """Testes de retry com backoff e dead-letter queue"""
+
+    def test_backoff_grows_exponentially_with_cap(self):
+        """Delay dobra a cada tentativa e respeita o máximo"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=0.0)
+
+        assert [policy.get_delay(attempt) for attempt in range(1, 5)] == [1.0, 2.0, 4.0, 5.0]
+
+    def test_jitter_reduces_delay_within_bounds(self):
+        """Jitter nunca aumenta o delay nem o reduz além da fração"""
+        policy = RetryPolicy(base_delay=10.0, jitter=0.5)
+
+        for _ in range(20):
+            assert 5.0 <= policy.get_delay(1) <= 10.0
+
+    def test_retryable_exceptions(self):
+        """Erros de validação não são retentados"""
+        policy = RetryPolicy(retryable_exceptions=(ConnectionError,))
+
+        assert policy.is_retryable(ConnectionError("timeout"))
+        assert not policy.is_retryable(RuntimeError("boom"))
+        assert not RetryPolicy().is_retryable(ValueError("usuário não encontrado"))
+
+    @pytest.mark.asyncio
+    async def test_transient_failure_is_retried(self):
+        """Falha transitória é retentada e a tarefa conclui"""
+        service = BackgroundTaskService(num_workers=1)
+        calls = 0
+
+        async def flaky():
+            nonlocal calls
+            calls += 1
+            if calls < 3:
+                raise ConnectionError("Firestore indisponível")
+            return "ok"
+
+        task_id = service.submit_task(
+            "badge_verification", flaky, {},
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01, jitter=0.0)
+        )
+
+        await service.start_worker()
+        for _ in range(100):
+            if service.get_task_status(task_id)["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        status = service.get_task_status(task_id)
+        assert status["status"] == "completed"
+        assert status["attempts"] == 3
+        assert service.metrics["retried_tasks"] == 2
+        assert not service.dead_letters
+
+    @pytest.mark.asyncio
+    async def test_task_without_policy_is_not_retried(self):
+        """Retry é opt-in: sem política registrada a primeira falha vai para a DLQ"""
+        service = BackgroundTaskService(num_workers=1)
+        calls = 0
+
+        async def emit():
+            nonlocal calls
+            calls += 1
+            raise ConnectionError("Firestore indisponível")
+
+        task_id = service.submit_task("events_simple", emit, {})
+
+        await service.start_worker()
+        for _ in range(100):
+            if service.dead_letters:
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        assert calls == 1
+        assert [d["task_id"] for d in service.get_dead_letters()] == [task_id]
+        assert service.metrics["retried_tasks"] == 0
+
+    @pytest.mark.asyncio
+    async def test_exhausted_task_goes_to_dead_letter_and_redrives(self):
+        """Tarefa que esgota tentativas vai para a DLQ e pode ser reenviada"""
+        service = BackgroundTaskService(num_workers=1)
+        should_fail = True
+
+        async def award():
+            if should_fail:
+                raise ConnectionError("Firestore indisponível")
+            return "awarded"
+
+        task_id = service.submit_task(
+            "badge_verification", award, {},
+            retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01, jitter=0.0)
+        )
+
+        await service.start_worker()
+        for _ in range(100):
+            if service.dead_letters:
+                break
+            await asyncio.sleep(0.01)
+
+        dead_letters = service.get_dead_letters()
+        assert [d["task_id"] for d in dead_letters] == [task_id]
+        assert dead_letters[0]["attempts"] == 2
+        assert service.metrics["failed_tasks"] == 1
+
+        should_fail = False
+        assert service.redrive_dead_letter(task_id)
+        for _ in range(100):
+            if service.get_task_status(task_id)["status"] == "completed":
+                break
+            await asyncio.sleep(0.01)
+        await service.stop_worker()
+
+        assert service.get_task_status(task_id)["result"] == "awarded"
+        assert not service.dead_letters
+        assert not service.redrive_dead_letter(task_id)
+
+
+class TestDurableQueue:
+    """Testes da fila durável em SQLite"""
+
+    @pytest.mark.asyncio
+    async def test_pending_task_recovered_after_restart(self, tmp_path):
+        """Tarefa não executada é reexecutada por outro processo após o lease expirar"""
+        db_path = str(tmp_path / "tasks.db")
+        executed = []
+
+        async def award(user_id):
+            executed.append(user_id)
+
+        crashed = BackgroundTaskService(store=SQLiteTaskQueueStore(db_path, lease_seconds=0.05))
+        crashed.register_task_handler("badge_verification", award)
+        crashed.submit_task("badge_verification", award, {"user_id": "user_1"})
+        await crashed.flush_pending_saves()
+        # Processo morre antes de rodar os workers
+
+        await asyncio.sleep(0.1)
+        restarted = BackgroundTaskService(store=SQLiteTaskQueueStore(db_path, lease_seconds=0.05))
+        restarted.register_task_handler("badge_verification", award)
+
+        assert restarted.recover_persisted_tasks() == 1
+        await restarted._execute_task(restarted.task_queue.get_nowait())
+
+        assert executed == ["user_1"]
+        assert restarted._store.get_stats() == {}
+
+    @pytest.mark.asyncio
+    async def test_live_lease_is_not_stolen(self, tmp_path):
+        """Tarefas de um processo vivo não são reivindicadas por outro"""
+        db_path = str(tmp_path / "tasks.db")
+
+        async def noop():
+            return None
+
+        owner = BackgroundTaskService(store=SQLiteTaskQueueStore(db_path, lease_seconds=60))
+        owner.register_task_handler("events_simple", noop)
+        owner.submit_task("events_simple", noop, {})
+        await owner.flush_pending_saves()
+
+        other = BackgroundTaskService(store=SQLiteTaskQueueStore(db_path, lease_seconds=60))
+        other.register_task_handler("events_simple", noop)
+
+        assert other.recover_persisted_tasks() == 0
+        assert owner._store.get_stats() == {"pending": 1}
+
+    @pytest.mark.asyncio
+    async def test_dead_tasks_reloaded_into_dead_letters(self, tmp_path):
+        """Tarefa morta de um processo encerrado volta para a DLQ; o redrive a executa e limpa o disco"""
+        db_path = str(tmp_path / "tasks.db")
+        executed = []
+
+        async def award(user_id):
+            if not executed:
+                executed.append("falha")
+                raise RuntimeError("firestore indisponível")
+            executed.append(user_id)
+
+        crashed = BackgroundTaskService(store=SQLiteTaskQueueStore(db_path, lease_seconds=0.05))
+        crashed.register_task_handler("badge_verification", award)
+        task_id = crashed.submit_task(
+            "badge_verification", award, {"user_id": "user_1"}, retry_policy=RetryPolicy(max_attempts=1)
+        )
+        await crashed.flush_pending_saves()
+        await crashed._execute_task(crashed.task_queue.get_nowait())
+        assert crashed._store.get_stats() == {"dead": 1}
+
+        await asyncio.sleep(0.1)
+        restarted = BackgroundTaskService(store=SQLiteTaskQueueStore(db_path, lease_seconds=0.05))
+        restarted.register_task_handler("badge_verification", award)
+
+        assert restarted.recover_persisted_tasks() == 1
+        assert restarted.task_queue.qsize() == 0
+        assert restarted.get_dead_letters()[0]["error"] == "firestore indisponível"
+        assert restarted.metrics["dead_lettered_tasks"] == 0
+
+        assert restarted.redrive_dead_letter(task_id) is True
+        await restarted._execute_task(restarted.task_queue.get_nowait())
+
+        assert executed == ["falha", "user_1"]
+        assert restarted._store.get_stats() == {}
+
+    @pytest.mark.asyncio
+    async def test_dead_letter_eviction_purges_store(self, tmp_path):
+        """Tarefa descartada da DLQ cheia também sai da fila durável"""
+        service = BackgroundTaskService(store=SQLiteTaskQueueStore(str(tmp_path / "tasks.db")), max_dead_letters=1)
+
+        async def fail():
+            raise RuntimeError("falha")
+
+        service.register_task_handler("events_simple", fail)
+        task_ids = []
+        for _ in range(2):
+            task_ids.append(service.submit_task("events_simple", fail, {}, retry_policy=RetryPolicy(max_attempts=1)))
+            await service.flush_pending_saves()
+            await service._execute_task(service.task_queue.get_nowait())
+
+        assert task_ids[0] != task_ids[1]
+        assert list(service.dead_letters) == [task_ids[1]]
+        assert service._store.get_stats() == {"dead": 1}
+
+    @pytest.mark.asyncio
+    async def test_submit_persists_off_the_event_loop(self, tmp_path):
+        """Gravação da submissão roda em thread; a tarefa entra na fila só depois de gravada"""
+        service = BackgroundTaskService(store=SQLiteTaskQueueStore(str(tmp_path / "tasks.db")))
+
+        async def noop():
+            return None
+
+        service.register_task_handler("events_simple", noop)
+        task_id = service.submit_task("events_simple", noop, {})
+
+        assert service.task_queue.qsize() == 0
+        assert service.get_task_status(task_id)["status"] == "pending"
+        await service.flush_pending_saves()
+        assert service.task_queue.qsize() == 1
+        assert service.get_metrics()["durable_queue"] == {"pending": 1}
+
+    @pytest.mark.asyncio
+    async def test_tasks_without_handler_stay_in_memory(self, tmp_path):
+        """Sem handler registrado a tarefa não é gravada em disco"""
+        service = BackgroundTaskService(store=SQLiteTaskQueueStore(str(tmp_path / "tasks.db")))
+
+        async def noop():
+            return None
+
+        service.submit_task("ad_hoc", noop, {})
+
+        assert service._store.get_stats() == {}
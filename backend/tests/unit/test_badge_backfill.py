@@ -0,0 +1,164 @@
+"""
+Testes unitários para o backfill de badges em lote.
+"""
+
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from app.models.reward import Badge
+from app.repositories.badge_catalog import BadgeCatalog
+from app.services.badge_backfill import BadgeBackfillService
+from app.services.badge_rules import BadgeRuleEngine
+
+CATALOG = [
+    Badge(id="first_steps", requirements={"type": "first_completion", "value": 1}),
+    Badge(id="perfectionist", requirements={"type": "perfect_score", "value": 100}),
+    Badge(id="level_5", requirements={"type": "level", "value": 5}),
+    Badge(id="point_collector", requirements={"type": "points", "value": 1000}),
+    Badge(id="learning_path_enthusiast", requirements={"type": "learning_paths_completed", "count": 2}),
+    Badge(id="fundamentos_bitcoin_master",
+          requirements={"type": "learning_path_completed", "learning_path_id": "fundamentos_dinheiro_bitcoin"}),
+    Badge(id="excellent_quiz_score", requirements={"type": "excellent_quiz_scores", "count": 5, "min_score": 90}),
+]
+
+USERS = [
+    {"uid": "ana", "level": 6, "points": 1500, "completed_missions": {"m1": None}},
+    {"uid": "bia", "level": 2, "points": 1000},
+    {"uid": "caio", "points": 10},
+    {"uid": "duda", "level": 5, "points": 0, "completed_missions": {"m1": None, "m2": None}},
+    {"uid": "edu", "level": 9, "points": 9000},
+]
+
+
+class FakeUserRepo:
+    """Páginas em ordem de ID, como a consulta projetada do Firestore"""
+
+    def __init__(self, users):
+        self.users = sorted(users, key=lambda row: row["uid"])
+        self.pages_read = 0
+
+    def get_users_fields_page(self, fields, limit, after_id=None):
+        self.pages_read += 1
+        rows = [row for row in self.users if after_id is None or row["uid"] > after_id]
+        return rows[:limit]
+
+
+@pytest.fixture(autouse=True)
+def counters(monkeypatch):
+    monkeypatch.setattr("app.services.badge_backfill.get_sharded_counters", MagicMock)
+
+
+@pytest.fixture
+def badge_repo():
+    repo = MagicMock()
+    repo.get_catalog.return_value = BadgeCatalog.from_badges(CATALOG)
+    repo.get_users_badge_ids.return_value = {"ana": {"level_5"}}
+    repo.get_backfill_checkpoint.return_value = None
+    checkpoints = []
+    repo.save_backfill_checkpoint.side_effect = lambda job_id, data: checkpoints.append(dict(data))
+    repo.checkpoints = checkpoints
+
+    # BulkWriter simulado: cada create confirma na hora, exceto os de `repo.existing`
+    repo.existing = set()
+    callbacks = {}
+    repo.create_bulk_writer.side_effect = lambda *args, **kwargs: callbacks.update(kwargs) or MagicMock()
+    repo.user_badge_path.side_effect = lambda user_id, badge_id: f"user_badges/{user_id}_{badge_id}"
+
+    def queue_award(writer, user_id, badge_id, context):
+        path = repo.user_badge_path(user_id, badge_id)
+        if (user_id, badge_id) not in repo.existing:
+            callbacks["on_written"](SimpleNamespace(path=path))
+        return SimpleNamespace(user_id=user_id, badge_id=badge_id)
+
+    repo.queue_award.side_effect = queue_award
+    return repo
+
+
+@pytest.fixture
+def path_repo():
+    repo = MagicMock()
+    repo.get_progress_by_users.return_value = {
+        "bia": [
+            {"path_id": "fundamentos_dinheiro_bitcoin", "completed_at": "2024-01-01", "completed_modules": ["a", "b"]},
+            {"path_id": "aprofundando_bitcoin_tecnologia", "completed_at": "2024-02-01"},
+        ]
+    }
+    return repo
+
+
+def make_service(users, badge_repo, path_repo, page_size=2):
+    return BadgeBackfillService(
+        FakeUserRepo(users), badge_repo,
+        path_repo_factory=lambda: path_repo,
+        rule_engine=BadgeRuleEngine(),
+        page_size=page_size
+    )
+
+
+class TestBadgeBackfill:
+    """Testes para o plano, a avaliação vetorizada e o checkpoint"""
+
+    def test_plan_separates_rules(self, badge_repo, path_repo):
+        """Marcos em bloco, trilha específica por linha, regras de evento fora"""
+        vector_rules, row_rules, skipped = make_service(USERS, badge_repo, path_repo).plan()
+
+        assert sorted(rule.badge_id for rule in vector_rules) == [
+            "first_steps", "learning_path_enthusiast", "level_5", "point_collector"
+        ]
+        assert [rule.badge_id for rule in row_rules] == ["fundamentos_bitcoin_master"]
+        assert sorted(skipped) == ["excellent_quiz_score", "perfectionist"]
+
+    def test_evaluate_page_skips_earned(self, badge_repo, path_repo):
+        """Máscaras por limiar, sem repetir badges já conquistados"""
+        service = make_service(USERS, badge_repo, path_repo)
+        vector_rules, row_rules, _ = service.plan()
+
+        awards = service.evaluate_page(
+            USERS, vector_rules, row_rules, {"ana": {"level_5"}}, service._load_path_data([u["uid"] for u in USERS])
+        )
+
+        assert sorted(awards["ana"]) == ["first_steps", "point_collector"]
+        assert sorted(awards["bia"]) == ["fundamentos_bitcoin_master", "learning_path_enthusiast", "point_collector"]
+        assert "caio" not in awards
+        assert sorted(awards["edu"]) == ["level_5", "point_collector"]
+
+    def test_run_writes_in_bulk_and_checkpoints_each_page(self, badge_repo, path_repo):
+        """Concessões vão para o BulkWriter; checkpoint após cada página"""
+        service = make_service(USERS, badge_repo, path_repo)
+
+        result = service.run("job1", badge_ids=["level_5", "point_collector"])
+
+        assert result["status"] == "completed"
+        assert (result["users_scanned"], result["badges_awarded"]) == (5, 5)
+        assert badge_repo.queue_award.call_count == 5
+        assert badge_repo.queue_earned.call_count == 5
+        writer = badge_repo.queue_award.call_args.args[0]
+        assert writer.flush.call_count == 6
+        writer.close.assert_called_once()
+        assert [checkpoint["last_user_id"] for checkpoint in badge_repo.checkpoints[:3]] == ["bia", "duda", "edu"]
+        path_repo.get_progress_by_users.assert_not_called()
+
+    def test_run_counts_only_created_awards(self, badge_repo, path_repo):
+        """Concessão que já existia não conta nem regrava progresso/resumo"""
+        badge_repo.existing = {("bia", "point_collector")}
+        service = make_service(USERS, badge_repo, path_repo)
+
+        result = service.run("job1", badge_ids=["point_collector"])
+
+        assert (result["badges_awarded"], result["failed_writes"]) == (2, 0)
+        earned = [call.args[1].user_id for call in badge_repo.queue_earned.call_args_list]
+        assert earned == ["ana", "edu"]
+
+    def test_run_resumes_from_checkpoint(self, badge_repo, path_repo):
+        """Job pausado continua do último usuário confirmado"""
+        service = make_service(USERS, badge_repo, path_repo)
+
+        paused = service.run("job1", badge_ids=["point_collector"], max_pages=1)
+        badge_repo.get_backfill_checkpoint.return_value = paused
+        resumed = service.run("job1", badge_ids=["point_collector"])
+
+        assert (paused["status"], paused["last_user_id"]) == ("paused", "bia")
+        assert (resumed["status"], resumed["users_scanned"]) == ("completed", 5)
+        awarded_users = [call.args[1] for call in badge_repo.queue_award.call_args_list]
+        assert awarded_users == ["ana", "bia", "edu"]
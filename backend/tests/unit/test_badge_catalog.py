@@ -0,0 +1,85 @@
+"""
+Testes unitários para o catálogo de badges versionado.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from app.models.reward import Badge
+from app.repositories.badge_catalog import BadgeCatalog, BadgeCatalogCache
+from app.repositories.badge_repository import BadgeRepository
+
+CATALOG = [
+    Badge(id="level_5", requirements={"type": "level", "value": 5}),
+    Badge(id="level_10", requirements={"type": "level", "value": 10}),
+    Badge(id="point_collector", requirements={"type": "points", "value": 1000}),
+]
+
+
+@pytest.fixture
+def badge_repo():
+    repo = MagicMock()
+    repo.get_catalog_version.return_value = 1
+    repo.load_badges.return_value = CATALOG
+    return repo
+
+
+class TestBadgeCatalog:
+    """Testes para os índices e a recarga por versão"""
+
+    def test_lookups_by_id_and_type(self):
+        """Índices por ID e por tipo de requirement, imutáveis"""
+        catalog = BadgeCatalog.from_badges(CATALOG, version=3)
+
+        assert catalog.get("level_10").id == "level_10"
+        assert catalog.get("desconhecido") is None
+        assert [badge.id for badge in catalog.of_type("level")] == ["level_5", "level_10"]
+        assert catalog.of_type("streak") == ()
+        with pytest.raises(TypeError):
+            catalog.badges["novo"] = CATALOG[0]
+
+    def test_version_checked_at_most_every_interval(self, badge_repo, monkeypatch):
+        """Dentro do intervalo nada é lido; depois, a coleção só é relida se a versão mudar"""
+        now = [100.0]
+        monkeypatch.setattr("app.repositories.badge_catalog.time.monotonic", lambda: now[0])
+        cache = BadgeCatalogCache(check_interval=60)
+
+        first = cache.get(badge_repo)
+        now[0] += 30
+        assert cache.get(badge_repo) is first
+        assert badge_repo.get_catalog_version.call_count == 1
+
+        now[0] += 31
+        assert cache.get(badge_repo) is first
+        assert badge_repo.get_catalog_version.call_count == 2
+        badge_repo.load_badges.assert_called_once()
+
+        badge_repo.get_catalog_version.return_value = 2
+        badge_repo.load_badges.return_value = CATALOG[:1]
+        now[0] += 61
+        reloaded = cache.get(badge_repo)
+        assert (reloaded.version, len(reloaded)) == (2, 1)
+
+    def test_failure_keeps_previous_catalog(self, badge_repo):
+        """Erro na verificação mantém o catálogo anterior; sem catálogo, propaga"""
+        cache = BadgeCatalogCache(check_interval=0)
+        catalog = cache.get(badge_repo)
+
+        badge_repo.get_catalog_version.side_effect = RuntimeError("firestore indisponível")
+
+        assert cache.get(badge_repo) is catalog
+        with pytest.raises(RuntimeError):
+            BadgeCatalogCache(check_interval=0).get(badge_repo)
+
+    def test_repository_lookup_served_from_catalog(self):
+        """get_badge_by_id não lê o documento do badge quando ele está no catálogo"""
+        db = MagicMock()
+        repo = BadgeRepository(db)
+        repo.get_catalog_version = MagicMock(return_value=1)
+        repo.load_badges = MagicMock(return_value=CATALOG)
+
+        assert repo.get_badge_by_id("level_5").id == "level_5"
+        assert [badge.id for badge in repo.get_badges_by_requirement_type("points")] == ["point_collector"]
+        assert len(repo.get_all_badges()) == 3
+        db.collection.assert_not_called()
+        repo.load_badges.assert_called_once()
@@ -0,0 +1,138 @@
+"""
+Testes unitários para o push de concessões de badges (SSE).
+"""
+
+import asyncio
+import json
+import threading
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.events import LevelUpEvent
+from app.models.reward import Badge
+from app.repositories.badge_catalog import BadgeCatalog
+from app.services.badge_engine import BadgeEngine
+from app.services.badge_notifications import BadgeNotificationHub, build_notification
+from app.services.badge_rules import BadgeRuleEngine
+from app.services.validation_service import ValidationService
+
+LEVEL_5 = Badge(id="level_5", name="Nível 5", rarity="common", requirements={"type": "level", "value": 5})
+
+
+class TestBadgeNotificationHub:
+    """Testes para o fan-out e o formato SSE"""
+
+    @pytest.mark.asyncio
+    async def test_publish_delivers_once_to_user_connections(self):
+        """Conexões do usuário recebem; repetição (local + listener) é descartada"""
+        hub = BadgeNotificationHub()
+        first, second = hub.subscribe("user1"), hub.subscribe("user1")
+        other = hub.subscribe("user2")
+
+        notification = build_notification("user1", "level_5", LEVEL_5)
+        assert hub.publish(notification) is True
+        assert hub.publish(dict(notification)) is False
+
+        assert first.get_nowait()["name"] == "Nível 5"
+        assert second.qsize() == 1
+        assert other.empty()
+        assert hub.metrics["duplicates"] == 1
+
+    @pytest.mark.asyncio
+    async def test_publish_from_other_thread(self):
+        """Callback do listener (outra thread) entrega pelo event loop"""
+        hub = BadgeNotificationHub()
+        queue = hub.subscribe("user1")
+
+        thread = threading.Thread(target=hub.publish, args=(build_notification("user1", "level_5"),))
+        thread.start()
+        thread.join()
+
+        notification = await asyncio.wait_for(queue.get(), timeout=1)
+        assert notification["badge_id"] == "level_5"
+
+    @pytest.mark.asyncio
+    async def test_stream_formats_server_sent_events(self):
+        """Stream abre com `connected`, envia `badge_awarded` e libera a fila ao fechar"""
+        hub = BadgeNotificationHub(keepalive_seconds=0.01)
+        disconnected = [False]
+
+        async def is_disconnected():
+            return disconnected[0]
+
+        stream = hub.stream("user1", is_disconnected)
+        assert (await stream.__anext__()).startswith("event: connected")
+
+        assert await stream.__anext__() == ": keepalive\n\n"
+        hub.publish(build_notification("user1", "level_5", LEVEL_5))
+        message = await stream.__anext__()
+        disconnected[0] = True
+        await stream.aclose()
+
+        lines = message.strip().split("\n")
+        assert lines[:2] == ["id: user1:level_5", "event: badge_awarded"]
+        assert json.loads(lines[2][len("data: "):])["rarity"] == "common"
+        assert hub.get_stats()["users_connected"] == 0
+
+    @pytest.mark.asyncio
+    async def test_listener_restarts_with_recent_lower_bound(self):
+        """Listener é reaberto com `earned_at` adiantado e só notifica usuários conectados"""
+        hub = BadgeNotificationHub(listener_window_seconds=0)
+        queue = hub.subscribe("user1")
+        db = MagicMock()
+        first, second = MagicMock(), MagicMock()
+        query = db.collection.return_value.where.return_value
+        query.on_snapshot.side_effect = [first, second]
+
+        hub.start_listener(db, lambda badge_id: LEVEL_5)
+        started_bound = db.collection.return_value.where.call_args.args[2]
+        hub._restart_listener()
+        restarted_bound = db.collection.return_value.where.call_args.args[2]
+
+        first.unsubscribe.assert_called_once()
+        assert hub._listener is second
+        # Novo limite: instante da troca menos a sobreposição
+        assert timedelta(seconds=59) < started_bound - restarted_bound <= timedelta(seconds=61)
+        assert hub.metrics["listener_restarts"] == 1
+
+        on_snapshot = query.on_snapshot.call_args.args[0]
+        changes = []
+        for user_id in ("user1", "user2"):
+            change = MagicMock()
+            change.type.name = "ADDED"
+            change.document.to_dict.return_value = {"user_id": user_id, "badge_id": "level_5"}
+            changes.append(change)
+        on_snapshot([], changes, None)
+
+        assert queue.get_nowait()["user_id"] == "user1"
+        assert hub.metrics["published"] == 1
+
+        hub.stop_listener()
+        second.unsubscribe.assert_called_once()
+
+
+class TestBadgeEngineNotifications:
+    """Testes para a publicação a partir do caminho de concessão"""
+
+    @pytest.mark.asyncio
+    async def test_award_publishes_notification(self, monkeypatch):
+        """Badge concedido por evento é publicado com os dados do catálogo"""
+        hub = BadgeNotificationHub()
+        monkeypatch.setattr("app.services.badge_engine.get_badge_notification_hub", lambda: hub)
+        counters = MagicMock(increment_async=AsyncMock())
+        monkeypatch.setattr("app.services.badge_engine.get_sharded_counters", lambda: counters)
+        user_repo = MagicMock()
+        user_repo.get_user_profile.return_value = None
+        badge_repo = MagicMock()
+        badge_repo.get_catalog.return_value = BadgeCatalog.from_badges([LEVEL_5])
+        badge_repo.get_user_badge_ids.return_value = set()
+        badge_repo.award_badge.return_value = True
+        engine = BadgeEngine(ValidationService(user_repo, badge_repo, BadgeRuleEngine()), badge_repo)
+        queue = hub.subscribe("user1")
+
+        await engine.process_events([LevelUpEvent(user_id="user1", old_level=4, new_level=5, points_required=500)])
+
+        notification = queue.get_nowait()
+        assert (notification["badge_id"], notification["name"]) == ("level_5", "Nível 5")
+        badge_repo.get_badge_by_id.assert_not_called()
@@ -0,0 +1,102 @@
+"""
+Testes unitários para o progresso incremental de badges.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from firebase_admin import firestore
+
+from app.models.events import (
+    LearningPathCompletedEvent, MissionCompletedEvent, ModuleCompletedEvent, QuizCompletedEvent
+)
+from app.models.reward import Badge
+from app.repositories.badge_catalog import BadgeCatalog
+from app.services.badge_progress import BadgeProgressService, progress_updates
+from app.services.badge_rules import BadgeRuleEngine
+from app.services.validation_service import ValidationService
+
+CATALOG = [
+    Badge(id="first_steps", name="Primeiros Passos", requirements={"type": "first_completion", "value": 1}),
+    Badge(id="perfectionist", name="Perfeccionista", requirements={"type": "perfect_score", "value": 100}),
+    Badge(id="point_collector", name="Colecionador", requirements={"type": "points", "value": 1000}),
+    Badge(id="learning_path_enthusiast", name="Entusiasta",
+          requirements={"type": "learning_paths_completed", "count": 2}),
+]
+
+
+@pytest.fixture
+def repos():
+    badge_repo = MagicMock()
+    badge_repo.get_catalog.return_value = BadgeCatalog.from_badges(CATALOG)
+    badge_repo.get_user_badge_ids.return_value = {"first_steps"}
+    user_repo = MagicMock()
+    user_repo.get_user_profile.return_value = MagicMock(
+        level=2, points=400, xp=0, current_streak=3, completed_missions={"m1": None},
+        has_completed_questionnaire=False, knowledge_profile=None
+    )
+    return user_repo, badge_repo
+
+
+def make_service(user_repo, badge_repo):
+    validation_service = ValidationService(user_repo, badge_repo, BadgeRuleEngine())
+    validation_service._load_path_progress = MagicMock(return_value={
+        "completed_paths": frozenset({"fundamentos_dinheiro_bitcoin"}), "modules_completed": 4
+    })
+    return BadgeProgressService(badge_repo, validation_service)
+
+
+class TestBadgeProgress:
+    """Testes para as atualizações por evento e a leitura do progresso"""
+
+    def test_event_updates_use_transforms(self):
+        """Eventos viram transforms idempotentes, sem leitura"""
+        mission = progress_updates(MissionCompletedEvent(
+            user_id="u", mission_id="m2", score=90.0, mission_type="daily", total_points=700
+        ))
+        path = progress_updates(LearningPathCompletedEvent(
+            user_id="u", learning_path_id="p1", learning_path_name="P1", total_missions=3, completed_missions=3
+        ))
+        module = progress_updates(ModuleCompletedEvent(
+            user_id="u", learning_path_id="p1", module_id="mod1", module_name="Módulo 1"
+        ))
+
+        assert mission["mission_ids"] == firestore.ArrayUnion(["m2"])
+        assert mission["points"] == firestore.Maximum(700)
+        assert path == {"completed_paths": firestore.ArrayUnion(["p1"])}
+        assert module == {"modules_completed": firestore.Increment(1)}
+        assert progress_updates(QuizCompletedEvent(user_id="u", quiz_id="q", score=100.0)) == {}
+
+    def test_progress_is_one_read_when_seeded(self, repos):
+        """Documento semeado: uma leitura, sem perfil nem badges"""
+        user_repo, badge_repo = repos
+        badge_repo.get_badge_progress.return_value = {
+            "seeded_at": "2024-01-01", "points": 500, "mission_ids": ["m1", "m2"],
+            "completed_paths": ["p1", "p2"], "earned_badges": ["first_steps", "learning_path_enthusiast"]
+        }
+
+        result = make_service(user_repo, badge_repo).get_user_badge_progress("user1")
+
+        assert (result["total_badges"], result["earned_badges"]) == (4, 2)
+        assert result["badge_progress"]["point_collector"]["progress"]["progress"] == 50
+        assert result["badge_progress"]["learning_path_enthusiast"]["progress"]["completed"] is True
+        badge_repo.get_badge_progress.assert_called_once_with("user1")
+        user_repo.get_user_profile.assert_not_called()
+        badge_repo.get_user_badge_ids.assert_not_called()
+        badge_repo.update_badge_progress.assert_not_called()
+
+    def test_unseeded_progress_is_seeded_once(self, repos):
+        """Sem semeadura: lê as fontes, grava com transforms e mantém o que eventos já gravaram"""
+        user_repo, badge_repo = repos
+        badge_repo.get_badge_progress.return_value = {"points": 1200, "mission_ids": ["m9"]}
+
+        result = make_service(user_repo, badge_repo).get_user_badge_progress("user1")
+
+        seeded = badge_repo.update_badge_progress.call_args.args[1]
+        assert seeded["points"] == firestore.Maximum(400)
+        assert seeded["mission_ids"] == firestore.ArrayUnion(["m1"])
+        assert seeded["modules_completed"] == 4
+        assert "seeded_at" in seeded
+        # Total do evento (1200) vence o perfil desatualizado (400)
+        assert result["badge_progress"]["point_collector"]["progress"]["completed"] is True
+        assert result["badge_progress"]["first_steps"]["has_badge"] is True
+        assert result["badge_progress"]["learning_path_enthusiast"]["progress"]["progress"] == 50
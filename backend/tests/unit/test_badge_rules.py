@@ -0,0 +1,196 @@
+"""
+Testes unitários para o motor de regras de badges.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.events import (
+    EventType, LearningPathCompletedEvent, LevelUpEvent, MissionCompletedEvent, PointsEarnedEvent
+)
+from app.models.reward import Badge
+from app.repositories.badge_catalog import BadgeCatalog
+from app.services.badge_engine import BadgeEngine
+from app.services.badge_rules import BadgeRuleEngine, UserSnapshot, compile_badge_rule
+from app.services.validation_service import ValidationService
+
+CATALOG = [
+    Badge(id="first_steps", requirements={"type": "first_completion", "value": 1}),
+    Badge(id="perfectionist", requirements={"type": "perfect_score", "value": 100}),
+    Badge(id="streak_7", requirements={"type": "streak", "value": 7}),
+    Badge(id="level_5", requirements={"type": "level", "value": 5}),
+    Badge(id="point_collector", requirements={"type": "points", "value": 1000}),
+    Badge(id="point_master", requirements={"type": "points", "value": 5000}),
+    Badge(id="fundamentos_bitcoin_master",
+          requirements={"type": "learning_path_completed", "learning_path_id": "fundamentos_dinheiro_bitcoin"}),
+    Badge(id="learning_path_enthusiast", requirements={"type": "learning_paths_completed", "count": 2}),
+    Badge(id="bitcoin_curious", requirements={"type": "questionnaire_completed", "profile": "Explorador Curioso"}),
+    Badge(id="misterioso", requirements={"type": "desconhecido"}),
+]
+
+
+class TestBadgeRuleEngine:
+    """Testes para a compilação e o índice de regras"""
+
+    @pytest.fixture
+    def engine(self):
+        engine = BadgeRuleEngine()
+        engine.compile(CATALOG)
+        return engine
+
+    def test_rules_indexed_by_event_type(self, engine):
+        """Cada evento só enxerga as regras que pode disparar"""
+        level_rules = {rule.badge_id for rule in engine.rules_for_event(EventType.LEVEL_UP)}
+        path_rules = {rule.badge_id for rule in engine.rules_for_event(EventType.LEARNING_PATH_COMPLETED)}
+
+        assert level_rules == {"level_5"}
+        assert path_rules == {"fundamentos_bitcoin_master", "learning_path_enthusiast"}
+        assert engine.rules_for_event(EventType.MODULE_COMPLETED) == ()
+        # Tipo desconhecido não vira regra; questionário só vale em verificação completa
+        assert engine.skipped == ["misterioso"]
+        assert engine.get_rule("bitcoin_curious").event_types == frozenset()
+
+    def test_threshold_rules_use_event_totals(self, engine):
+        """Total trazido pelo evento vale mesmo com perfil desatualizado"""
+        snapshot = UserSnapshot(user_id="user1", points=900)
+        event = PointsEarnedEvent(user_id="user1", points_earned=200, total_points=1100, source="mission")
+
+        rules = engine.rules_for_event(event.event_type)
+
+        assert engine.evaluate(rules, snapshot, event) == ["point_collector"]
+        assert engine.evaluate(rules, snapshot) == []
+
+    def test_threshold_index_returns_crossed_milestones(self, engine):
+        """Transição anterior -> novo propõe só os marcos cruzados"""
+        def crossed(event):
+            return sorted(rule.badge_id for rule in engine.candidate_rules(event))
+
+        assert crossed(PointsEarnedEvent(user_id="u", points_earned=200, total_points=1100, source="mission")) == [
+            "point_collector"
+        ]
+        assert crossed(PointsEarnedEvent(user_id="u", points_earned=50, total_points=1100, source="mission")) == []
+        assert crossed(PointsEarnedEvent(user_id="u", points_earned=4500, total_points=5000, source="quiz")) == [
+            "point_collector", "point_master"
+        ]
+        assert crossed(LevelUpEvent(user_id="u", old_level=5, new_level=6, points_required=600)) == []
+        # Marco exatamente no novo valor conta; no valor anterior, não
+        assert crossed(LevelUpEvent(user_id="u", old_level=4, new_level=5, points_required=500)) == ["level_5"]
+        # Sem transição de pontos o evento avalia as próprias regras normalmente
+        mission = MissionCompletedEvent(user_id="u", mission_id="m1", score=100.0, mission_type="daily")
+        assert crossed(mission) == ["first_steps", "perfectionist", "point_collector", "point_master", "streak_7"]
+
+    def test_path_rules(self, engine):
+        """Trilha específica e contagem de trilhas concluídas"""
+        snapshot = UserSnapshot(user_id="user1", completed_paths=frozenset({"aprofundando_bitcoin_tecnologia"}))
+        event = LearningPathCompletedEvent(
+            user_id="user1", learning_path_id="fundamentos_dinheiro_bitcoin",
+            learning_path_name="Fundamentos", total_missions=8, completed_missions=8
+        )
+
+        eligible = engine.evaluate(engine.rules_for_event(event.event_type), snapshot, event)
+
+        assert sorted(eligible) == ["fundamentos_bitcoin_master", "learning_path_enthusiast"]
+        assert engine.get_rule("learning_path_enthusiast").fields == frozenset({"completed_paths"})
+
+    def test_metric_rule_exposes_threshold(self):
+        """Regras de marco expõem métrica e limiar"""
+        rule = compile_badge_rule(Badge(id="module_explorer", requirements={"type": "modules_completed", "count": 5}))
+
+        assert (rule.metric, rule.threshold) == ("modules_completed", 5)
+        assert rule.matches(UserSnapshot(user_id="u", modules_completed=5))
+        assert not rule.matches(UserSnapshot(user_id="u", modules_completed=4))
+
+
+class TestValidationServiceRules:
+    """Testes para a avaliação de eventos no ValidationService"""
+
+    @pytest.mark.asyncio
+    async def test_event_reads_profile_once(self):
+        """Um evento lê o perfil uma vez, qualquer que seja o número de regras"""
+        engine = BadgeRuleEngine()
+        engine.compile(CATALOG)
+        user_repo = MagicMock()
+        user_repo.get_user_profile.return_value = MagicMock(
+            level=3, points=4800, xp=0, current_streak=7, completed_missions={"m1": None},
+            has_completed_questionnaire=True, knowledge_profile=None
+        )
+        badge_repo = MagicMock()
+        badge_repo.get_user_badge_ids.return_value = {"first_steps"}
+        service = ValidationService(user_repo, badge_repo, engine)
+        event = MissionCompletedEvent(
+            user_id="user1", mission_id="m2", score=100.0, mission_type="daily", points_earned=4200,
+            total_points=5000
+        )
+
+        eligible = await service.check_badge_conditions("user1", event)
+
+        # Já conquistado não é proposto de novo
+        assert sorted(eligible) == ["perfectionist", "point_collector", "point_master", "streak_7"]
+        user_repo.get_user_profile.assert_called_once_with("user1")
+        badge_repo.get_user_badge_ids.assert_called_once_with("user1")
+        badge_repo.get_badge_by_id.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_catalog_compiled_once_per_version(self):
+        """Regras recompiladas só quando o catálogo muda de versão"""
+        badge_repo = MagicMock()
+        badge_repo.get_catalog.return_value = BadgeCatalog.from_badges(CATALOG, version=1)
+        badge_repo.get_user_badge_ids.return_value = set()
+        user_repo = MagicMock()
+        user_repo.get_user_profile.return_value = None
+        engine = BadgeRuleEngine()
+        service = ValidationService(user_repo, badge_repo, engine)
+        event = LevelUpEvent(user_id="user1", old_level=2, new_level=5, points_required=500)
+
+        assert await service.check_badge_conditions("user1", event) == ["level_5"]
+        compiled = engine.rules
+        assert await service.check_badge_conditions("user1", event) == ["level_5"]
+        assert engine.rules is compiled
+
+        badge_repo.get_catalog.return_value = BadgeCatalog.from_badges(
+            CATALOG + [Badge(id="level_3", requirements={"type": "level", "value": 3})], version=2
+        )
+        assert sorted(await service.check_badge_conditions("user1", event)) == ["level_3", "level_5"]
+        assert engine.get_stats()["catalog_version"] == 2
+
+
+class TestBadgeEngineBatch:
+    """Testes para a avaliação de lotes de eventos com um contexto por usuário"""
+
+    @pytest.fixture
+    def repos(self):
+        user_repo = MagicMock()
+        user_repo.get_user_profile.return_value = MagicMock(
+            level=4, points=900, xp=0, current_streak=0, completed_missions={},
+            has_completed_questionnaire=False, knowledge_profile=None
+        )
+        badge_repo = MagicMock()
+        badge_repo.get_catalog.return_value = BadgeCatalog.from_badges(CATALOG)
+        badge_repo.get_user_badge_ids.return_value = set()
+        badge_repo.award_badge.return_value = True
+        return user_repo, badge_repo
+
+    @pytest.mark.asyncio
+    async def test_batch_reads_user_once_and_awards_once(self, repos, monkeypatch):
+        """Lote de eventos: duas leituras por usuário, badge concedido uma vez"""
+        user_repo, badge_repo = repos
+        counters = MagicMock(increment_async=AsyncMock())
+        monkeypatch.setattr("app.services.badge_engine.get_sharded_counters", lambda: counters)
+        engine = BadgeEngine(ValidationService(user_repo, badge_repo, BadgeRuleEngine()), badge_repo)
+        events = [
+            MissionCompletedEvent(user_id="user1", mission_id="m1", score=80.0, mission_type="daily",
+                                  total_points=1000),
+            PointsEarnedEvent(user_id="user1", points_earned=100, total_points=1000, source="mission"),
+            LevelUpEvent(user_id="user1", old_level=4, new_level=5, points_required=500),
+        ]
+
+        awarded = await engine.process_events(events)
+
+        assert sorted(awarded["user1"]) == ["first_steps", "level_5", "point_collector"]
+        user_repo.get_user_profile.assert_called_once()
+        badge_repo.get_user_badge_ids.assert_called_once()
+        badge_repo.has_badge.assert_not_called()
+        badge_repo.get_badge_by_id.assert_not_called()
+        assert badge_repo.award_badge.call_count == 3
+        assert all(call.kwargs == {"check_duplicate": False} for call in badge_repo.award_badge.call_args_list)
+        counters.increment_async.assert_awaited_once_with("badges_awarded", 3)
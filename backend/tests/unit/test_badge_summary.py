@@ -0,0 +1,123 @@
+"""
+Testes unitários para o resumo de badges no documento do usuário.
+"""
+
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from firebase_admin import firestore
+
+from app.models.reward import Badge
+from app.models.user import earned_badge_ids
+from app.repositories.badge_catalog import BadgeCatalog
+from app.repositories.badge_repository import BadgeRepository
+
+CATALOG = [
+    Badge(id="first_steps", rarity="common", requirements={"type": "first_completion", "value": 1}),
+    Badge(id="perfectionist", rarity="epic", requirements={"type": "perfect_score", "value": 100}),
+]
+
+JAN = datetime(2024, 1, 1, tzinfo=timezone.utc)
+FEB = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def repo():
+    repo = BadgeRepository(MagicMock())
+    repo.get_catalog = MagicMock(return_value=BadgeCatalog.from_badges(CATALOG))
+    return repo
+
+
+def user_doc(summary):
+    doc = MagicMock()
+    doc.exists = True
+    doc.to_dict.return_value = {"badge_summary": summary}
+    return doc
+
+
+class TestBadgeSummary:
+    """Testes para a gravação e a leitura do resumo"""
+
+    def test_award_updates_summary_in_same_batch(self, repo):
+        """A concessão grava o resumo com transforms, no batch da concessão"""
+        repo.has_badge = MagicMock(return_value=False)
+
+        assert repo.award_badge("user1", "perfectionist", {}) is True
+
+        batch = repo.db.batch.return_value
+        summary = batch.update.call_args.args[1]
+        assert summary["badge_summary.badge_ids"] == firestore.ArrayUnion(["perfectionist"])
+        assert summary["badge_summary.earned_at.perfectionist"] == summary["badge_summary.last_earned"]["earned_at"]
+        # Sem contadores: reaplicar a mesma concessão não altera o resumo
+        assert not any(path.endswith((".count", ".by_rarity")) for path in summary)
+        assert summary["badge_summary.last_earned"]["badge_id"] == "perfectionist"
+        assert batch.create.call_args.args[1]["badge_id"] == "perfectionist"
+        batch.commit.assert_called_once()
+
+    def test_award_without_profile_skips_summary(self, repo):
+        """Sem perfil o update do resumo falha e a concessão é gravada sem ele"""
+        from google.api_core.exceptions import NotFound
+
+        repo.has_badge = MagicMock(return_value=False)
+        with_summary, without_summary = MagicMock(), MagicMock()
+        with_summary.commit.side_effect = NotFound("users/user1")
+        repo.db.batch.side_effect = [with_summary, without_summary]
+
+        assert repo.award_badge("user1", "perfectionist", {}) is True
+
+        without_summary.create.assert_called_once()
+        without_summary.update.assert_not_called()
+        without_summary.commit.assert_called_once()
+
+    def test_build_summary_from_user_badges(self, repo):
+        """Reconstrução: duplicatas contam uma vez, com a data mais antiga"""
+        summary = repo._build_summary([
+            {"badge_id": "perfectionist", "earned_at": FEB},
+            {"badge_id": "first_steps", "earned_at": JAN},
+            {"badge_id": "perfectionist", "earned_at": "2024-03-01T00:00:00Z"},
+        ])
+
+        assert summary["badge_ids"] == ["first_steps", "perfectionist"]
+        assert summary["earned_at"]["perfectionist"] == FEB
+        assert repo._summary_counts(summary) == {"count": 2, "by_rarity": {"common": 1, "epic": 1}}
+        assert summary["last_earned"] == {"badge_id": "perfectionist", "earned_at": FEB}
+        assert summary["complete"] is True
+
+    def test_complete_summary_is_one_read(self, repo):
+        """Resumo completo: badges vêm do documento do usuário, sem consultar user_badges"""
+        repo.db.collection.return_value.document.return_value.get.return_value = user_doc({
+            "badge_ids": ["first_steps", "perfectionist"],
+            "earned_at": {"first_steps": JAN, "perfectionist": FEB},
+            "complete": True
+        })
+        repo.rebuild_badge_summary = MagicMock()
+
+        badges = repo.get_earned_badges("user1")
+
+        assert [badge.badge_id for badge in badges] == ["perfectionist", "first_steps"]
+        assert repo.get_user_badge_ids("user1") == {"first_steps", "perfectionist"}
+        repo.db.collection.return_value.where.assert_not_called()
+        repo.rebuild_badge_summary.assert_not_called()
+
+    def test_partial_summary_is_rebuilt(self, repo):
+        """Resumo só com concessões recentes (sem `complete`) é reconstruído"""
+        repo.db.collection.return_value.document.return_value.get.return_value = user_doc({
+            "badge_ids": ["perfectionist"], "count": 1
+        })
+        repo.rebuild_badge_summary = MagicMock(return_value={"badge_ids": ["first_steps", "perfectionist"]})
+
+        assert repo.get_user_badge_ids("user1") == {"first_steps", "perfectionist"}
+        repo.rebuild_badge_summary.assert_called_once_with("user1")
+
+    def test_missing_profile_is_not_rebuilt(self, repo):
+        """Usuário sem documento: resumo vazio, sem ler user_badges a cada leitura"""
+        repo.db.collection.return_value.document.return_value.get.return_value = MagicMock(exists=False)
+
+        assert repo.get_user_badge_ids("user1") == set()
+        repo.db.collection.return_value.where.assert_not_called()
+
+    def test_ranking_badges_prefer_summary(self):
+        """Entradas de ranking usam o resumo e caem na lista legada sem ele"""
+        assert earned_badge_ids({"badge_ids": ["perfectionist"]}, ["legacy"]) == ["perfectionist"]
+        assert earned_badge_ids(None, ["legacy"]) == ["legacy"]
+        assert earned_badge_ids(None, None) == []
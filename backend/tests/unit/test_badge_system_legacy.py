@@ -12,6 +12,8 @@ from app.models.events import MissionCompletedEvent, LevelUpEvent, EventType
 from app.services.event_bus import EventBus
 from app.services.badge_engine import BadgeEngine
 from app.services.validation_service import ValidationService
+from app.services.badge_rules import BadgeRuleEngine
+from app.models.reward import Badge
 from app.repositories.badge_repository import BadgeRepository
 from app.repositories.user_repository import UserRepository
 
@@ -254,21 +256,32 @@ class TestValidationService:
         return AsyncMock()
     
     @pytest.fixture
-    def validation_service(self, mock_user_repo, mock_badge_repo):
+    def rule_engine(self):
+        """Motor de regras com parte do catálogo de badges"""
+        engine = BadgeRuleEngine()
+        engine.compile([
+            Badge(id="first_steps", requirements={"type": "first_completion", "value": 1}),
+            Badge(id="perfectionist", requirements={"type": "perfect_score", "value": 100}),
+            Badge(id="level_5", requirements={"type": "level", "value": 5}),
+            Badge(id="level_10", requirements={"type": "level", "value": 10}),
+        ])
+        return engine
+    
+    @pytest.fixture
+    def validation_service(self, mock_user_repo, mock_badge_repo, rule_engine):
         """Instância do ValidationService com mocks"""
-        return ValidationService(mock_user_repo, mock_badge_repo)
+        mock_user_repo.get_user_profile = MagicMock(return_value=None)
+        mock_badge_repo.get_user_badge_ids = MagicMock(return_value=set())
+        return ValidationService(mock_user_repo, mock_badge_repo, rule_engine)
 
     @pytest.mark.asyncio
     async def test_check_mission_badges_first_mission(self, validation_service, mock_user_repo):
         """Testa verificação de badges para primeira missão"""
         # Mock - usuário sem missões completadas
-        mock_user = MagicMock()
+        mock_user = MagicMock(level=1, points=0, xp=0, current_streak=0, knowledge_profile=None)
         mock_user.completed_missions = {}
         mock_user_repo.get_user_profile.return_value = mock_user
         
-        # Mock - streak zero
-        validation_service._get_current_streak = AsyncMock(return_value=0)
-        
         # Criar evento
         event = MissionCompletedEvent(
             user_id="user1",
@@ -278,16 +291,14 @@ class TestValidationService:
         )
         
         # Testar
-        badges = await validation_service._check_mission_badges("user1", event)
+        badges = await validation_service.check_badge_conditions("user1", event)
         
         assert "first_steps" in badges
+        assert "perfectionist" not in badges
 
     @pytest.mark.asyncio
     async def test_check_mission_badges_perfect_score(self, validation_service):
         """Testa verificação de badges para score perfeito"""
-        # Mock - streak zero
-        validation_service._get_current_streak = AsyncMock(return_value=0)
-        
         # Criar evento com score perfeito
         event = MissionCompletedEvent(
             user_id="user1",
@@ -297,7 +308,7 @@ class TestValidationService:
         )
         
         # Testar
-        badges = await validation_service._check_mission_badges("user1", event)
+        badges = await validation_service.check_badge_conditions("user1", event)
         
         assert "perfectionist" in badges
 
@@ -314,9 +325,9 @@ class TestValidationService:
         )
         
         # Testar
-        badges = await validation_service._check_level_badges("user1", event)
+        badges = await validation_service.check_badge_conditions("user1", event)
         
-        assert "level_5" in badges
+        assert badges == ["level_5"]
 
 
 class TestBadgeEngine:
@@ -351,8 +362,8 @@ class TestBadgeEngine:
         
         assert result is True
         mock_badge_repo.has_badge.assert_called_once_with("user1", "badge1")
-        mock_validation_service.validate_badge_eligibility.assert_called_once_with("user1", "badge1")
-        mock_badge_repo.award_badge.assert_called_once_with("user1", "badge1", {"test": "context"})
+        mock_validation_service.validate_badge_eligibility.assert_called_once_with("user1", "badge1", None, None)
+        mock_badge_repo.award_badge.assert_called_once_with("user1", "badge1", {"test": "context"}, check_duplicate=True)
 
     @pytest.mark.asyncio
     async def test_award_badge_if_eligible_not_eligible(self, badge_engine, mock_validation_service, mock_badge_repo):
@@ -367,7 +378,7 @@ class TestBadgeEngine:
         
         assert result is False
         mock_badge_repo.has_badge.assert_called_once_with("user1", "badge1")
-        mock_validation_service.validate_badge_eligibility.assert_called_once_with("user1", "badge1")
+        mock_validation_service.validate_badge_eligibility.assert_called_once_with("user1", "badge1", None, None)
         mock_badge_repo.award_badge.assert_not_called()
 
     def test_get_engine_stats(self, badge_engine):
@@ -0,0 +1,138 @@
+"""
+Testes unitários para as estruturas de leaderboard em memória.
+"""
+
+import random
+from datetime import date, timedelta
+
+from app.services.leaderboard_index import DailyScoreBuckets, IndexableSkipList, LeaderboardIndex, LeaderboardMember
+
+
+def _member(user_id: str, points: int, xp: int = 0) -> LeaderboardMember:
+    return LeaderboardMember(user_id=user_id, name=user_id, email=f"{user_id}@test.com", points=points, xp=xp)
+
+
+class TestIndexableSkipList:
+    """Testes para a skip list indexável"""
+
+    def test_matches_sorted_list_under_random_operations(self):
+        """Posições e iteração batem com uma lista ordenada de referência"""
+        rng = random.Random(42)
+        skiplist = IndexableSkipList()
+        reference = []
+
+        for _ in range(2000):
+            key = rng.randint(0, 500)
+            if key in reference and rng.random() < 0.5:
+                assert skiplist.remove(key)
+                reference.remove(key)
+            elif key not in reference:
+                skiplist.insert(key)
+                reference.append(key)
+        reference.sort()
+
+        assert len(skiplist) == len(reference)
+        assert list(skiplist) == reference
+        for index in (0, len(reference) // 2, len(reference) - 1):
+            assert skiplist.count_less(reference[index]) == index
+            assert next(skiplist.iter_from(index)) == reference[index]
+
+    def test_remove_missing_key(self):
+        """Remover chave inexistente não altera a estrutura"""
+        skiplist = IndexableSkipList()
+        skiplist.insert(1)
+
+        assert not skiplist.remove(2)
+        assert list(skiplist) == [1]
+
+
+class TestLeaderboardIndex:
+    """Testes para o LeaderboardIndex"""
+
+    def test_rank_and_page(self):
+        """Ordena por pontos + XP com desempate por user_id"""
+        index = LeaderboardIndex()
+        index.replace_all([
+            _member("ana", 100, 50),
+            _member("bia", 300),
+            _member("caio", 150),
+            _member("davi", 10),
+        ])
+
+        assert [member.user_id for _, member, _ in index.top(4)] == ["bia", "ana", "caio", "davi"]
+        assert index.rank("caio") == 3
+        assert index.page(offset=1, limit=2) == [(2, index.get("ana"), 150), (3, index.get("caio"), 150)]
+        assert index.rank("inexistente") is None
+
+    def test_upsert_moves_user(self):
+        """Atualizar o score reposiciona o usuário"""
+        index = LeaderboardIndex()
+        index.replace_all([_member("ana", 100), _member("bia", 200)])
+
+        index.upsert(_member("ana", 500))
+        index.upsert(_member("novo", 150))
+
+        assert [member.user_id for _, member, _ in index.top(3)] == ["ana", "bia", "novo"]
+        assert len(index) == 3
+
+    def test_remove(self):
+        """Usuário removido sai do ranking e os demais sobem"""
+        index = LeaderboardIndex()
+        index.replace_all([_member("ana", 100), _member("bia", 200)])
+
+        assert index.remove("bia")
+        assert index.rank("ana") == 1
+        assert not index.remove("bia")
+
+    def test_page_past_the_end(self):
+        """Página além do fim retorna vazia"""
+        index = LeaderboardIndex()
+        index.replace_all([_member("ana", 100)])
+
+        assert index.page(offset=5, limit=10) == []
+
+    def test_page_after_cursor_key(self):
+        """Página por cursor continua depois da chave, mesmo se o usuário mudou de score"""
+        index = LeaderboardIndex()
+        index.replace_all([_member(f"u{i}", i * 10) for i in range(1, 7)])
+
+        first = index.page(0, 2)
+        _, last_member, last_score = first[-1]
+        index.upsert(_member(last_member.user_id, 1000))
+
+        assert [member.user_id for _, member, _ in index.page_after(last_score, last_member.user_id, 2)] == ["u4", "u3"]
+
+
+class TestDailyScoreBuckets:
+    """Testes para os buckets diários de score"""
+
+    def test_window_sums_only_days_inside_window(self):
+        """Janela de 7 dias ignora buckets mais antigos"""
+        buckets = DailyScoreBuckets(retention_days=31)
+        today = date(2026, 10, 19)
+        buckets.add("ana", today, 10, 5)
+        buckets.add("ana", today - timedelta(days=6), 20, 0)
+        buckets.add("ana", today - timedelta(days=7), 100, 0)
+
+        assert buckets.window_totals("ana", today, 7) == (30, 5)
+        assert buckets.window_totals("ana", today, 31) == (130, 5)
+        assert buckets.active_users(today - timedelta(days=20), 7) == {}
+
+    def test_merge_max_does_not_double_count(self):
+        """Ledger e eventos do mesmo dia se combinam pelo máximo"""
+        buckets = DailyScoreBuckets()
+        today = date(2026, 10, 19)
+        buckets.add("ana", today, 50, 10)
+        buckets.merge_max("ana", today, 40, 30)
+
+        assert buckets.window_totals("ana", today, 1) == (50, 30)
+
+    def test_prune_drops_inactive_users(self):
+        """Usuário sem atividade na retenção sai da memória"""
+        buckets = DailyScoreBuckets(retention_days=7)
+        today = date(2026, 10, 19)
+        buckets.add("ana", today - timedelta(days=10), 50, 0)
+        buckets.add("bia", today, 10, 0)
+
+        assert buckets.prune(today) == 1
+        assert len(buckets) == 1
@@ -0,0 +1,205 @@
+"""
+Testes unitários para LeaderboardService.
+"""
+
+import pytest
+from datetime import datetime, timedelta, UTC
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.events import LearningPathProgressEvent, LevelUpEvent, MissionCompletedEvent, PointsEarnedEvent
+from app.services import leaderboard_service as leaderboard_module
+from app.services.leaderboard_service import LeaderboardService, ranking_window_tags
+
+
+class TestLeaderboardService:
+    """Testes para atualização incremental do leaderboard por eventos"""
+
+    @pytest.fixture
+    def mock_cache(self, monkeypatch):
+        cache = MagicMock(delete_by_tags=AsyncMock(return_value=0))
+        monkeypatch.setattr(leaderboard_module, "get_advanced_cache", lambda: cache)
+        return cache
+
+    @pytest.fixture
+    def service(self):
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.return_value = [
+            {"uid": f"user{i}", "name": f"User{i}", "email": f"user{i}@test.com",
+             "points": i * 100, "xp": 0, "level": 1 if i <= 150 else 2}
+            for i in range(1, 301)
+        ]
+        service = LeaderboardService()
+        service._load_sync(user_repo)
+        service.loaded = True
+        return service
+
+    def test_ranking_window_tags(self):
+        """Intervalo de ranks vira as tags das janelas que ele cobre"""
+        assert ranking_window_tags(1, 100) == ["global_window:0"]
+        assert ranking_window_tags(95, 205) == ["global_window:0", "global_window:1", "global_window:2"]
+
+    @pytest.mark.asyncio
+    async def test_points_earned_moves_user_and_invalidates_window(self, service, mock_cache):
+        """Evento de pontos reposiciona o usuário e invalida só as janelas entre os ranks"""
+        assert service.global_index.rank("user150") == 151
+
+        await service._handle_score_event(PointsEarnedEvent(
+            user_id="user150", points_earned=1000, xp_earned=0,
+            total_points=16000, total_xp=0, source="mission"
+        ))
+
+        assert service.global_index.rank("user150") == 141
+        mock_cache.delete_by_tags.assert_awaited_once_with(["global_window:1"])
+
+    @pytest.mark.asyncio
+    async def test_repeated_event_with_totals_is_idempotent(self, service, mock_cache):
+        """Eventos com totais não somam duas vezes"""
+        event = MissionCompletedEvent(
+            user_id="user1", mission_id="m1", score=100, mission_type="daily",
+            points_earned=50, xp_earned=100, total_points=150, total_xp=100
+        )
+
+        await service._handle_score_event(event)
+        await service._handle_score_event(event)
+
+        assert service.global_index.get_score("user1") == 250
+
+    @pytest.mark.asyncio
+    async def test_delta_applied_when_totals_missing(self, service, mock_cache):
+        """Sem totais o delta é aplicado sobre o score atual"""
+        await service._handle_score_event(MissionCompletedEvent(
+            user_id="user2", mission_id="m1", score=100, mission_type="daily",
+            points_earned=50, xp_earned=25
+        ))
+
+        member = service.global_index.get("user2")
+        assert (member.points, member.xp) == (250, 25)
+
+    @pytest.mark.asyncio
+    async def test_level_up_updates_member(self, service, mock_cache):
+        """Level up atualiza o nível e invalida a janela do usuário"""
+        await service._handle_level_up(LevelUpEvent(
+            user_id="user300", old_level=1, new_level=2, points_required=100
+        ))
+
+        assert service.global_index.get("user300").level == 2
+        mock_cache.delete_by_tags.assert_awaited_once_with(["global_window:0"])
+
+    def test_rank_stats_for_user_outside_top_100(self, service):
+        """Posição e percentil exatos para qualquer usuário, com rank no nível"""
+        stats = service.get_rank_stats("user10")
+
+        assert stats["global_rank"] == 291
+        assert stats["level_rank"] == 141
+        assert stats["level_total_users"] == 150
+        assert stats["percentile"] == round(10 / 300 * 100, 2)
+
+    def test_rank_stats_for_unknown_user(self, service):
+        """Usuário sem pontos é posicionado como score 0"""
+        stats = service.get_rank_stats("novato")
+
+        assert stats["global_rank"] == 301
+        assert stats["total_users"] == 301
+        assert "novato" not in service.global_index
+
+    @pytest.mark.asyncio
+    async def test_level_up_moves_level_partition(self, service, mock_cache):
+        """Level up tira o usuário do índice do nível antigo"""
+        await service._handle_level_up(LevelUpEvent(
+            user_id="user5", old_level=1, new_level=2, points_required=100
+        ))
+
+        assert "user5" not in service.level_indexes[1]
+        assert service.level_indexes[2].rank("user5") == 151
+
+    @pytest.mark.asyncio
+    async def test_score_event_feeds_weekly_and_monthly_windows(self, service, mock_cache):
+        """O ganho do evento entra no bucket do dia; repetições não somam"""
+        event = PointsEarnedEvent(
+            user_id="user10", points_earned=40, xp_earned=10,
+            total_points=1040, total_xp=10, source="mission"
+        )
+
+        await service._handle_score_event(event)
+        await service._handle_score_event(event)
+
+        assert service.window_indexes["weekly"].get_score("user10") == 50
+        assert service.window_indexes["monthly"].get("user10").name == "User10"
+        stats = service.get_rank_stats("user10")
+        assert (stats["weekly_rank"], stats["monthly_rank"]) == (1, 1)
+        assert service.get_rank_stats("user11")["weekly_rank"] == 0
+
+    def test_ledger_warms_windows_on_load(self):
+        """Carga completa aquece os buckets com o ledger de recompensas"""
+        now = datetime.now(UTC)
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.return_value = [{"uid": "ana", "name": "Ana", "points": 500}]
+        reward_repo = MagicMock()
+        reward_repo.get_rewards_since.return_value = [
+            {"user_id": "ana", "points_earned": 30, "xp_earned": 5, "earned_at": now},
+            {"user_id": "ana", "points_earned": 20, "xp_earned": 0, "earned_at": now - timedelta(days=10)},
+        ]
+        service = LeaderboardService()
+
+        service._load_sync(user_repo, reward_repo)
+
+        assert service.window_indexes["weekly"].get_score("ana") == 35
+        assert service.window_indexes["monthly"].get_score("ana") == 55
+        assert service.window_indexes["weekly"].get("ana").name == "Ana"
+
+    def test_path_boards_built_from_progress_on_load(self):
+        """Carga completa monta um índice por trilha com os dados do perfil"""
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.return_value = [
+            {"uid": "ana", "name": "Ana", "points": 10},
+            {"uid": "bia", "name": "Bia", "points": 900},
+        ]
+        path_repo = MagicMock()
+        path_repo.get_path_scores.return_value = [
+            {"user_id": "ana", "path_id": "bitcoin", "total_score": 300},
+            {"user_id": "bia", "path_id": "bitcoin", "total_score": 120},
+            {"user_id": "bia", "path_id": "defi", "total_score": 50},
+        ]
+        service = LeaderboardService()
+
+        service._load_sync(user_repo, path_repo=path_repo)
+
+        board = service.get_path_index("bitcoin")
+        assert board.rank("ana") == 1
+        assert board.get("ana").name == "Ana"
+        assert len(service.get_path_index("defi")) == 1
+
+    def test_failed_reload_keeps_previous_boards(self, service):
+        """Falha de leitura no refresh mantém os índices carregados"""
+        level_two = len(service.level_indexes[2])
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.side_effect = RuntimeError("firestore indisponível")
+        path_repo = MagicMock()
+        path_repo.get_path_scores.side_effect = RuntimeError("firestore indisponível")
+
+        with pytest.raises(RuntimeError):
+            service._load_sync(user_repo)
+        # Usuários lidos, mas trilhas não: nada é trocado
+        user_repo.get_users_ranking_fields.side_effect = None
+        user_repo.get_users_ranking_fields.return_value = [{"uid": "ana", "name": "Ana", "points": 10}]
+        with pytest.raises(RuntimeError):
+            service._load_sync(user_repo, path_repo=path_repo)
+
+        assert len(service.global_index) == 300
+        assert len(service.level_indexes[2]) == level_two
+        assert service.global_index.rank("user300") == 1
+
+    @pytest.mark.asyncio
+    async def test_path_progress_event_moves_user_in_path_board(self, service, mock_cache):
+        """Evento de progresso reposiciona o usuário só no ranking da trilha"""
+        service.record_path_score("user1", "bitcoin", 200)
+
+        event = LearningPathProgressEvent(user_id="user2", learning_path_id="bitcoin", total_score=250)
+        await service._handle_path_progress(event)
+        await service._handle_path_progress(event)
+
+        board = service.get_path_index("bitcoin")
+        assert (len(board), board.rank("user2"), board.get_score("user2")) == (2, 1, 250)
+        assert board.get("user2").name == "User2"
+        mock_cache.delete_by_tags.assert_awaited_with(["path:bitcoin"])
+        assert service.global_index.get_score("user2") == 200
@@ -0,0 +1,100 @@
+"""
+Testes unitários para o índice compilado das trilhas de aprendizado.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.learning_path import DifficultyLevel, LearningPath, MissionReference, Module, UserPathProgress
+from app.services.learning_path_index import get_path_index
+from app.services.learning_path_service import LearningPathService
+
+
+def _module(module_id: str, order: int, mission_ids) -> Module:
+    return Module(
+        id=module_id, name=module_id.title(), description="", order=order,
+        missions=[MissionReference(id=mission_id, mission_id=mission_id) for mission_id in mission_ids]
+    )
+
+
+def _path() -> LearningPath:
+    # Módulos fora de ordem no documento
+    return LearningPath(
+        id="path1", name="Trilha", description="", difficulty=DifficultyLevel.BEGINNER, estimated_duration="1h",
+        modules=[_module("mod3", 3, ["m5"]), _module("mod1", 1, ["m1", "m2"]), _module("mod2", 2, ["m3", "m4"])]
+    )
+
+
+class TestLearningPathIndex:
+    """Testes para os lookups do índice e o uso no LearningPathService"""
+
+    def test_compiled_lookups(self):
+        """Módulos em ordem, localização e ordinal das missões e totais"""
+        index = get_path_index(_path())
+
+        assert [module.id for module in index.modules] == ["mod1", "mod2", "mod3"]
+        assert index.mission_ids == ("m1", "m2", "m3", "m4", "m5")
+        assert (index.locations["m4"].module_id, index.locations["m4"].position, index.locations["m4"].ordinal) == ("mod2", 1, 3)
+        assert index.find_mission("m5").mission_id == "m5"
+        assert index.find_mission("desconhecida") is None
+        assert (index.total_modules, index.total_missions) == (3, 5)
+        assert index.progress_percentage(index.encode(["m1", "m5"])) == 40
+        assert index.first_module().id == "mod1"
+        assert index.next_module("mod1", {"mod2"}).id == "mod3"
+
+    def test_index_compiled_once_per_path_instance(self):
+        """O índice fica na instância da trilha e não entra na serialização"""
+        path = _path()
+
+        assert get_path_index(path) is get_path_index(path)
+        assert "_index" not in path.model_dump()
+
+    def test_only_modules_of_changed_missions_are_checked(self):
+        """Com as missões alteradas, só os módulos delas são verificados"""
+        index = get_path_index(_path())
+        completed = index.encode(["m1", "m2", "m3", "m4"])
+
+        assert index.completed_modules(completed) == ["mod1", "mod2"]
+        assert index.completed_modules(completed, already_completed={"mod1"}) == ["mod2"]
+        assert index.completed_modules(completed, changed_missions=["m4"]) == ["mod2"]
+        assert index.completed_modules(completed, changed_missions=["m5"]) == []
+
+    def test_progress_bitset_round_trip(self):
+        """Bitset gravado é reaproveitado; chave diferente ou divergência com a lista recalculam"""
+        index = get_path_index(_path())
+        progress = UserPathProgress(user_id="user1", path_id="path1", completed_missions=["m3", "m1"])
+
+        bits = index.progress_bits(progress)
+        assert bits == 0b101
+        assert index.store_bits(progress, bits) == {
+            "completed_mission_bits": b"\x05", "mission_bits_key": index.bits_key
+        }
+        assert index.is_module_complete("mod2", bits | index.mission_bit("m4"))
+        assert not index.is_path_complete(bits)
+        assert index.is_path_complete(index.full_mask)
+
+        # Bit perdido por gravação concorrente: a lista vence
+        progress.completed_missions.append("m2")
+        assert index.progress_bits(progress) == 0b111
+        # Trilha alterada: outro espaço de ordinais
+        progress.mission_bits_key = "outra"
+        progress.completed_mission_bits = b"\xff"
+        assert index.progress_bits(progress) == 0b111
+
+    def test_service_persists_completed_module_and_advances(self):
+        """Conclusão de módulo persistida e avanço para o próximo pelo índice"""
+        service = LearningPathService.__new__(LearningPathService)
+        service.repository = MagicMock()
+        service.event_bus = AsyncMock()
+        path = _path()
+        progress = UserPathProgress(
+            user_id="user1", path_id="path1", current_module_id="mod1", completed_missions=["m1", "m2"]
+        )
+
+        asyncio.run(service._check_and_persist_module_completion(progress, path, ["m2"]))
+        asyncio.run(service._advance_to_next_module(progress, path))
+
+        service.repository.complete_module.assert_called_once_with("user1", "path1", "mod1")
+        assert progress.completed_modules == ["mod1"]
+        assert progress.current_module_id == "mod2"
+        assert service.event_bus.emit.call_args.args[0].module_name == "Mod1"
@@ -0,0 +1,103 @@
+"""
+Testes unitários para o RankingMaterializer.
+"""
+
+import pytest
+from datetime import datetime, UTC
+from unittest.mock import AsyncMock, MagicMock
+
+from app.models.ranking import RankingType
+from app.services.leaderboard_service import LeaderboardService
+from app.services.ranking_materializer import RankingMaterializer
+from app.services.ranking_service import RankingService
+
+
+class TestRankingMaterializer:
+    """Testes para a materialização de snapshots de ranking"""
+
+    @pytest.fixture
+    def leaderboard(self):
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.return_value = [
+            {"uid": f"user{i}", "name": f"User{i}", "points": i * 10, "level": 1 if i <= 3 else 2}
+            for i in range(1, 6)
+        ]
+        path_repo = MagicMock()
+        path_repo.get_path_scores.return_value = [
+            {"user_id": "user1", "path_id": "bitcoin", "total_score": 300},
+            {"user_id": "user5", "path_id": "bitcoin", "total_score": 100},
+        ]
+        leaderboard = LeaderboardService()
+        leaderboard._load_sync(user_repo, path_repo=path_repo)
+        leaderboard.loaded = True
+        return leaderboard
+
+    @pytest.fixture
+    def ranking_repo(self):
+        repo = MagicMock()
+        repo.try_acquire_lease.return_value = True
+        repo.swap_current_snapshot.return_value = None
+        return repo
+
+    @pytest.fixture
+    def materializer(self, leaderboard, ranking_repo):
+        return RankingMaterializer(
+            leaderboard,
+            ranking_repo_factory=lambda: ranking_repo,
+            user_repo_factory=MagicMock,
+            page_size=2
+        )
+
+    def test_build_snapshot_pages(self, materializer, leaderboard):
+        """Snapshot é dividido em páginas com ranks contínuos"""
+        manifest, chunks = materializer.build_snapshot(
+            "global", (RankingType.GLOBAL, "all_time", leaderboard.global_index), datetime.now(UTC)
+        )
+
+        assert (manifest["total_users"], manifest["page_count"]) == (5, 3)
+        assert [entry["rank"] for entry in chunks[1]["entries"]] == [3, 4]
+        assert chunks[2]["entries"][0]["user_id"] == "user1"
+        assert all(chunk["snapshot_id"] == manifest["snapshot_id"] for chunk in chunks)
+        # Páginas são públicas: nada de email
+        assert all("email" not in entry for chunk in chunks for entry in chunk["entries"])
+
+    def test_materialize_writes_chunks_before_swapping_pointer(self, materializer, ranking_repo):
+        """Páginas e manifesto são escritos antes da troca do ponteiro"""
+        ranking_repo.swap_current_snapshot.return_value = "global_antigo"
+
+        published = materializer._materialize_sync()
+
+        assert published["global"] == 5
+        assert published["level_2"] == 2
+        assert published["path_bitcoin"] == 2
+        call_names = [name for name, _, _ in ranking_repo.method_calls]
+        assert call_names.index("write_snapshot_chunks") < call_names.index("swap_current_snapshot")
+        ranking_repo.delete_snapshot.assert_any_call("global_antigo")
+
+    def test_skips_without_lease(self, materializer, ranking_repo):
+        """Outro worker com o lease: nada é escrito"""
+        ranking_repo.try_acquire_lease.return_value = False
+
+        assert materializer._materialize_sync() == {}
+        ranking_repo.write_snapshot_chunks.assert_not_called()
+        assert materializer.metrics["skipped_runs"] == 1
+
+    @pytest.mark.asyncio
+    async def test_reader_serves_page_from_single_chunk_read(self, materializer, ranking_repo):
+        """Leitor busca o ponteiro uma vez e cada página em um único documento"""
+        manifest, chunks = materializer.build_snapshot(
+            "global",
+            (RankingType.GLOBAL, "all_time", materializer.leaderboard.global_index),
+            datetime.now(UTC)
+        )
+        ranking_repo.get_current_snapshot.return_value = manifest
+        ranking_repo.get_snapshot_chunk.side_effect = lambda snapshot_id, page: chunks[page]
+        service = RankingService(MagicMock(), ranking_repo, leaderboard=materializer.leaderboard)
+        service.cache = MagicMock(get=AsyncMock(return_value=None), set=AsyncMock())
+
+        ranking = await service.get_ranking_snapshot_page("global", 1)
+
+        assert [entry.rank for entry in ranking.entries] == [3, 4]
+        assert ranking.context["has_more"] is True
+        ranking_repo.get_snapshot_chunk.assert_called_once_with(manifest["snapshot_id"], 1)
+        assert await service.get_ranking_snapshot_page("global", 3) is None
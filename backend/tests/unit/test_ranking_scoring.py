@@ -0,0 +1,92 @@
+"""
+Testes unitários para o cálculo vetorizado do score de ranking.
+"""
+
+import random
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from app.services.leaderboard_index import IndexableSkipList, LeaderboardIndex, LeaderboardMember
+from app.services.leaderboard_service import LeaderboardService
+from app.services.ranking_scoring import (
+    compute_ranking_scores,
+    extract_score_columns,
+    rank_order,
+    ranking_bonus,
+)
+
+
+class TestRankingScoring:
+    """Testes para a fórmula e a ordenação em bloco"""
+
+    def test_vectorized_scores_match_scalar_formula(self):
+        """Versão vetorizada e por usuário dão o mesmo score"""
+        rows = [
+            {"uid": "ana", "points": 100, "xp": 50, "current_streak": 30,
+             "completed_learning_paths": ["bitcoin", "defi"], "average_score": 87.5},
+            {"uid": "bia", "points": 10, "current_streak": 3, "completed_learning_paths": 1},
+            {"uid": "caio"},
+        ]
+
+        scores = compute_ranking_scores(extract_score_columns(rows))
+
+        expected = [
+            row.get("points", 0) + row.get("xp", 0) + ranking_bonus(
+                row.get("current_streak", 0), row.get("completed_learning_paths", 0), row.get("average_score", 0.0)
+            )
+            for row in rows
+        ]
+        assert scores.tolist() == expected
+        # Streak limitado a 200, 2 trilhas = 100, qualidade 87.5 * 2 = 175
+        assert expected[0] == 150 + 200 + 100 + 175
+
+    def test_rank_order_breaks_ties_by_user_id(self):
+        """Empates são resolvidos por user_id, independente da ordem de entrada"""
+        user_ids = np.array(["zeca", "bia", "ana", "caio"])
+        scores = np.array([10, 30, 10, 30])
+
+        assert user_ids[rank_order(scores, user_ids)].tolist() == ["bia", "caio", "ana", "zeca"]
+
+    def test_from_sorted_matches_incremental_inserts(self):
+        """Construção em bloco equivale a inserir chave a chave"""
+        keys = sorted(random.Random(7).sample(range(10_000), 1500))
+        bulk = IndexableSkipList.from_sorted(keys)
+
+        assert len(bulk) == len(keys)
+        assert list(bulk) == keys
+        for index in (0, 1, 700, len(keys) - 1):
+            assert bulk.count_less(keys[index]) == index
+            assert next(bulk.iter_from(index)) == keys[index]
+
+        # Continua funcional para atualizações incrementais
+        bulk.insert(-1)
+        assert bulk.remove(keys[3])
+        assert list(bulk) == [-1] + keys[:3] + keys[4:]
+
+    def test_presorted_replace_all_matches_default(self):
+        """replace_all com presorted gera o mesmo índice que a versão ordenada por inserção"""
+        members = [LeaderboardMember(user_id=f"user{i}", points=(i * 37) % 101) for i in range(300)]
+        ordered = sorted(members, key=lambda member: (-member.score, member.user_id))
+        default_index, bulk_index = LeaderboardIndex("a"), LeaderboardIndex("b")
+
+        default_index.replace_all(members)
+        bulk_index.replace_all(ordered, presorted=True)
+
+        assert bulk_index.page(0, 300) == default_index.page(0, 300)
+        assert bulk_index.rank("user150") == default_index.rank("user150")
+
+    def test_leaderboard_load_applies_bonus(self):
+        """Carga completa ordena pelo score com bônus, não só por pontos + XP"""
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.return_value = [
+            {"uid": "ana", "points": 300, "level": 1},
+            {"uid": "bia", "points": 250, "current_streak": 10, "level": 1},
+        ]
+        service = LeaderboardService()
+
+        service._load_sync(user_repo)
+
+        assert service.global_index.rank("bia") == 1
+        assert service.global_index.get_score("bia") == 350
+        assert service.level_indexes[1].rank("ana") == 2
@@ -0,0 +1,135 @@
+"""
+Testes unitários para os snapshots colunares de ranking em disco local.
+"""
+
+import pytest
+from datetime import datetime, UTC
+from unittest.mock import MagicMock
+
+from app.models.ranking import RankingType
+from app.services.leaderboard_index import LeaderboardIndex, LeaderboardMember
+from app.services.leaderboard_service import LeaderboardService, ranking_entries
+from app.services.ranking_materializer import RankingMaterializer
+from app.services.ranking_service import RankingService
+from app.services.ranking_snapshot_file import LocalSnapshotStore, RankingSnapshotFile, write_snapshot_file
+
+
+def _index(size: int) -> LeaderboardIndex:
+    index = LeaderboardIndex("global")
+    index.replace_all([
+        LeaderboardMember(
+            user_id=f"user{i:03d}", name=f"Usuário {i}", email=f"user{i}@test.com",
+            points=i * 10, xp=i, level=1 + i % 3,
+            badges=["first_mission", "streak_7"][:i % 3],
+            last_activity=datetime(2026, 1, 1, tzinfo=UTC)
+        )
+        for i in range(size)
+    ])
+    return index
+
+
+class TestRankingSnapshotFile:
+    """Testes para o formato colunar e o leitor mapeado em memória"""
+
+    def test_round_trip_matches_index_without_email(self, tmp_path):
+        """Páginas lidas do arquivo batem com o índice; email não é gravado"""
+        index = _index(50)
+        path = str(tmp_path / "global.cqr")
+        write_snapshot_file(path, index.page(0, len(index)), {"page_size": 10})
+
+        snapshot = RankingSnapshotFile(path)
+
+        expected = [entry.model_copy(update={"email": ""}) for entry in ranking_entries(index, 20, 5)]
+        assert snapshot.page(20, 5) == expected
+        assert len(snapshot) == 50
+        assert snapshot.metadata["page_size"] == 10
+        # Strings repetidas (badges) entram uma única vez na tabela
+        assert snapshot.metadata["string_count"] == 50 * 2 + 2
+
+    def test_rank_of_uses_user_index(self, tmp_path):
+        """Rank por user_id via busca binária, None para quem não está no ranking"""
+        index = _index(200)
+        path = str(tmp_path / "global.cqr")
+        write_snapshot_file(path, index.page(0, len(index)), {})
+
+        snapshot = RankingSnapshotFile(path)
+
+        assert all(snapshot.rank_of(f"user{i:03d}") == index.rank(f"user{i:03d}") for i in (0, 7, 199))
+        assert snapshot.rank_of("ninguem") is None
+
+    def test_empty_ranking(self, tmp_path):
+        """Ranking vazio gera um arquivo válido"""
+        path = str(tmp_path / "weekly.cqr")
+        write_snapshot_file(path, [], {})
+
+        snapshot = RankingSnapshotFile(path)
+
+        assert (len(snapshot), snapshot.page(0, 10), snapshot.rank_of("ana")) == (0, [], None)
+
+    def test_store_reopens_replaced_file(self, tmp_path):
+        """Leitores continuam com o mapeamento antigo até o arquivo ser trocado"""
+        store = LocalSnapshotStore(str(tmp_path))
+        store.write("global", _index(3).page(0, 3), {})
+        first = store.open("global")
+
+        assert store.open("global") is first
+        store.write("global", _index(5).page(0, 5), {})
+        second = store.open("global")
+
+        assert (len(first), len(second)) == (3, 5)
+        assert store.open("../etc/passwd") is None
+
+
+class TestLocalSnapshotServing:
+    """Testes da gravação pelo materializador e da leitura pelo RankingService"""
+
+    @pytest.fixture
+    def leaderboard(self):
+        user_repo = MagicMock()
+        user_repo.get_users_ranking_fields.return_value = [
+            {"uid": f"user{i}", "name": f"User{i}", "points": i * 10, "level": 1 if i <= 3 else 2}
+            for i in range(1, 6)
+        ]
+        leaderboard = LeaderboardService()
+        leaderboard._load_sync(user_repo)
+        leaderboard.loaded = True
+        return leaderboard
+
+    @pytest.fixture
+    def store(self, tmp_path, leaderboard):
+        store = LocalSnapshotStore(str(tmp_path))
+        materializer = RankingMaterializer(
+            leaderboard, ranking_repo_factory=MagicMock, user_repo_factory=MagicMock,
+            page_size=2, local_store=store
+        )
+        boards = materializer.collect_boards()
+
+        assert materializer.write_local_snapshots(boards, datetime.now(UTC)) == len(boards)
+        # Snapshot ainda recente: outro worker não regrava
+        assert materializer.write_local_snapshots(boards, datetime.now(UTC)) == 0
+        return store
+
+    @pytest.mark.asyncio
+    async def test_page_served_from_local_snapshot(self, store, leaderboard):
+        """Página sai do arquivo local, sem ler o Firestore"""
+        ranking_repo = MagicMock()
+        service = RankingService(MagicMock(), ranking_repo, leaderboard=leaderboard, local_snapshots=store)
+
+        ranking = await service.get_ranking_snapshot_page("global", 1)
+
+        assert [entry.rank for entry in ranking.entries] == [3, 4]
+        assert ranking.type == RankingType.GLOBAL
+        assert ranking.context["page_count"] == 3
+        assert await service.get_ranking_snapshot_page("level_2", 1) is None
+        ranking_repo.get_current_snapshot.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stats_from_local_snapshot_before_load(self, store):
+        """Worker sem leaderboard carregado responde posições pelo snapshot"""
+        user_repo = MagicMock()
+        service = RankingService(user_repo, MagicMock(), leaderboard=LeaderboardService(), local_snapshots=store)
+
+        stats = await service.get_user_ranking_stats("user4")
+
+        assert (stats.global_rank, stats.level_rank, stats.weekly_rank, stats.total_users) == (2, 2, 0, 5)
+        user_repo.get_users_ranking_fields.assert_not_called()
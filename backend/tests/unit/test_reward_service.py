@@ -306,3 +306,43 @@ class TestRewardService:
         assert result["total_points"] == 300
         assert result["total_xp"] == 150
         assert result["total_rewards"] == 2
+
+    @pytest.mark.asyncio
+    async def test_apply_rewards_with_reward_id_is_idempotent(self, reward_service, mock_user_repo):
+        """Com reward_id, a reexecução não credita nem publica de novo"""
+        mock_user_repo.get_user_profile.return_value = UserProfile(
+            uid="user1",
+            name="User1",
+            email="user1@test.com",
+            register_date=datetime.now(timezone.utc),
+            points=150,
+            xp=75
+        )
+        reward_service.reward_repo = MagicMock()
+        reward_service.reward_repo.apply_user_reward_once = AsyncMock(side_effect=[True, False])
+        reward_service._publish_points_earned = MagicMock()
+
+        first = await reward_service.apply_rewards("user1", RewardType.LEARNING_PATH_MODULE, 50, 25, {}, reward_id="r1")
+        again = await reward_service.apply_rewards("user1", RewardType.LEARNING_PATH_MODULE, 50, 25, {}, reward_id="r1")
+
+        assert (first["points_earned"], first["already_applied"]) == (50, False)
+        assert (again["points_earned"], again["already_applied"]) == (0, True)
+        assert again["total_points"] == 150
+        reward_service._publish_points_earned.assert_called_once()
+        mock_user_repo.update_user_profile.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_apply_user_reward_once_already_exists(self):
+        """Ledger com o mesmo ID: o batch falha por inteiro e nada é creditado"""
+        from google.api_core.exceptions import AlreadyExists
+        from app.repositories.reward_repository import RewardRepository
+
+        db = MagicMock()
+        db.batch.return_value.commit = AsyncMock(side_effect=[None, AlreadyExists("user_rewards/r1")])
+        repo = RewardRepository(db)
+        reward = UserReward(user_id="user1", points_earned=50, xp_earned=25)
+
+        assert await repo.apply_user_reward_once("r1", reward) is True
+        assert await repo.apply_user_reward_once("r1", reward) is False
+        db.collection.return_value.document.assert_any_call("r1")
+        db.batch.return_value.create.assert_called()
@@ -0,0 +1,96 @@
+"""
+Testes unitários para os contadores distribuídos.
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from app.models.events import MissionCompletedEvent, PointsEarnedEvent
+from app.services.sharded_counter import (
+    COUNTER_MISSIONS_COMPLETED,
+    COUNTER_POINTS_DISTRIBUTED,
+    COUNTER_USERS,
+    COUNTER_XP_DISTRIBUTED,
+    InMemoryCounterStore,
+    ShardedCounterService,
+)
+
+
+class TestShardedCounterService:
+    """Testes para incremento e leitura dos contadores"""
+
+    @pytest.fixture
+    def counters(self):
+        return ShardedCounterService(InMemoryCounterStore(), num_shards=4, cache_seconds=60)
+
+    def test_increments_spread_over_shards_and_sum_on_read(self, counters):
+        """Incrementos caem em shards diferentes e a leitura soma todos"""
+        for _ in range(200):
+            counters.increment(COUNTER_MISSIONS_COMPLETED)
+        counters.increment(COUNTER_MISSIONS_COMPLETED, 0)
+
+        assert counters.get(COUNTER_MISSIONS_COMPLETED) == 200
+        assert len(counters.store._shards[COUNTER_MISSIONS_COMPLETED]) > 1
+        assert counters.get("inexistente") == 0
+
+    def test_cached_read_sees_own_increments(self, counters):
+        """Leitura em cache não volta ao armazenamento, mas soma os incrementos locais"""
+        counters.increment(COUNTER_USERS, 5)
+        assert counters.get(COUNTER_USERS) == 5
+        counters.store = MagicMock(wraps=counters.store)
+
+        counters.increment(COUNTER_USERS, 2)
+
+        assert counters.get(COUNTER_USERS) == 7
+        counters.store.read.assert_not_called()
+
+    def test_seed_runs_once_for_existing_data(self, counters):
+        """Valor anterior ao contador é semeado uma vez, sem contar de novo o que já está nos shards"""
+        # Contagem completa (1000) já inclui os 3 cadastros feitos antes da primeira leitura
+        seeder = MagicMock(return_value=1000)
+        counters.register_seed(COUNTER_USERS, seeder)
+        counters.increment(COUNTER_USERS, 3)
+
+        assert counters.get(COUNTER_USERS) == 1000
+        counters.increment(COUNTER_USERS)
+        other_process = ShardedCounterService(counters.store, num_shards=4)
+        other_process.register_seed(COUNTER_USERS, MagicMock(return_value=999))
+        assert other_process.get(COUNTER_USERS) == 1001
+        seeder.assert_called_once()
+
+    def test_seed_registered_at_startup(self, counters):
+        """Startup semeia os contadores pendentes; a primeira leitura não conta de novo"""
+        seeder = MagicMock(return_value=50)
+        counters.register_seed(COUNTER_USERS, seeder)
+
+        assert counters.seed_registered() == 1
+        assert counters.seed_registered() == 0
+        counters.increment(COUNTER_USERS, 2)
+        assert counters.get(COUNTER_USERS) == 52
+        seeder.assert_called_once()
+
+    def test_failed_increment_is_not_raised(self, counters):
+        """Falha no armazenamento não derruba quem incrementa"""
+        counters.store = MagicMock()
+        counters.store.increment.side_effect = RuntimeError("firestore indisponível")
+
+        counters.increment(COUNTER_USERS)
+
+        assert counters.metrics["failed_increments"] == 1
+
+    @pytest.mark.asyncio
+    async def test_business_events_feed_counters(self, counters):
+        """Missões e pontos entregues viram totais globais"""
+        await counters._handle_mission_completed(MissionCompletedEvent(
+            user_id="ana", mission_id="m1", score=90, mission_type="daily",
+            points_earned=50, xp_earned=20
+        ))
+        await counters._handle_points_earned(PointsEarnedEvent(
+            user_id="ana", points_earned=10, total_points=60, source="quiz"
+        ))
+
+        assert counters.get_many([COUNTER_MISSIONS_COMPLETED, COUNTER_POINTS_DISTRIBUTED, COUNTER_XP_DISTRIBUTED]) == {
+            COUNTER_MISSIONS_COMPLETED: 1,
+            COUNTER_POINTS_DISTRIBUTED: 60,
+            COUNTER_XP_DISTRIBUTED: 20
+        }